@@ -0,0 +1,297 @@
+"""
+Замеры скорости основных операций со студентами на локальном PostgreSQL.
+
+Операции меню (add_student, view_students, find_student, delete_student, edit_student)
+спрашивают данные через input(), поэтому здесь вызываются функции работы с данными,
+которые стоят за этими пунктами меню: insert_student, iter_all_students,
+get_student_by_id, find_students_by_name, update_student, delete_student_by_id.
+
+Пример запуска (база берется из того же ".env"):
+
+    python benchmark_students.py --sizes 10000,100000,1000000 --output bench_results.json
+    python benchmark_students.py --sizes 10000 --compare bench_results.json
+
+Для каждого размера таблица дополняется синтетическими студентами до нужного
+числа строк, затем каждая операция выполняется --ops раз. Результаты
+(перцентили задержки и операций в секунду) записываются в JSON-файл,
+чтобы сравнивать прогоны между собой. Добавленные студенты в конце удаляются
+(если не указан --keep).
+"""
+import argparse
+import json
+import platform
+import random
+import time
+from datetime import datetime
+
+import student_management_functions as sm
+
+
+# --- Синтетические данные: русские ФИО ---
+# Фамилии в мужской форме; женская форма получается окончанием "-а" ("Иванов" -> "Иванова")
+LAST_NAMES = [
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+    'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров',
+    'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов', 'Андреев', 'Макаров', 'Никитин',
+    'Захаров', 'Зайцев', 'Соловьев', 'Борисов', 'Яковлев', 'Григорьев', 'Романов', 'Воробьев',
+    'Сергеев', 'Кузьмин', 'Фролов', 'Александров', 'Дмитриев', 'Королев', 'Гусев', 'Киселев',
+    'Ильин', 'Максимов', 'Поляков', 'Сорокин', 'Виноградов', 'Ковалев', 'Белов', 'Медведев',
+    'Антонов', 'Тарасов', 'Жуков', 'Баранов', 'Филиппов', 'Комаров', 'Давыдов', 'Беляев',
+]
+MALE_NAMES = [
+    'Александр', 'Дмитрий', 'Максим', 'Сергей', 'Андрей', 'Алексей', 'Артем', 'Илья',
+    'Кирилл', 'Михаил', 'Никита', 'Матвей', 'Роман', 'Егор', 'Иван', 'Владимир',
+    'Павел', 'Николай', 'Денис', 'Тимофей', 'Евгений', 'Олег', 'Константин', 'Георгий',
+]
+FEMALE_NAMES = [
+    'Анастасия', 'Мария', 'Анна', 'Виктория', 'Екатерина', 'Наталья', 'Марина', 'Полина',
+    'Дарья', 'Алиса', 'Ксения', 'Елена', 'Ольга', 'Татьяна', 'Юлия', 'Валерия',
+    'Софья', 'Ирина', 'Светлана', 'Алена', 'Вероника', 'Кристина', 'Людмила', 'Варвара',
+]
+# Отчества образуются от мужских имен отцов
+FATHER_NAMES = {
+    'Александр': ('Александрович', 'Александровна'),
+    'Дмитрий': ('Дмитриевич', 'Дмитриевна'),
+    'Сергей': ('Сергеевич', 'Сергеевна'),
+    'Андрей': ('Андреевич', 'Андреевна'),
+    'Алексей': ('Алексеевич', 'Алексеевна'),
+    'Михаил': ('Михайлович', 'Михайловна'),
+    'Иван': ('Иванович', 'Ивановна'),
+    'Владимир': ('Владимирович', 'Владимировна'),
+    'Павел': ('Павлович', 'Павловна'),
+    'Николай': ('Николаевич', 'Николаевна'),
+    'Евгений': ('Евгеньевич', 'Евгеньевна'),
+    'Олег': ('Олегович', 'Олеговна'),
+    'Игорь': ('Игоревич', 'Игоревна'),
+    'Юрий': ('Юрьевич', 'Юрьевна'),
+    'Виктор': ('Викторович', 'Викторовна'),
+    'Петр': ('Петрович', 'Петровна'),
+}
+
+
+def random_student_row(rng):
+    """
+    Случайный студент: (фамилия, имя, отчество, возраст, курс).
+    Возраст чаще 17-25 лет, как у настоящих студентов, иногда - старше.
+    """
+    male = rng.random() < 0.5
+    last_name = rng.choice(LAST_NAMES)
+    patronymic = rng.choice(list(FATHER_NAMES.values()))
+    if male:
+        first_name, patronymic = rng.choice(MALE_NAMES), patronymic[0]
+    else:
+        last_name, first_name, patronymic = last_name + 'а', rng.choice(FEMALE_NAMES), patronymic[1]
+    course = rng.randint(sm.MIN_COURSE, sm.MAX_COURSE)
+    if rng.random() < 0.9:
+        age = min(16 + course + rng.randint(0, 3), sm.MAX_AGE)
+    else:
+        age = rng.randint(sm.MIN_AGE, sm.MAX_AGE)
+    return last_name, first_name, patronymic, age, course
+
+
+def seed_students(count, rng, batch_size=sm.IMPORT_BATCH_SIZE):
+    """
+    Добавляет count синтетических студентов пачками через COPY (как массовый импорт).
+    """
+    with sm.db_transaction() as connection:
+        cursor = connection.cursor()
+        try:
+            left = count
+            while left > 0:
+                batch = [random_student_row(rng) for _ in range(min(batch_size, left))]
+                sm._copy_students_batch(cursor, batch)
+                left -= len(batch)
+            cursor.execute('ANALYZE students;')  # Свежая статистика для планировщика
+        finally:
+            cursor.close()
+    sm.invalidate_students()
+
+
+def table_info():
+    """
+    (число студентов, наибольший ID) в таблице.
+    """
+    with sm.db_transaction() as connection:
+        cursor = connection.cursor()
+        cursor.execute('SELECT count(*), coalesce(max(id), 0) FROM students;')
+        info = cursor.fetchone()
+        cursor.close()
+    return info
+
+
+def random_ids(count, rng, first_id, last_id):
+    return [rng.randint(first_id, last_id) for _ in range(count)]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, total_seconds, rows=None):
+    """
+    Задержки (в секундах) -> перцентили в миллисекундах и операций в секунду.
+    """
+    values = sorted(latencies)
+    summary = {
+        'ops': len(values),
+        'p50_ms': percentile(values, 0.50) * 1000,
+        'p90_ms': percentile(values, 0.90) * 1000,
+        'p99_ms': percentile(values, 0.99) * 1000,
+        'max_ms': (values[-1] if values else 0.0) * 1000,
+        'mean_ms': (sum(values) / len(values) if values else 0.0) * 1000,
+        'ops_per_sec': len(values) / total_seconds if total_seconds else 0.0,
+    }
+    if rows is not None:
+        summary['rows'] = rows
+        summary['rows_per_sec'] = rows / total_seconds if total_seconds else 0.0
+    return summary
+
+
+def measure(operation, arguments):
+    """
+    Вызывает operation(аргумент) для каждого аргумента, возвращает (задержки, общее время).
+    """
+    latencies = []
+    started = time.perf_counter()
+    for argument in arguments:
+        call_started = time.perf_counter()
+        operation(argument)
+        latencies.append(time.perf_counter() - call_started)
+    return latencies, time.perf_counter() - started
+
+
+def bench_size(size, ops, rng, first_seeded_id):
+    """
+    Все операции на таблице из size студентов. Возвращает {операция: результат}.
+    """
+    count, last_id = table_info()
+    if count < size:
+        print(f'Добавляю {size - count} синтетических студентов...')
+        started = time.perf_counter()
+        seed_students(size - count, rng)
+        print(f'  готово за {time.perf_counter() - started:.1f} сек.')
+        count, last_id = table_info()
+    # ID для чтения берутся среди добавленных студентов, а если в таблице и так
+    # хватало студентов (ничего не добавлялось) - среди всех
+    first_id = first_seeded_id if first_seeded_id <= last_id else 1
+    results = {}
+
+    print(f'Таблица: {count} студентов. Замеряю операции по {ops} раз...')
+
+    # Добавление (пункт меню "Добавить нового студента")
+    new_ids = []
+
+    def insert(row):
+        new_ids.append(sm.insert_student(sm.Student(*row)))
+    results['insert'] = summarize(*measure(insert, [random_student_row(rng) for _ in range(ops)]))
+
+    # Поиск по ID (без кэша - чтобы мерить БД, а не словарь)
+    results['get_by_id'] = summarize(*measure(
+        lambda student_id: sm.get_student_by_id(student_id, fresh=True), random_ids(ops, rng, first_id, last_id)
+    ))
+
+    # Поиск по части ФИО (пункт меню "Найти")
+    terms = [rng.choice(LAST_NAMES)[1:rng.randint(4, 7)] for _ in range(ops)]
+    results['search_substring'] = summarize(*measure(sm.find_students_by_name, terms))
+
+    # Изменение (пункт меню "Редактировать")
+    results['update'] = summarize(*measure(
+        lambda student_id: sm.update_student(student_id, {'age': rng.randint(18, 25)}), new_ids
+    ))
+
+    # Удаление (пункт меню "Удалить") - удаляю студентов, добавленных выше
+    results['delete'] = summarize(*measure(sm.delete_student_by_id, new_ids))
+
+    # Весь список (пункт меню "Посмотреть список") - один проход, меряю строки в секунду
+    rows = 0
+    started = time.perf_counter()
+    for _ in sm.iter_all_students():
+        rows += 1
+    elapsed = time.perf_counter() - started
+    results['full_listing'] = summarize([elapsed], elapsed, rows=rows)
+
+    for name, result in results.items():
+        line = (f"  {name:<17} p50 {result['p50_ms']:8.2f} мс  p90 {result['p90_ms']:8.2f} мс  "
+                f"p99 {result['p99_ms']:8.2f} мс  {result['ops_per_sec']:9.0f} оп/сек")
+        if 'rows_per_sec' in result:
+            line += f"  ({result['rows_per_sec']:.0f} строк/сек)"
+        print(line)
+    return results
+
+
+def compare_results(previous_path, results):
+    """
+    Печатает, во сколько раз изменилась медианная задержка по сравнению с прошлым прогоном.
+    """
+    with open(previous_path, encoding='utf-8') as file:
+        previous = json.load(file)['results']
+    print(f'\nСравнение с {previous_path} (p50: было -> стало):')
+    for size, operations in results.items():
+        for name, result in operations.items():
+            old = previous.get(size, {}).get(name)
+            if not old or not old['p50_ms']:
+                continue
+            ratio = result['p50_ms'] / old['p50_ms']
+            mark = '  <-- медленнее' if ratio > 1.2 else ''
+            print(f"  {size:>8} {name:<17} {old['p50_ms']:8.2f} -> {result['p50_ms']:8.2f} мс (x{ratio:.2f}){mark}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Замеры скорости операций со студентами')
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help='размеры таблицы через запятую (по умолчанию 10000,100000,1000000)')
+    parser.add_argument('--ops', type=int, default=1000, help='сколько раз выполнять каждую операцию')
+    parser.add_argument('--output', default='bench_results.json', help='куда записать результаты (JSON)')
+    parser.add_argument('--compare', help='JSON-файл прошлого прогона для сравнения')
+    parser.add_argument('--seed', type=int, default=42, help='начальное значение генератора случайных чисел')
+    parser.add_argument('--cache', action='store_true', help='не выключать кэш студентов во время замеров')
+    parser.add_argument('--keep', action='store_true', help='не удалять добавленных синтетических студентов')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    if not args.cache:
+        sm.student_cache.max_size = 0  # Меряем базу данных, а не кэш
+    sm.ensure_schema(force=True)
+
+    _, last_id_before = table_info()
+    results = {}
+    try:
+        for size in sizes:
+            print(f'\n===== {size} студентов =====')
+            results[str(size)] = bench_size(size, args.ops, rng, last_id_before + 1)
+    finally:
+        if not args.keep:
+            with sm.db_transaction() as connection:
+                cursor = connection.cursor()
+                cursor.execute('DELETE FROM students WHERE id > %s;', (last_id_before,))
+                print(f'\nУдалено синтетических студентов: {cursor.rowcount}')
+                sm.announce_students_changed(cursor)
+                cursor.close()
+            sm.invalidate_students()
+
+    report = {
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ops': args.ops,
+        'cache': args.cache,
+        'fast_mode': sm.FAST_MODE,
+        'pool': {'min': sm.DB_POOL_MIN, 'max': sm.DB_POOL_MAX},
+        'results': results,
+    }
+    if args.compare:
+        compare_results(args.compare, results)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f'\nРезультаты записаны в {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,47 @@
 import time
-import psycopg2 # Импортируем библиотеку для работы с PostGreSQL
-from psycopg2 import Error  # Импортируем класс Error для работы с ошибками
-from dotenv import load_dotenv # 
+_MODULE_STARTED = time.perf_counter()  # начало запуска - для отчета --startup-report
+import sys   # sys.stdout.write - вывод пачки строк одной записью
+import argparse # Разбор аргументов командной строки (например, --fast)
+import io    # Буфер в памяти для пачки строк, которую отправляем в COPY
+import re
+import csv   # Чтение CSV-файлов при импорте
+import json  # Чтение JSON-файлов при импорте
+import threading # Нужен для блокировки счетчиков пула и ограничения числа соединений
+import select    # Ожидание уведомлений LISTEN/NOTIFY от PostgreSQL
+import queue     # Очередь пачек между проверкой и загрузкой при параллельном импорте
+import itertools # Счетчик для чтения с реплик по очереди
+import heapq     # Несколько лучших результатов поиска с опечатками без сортировки всех найденных
+from array import array # Компактные массивы чисел для StudentColumns
+from collections import OrderedDict, deque # OrderedDict - хранилище кэша, deque - очередь пачек при параллельном импорте
+import atexit    # Чтобы закрыть пул соединений при выходе из программы
+from contextlib import contextmanager # Для контекстного менеджера "with db_connection() as connection"
+from functools import lru_cache # Кэш "отпечатков" SQL-запросов для метрик
 import os
+# Остальные библиотеки (psycopg2, asyncio, multiprocessing, http.server, dotenv)
+# импортируются только там, где они нужны, чтобы программа запускалась быстрее.
 
-load_dotenv() # читает данные из ".env"
+
+def _find_dotenv():
+    """
+    Ищет файл ".env" в папке программы и выше по дереву папок (так же, как load_dotenv()).
+    """
+    folder = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(folder, '.env')
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+
+_dotenv_started = time.perf_counter()
+_dotenv_path = _find_dotenv()
+if _dotenv_path:  # Если файла ".env" нет (настройки заданы переменными окружения), dotenv не нужен
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path) # читает данные из ".env"
+_dotenv_finished = time.perf_counter()
 
 
 # --- Данные для подключения к базе данных PostgreSQL ---
@@ -15,638 +52,6108 @@ DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_PORT = os.getenv('DB_PORT')
 # --------------------------------------------------------------------------
 
+# --- Настройки пула соединений (тоже читаются из ".env") ---
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))        # сколько соединений держать открытыми всегда
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))       # больше этого числа соединений пул не откроет
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # сколько секунд ждать свободное соединение
+DB_POOL_HEALTH_CHECK = os.getenv('DB_POOL_HEALTH_CHECK', '1') != '0'  # проверять ли соединение "SELECT 1" при выдаче
+DB_POOL_REPORT = os.getenv('DB_POOL_REPORT', '0') == '1'  # печатать ли статистику пула при выходе
+# --------------------------------------------------------------------------
 
-def get_db_connection():
+# --- Реплики для чтения (необязательно) ---
+# DB_REPLICA_DSNS - строки подключения к репликам через ";", например:
+#   DB_REPLICA_DSNS=host=10.0.0.2 port=5432; postgresql://10.0.0.3:5433/students
+# Чего нет в строке (имя БД, пользователь, пароль), берется из DB_NAME, DB_USER, DB_PASSWORD.
+# Пусто - все запросы идут на основной сервер DB_HOST.
+DB_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv('DB_REPLICA_DSNS', '').split(';') if dsn.strip()]
+DB_REPLICA_POOL_MAX = int(os.getenv('DB_REPLICA_POOL_MAX', '5'))  # соединений с каждой репликой
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '10'))  # реплика, отставшая сильнее (сек.), не используется
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '5'))  # как часто проверять реплику (сек.)
+DB_READ_AFTER_WRITE = float(os.getenv('DB_READ_AFTER_WRITE', '5'))  # сек. после своего изменения читать с основного
+# --------------------------------------------------------------------------
+
+# --- Настройки вывода списка студентов ---
+VIEW_FETCH_SIZE = int(os.getenv('VIEW_FETCH_SIZE', '1000'))  # сколько строк забирать с сервера за раз
+VIEW_PAGE_SIZE = int(os.getenv('VIEW_PAGE_SIZE', '20'))      # сколько студентов на одной странице
+# --------------------------------------------------------------------------
+
+# --- Настройки поиска ---
+SEARCH_RESULTS_LIMIT = int(os.getenv('SEARCH_RESULTS_LIMIT', '100'))  # больше строк поиск не вернет
+TRIGRAM_MIN_LENGTH = 3  # короче этого поиск по триграммам не работает, ищем по началу фамилии
+SEARCH_FUZZY_MAX_DISTANCE = int(os.getenv('SEARCH_FUZZY_MAX_DISTANCE', '2'))  # больше опечаток в слове не ищем
+SEARCH_FUZZY_FALLBACK = os.getenv('SEARCH_FUZZY_FALLBACK', '1') != '0'  # искать с опечатками, если ничего не нашлось
+# --------------------------------------------------------------------------
+
+# --- Настройки массового импорта ---
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '5000'))  # сколько строк отправлять в одном COPY
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', str(os.cpu_count() or 1)))  # процессов для проверки записей
+IMPORT_WRITERS = int(os.getenv('IMPORT_WRITERS', '2'))  # соединений, которые параллельно грузят через COPY
+# --------------------------------------------------------------------------
+
+# --- Кэш студентов ---
+STUDENT_CACHE_SIZE = int(os.getenv('STUDENT_CACHE_SIZE', '10000'))  # сколько записей хранить (0 - кэш выключен)
+STUDENT_CACHE_TTL = float(os.getenv('STUDENT_CACHE_TTL', '60'))     # сколько секунд запись считается свежей
+STUDENT_CACHE_NOTIFY = os.getenv('STUDENT_CACHE_NOTIFY', '0') == '1'  # сбрасывать кэш по LISTEN/NOTIFY
+STUDENT_CACHE_CHANNEL = 'students_changed'  # канал уведомлений об изменении студентов
+STUDENT_CACHE_REPORT = os.getenv('STUDENT_CACHE_REPORT', '0') == '1'  # печатать статистику кэша при выходе
+# --------------------------------------------------------------------------
+
+# --- Журнал изменений студентов (для синхронизации внешних систем) ---
+STUDENT_CHANGES_CHANNEL = 'student_changes_feed'  # канал уведомлений о новых записях в журнале
+STUDENT_CHANGES_BATCH_SIZE = int(os.getenv('STUDENT_CHANGES_BATCH_SIZE', '1000'))  # сколько изменений читать за раз
+STUDENT_CHANGES_KEEP_DAYS = int(os.getenv('STUDENT_CHANGES_KEEP_DAYS', '30'))  # сколько дней хранить журнал
+# --------------------------------------------------------------------------
+
+# --- HTTP/JSON API (запуск с флагом --serve) ---
+API_HOST = os.getenv('API_HOST', '127.0.0.1')  # на каком адресе слушать запросы
+API_PORT = int(os.getenv('API_PORT', '8000'))   # на каком порту
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))  # page_size/limit больше этого - ошибка 400
+API_STREAM_CHUNK_ROWS = int(os.getenv('API_STREAM_CHUNK_ROWS', '500'))  # сколько студентов в одном чанке ответа
+# --------------------------------------------------------------------------
+
+# --- Подготовленные запросы ---
+# Выключите (DB_PREPARED_STATEMENTS=0), если соединения идут через PgBouncer в режиме transaction:
+# там подготовленный запрос может оказаться на другом соединении с сервером
+DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', '1') != '0'
+# --------------------------------------------------------------------------
+
+# --- Замеры времени запросов ---
+DB_METRICS = os.getenv('DB_METRICS', '1') != '0'  # замерять ли время каждого запроса
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '200'))  # запросы дольше этого пишутся в журнал
+DB_SLOW_QUERY_LOG = os.getenv('DB_SLOW_QUERY_LOG', '')  # файл журнала медленных запросов (пусто - в stderr)
+DB_METRICS_FILE = os.getenv('DB_METRICS_FILE', '')      # куда записать метрики Prometheus при выходе
+DB_METRICS_REPORT = os.getenv('DB_METRICS_REPORT', '0') == '1'  # печатать самые долгие запросы при выходе
+# --------------------------------------------------------------------------
+
+# --- Запуск программы ---
+# Файл, в котором запоминается версия схемы каждой БД (чтобы не проверять ее при каждом запуске)
+SCHEMA_CACHE_FILE = os.getenv('SCHEMA_CACHE_FILE',
+                              os.path.join(os.path.expanduser('~'), '.cache', 'student_management_schema.json'))
+STARTUP_REPORT = os.getenv('STUDENTS_STARTUP_REPORT', '0') == '1'  # печатать время этапов запуска
+# --------------------------------------------------------------------------
+
+# --- Быстрый (пакетный) режим вывода ---
+# В учебном режиме вывод "плавный": между строками меню и таблиц делаются паузы.
+# В быстром режиме (STUDENTS_FAST_MODE=1 в ".env" или флаг --fast) пауз нет совсем,
+# а строки таблиц выводятся пачками одной записью вместо print() на каждую строку.
+FAST_MODE = os.getenv('STUDENTS_FAST_MODE', '0') == '1'
+OUTPUT_FLUSH_LINES = int(os.getenv('OUTPUT_FLUSH_LINES', '1000'))  # сколько строк копить перед выводом
+# --------------------------------------------------------------------------
+
+
+# ==================== Отчет о времени запуска ====================
+# С флагом --startup-report (или STUDENTS_STARTUP_REPORT=1) программа печатает,
+# сколько заняли этапы запуска, в духе "python -X importtime":
+# собственное время этапа и время от начала импорта модуля до конца этапа.
+# Этапы, которые выполняются позже (загрузка драйвера, подключение к БД),
+# печатаются сразу, когда выполнятся.
+_startup_events = []  # (этап, собственное время, время с начала запуска) в секундах
+_startup_reported = False
+
+
+def startup_event(name, started, finished=None):
     """
-    Устанавливает и возвращает соединение с базой данных PostgreSQL.
-    В случае ошибки подключения выводит сообщение и возвращает None.
+    Записывает этап запуска name, который начался в момент started (time.perf_counter())
+    и закончился в момент finished (по умолчанию - сейчас).
     """
-    connection = None
-    try:
-        # Пытаемся установить соединение с БД, используя импортированную библиотеку "psycopg2"
-        connection = psycopg2.connect(
-            host=DB_HOST,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            port=DB_PORT
-        )
-        # Если соединение успешно установлено, то выводим об этом сообщение
-        print('Соединение с базой данных PostgreSQL успешно установлено!')
-        return connection # возвращает объект соединения
-    except Error as e:
-        # Если произошла ошибка, выводим ее
-        print(f"Произошла ошибка: {e}.")
-        return None # В случае ошибки возвращает None
-    
-    
-def create_students_table():
+    finished = finished or time.perf_counter()
+    event = (name, finished - started, finished - _MODULE_STARTED)
+    _startup_events.append(event)
+    if _startup_reported and STARTUP_REPORT:
+        _print_startup_event(event)
+
+
+def _print_startup_event(event):
+    name, own, total = event
+    print(f'запуск: {own * 1000:9.1f} | {total * 1000:10.1f} | {name}')
+
+
+def print_startup_report():
     """
-    Создает таблицу 'students' в базе данных, если она еще не существует.
+    Печатает все этапы запуска до этого момента.
     """
-    connection = get_db_connection()  # Получаем объект соединения с БД
-    if connection: # Проверяем, удалось ли установить соединение
-        cursor = connection.cursor()  # Создаем объект курсора
-        try:
-            # SQL-запрос для создания таблицы students
-            # IF NOT EXISTS: предотвращает ошибку, если таблица уже существует
-            # student_id: SERIAL PRIMARY KEY - автоматически увеличивающийся уникальный ID
-            # VARCHAR(50): строка до 50 символов
-            # NOT NULL: поле не может быть пустым
-            # INTEGER: целое число
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS students (
-                id SERIAL PRIMARY KEY,
-                last_name VARCHAR(50) NOT NULL,
-                first_name VARCHAR(50) NOT NULL,
-                patronymic VARCHAR(50),
-                age INTEGER,
-                course INTEGER
-            );
-            """
-            cursor.execute(create_table_query) # Выполняет SQL-запрос через курсор
-            connection.commit() # Подтверждаем изменения в базе данных (сохраняем)
-            print("Таблица 'students' успешно создана или уже существует.")
-        
-        except Error as e:
-            print(f"Ошибка при создании таблицы 'students': {e}")
-            connection.rollback()  # Откатываем изменения, если произошла ошибка
-        
-        finally:
-            if cursor:
-                cursor.close()  # Всегда закрываем курсор
-            if connection:
-                connection.close()  # Всегда закрываем соединение с БД
-                print('Соединение с БД закрыто.')
-                
-    
-    
-     
+    global _startup_reported
+    print('запуск:  этап, мс |   всего, мс | что делали')
+    for event in _startup_events:
+        _print_startup_event(event)
+    print(f'запуск: до меню {(time.perf_counter() - _MODULE_STARTED) * 1000:.1f} мс '
+          f'(без запуска самого интерпретатора Python)')
+    _startup_reported = True
 
-# ==================== Определение класса Student ====================
-# Мы определяем новый КЛАСС с именем 'Student'.
-# Это как ЧЕРТЕЖ или ШАБЛОН для создания КОНКРЕТНЫХ ОБЪЕКТОВ-студентов.
-# Каждый ОБЪЕКТ-студент будет иметь характеристики (АТРИБУТЫ)
-# и сможет выполнять действия (МЕТОДЫ), определенные в этом КЛАССЕ.
-class Student:
+# ==================== Конец отчета о времени запуска ====================
+
+
+startup_event('чтение настроек (.env)' if _dotenv_path else 'чтение настроек (без .env)',
+              _dotenv_started, _dotenv_finished)
+
+
+# ==================== Замеры времени запросов (метрики) ====================
+# Каждый курсор, который выдают соединения из пула, - это TimingCursor:
+# он замеряет время execute/copy_expert и fetch*, число строк и ошибки
+# по "отпечатку" запроса (тексту SQL без конкретных значений).
+# Пул дополнительно замеряет время открытия соединения и время ожидания соединения.
+# Метрики можно получить в формате Prometheus: GET /metrics в режиме --serve
+# или файлом DB_METRICS_FILE при выходе из программы.
+
+# Границы корзин гистограмм (секунды)
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Имя подготовленного запроса -> его SQL (заполняет execute_prepared): у "EXECUTE имя (...)"
+# отпечаток берется по SQL запроса, иначе разные запросы выглядели бы в метриках одинаково
+_prepared_queries = {}
+_EXECUTE_PREPARED = re.compile(r'EXECUTE (\w+) ')
+
+
+@lru_cache(maxsize=1024)
+def query_fingerprint(query):
     """
-    Класс Student представляет собой шаблон для создания объектов студентов.
-    Каждый объект студента будет иметь АТРИБУТЫ (данные)
-    и сможет выполнять МЕТОДЫ (действия).
+    "Отпечаток" запроса: параметры, числа и строки заменены на "?", лишние пробелы убраны.
+    Например: "SELECT ... WHERE id = %s;" и "... WHERE id = 42;" дают один отпечаток.
+    Подготовленный запрос ("EXECUTE имя (...)") получает отпечаток своего SQL.
     """
-    # --- Конструктор (метод __init__) ---
-    # Это специальный МЕТОД, называемый КОНСТРУКТОРОМ.
-    # Он автоматически вызывается КАЖДЫЙ РАЗ, когда вы создаете новый
-    # ЭКЗЕМПЛЯР (или ОБЪЕКТ) класса Student.
-    # Например, когда мы пишем `Student("Иванов", "Иван", ...)`
-    # 'self' - это ОБЯЗАТЕЛЬНЫЙ первый параметр в любом методе класса.
-    # Он является ссылкой на ТОТ КОНКРЕТНЫЙ ОБЪЕКТ, который сейчас создается
-    # или с которым мы работаем. Через 'self' мы присваиваем данные
-    # АТРИБУТАМ ЭТОГО КОНКРЕТНОГО ОБЪЕКТА.
-    def __init__(self, last_name, first_name, patronymic, age, course):
-        self.last_name = last_name    # АТРИБУТ фамилия
-        self.first_name = first_name  # АТРИБУТ имя
-        self.patronymic = patronymic  # АТРИБУТ отчество
-        self.age = age                # АТРИБУТ возраст
-        self.course = course          # АТРИБУТ курс
-        
-    
-    # --- Специальный метод __str__() ---
-    # Этот специальный МЕТОД определяет, как ОБЪЕКТ класса Student
-    # должен быть представлен в виде СТРОКИ, когда вы используете
-    # функцию `print()` для этого ОБЪЕКТА или преобразуете его к строке (`str()`).
-    # Это очень удобно для "человекочитаемого" вывода информации о студенте.
-    def __str__(self):
-        return (f"ФИО: {self.last_name} {self.first_name} {self.patronymic} "
-                f"| Возраст: {self.age} | Курс: {self.course}")
-        
-# ==================== Конец определения класса Student ====================
+    match = _EXECUTE_PREPARED.match(query)
+    if match and match.group(1) in _prepared_queries:
+        query = _prepared_queries[match.group(1)]
+    fingerprint = re.sub(r"%\(\w+\)s|%s|'(?:[^']|'')*'|\b\d+\b", '?', query)
+    fingerprint = ' '.join(fingerprint.split())
+    return fingerprint[:200]
 
 
-students = []
+class Histogram:
+    """
+    Гистограмма в стиле Prometheus: сколько наблюдений попало в каждую корзину, их сумма и число.
+    """
+    def __init__(self):
+        self.buckets = [0] * len(METRICS_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
 
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(METRICS_BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
 
 
-# функция вызова меню
-def display_menu():
-    '''
-        Выводит главное меню системы управления студентами на экран
-    '''
-    print('<><><><><> СИСТЕМА УПРАВЛЕНИЯ СПИСКОМ СТУДЕНТОВ <><><><><>')
-    time.sleep(0.2)
-    print()
-    print('<< 1 >> Добавить нового студента')
-    time.sleep(0.2)
-    print('<< 2 >> Посмотреть список студентов')
-    time.sleep(0.2)
-    print('<< 3 >> Найти студента по фамилии')
-    time.sleep(0.2)
-    print('<< 4 >> Удалить студента из списка')
-    time.sleep(0.2)
-    print('<< 5 >> Редактировать студента')
-    time.sleep(0.2)
-    print('<< 6 >> Выход из программы')
-    print('\n***********************************************************')
-    print() # пустая строка для отделения меню
-    
-    
-'''
-добавляю функции для обработки данных ввода ФИО
-'''
-# проверяет корректность части ФИО
-def validate_name(name, name_type):
-    if not name:
-        print(f'Ошибка: **{name_type}** не может быть пустым.')
-        return False
-    
-    if not name.isalpha():
-        print(f'Ошибка: **{name_type}** должен содержать только буквы.')
-        return False
-    return True
+class QueryMetrics:
+    """
+    Счетчики и гистограммы запросов к БД (потокобезопасно).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connect = Histogram()    # открытие физического соединения
+        self.checkout = Histogram()   # получение соединения из пула (с ожиданием)
+        self.queries = {}             # (отпечаток, 'execute' или 'fetch') -> Histogram
+        self.rows = {}                # отпечаток -> сколько строк вернули или изменили
+        self.errors = {}              # отпечаток -> сколько раз запрос упал с ошибкой
+        self.slow_queries = 0
 
-'''
-функция запрашивает у пользователя часть ФИО с валидацией
-'''
-def get_valid_name(name_type):
-    while True:
-        name = input(f'Введите {name_type} студента: ').title().strip()
-        if validate_name(name, name_type):
-            return name
-    
-        
-        
-        
-        
-# определение функции добавить студента  add_student()
-def add_student():
-    '''
-    Добавляем нового студента (фамилия, имя, отчество, возраст, курс)
-    
-    Аргументы:
-        students_list (list): Список, в который будет добавлен новый студент.
-    '''
-    print('\n---------- Добавляем нового студента ----------') # вывод для ясности, что сейчас мы добавляем нового студента
-    '''
-    здесь будет весь код для вызова "пункта меню << 1 >>"
-    '''
-    time.sleep(0.5)
-    print('\n***Введите данные студента***')
-    time.sleep(0.2)
-    print('-----------------------------')
-    last_name = get_valid_name('фамилию')
-    first_name = get_valid_name('имя')
-    patronymic = get_valid_name('отчество')
-    
-    # ввод и валидация возраста студента
-    while True:
-        student_age_str = input('Введите возраст студента: ').strip()
-        # валидация на пустой ввод
-        if not student_age_str:
-            print('Возраст не может быть пустой строкой')
-            continue
-        
-        # валидация на число
-        if not student_age_str.isdigit():
-            print('Возраст надо вводить числом')
-            continue
-        student_age = int(student_age_str)
-        # проверка диапазона возраста(в нашем ввузе можно обучаться с 16 до 65 лет (включительно))
-        if not 16 <= student_age <= 65:
-            print('В нашем ВУЗе можно учиться с 16 лет до 65(включительно)')
-            continue
-        break # выход из цикла валидации **возраста**
-        
-        # ввод и валидация курса студента
-    while True:
-        student_course_str = input('Введите курс студента: ').strip()
-        if not student_course_str:
-            print('Вы не ввели курс')
-            continue
-        if not student_course_str.isdigit():
-            print('Курс надо вводить числом')
-            continue
-        student_course = int(student_course_str)
-        if not 1 <= student_course <= 6:
-            print('В нашем ВУЗе есть только курсы с 1-го по 6-ой(включительно)')
-            continue
-        break
-            
-    # создаю объект (экземпляр) класса Student
-    # Раньше здесь создавался словарь, а теперь вызываем конструктор __init__
-    new_student = Student(
-        last_name,
-        first_name,
-        patronymic,
-        student_age,
-        student_course
-    )
-    
-    # ----- код для сохранения в БД -----
-    connection = get_db_connection()   # Получаю соиденение с БД
-    if connection: # Если соединение установленно
-        cursor = connection.cursor() # Создаю курсор
+    def observe_connect(self, seconds):
+        with self._lock:
+            self.connect.observe(seconds)
+
+    def observe_checkout(self, seconds):
+        with self._lock:
+            self.checkout.observe(seconds)
+
+    def observe_query(self, fingerprint, phase, seconds, rows):
+        with self._lock:
+            histogram = self.queries.get((fingerprint, phase))
+            if histogram is None:
+                histogram = self.queries[(fingerprint, phase)] = Histogram()
+            histogram.observe(seconds)
+            self.rows[fingerprint] = self.rows.get(fingerprint, 0) + rows
+
+    def observe_error(self, fingerprint):
+        with self._lock:
+            self.errors[fingerprint] = self.errors.get(fingerprint, 0) + 1
+
+    def observe_slow_query(self, fingerprint, seconds, rows):
+        with self._lock:
+            self.slow_queries += 1
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S')} медленный запрос {seconds * 1000:.1f} мс, "
+                f"строк: {rows}: {fingerprint}\n")
+        if DB_SLOW_QUERY_LOG:
+            with open(DB_SLOW_QUERY_LOG, 'a', encoding='utf-8') as file:
+                file.write(line)
+        else:
+            sys.stderr.write(line)
+
+    def slowest(self, limit=10):
+        """
+        Запросы, на которые ушло больше всего времени: [(отпечаток, фаза, число, всего секунд)].
+        """
+        with self._lock:
+            items = [(fingerprint, phase, histogram.count, histogram.sum)
+                     for (fingerprint, phase), histogram in self.queries.items()]
+        return sorted(items, key=lambda item: item[3], reverse=True)[:limit]
+
+
+query_metrics = QueryMetrics()
+
+
+class TimingCursorMixin:
+    """
+    Курсор psycopg2 (TimingCursor), который замеряет время каждого запроса и чтения строк
+    и записывает его в query_metrics. Запросы дольше DB_SLOW_QUERY_MS попадают в журнал.
+    Соединения из пула выдают такие курсоры по умолчанию.
+    """
+    _fingerprint = '?'
+
+    def _run_timed(self, query, call, *args):
+        if not DB_METRICS:
+            return call(*args)
+        if not isinstance(query, str):
+            query = query.decode('utf-8', 'replace') if isinstance(query, bytes) else query.as_string(self)
+        self._fingerprint = fingerprint = query_fingerprint(query)
+        started = time.perf_counter()
         try:
-            # SQL-запрос для вставки данных. Используем %s для параметров,
-            # чтобы избежать SQL-инъекций и корректно передавать данные.
-            insert_query = """
-            INSERT INTO students (last_name, first_name, patronymic, age, course)
-            VALUES (%s, %s, %s, %s, %s) RETURNING id;
-            """
-            # выполняю запрос, передавая данные ввиде кортежа
-            cursor.execute(insert_query, (
-                new_student.last_name,
-                new_student.first_name,
-                new_student.patronymic,
-                new_student.age,
-                new_student.course
-            ))
-            # Получаем ID только что вставленной записи (если нужно, для подтверждения)
-            student_id = cursor.fetchone()[0]
-            connection.commit()  # Подтверждаю изменения в БД
-            
-    
-            # добаляю словарь на нового студента в список
-            # students_list.append(new_student)
-            # вывод подтверждения о добавлении студента
-            print(f'\nСтудент **{new_student.last_name} {new_student.first_name} {new_student.patronymic}**  (ID: {student_id}) добавлен в список студентов.')
-        except Error as e:
-            print(f"Произошла ошибка при добавлении студента в БД: {e}")
-            connection.rollback() # Откатываю изменения, если произошла ошибка.
-        # Закрываю курсор и закрываю соединение
+            result = call(*args)
+        except Error:
+            query_metrics.observe_error(fingerprint)
+            raise
+        elapsed = time.perf_counter() - started
+        # Для SELECT строки считаются при чтении (fetch), для остальных - измененные строки
+        rows = self.rowcount if self.description is None and self.rowcount > 0 else 0
+        query_metrics.observe_query(fingerprint, 'execute', elapsed, rows)
+        if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+            query_metrics.observe_slow_query(fingerprint, elapsed, rows)
+        return result
+
+    def _fetch_timed(self, call, *args):
+        if not DB_METRICS:
+            return call(*args)
+        started = time.perf_counter()
+        result = call(*args)
+        rows = len(result) if isinstance(result, list) else int(result is not None)
+        query_metrics.observe_query(self._fingerprint, 'fetch', time.perf_counter() - started, rows)
+        return result
+
+    def execute(self, query, vars=None):
+        return self._run_timed(query, super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._run_timed(query, super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._run_timed(sql, super().copy_expert, sql, file, size)
+
+    def fetchone(self):
+        return self._fetch_timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch_timed(super().fetchmany) if size is None else self._fetch_timed(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch_timed(super().fetchall)
+
+    def __iter__(self):
+        if not DB_METRICS:
+            return super().__iter__()
+        return self._iter_timed(super().__iter__())
+
+    def _iter_timed(self, rows):
+        # "for row in cursor" не вызывает fetchone(), поэтому замеряю каждую строку здесь
+        elapsed = 0.0
+        count = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                count += 1
+                yield row
         finally:
-            if cursor:
-                cursor.close()
-            if connection:
-                connection.close()
-                print("Соелинение с БД закрыто.")
-    else:
-        print("Не удалось добавить студента: нет соединения с БД.")
-    # ------ тут код для сохранения студента в БД заканчивается ------    
-    
- 
-# определение функции вывода списка студентов
-def view_students(): # "students_list" пока оставляю, но потом удалю(после полного перехода в PostgreSQL)
+            query_metrics.observe_query(self._fingerprint, 'fetch', elapsed, count)
+
+
+def _prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _render_histogram(lines, name, histogram, labels=''):
+    separator = ',' if labels else ''
+    cumulative = 0
+    for bound, count in zip(METRICS_BUCKETS, histogram.buckets):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {histogram.count}')
+    suffix = f'{{{labels}}}' if labels else ''
+    lines.append(f'{name}_sum{suffix} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{suffix} {histogram.count}')
+
+
+def render_prometheus_metrics():
     """
-    Отображает список всех студентов, находящихся в системе, получая их из базы данных PostgreSQL.
+    Все метрики (запросы, пул соединений, кэш) в текстовом формате Prometheus.
     """
-    print('\n<<<<<<<<<<<<<<<<<<<<< СПИСОК СТУДЕНТОВ >>>>>>>>>>>>>>>>>>>>>')
-    time.sleep(0.2)
-    print()
-    
-    connection = None # Инициализируем переменную connection как None
-    cursor = None     # Инициализируем переменную cursor как None
-    
-    
-    # Получаю объект соединения с БД
-    connection = get_db_connection()
-        
-    # Проверяю, удалось ли установить соединение
-    if connection:
+    lines = []
+    with query_metrics._lock:
+        lines.append('# HELP student_db_connect_seconds Время открытия соединения с PostgreSQL.')
+        lines.append('# TYPE student_db_connect_seconds histogram')
+        _render_histogram(lines, 'student_db_connect_seconds', query_metrics.connect)
+        lines.append('# HELP student_db_pool_checkout_seconds Время получения соединения из пула.')
+        lines.append('# TYPE student_db_pool_checkout_seconds histogram')
+        _render_histogram(lines, 'student_db_pool_checkout_seconds', query_metrics.checkout)
+        lines.append('# HELP student_db_query_seconds Время выполнения (execute) и чтения (fetch) запросов.')
+        lines.append('# TYPE student_db_query_seconds histogram')
+        for (fingerprint, phase), histogram in sorted(query_metrics.queries.items()):
+            labels = f'query="{_prometheus_label(fingerprint)}",phase="{phase}"'
+            _render_histogram(lines, 'student_db_query_seconds', histogram, labels)
+        lines.append('# HELP student_db_query_rows_total Строк прочитано или изменено запросом.')
+        lines.append('# TYPE student_db_query_rows_total counter')
+        for fingerprint, rows in sorted(query_metrics.rows.items()):
+            lines.append(f'student_db_query_rows_total{{query="{_prometheus_label(fingerprint)}"}} {rows}')
+        lines.append('# HELP student_db_query_errors_total Запросов, завершившихся ошибкой.')
+        lines.append('# TYPE student_db_query_errors_total counter')
+        for fingerprint, errors in sorted(query_metrics.errors.items()):
+            lines.append(f'student_db_query_errors_total{{query="{_prometheus_label(fingerprint)}"}} {errors}')
+        lines.append('# HELP student_db_slow_queries_total Запросов дольше DB_SLOW_QUERY_MS.')
+        lines.append('# TYPE student_db_slow_queries_total counter')
+        lines.append(f'student_db_slow_queries_total {query_metrics.slow_queries}')
+    for name, value in get_pool_stats().items():
+        if isinstance(value, (int, float)):
+            lines.append(f'# TYPE student_db_pool_{name} gauge')
+            lines.append(f'student_db_pool_{name} {int(value) if isinstance(value, bool) else value}')
+    replicas = get_replica_stats()
+    if replicas:
+        for name in ('reads', 'failures', 'skipped', 'connections_created'):
+            lines.append(f'# TYPE student_db_replica_{name}_total counter')
+            for replica, stats in replicas.items():
+                lines.append(f'student_db_replica_{name}_total{{replica="{_prometheus_label(replica)}"}} {stats[name]}')
+        lines.append('# TYPE student_db_replica_healthy gauge')
+        for replica, stats in replicas.items():
+            lines.append(f'student_db_replica_healthy{{replica="{_prometheus_label(replica)}"}} {int(stats["healthy"])}')
+        lines.append('# TYPE student_db_replica_lag_seconds gauge')
+        for replica, stats in replicas.items():
+            if stats['lag'] is not None:
+                lines.append(f'student_db_replica_lag_seconds{{replica="{_prometheus_label(replica)}"}} {stats["lag"]}')
+    for name, value in get_cache_stats().items():
+        if isinstance(value, (int, float)):
+            lines.append(f'# TYPE student_cache_{name} gauge')
+            lines.append(f'student_cache_{name} {int(value) if isinstance(value, bool) else value}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics_file(path=None):
+    """
+    Записывает метрики в файл (по умолчанию DB_METRICS_FILE), например для node_exporter textfile.
+    """
+    path = path or DB_METRICS_FILE
+    if not path:
+        return
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        file.write(render_prometheus_metrics())
+    os.replace(path + '.tmp', path)
+
+
+def print_query_stats(limit=10):
+    """
+    Печатает запросы, на которые ушло больше всего времени.
+    """
+    print('\n--- Самые долгие запросы к БД (всего времени) ---')
+    for fingerprint, phase, count, seconds in query_metrics.slowest(limit):
+        print(f'{seconds * 1000:10.1f} мс  {count:7} раз  {phase:<7}  {fingerprint[:90]}')
+    print(f'Медленных запросов (дольше {DB_SLOW_QUERY_MS:.0f} мс): {query_metrics.slow_queries}')
+
+
+if DB_METRICS_FILE:
+    atexit.register(write_metrics_file)
+
+# ==================== Конец замеров времени запросов ====================
+
+
+class StudentConnectionMixin:
+    """
+    Соединение psycopg2 (StudentConnection), которое помнит, какие запросы на нем уже подготовлены (PREPARE).
+    Подготовленные запросы живут, пока живет соединение, поэтому у нового
+    соединения (например, вместо "умершего") набор снова пустой.
+
+    Еще соединение помнит, каких студентов изменила текущая транзакция
+    (invalidate_students_after_commit), и сбрасывает кэш для них только после commit.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.changed_students = []  # ID студентов, измененных в текущей транзакции (None - неизвестно каких)
+
+    def commit(self):
+        super().commit()
+        changed, self.changed_students = self.changed_students, []
+        if changed:
+            invalidate_students(None if None in changed else changed)
+
+    def rollback(self):
+        super().rollback()
+        self.changed_students = []  # изменений не было - и кэш сбрасывать не нужно
+
+
+class StudentConnectionPoolMixin:
+    """
+    Пул соединений psycopg2 (StudentConnectionPool), который дополнительно считает,
+    сколько физических соединений с PostgreSQL было открыто и сколько времени это заняло.
+    Соединения создаются как StudentConnection (для подготовленных запросов).
+    Если задан on_connect(секунды) (пулы реплик, передается в конструктор),
+    открытые соединения считает он, а не счетчики основного пула.
+    Сколько соединений открыто и сколько из них выдано, пул тоже считает сам
+    (open_connections, used_connections), а не по внутренним полям psycopg2.
+    """
+    on_connect = None
+
+    def __init__(self, minconn, maxconn, *args, on_connect=None, **kwargs):
+        kwargs.setdefault('connection_factory', StudentConnection)
+        if on_connect is not None:
+            self.on_connect = on_connect  # до super().__init__: первые minconn соединений тоже его
+        self._counts_lock = threading.Lock()
+        self.open_connections = 0  # открытые соединения: свободные и выданные
+        self.used_connections = 0  # выданные (getconn без putconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)  # здесь открываются первые minconn соединений
+
+    def getconn(self, key=None):
+        connection = super().getconn(key)
+        with self._counts_lock:
+            self.used_connections += 1
+        return connection
+
+    def putconn(self, conn, key=None, close=False):
+        super().putconn(conn, key, close)
+        with self._counts_lock:
+            self.used_connections -= 1
+            if conn.closed:  # пул закрыл соединение (лишнее или "мертвое"), а не оставил свободным
+                self.open_connections -= 1
+
+    def closeall(self):
+        super().closeall()
+        with self._counts_lock:
+            self.open_connections = self.used_connections = 0
+
+    def idle_connections(self):
+        """
+        Сколько открытых соединений лежит в пуле свободными.
+        """
+        with self._counts_lock:
+            return self.open_connections - self.used_connections
+
+    def _connect(self, key=None):
+        started = time.perf_counter()
+        connection = super()._connect(key)
+        with self._counts_lock:
+            self.open_connections += 1
+        if self.on_connect is not None:
+            self.on_connect(time.perf_counter() - started)
+            return connection
+        query_metrics.observe_connect(time.perf_counter() - started)
+        _count_pool_event('connections_created')
+        return connection
+
+
+# ==================== Загрузка драйвера PostgreSQL ====================
+# psycopg2 импортируется не при запуске программы, а при первом обращении к БД
+# (load_db_driver), поэтому меню и справка --help появляются быстрее.
+# До загрузки драйвера имена ниже - заглушки, после загрузки - настоящие классы:
+#   TimingCursor          = TimingCursorMixin + курсор psycopg2
+#   StudentCursor         = StudentCursorMixin + TimingCursor
+#   StudentConnection     = StudentConnectionMixin + соединение psycopg2
+#   StudentConnectionPool = StudentConnectionPoolMixin + ThreadedConnectionPool
+psycopg2 = None  # модуль psycopg2 (после load_db_driver)
+pg_pool = None   # модуль psycopg2.pool (после load_db_driver)
+TimingCursor = StudentCursor = StudentConnection = StudentConnectionPool = None
+_driver_lock = threading.Lock()
+
+
+class Error(Exception):
+    """
+    Заглушка для psycopg2.Error, пока драйвер не загружен (ошибок БД до этого быть не может),
+    чтобы везде можно было писать "except Error". load_db_driver() заменяет ее на psycopg2.Error.
+    """
+
+
+def load_db_driver():
+    """
+    Импортирует psycopg2 (один раз) и создает классы курсора, соединения и пула.
+    Возвращает модуль psycopg2.
+    """
+    global psycopg2, pg_pool, Error, TimingCursor, StudentCursor, StudentConnection, StudentConnectionPool
+    if psycopg2 is not None:
+        return psycopg2
+    with _driver_lock:
+        if psycopg2 is not None:  # Драйвер мог загрузить другой поток
+            return psycopg2
+        started = time.perf_counter()
+        import psycopg2 as driver
+        from psycopg2 import extensions, pool as driver_pool
+
+        class TimingCursor(TimingCursorMixin, extensions.cursor):
+            pass
+
+        class StudentCursor(StudentCursorMixin, TimingCursor):
+            pass
+
+        class StudentConnection(StudentConnectionMixin, extensions.connection):
+            pass
+
+        class StudentConnectionPool(StudentConnectionPoolMixin, driver_pool.ThreadedConnectionPool):
+            pass
+
+        Error = driver.Error
+        pg_pool = driver_pool
+        psycopg2 = driver  # Последним: теперь другие потоки считают драйвер загруженным
+        startup_event('загрузка драйвера psycopg2', started)
+    return psycopg2
+
+# ==================== Конец загрузки драйвера ====================
+
+
+def set_fast_mode(enabled):
+    """
+    Включает (True) или выключает (False) быстрый режим вывода.
+    """
+    global FAST_MODE
+    FAST_MODE = enabled
+
+
+def pause(seconds):
+    """
+    Пауза для "плавного" вывода в учебном режиме. В быстром режиме ничего не делает.
+    """
+    if not FAST_MODE:
+        time.sleep(seconds)
+
+
+class PacedOutput:
+    """
+    Вывод строк меню и таблиц.
+
+    В учебном режиме каждая строка печатается отдельно, перед ней пауза delay секунд.
+    В быстром режиме строки копятся в списке и выводятся одной записью
+    sys.stdout.write(), когда накопится OUTPUT_FLUSH_LINES строк или при выходе из "with".
+
+        with PacedOutput(delay=0.2) as table:
+            table.add('строка')
+    """
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lines = []
+
+    def add(self, line):
+        if FAST_MODE:
+            self.lines.append(line)
+            if len(self.lines) >= OUTPUT_FLUSH_LINES:
+                self.flush()
+        else:
+            pause(self.delay)
+            print(line)
+
+    def flush(self):
+        if self.lines:
+            self.lines.append('')  # чтобы последняя строка тоже закончилась переводом строки
+            sys.stdout.write('\n'.join(self.lines))
+            sys.stdout.flush()
+            self.lines = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
+
+
+connection_pool = None  # Сам пул создается "лениво" - при первом запросе соединения
+_pool_lock = threading.RLock()  # Защищает создание пула и счетчики от одновременного доступа из потоков
+# (RLock: при создании пула первые соединения открываются под этой же блокировкой и считаются в pool_stats)
+# Семафор ограничивает число выданных соединений: если все заняты, мы ЖДЕМ,
+# а не получаем сразу ошибку "connection pool exhausted"
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+# Счетчики использования пула (чтобы подобрать размер пула, например под PgBouncer)
+pool_stats = {
+    'checkouts': 0,            # сколько раз соединение выдали из пула
+    'returns': 0,              # сколько раз соединение вернули в пул
+    'in_use': 0,               # сколько соединений занято прямо сейчас
+    'peak_in_use': 0,          # максимум одновременно занятых соединений
+    'waits': 0,                # сколько раз пришлось ждать свободное соединение
+    'wait_time_total': 0.0,    # суммарное время ожидания (секунды)
+    'timeouts': 0,             # сколько раз так и не дождались соединения
+    'connections_created': 0,  # сколько физических соединений открыто с БД
+    'broken_discarded': 0,     # сколько "мертвых" соединений выброшено при проверке
+}
+
+
+def _count_pool_event(name, value=1):
+    """
+    Увеличивает счетчик пула "name" на "value" (потокобезопасно).
+    """
+    with _pool_lock:
+        pool_stats[name] += value
+
+
+def get_connection_pool():
+    """
+    Возвращает пул соединений, при первом вызове создает его.
+    В случае ошибки подключения выводит сообщение и возвращает None.
+    """
+    global connection_pool
+    if connection_pool is not None:
+        return connection_pool
+    load_db_driver()
+    with _pool_lock:
+        if connection_pool is None:  # Повторная проверка: пул мог создать другой поток
+            started = time.perf_counter()
+            try:
+                # Пытаемся создать пул соединений с БД, используя библиотеку "psycopg2"
+                connection_pool = StudentConnectionPool(
+                    DB_POOL_MIN,
+                    DB_POOL_MAX,
+                    host=DB_HOST,
+                    database=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    port=DB_PORT,
+                    cursor_factory=TimingCursor  # все курсоры замеряют время запросов
+                )
+                atexit.register(close_connection_pool)
+                startup_event('подключение к PostgreSQL (создание пула)', started)
+            except Error as e:
+                # Если произошла ошибка, выводим ее
+                print(f"Произошла ошибка: {e}.")
+                return None
+    return connection_pool
+
+
+def _connection_is_alive(connection):
+    """
+    Проверяет соединение перед выдачей из пула.
+    Соединение могло "умереть", пока лежало в пуле (перезапуск сервера, таймаут PgBouncer).
+    """
+    if connection.closed:
+        return False
+    if not DB_POOL_HEALTH_CHECK:
+        return True
+    try:
+        cursor = connection.cursor()
+        cursor.execute('SELECT 1;')
+        cursor.close()
+        connection.rollback()  # Завершаем транзакцию, которую открыл SELECT
+        return True
+    except Error:
+        return False
+
+
+def get_db_connection():
+    """
+    Выдает проверенное соединение с базой данных PostgreSQL из пула.
+    Если свободных соединений нет, ждет до DB_POOL_TIMEOUT секунд.
+    В случае ошибки подключения выводит сообщение и возвращает None.
+    Соединение ОБЯЗАТЕЛЬНО нужно вернуть через release_db_connection()
+    (проще всего - использовать "with db_connection() as connection:").
+    """
+    ensure_schema()  # Перед первым запросом - проверка схемы БД (обычно по кэшу, без запросов)
+    pool = get_connection_pool()
+    if pool is None:
+        return None
+    checkout_started = time.perf_counter()
+
+    # Сначала пробуем занять "слот" без ожидания, чтобы посчитать ожидания
+    if not _pool_slots.acquire(blocking=False):
+        started = time.perf_counter()
+        acquired = _pool_slots.acquire(timeout=DB_POOL_TIMEOUT)
+        _count_pool_event('waits')
+        _count_pool_event('wait_time_total', time.perf_counter() - started)
+        if not acquired:
+            _count_pool_event('timeouts')
+            print(f'Нет свободных соединений с БД (ждали {DB_POOL_TIMEOUT} сек.).')
+            return None
+
+    try:
+        # Пробуем несколько раз: все соединения в пуле могли "умереть" разом
+        for _ in range(DB_POOL_MAX + 1):
+            connection = pool.getconn()
+            if _connection_is_alive(connection):
+                with _pool_lock:
+                    pool_stats['checkouts'] += 1
+                    pool_stats['in_use'] += 1
+                    pool_stats['peak_in_use'] = max(pool_stats['peak_in_use'], pool_stats['in_use'])
+                query_metrics.observe_checkout(time.perf_counter() - checkout_started)
+                return connection # возвращает объект соединения
+            # Выбрасываем "мертвое" соединение, пул откроет новое
+            pool.putconn(connection, close=True)
+            _count_pool_event('broken_discarded')
+        print('Произошла ошибка: не удалось получить рабочее соединение с БД.')
+    except Error as e:
+        # Если произошла ошибка, выводим ее
+        print(f"Произошла ошибка: {e}.")
+    _pool_slots.release()
+    return None # В случае ошибки возвращает None
+
+
+def release_db_connection(connection):
+    """
+    Возвращает соединение в пул (вместо закрытия).
+    Незавершенная транзакция при этом откатывается самим пулом.
+    """
+    if connection is None or connection_pool is None:
+        return
+    try:
+        connection_pool.putconn(connection, close=bool(connection.closed))
+    finally:
+        with _pool_lock:
+            pool_stats['returns'] += 1
+            pool_stats['in_use'] -= 1
+        _pool_slots.release()
+
+
+@contextmanager
+def db_connection(readonly=False):
+    """
+    Контекстный менеджер для работы с соединением из пула:
+
+        with db_connection() as connection:
+            if connection:
+                ...
+
+    Внутри блока "connection" - соединение или None (если подключиться не удалось).
+    После выхода из блока соединение всегда возвращается в пул.
+    С readonly=True (блок только читает) соединение может быть с реплики
+    (см. get_replica_connection), а если реплик нет или они недоступны - с основного сервера.
+    """
+    if readonly:
+        ensure_schema()
+        connection, replica = get_replica_connection()
+        if connection is not None:
+            _replica_session.used_replica = True
+            try:
+                yield connection
+            except Error as e:
+                if isinstance(e, psycopg2.OperationalError):
+                    replica.mark_failed(e)  # реплика пропала посреди запроса: следующие чтения - с других
+                raise
+            finally:
+                replica.putconn(connection)
+            return
+    connection = get_db_connection()
+    try:
+        yield connection
+    finally:
+        if connection:
+            release_db_connection(connection)
+
+
+@contextmanager
+def db_transaction(connection=None, readonly=False):
+    """
+    Контекстный менеджер для одной транзакции:
+
+        with db_transaction() as connection:
+            ...
+
+    Без аргумента берет соединение из пула, при успешном выходе из блока
+    делает commit, при исключении - rollback (и пробрасывает исключение дальше).
+    Если передано уже открытое соединение "connection", работает в нем
+    и НЕ подтверждает транзакцию: это сделает тот, кто соединение открыл
+    (так несколько операций можно объединить в одну транзакцию).
+    Если соединения с БД нет, выбрасывает psycopg2.OperationalError.
+    readonly=True - транзакция только читает, ее можно выполнить на реплике.
+    """
+    if connection is not None:
+        yield connection
+        return
+    with db_connection(readonly) as own_connection:
+        if own_connection is None:
+            raise psycopg2.OperationalError('нет соединения с БД')
+        try:
+            yield own_connection
+            own_connection.commit()
+        except BaseException as e:
+            own_connection.rollback()
+            if isinstance(e, Error) and getattr(e, 'pgcode', None) == '42P01':
+                forget_schema_version()  # Нет нужной таблицы: при следующем запуске проверить схему заново
+            raise
+
+
+def get_pool_stats():
+    """
+    Возвращает копию счетчиков пула + текущий размер пула.
+    """
+    with _pool_lock:
+        stats = dict(pool_stats)
+    stats['pool_min'] = DB_POOL_MIN
+    stats['pool_max'] = DB_POOL_MAX
+    stats['idle'] = connection_pool.idle_connections() if connection_pool else 0
+    stats['utilization'] = round(stats['in_use'] / DB_POOL_MAX, 3) if DB_POOL_MAX else 0.0
+    return stats
+
+
+def print_pool_stats():
+    """
+    Выводит статистику использования пула соединений.
+    """
+    print('\n---------- Статистика пула соединений ----------')
+    for name, value in get_pool_stats().items():
+        if isinstance(value, float):
+            value = round(value, 4)
+        print(f'{name.ljust(20)}: {value}')
+    for name, stats in get_replica_stats().items():
+        state = 'исправна' if stats['healthy'] else 'не используется'
+        print(f"реплика {name}: {state}, отставание {stats['lag']} сек., чтений {stats['reads']}, "
+              f"сбоев {stats['failures']}, пропусков (пул занят) {stats['skipped']}, "
+              f"открыто соединений {stats['connections_created']}")
+
+
+def close_connection_pool():
+    """
+    Закрывает все соединения пула (вызывается при выходе из программы).
+    """
+    global connection_pool
+    with _pool_lock:
+        if connection_pool is not None and not connection_pool.closed:
+            connection_pool.closeall()
+            print('Пул соединений с БД закрыт.')
+        connection_pool = None
+
+
+# ==================== Реплики для чтения ====================
+# Если в ".env" заданы реплики (DB_REPLICA_DSNS), запросы, которые только читают
+# (список студентов, поиск, студент по ID, экспорт), идут на реплики по очереди (round-robin),
+# а все изменения - на основной сервер. Правила:
+#  - реплика проверяется не чаще раза в DB_REPLICA_CHECK_INTERVAL секунд: отвечает ли она
+#    и насколько отстала от основного сервера (больше DB_REPLICA_MAX_LAG - не используется);
+#  - недоступная или отставшая реплика пропускается до следующей проверки, а если
+#    не годится ни одна, чтение идет на основной сервер;
+#  - после изменения студентов (invalidate_students) DB_READ_AFTER_WRITE секунд чтения
+#    ЭТОГО потока идут на основной сервер: реплика могла еще не получить изменение,
+#    и пользователь не увидел бы только что сохраненные данные. В режиме сервера поток -
+#    это одно соединение клиента (keep-alive), поэтому чужие изменения не отправляют
+#    на основной сервер чтения остальных клиентов;
+#  - но в общий кэш то, что прочитано с реплики в эти секунды после ЛЮБОГО изменения,
+#    не кладется: иначе кэш вернул бы старые данные и тому, кто их изменил.
+# Запросы перед изменением (fresh=True, проверка версии) всегда читают с основного сервера.
+# Проверить можно и без настоящей репликации - на втором локальном PostgreSQL
+# с той же схемой: сервер, который не является репликой, считается не отставшим.
+
+# Отставание реплики в секундах: 0, если все полученное уже применено
+# (иначе время с последней примененной транзакции); NULL - сервер не реплика
+REPLICA_LAG_QUERY = """
+    SELECT CASE WHEN NOT pg_is_in_recovery() THEN NULL
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END;
+"""
+
+
+class ReplicaPool:
+    """
+    Пул соединений с одной репликой и ее состояние (исправна ли, когда проверять снова).
+    Пул создается при первом чтении с реплики.
+    """
+    def __init__(self, dsn):
+        self.params = {'database': DB_NAME, 'user': DB_USER, 'password': DB_PASSWORD}
+        self.params.update(psycopg2.extensions.parse_dsn(dsn))  # неверная строка - ProgrammingError
+        if self.params.get('dbname'):
+            self.params.pop('database')  # имя БД задано в самой строке подключения
+        self.name = f"{self.params.get('host') or 'localhost'}:{self.params.get('port') or 5432}"
+        self.pool = None
+        self.healthy = True
+        self.checked_at = None  # time.monotonic() последней проверки
+        self.lag = None         # отставание при последней проверке (сек.)
+        self.stats = {'reads': 0, 'failures': 0, 'skipped': 0, 'connections_created': 0, 'connect_seconds': 0.0}
+        # RLock: пул создается под этой блокировкой и сразу открывает первые соединения,
+        # а их считает _count_connect - под той же блокировкой
+        self._lock = threading.RLock()
+
+    def _count_connect(self, seconds):
+        with self._lock:
+            self.stats['connections_created'] += 1
+            self.stats['connect_seconds'] += seconds
+
+    def _create_pool(self):
+        params = {key: value for key, value in self.params.items() if value is not None}
+        # Как и основной пул, держит открытыми DB_POOL_MIN соединений: с minconn=0 psycopg2
+        # закрывал бы каждое возвращенное соединение, и каждое чтение подключалось бы заново
+        # Соединения с репликой - в счетчики реплики (on_connect)
+        self.pool = StudentConnectionPool(min(DB_POOL_MIN, DB_REPLICA_POOL_MAX), DB_REPLICA_POOL_MAX,
+                                          cursor_factory=TimingCursor, on_connect=self._count_connect, **params)
+
+    def check(self, connection):
+        """
+        Проверяет реплику запросом отставания; True - с нее можно читать.
+        """
+        cursor = connection.cursor()
+        cursor.execute(REPLICA_LAG_QUERY)
+        lag = cursor.fetchone()[0]
+        cursor.close()
+        connection.rollback()
+        self.lag = float(lag) if lag is not None else 0.0
+        return self.lag <= DB_REPLICA_MAX_LAG
+
+    def mark_failed(self, error):
+        """
+        Отмечает реплику неисправной до следующей проверки.
+        """
+        with self._lock:
+            self.stats['failures'] += 1
+            was_healthy, self.healthy = self.healthy, False
+            self.checked_at = time.monotonic()
+        if was_healthy:
+            print(f'Реплика {self.name} недоступна ({str(error).strip()}), читаю с основного сервера.')
+
+    def getconn(self):
+        """
+        Соединение с репликой или None, если сейчас она не годится для чтения.
+        """
+        now = time.monotonic()
+        due = self.checked_at is None or now - self.checked_at >= DB_REPLICA_CHECK_INTERVAL
+        if not self.healthy and not due:
+            return None
+        connection = None
+        try:
+            with self._lock:
+                if self.pool is None:
+                    self._create_pool()
+            connection = self.pool.getconn()
+            if due:
+                self.checked_at = now
+                usable = self.check(connection)
+                if usable != self.healthy:
+                    print(f'Реплика {self.name}: ' + ('снова используется для чтения.' if usable else
+                          f'отстает на {self.lag:.1f} сек., читаю с основного сервера.'))
+                self.healthy = usable
+            elif not _connection_is_alive(connection):
+                raise psycopg2.OperationalError('соединение с репликой разорвано')
+            if not self.healthy:
+                self.pool.putconn(connection)
+                return None
+        except pg_pool.PoolError:
+            # Все соединения с репликой заняты - это не неисправность, просто читаем с основного
+            with self._lock:
+                self.stats['skipped'] += 1
+            return None
+        except Error as e:
+            if connection is not None:
+                self.pool.putconn(connection, close=True)
+            self.mark_failed(e)
+            return None
+        with self._lock:
+            self.stats['reads'] += 1
+        return connection
+
+    def putconn(self, connection):
+        """
+        Возвращает соединение в пул реплики (незавершенная транзакция откатывается пулом).
+        """
+        self.pool.putconn(connection, close=bool(connection.closed))
+
+    def close(self):
+        with self._lock:
+            if self.pool is not None and not self.pool.closed:
+                self.pool.closeall()
+            self.pool = None
+
+
+replica_pools = None  # Список ReplicaPool, создается при первом чтении
+_replica_turn = itertools.count()  # Номер очередного чтения (для round-robin)
+_last_write_at = None  # time.monotonic() последнего изменения студентов в любом потоке программы
+# Состояние потока: last_write_at - его последнее изменение, used_replica - читал ли он с реплики
+_replica_session = threading.local()
+
+
+def note_primary_write():
+    """
+    Запоминает момент изменения данных: следующие DB_READ_AFTER_WRITE секунд
+    чтения этого потока пойдут на основной сервер (read-after-write).
+    """
+    global _last_write_at
+    _last_write_at = _replica_session.last_write_at = time.monotonic()
+
+
+def replica_read_is_cacheable():
+    """
+    Можно ли положить в общий кэш то, что этот поток только что прочитал (см. cached_read):
+    прочитанное с реплики вскоре после чьего-то изменения могло устареть.
+    """
+    if not getattr(_replica_session, 'used_replica', False):
+        return True
+    return _last_write_at is None or time.monotonic() - _last_write_at >= DB_READ_AFTER_WRITE
+
+
+def get_replica_pools():
+    """
+    Пулы реплик из DB_REPLICA_DSNS (пустой список, если реплики не заданы).
+    """
+    global replica_pools
+    if replica_pools is None:
+        load_db_driver()
+        with _pool_lock:
+            if replica_pools is None:
+                replicas = []
+                for number, dsn in enumerate(DB_REPLICA_DSNS, 1):
+                    try:
+                        replicas.append(ReplicaPool(dsn))
+                    except Error as e:
+                        print(f'Реплика №{number} из DB_REPLICA_DSNS пропущена: неверная строка подключения ({e}).')
+                replica_pools = replicas
+                if replica_pools:
+                    atexit.register(close_replica_pools)
+    return replica_pools
+
+
+def get_replica_connection():
+    """
+    Соединение для чтения с очередной исправной реплики: (соединение, ReplicaPool).
+    (None, None) - читать нужно с основного сервера: реплик нет, ни одна не годится
+    или недавно были изменения (DB_READ_AFTER_WRITE).
+    """
+    if not DB_REPLICA_DSNS:
+        return None, None
+    last_write_at = getattr(_replica_session, 'last_write_at', None)
+    if last_write_at is not None and time.monotonic() - last_write_at < DB_READ_AFTER_WRITE:
+        return None, None
+    replicas = get_replica_pools()
+    start = next(_replica_turn)
+    for offset in range(len(replicas)):
+        replica = replicas[(start + offset) % len(replicas)]
+        connection = replica.getconn()
+        if connection is not None:
+            return connection, replica
+    return None, None
+
+
+def get_replica_stats():
+    """
+    Состояние и счетчики каждой реплики: {имя: {...}}.
+    """
+    stats = {}
+    for replica in replica_pools or []:
+        stats[replica.name] = dict(replica.stats, healthy=replica.healthy,
+                                   lag=round(replica.lag, 3) if replica.lag is not None else None)
+    return stats
+
+
+def close_replica_pools():
+    """
+    Закрывает соединения со всеми репликами (при выходе из программы).
+    """
+    for replica in replica_pools or []:
+        replica.close()
+
+
+# ==================== Кэш студентов в памяти программы ====================
+_MISSING = object()  # Признак "в кэше ничего нет" (None в кэше - это "студент не найден")
+
+
+class StudentCache:
+    """
+    Кэш результатов чтения из БД внутри процесса (LRU + время жизни TTL).
+
+    Хранит два вида записей:
+      - студент по ID: ключ ('id', student_id) -> строка из БД (или None, если студента нет);
+      - списки: результаты поиска и страницы списка (ключ - параметры запроса).
+    При изменении студента удаляется только его запись по ID, а все списки
+    сбрасываются целиком: заранее не известно, в какие из них он попадал.
+    Когда записей больше max_size, вытесняется та, к которой дольше всего не обращались.
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._students = OrderedDict()  # ключ -> (момент устаревания, значение)
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def _section(self, key):
+        return self._students if key[0] == 'id' else self._queries
+
+    def get(self, key):
+        """
+        Возвращает значение из кэша или _MISSING, если его нет (или оно устарело).
+        """
+        if self.max_size <= 0:
+            return _MISSING
+        with self._lock:
+            section = self._section(key)
+            item = section.get(key)
+            if item is None:
+                self.stats['misses'] += 1
+                return _MISSING
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del section[key]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return _MISSING
+            section.move_to_end(key)  # запись стала "самой свежей"
+            self.stats['hits'] += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            section = self._section(key)
+            section[key] = (time.monotonic() + self.ttl, value)
+            section.move_to_end(key)
+            while len(self._students) + len(self._queries) > self.max_size:
+                # Вытесняю самую старую запись; списки вытесняются в первую очередь
+                oldest = self._queries if self._queries else self._students
+                oldest.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, student_ids=None):
+        """
+        Сбрасывает кэш после изменения студентов student_ids.
+        student_ids=None - изменилось неизвестно что (например, массовый импорт): сбрасывается все.
+        """
+        with self._lock:
+            if student_ids is None:
+                self.stats['invalidations'] += len(self._students) + len(self._queries)
+                self._students.clear()
+            else:
+                for student_id in student_ids:
+                    if self._students.pop(('id', int(student_id)), None) is not None:
+                        self.stats['invalidations'] += 1
+                self.stats['invalidations'] += len(self._queries)
+            self._queries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._students) + len(self._queries)
+        stats['max_size'] = self.max_size
+        stats['ttl'] = self.ttl
+        return stats
+
+
+student_cache = StudentCache(STUDENT_CACHE_SIZE, STUDENT_CACHE_TTL)
+
+
+def cached_read(key, load):
+    """
+    Чтение "через кэш": если значение по ключу есть в кэше - возвращает его,
+    иначе вызывает load(), кладет результат в кэш и возвращает.
+    """
+    value = student_cache.get(key)
+    if value is _MISSING:
+        _replica_session.used_replica = False
+        value = load()
+        if replica_read_is_cacheable():  # свежесть данных с реплики - см. раздел "Реплики для чтения"
+            student_cache.put(key, value)
+    return value
+
+
+def announce_students_changed(cursor, student_ids=None):
+    """
+    Сообщает другим копиям программы, что студенты student_ids изменились
+    (NOTIFY в канал STUDENT_CACHE_CHANNEL). Вызывается ДО commit: PostgreSQL
+    доставит уведомление только после успешного подтверждения транзакции.
+    Работает, только если включен STUDENT_CACHE_NOTIFY=1.
+    """
+    if STUDENT_CACHE_NOTIFY:
+        cursor.execute('SELECT pg_notify(%s, %s);', (STUDENT_CACHE_CHANNEL, cache_notification_payload(student_ids)))
+
+
+def cache_notification_payload(student_ids=None):
+    """
+    Текст уведомления об изменении студентов: "1,2,3" или "*" (изменилось все или слишком много).
+    """
+    if student_ids is None:
+        return '*'
+    payload = ','.join(str(student_id) for student_id in student_ids)
+    if len(payload) > 7000:  # размер уведомления ограничен 8000 байт
+        return '*'
+    return payload
+
+
+def invalidate_students(student_ids=None):
+    """
+    Сбрасывает кэш этой программы после изменения студентов (вызывается ПОСЛЕ commit)
+    и отмечает их для обновления в индексе поиска с опечатками.
+    Ближайшие чтения после этого идут на основной сервер, а не на реплики.
+    """
+    if student_ids is not None:
+        student_ids = list(student_ids)  # может прийти генератор, а нужен он дважды
+    note_primary_write()
+    student_cache.invalidate(student_ids)
+    fuzzy_name_index.invalidate(student_ids)
+
+
+def invalidate_students_after_commit(connection, student_ids=None):
+    """
+    Сбрасывает кэш после изменения студентов student_ids в транзакции соединения connection.
+    connection=None - транзакцию уже подтвердил db_transaction, и кэш сбрасывается сразу.
+    Если соединение передал вызывающий, транзакцию подтвердит он: до его commit другой поток
+    мог бы снова положить в кэш старые данные, поэтому кэш сбрасывается после commit
+    (см. StudentConnectionMixin), а после rollback не сбрасывается вовсе.
+    """
+    changed = getattr(connection, 'changed_students', None)
+    if changed is None:
+        invalidate_students(student_ids)
+    elif student_ids is None:
+        changed.append(None)
+    else:
+        changed.extend(student_ids)
+
+
+def _handle_cache_notification(payload):
+    """
+    Обрабатывает уведомление от другой копии программы: "*" или "1,2,3".
+    """
+    if payload == '*' or not payload:
+        invalidate_students(None)
+    else:
+        invalidate_students(int(part) for part in payload.split(',') if part)
+
+
+def _listen_for_cache_notifications():
+    """
+    Фоновый поток: держит ОТДЕЛЬНОЕ (не из пула) соединение с командой LISTEN
+    и сбрасывает кэш по уведомлениям. Если соединение обрывается, переподключается;
+    за время обрыва уведомления могли потеряться, поэтому кэш сбрасывается целиком.
+    """
+    load_db_driver()
+    while True:
+        connection = None
+        try:
+            connection = psycopg2.connect(
+                host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD, port=DB_PORT
+            )
+            connection.autocommit = True  # LISTEN работает вне транзакции
+            cursor = connection.cursor()
+            cursor.execute(f'LISTEN {STUDENT_CACHE_CHANNEL};')
+            invalidate_students(None)
+            while True:
+                # Жду, когда в соединении появятся данные (не дольше 5 секунд)
+                if select.select([connection], [], [], 5) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    _handle_cache_notification(connection.notifies.pop(0).payload)
+        except Error as e:
+            print(f'Слушатель уведомлений кэша: ошибка соединения с БД ({e}), переподключение...')
+            time.sleep(5)
+        finally:
+            if connection is not None:
+                connection.close()
+
+
+_cache_listener = None
+
+
+def start_cache_listener():
+    """
+    Запускает фоновый поток, который сбрасывает кэш по уведомлениям
+    от других копий программы (если STUDENT_CACHE_NOTIFY=1).
+    """
+    global _cache_listener
+    if STUDENT_CACHE_NOTIFY and STUDENT_CACHE_SIZE > 0 and _cache_listener is None:
+        _cache_listener = threading.Thread(
+            target=_listen_for_cache_notifications, name='student-cache-listener', daemon=True
+        )
+        _cache_listener.start()
+
+
+def get_cache_stats():
+    """
+    Возвращает счетчики кэша: попадания, промахи, вытеснения, устаревания, сбросы.
+    """
+    return student_cache.get_stats()
+
+
+def print_cache_stats():
+    """
+    Выводит статистику кэша студентов.
+    """
+    print('\n---------- Статистика кэша студентов ----------')
+    for name, value in get_cache_stats().items():
+        print(f'{name.ljust(20)}: {value}')
+
+# ==================== Конец кэша студентов ====================
+    
+    
+# SQL-запрос для создания таблицы students
+# IF NOT EXISTS: предотвращает ошибку, если таблица уже существует
+# student_id: SERIAL PRIMARY KEY - автоматически увеличивающийся уникальный ID
+# VARCHAR(50): строка до 50 символов
+# NOT NULL: поле не может быть пустым
+# INTEGER: целое число
+CREATE_STUDENTS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS students (
+    id SERIAL PRIMARY KEY,
+    last_name VARCHAR(50) NOT NULL,
+    first_name VARCHAR(50) NOT NULL,
+    patronymic VARCHAR(50),
+    age INTEGER,
+    course INTEGER
+);
+"""
+
+# Индексы для поиска студентов (используются в search_students):
+#  - pg_trgm: GIN-индексы по триграммам, ускоряют "ILIKE '%часть%'" и similarity();
+#  - обычный B-tree по lower(last_name) для поиска по началу фамилии (1-2 буквы);
+#  - столбец search_vector (tsvector, конфигурация 'russian') + GIN-индекс для полнотекстового поиска.
+# Генерируемые столбцы (GENERATED ALWAYS AS ... STORED) есть в PostgreSQL начиная с 12-й версии.
+SEARCH_INDEX_STATEMENTS = [
+    ("расширение pg_trgm", "CREATE EXTENSION IF NOT EXISTS pg_trgm;"),
+    ("триграммный индекс по фамилии",
+     "CREATE INDEX IF NOT EXISTS students_last_name_trgm_idx ON students USING gin (last_name gin_trgm_ops);"),
+    ("триграммный индекс по имени",
+     "CREATE INDEX IF NOT EXISTS students_first_name_trgm_idx ON students USING gin (first_name gin_trgm_ops);"),
+    ("триграммный индекс по отчеству",
+     "CREATE INDEX IF NOT EXISTS students_patronymic_trgm_idx ON students USING gin (patronymic gin_trgm_ops);"),
+    ("индекс для поиска по началу фамилии",
+     "CREATE INDEX IF NOT EXISTS students_last_name_prefix_idx ON students (lower(last_name) text_pattern_ops);"),
+    ("столбец для полнотекстового поиска",
+     """ALTER TABLE students ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('russian', last_name || ' ' || first_name || ' ' || coalesce(patronymic, ''))
+        ) STORED;"""),
+    ("полнотекстовый индекс",
+     "CREATE INDEX IF NOT EXISTS students_search_vector_idx ON students USING gin (search_vector);"),
+]
+
+# Индексы для сортировки списка и для отчетов по курсу/возрасту
+SORT_INDEX_STATEMENTS = [
+    # view_students, browse_students и поиск сортируют по (фамилия, имя, id):
+    # с этим индексом сортировка - это просто чтение индекса по порядку
+    ("индекс для сортировки по ФИО",
+     "CREATE INDEX IF NOT EXISTS students_name_order_idx ON students (last_name, first_name, id);"),
+    # отчеты и групповые операции фильтруют по курсу и диапазону возраста
+    ("индекс по курсу и возрасту",
+     "CREATE INDEX IF NOT EXISTS students_course_age_idx ON students (course, age);"),
+]
+
+# Сводная таблица для статистики (число студентов по курсу и возрасту).
+# Ее ведут триггеры на таблице students, поэтому отчет читает не больше
+# нескольких сотен строк, сколько бы студентов ни было.
+# Триггеры не обновляют сводку напрямую, а дописывают изменения ("дельты")
+# в student_stats_delta: так параллельные транзакции (например, загрузчики
+# параллельного импорта) не ждут друг друга на одних и тех же строках сводки.
+# Дельты переносятся в student_stats при построении отчета (refresh_student_stats).
+# Не указанные курс или возраст (NULL) здесь хранятся как 0; с миграции 7
+# они хранятся как NULL (см. STUDENT_STATS_NULL_STATEMENTS).
+STUDENT_STATS_STATEMENTS = [
+    ("таблица сводной статистики",
+     """CREATE TABLE IF NOT EXISTS student_stats (
+            course INTEGER NOT NULL,
+            age INTEGER NOT NULL,
+            students BIGINT NOT NULL,
+            PRIMARY KEY (course, age)
+        );"""),
+    ("таблица изменений статистики",
+     """CREATE TABLE IF NOT EXISTS student_stats_delta (
+            course INTEGER NOT NULL,
+            age INTEGER NOT NULL,
+            students BIGINT NOT NULL
+        );"""),
+    # Пока заполняется сводка, студентов менять нельзя, иначе числа разойдутся
+    ("блокировка таблицы students на время заполнения статистики",
+     "LOCK TABLE students IN SHARE MODE;"),
+    ("начальное заполнение статистики",
+     """INSERT INTO student_stats (course, age, students)
+        SELECT coalesce(course, 0), coalesce(age, 0), count(*) FROM students GROUP BY 1, 2
+        ON CONFLICT (course, age) DO UPDATE SET students = EXCLUDED.students;"""),
+    ("функция обновления статистики",
+     """CREATE OR REPLACE FUNCTION student_stats_track() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO student_stats_delta (course, age, students)
+                SELECT coalesce(course, 0), coalesce(age, 0), count(*) FROM new_rows GROUP BY 1, 2;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO student_stats_delta (course, age, students)
+                SELECT coalesce(course, 0), coalesce(age, 0), -count(*) FROM old_rows GROUP BY 1, 2;
+            ELSIF TG_OP = 'UPDATE' THEN
+                -- Если курс и возраст не менялись, +1 и -1 взаимно уничтожаются
+                INSERT INTO student_stats_delta (course, age, students)
+                SELECT course, age, sum(students) FROM (
+                    SELECT coalesce(course, 0) AS course, coalesce(age, 0) AS age, 1 AS students FROM new_rows
+                    UNION ALL
+                    SELECT coalesce(course, 0), coalesce(age, 0), -1 FROM old_rows
+                ) AS changes
+                GROUP BY 1, 2
+                HAVING sum(students) <> 0;
+            ELSIF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM student_stats;
+                DELETE FROM student_stats_delta;
+            END IF;
+            RETURN NULL;
+        END;
+        $$;"""),
+    # Триггеры уровня оператора: один COPY на миллион строк - одна вставка в student_stats_delta
+    ("триггер статистики на INSERT",
+     """DROP TRIGGER IF EXISTS students_stats_insert ON students;
+        CREATE TRIGGER students_stats_insert AFTER INSERT ON students
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION student_stats_track();"""),
+    ("триггер статистики на UPDATE",
+     """DROP TRIGGER IF EXISTS students_stats_update ON students;
+        CREATE TRIGGER students_stats_update AFTER UPDATE ON students
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION student_stats_track();"""),
+    ("триггер статистики на DELETE",
+     """DROP TRIGGER IF EXISTS students_stats_delete ON students;
+        CREATE TRIGGER students_stats_delete AFTER DELETE ON students
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION student_stats_track();"""),
+    ("триггер статистики на TRUNCATE",
+     """DROP TRIGGER IF EXISTS students_stats_truncate ON students;
+        CREATE TRIGGER students_stats_truncate AFTER TRUNCATE ON students
+        FOR EACH STATEMENT EXECUTE FUNCTION student_stats_track();"""),
+]
+
+# Журнал изменений студентов (change data capture) для внешних систем.
+# Вместо того чтобы перечитывать всю таблицу, они читают только изменения
+# (см. раздел "Журнал изменений студентов"): каждый INSERT/UPDATE/DELETE
+# дописывает строки в student_changes тем же оператором, что и изменение.
+# txid - номер транзакции, сделавшей изменение: читатель берет только изменения
+# завершенных транзакций и идет по порядку (txid, change_id), поэтому изменение
+# из долгой транзакции не "проскочит" мимо уже прочитанной позиции.
+# Столбец updated_at - время последнего изменения студента (ставит триггер).
+STUDENT_CHANGES_STATEMENTS = [
+    ("столбец времени изменения студента",
+     "ALTER TABLE students ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();"),
+    ("функция обновления updated_at",
+     """CREATE OR REPLACE FUNCTION students_touch_updated_at() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.updated_at := now();
+            RETURN NEW;
+        END;
+        $$;"""),
+    ("триггер обновления updated_at",
+     """DROP TRIGGER IF EXISTS students_touch_updated_at ON students;
+        CREATE TRIGGER students_touch_updated_at BEFORE UPDATE ON students
+        FOR EACH ROW EXECUTE FUNCTION students_touch_updated_at();"""),
+    ("таблица журнала изменений",
+     """CREATE TABLE IF NOT EXISTS student_changes (
+            change_id BIGSERIAL PRIMARY KEY,
+            txid BIGINT NOT NULL DEFAULT txid_current(),
+            operation VARCHAR(8) NOT NULL,
+            student_id INTEGER,
+            changed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            data JSONB
+        );"""),
+    ("индекс журнала по порядку чтения",
+     "CREATE INDEX IF NOT EXISTS student_changes_position_idx ON student_changes (txid, change_id);"),
+    ("функция записи в журнал изменений",
+     f"""CREATE OR REPLACE FUNCTION student_changes_track() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO student_changes (operation, student_id, data)
+                SELECT 'insert', n.id, to_jsonb(n) - 'search_vector' FROM new_rows n;
+            ELSIF TG_OP = 'UPDATE' THEN
+                -- UPDATE, который ничего не поменял (кроме updated_at), в журнал не попадает
+                INSERT INTO student_changes (operation, student_id, data)
+                SELECT 'update', n.id, to_jsonb(n) - 'search_vector'
+                FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE to_jsonb(n) - 'search_vector' - 'updated_at' <> to_jsonb(o) - 'search_vector' - 'updated_at';
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO student_changes (operation, student_id)
+                SELECT 'delete', o.id FROM old_rows o;
+            ELSIF TG_OP = 'TRUNCATE' THEN
+                -- Таблицу очистили целиком: читателю нужно загрузить ее заново
+                INSERT INTO student_changes (operation) VALUES ('truncate');
+            END IF;
+            -- Одинаковые уведомления в одной транзакции PostgreSQL отправляет один раз
+            PERFORM pg_notify('{STUDENT_CHANGES_CHANNEL}', '');
+            RETURN NULL;
+        END;
+        $$;"""),
+    ("триггер журнала на INSERT",
+     """DROP TRIGGER IF EXISTS students_changes_insert ON students;
+        CREATE TRIGGER students_changes_insert AFTER INSERT ON students
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION student_changes_track();"""),
+    ("триггер журнала на UPDATE",
+     """DROP TRIGGER IF EXISTS students_changes_update ON students;
+        CREATE TRIGGER students_changes_update AFTER UPDATE ON students
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION student_changes_track();"""),
+    ("триггер журнала на DELETE",
+     """DROP TRIGGER IF EXISTS students_changes_delete ON students;
+        CREATE TRIGGER students_changes_delete AFTER DELETE ON students
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION student_changes_track();"""),
+    ("триггер журнала на TRUNCATE",
+     """DROP TRIGGER IF EXISTS students_changes_truncate ON students;
+        CREATE TRIGGER students_changes_truncate AFTER TRUNCATE ON students
+        FOR EACH STATEMENT EXECUTE FUNCTION student_changes_track();"""),
+]
+
+# Версия строки студента для оптимистичной блокировки: изменение сохраняется,
+# только если студент с тех пор не менялся (UPDATE ... WHERE id = %s AND version = %s).
+# Версию увеличивает триггер, поэтому она растет при любом изменении студента,
+# откуда бы оно ни пришло. Заодно триггер перестает менять updated_at
+# (и версию) у UPDATE, которые на самом деле ничего не поменяли.
+STUDENT_VERSION_STATEMENTS = [
+    ("столбец версии студента",
+     "ALTER TABLE students ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;"),
+    ("функция обновления версии и updated_at",
+     """CREATE OR REPLACE FUNCTION students_touch_updated_at() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF (NEW.last_name, NEW.first_name, NEW.patronymic, NEW.age, NEW.course)
+               IS DISTINCT FROM (OLD.last_name, OLD.first_name, OLD.patronymic, OLD.age, OLD.course) THEN
+                NEW.version := OLD.version + 1;
+                NEW.updated_at := now();
+            ELSE
+                NEW.version := OLD.version;
+                NEW.updated_at := OLD.updated_at;
+            END IF;
+            RETURN NEW;
+        END;
+        $$;"""),
+]
+
+# Сводная статистика без подмены NULL на 0: студент без возраста (или курса) раньше
+# считался студентом с возрастом 0 и портил средний и минимальный возраст.
+# Теперь NULL - отдельная группа сводки, а в возрастные показатели она не входит.
+# Первичного ключа у сводки больше нет (в нем не может быть NULL): строки сводки
+# ищутся через IS NOT DISTINCT FROM, а одновременные обновления сводки
+# не дает делать блокировка в REFRESH_STUDENT_STATS_QUERY.
+STUDENT_STATS_NULL_STATEMENTS = [
+    ("курс и возраст в сводке могут быть NULL",
+     """ALTER TABLE student_stats DROP CONSTRAINT IF EXISTS student_stats_pkey,
+            ALTER COLUMN course DROP NOT NULL, ALTER COLUMN age DROP NOT NULL;
+        ALTER TABLE student_stats_delta ALTER COLUMN course DROP NOT NULL, ALTER COLUMN age DROP NOT NULL;"""),
+    ("функция обновления статистики без замены NULL на 0",
+     """CREATE OR REPLACE FUNCTION student_stats_track() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO student_stats_delta (course, age, students)
+                SELECT course, age, count(*) FROM new_rows GROUP BY 1, 2;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO student_stats_delta (course, age, students)
+                SELECT course, age, -count(*) FROM old_rows GROUP BY 1, 2;
+            ELSIF TG_OP = 'UPDATE' THEN
+                -- Если курс и возраст не менялись, +1 и -1 взаимно уничтожаются
+                -- (GROUP BY считает NULL одинаковыми, поэтому и для NULL тоже)
+                INSERT INTO student_stats_delta (course, age, students)
+                SELECT course, age, sum(students) FROM (
+                    SELECT course, age, 1 AS students FROM new_rows
+                    UNION ALL
+                    SELECT course, age, -1 FROM old_rows
+                ) AS changes
+                GROUP BY 1, 2
+                HAVING sum(students) <> 0;
+            ELSIF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM student_stats;
+                DELETE FROM student_stats_delta;
+            END IF;
+            RETURN NULL;
+        END;
+        $$;"""),
+    # Старая сводка не отличала возраст 0 от неизвестного - пересчитываю ее заново
+    ("блокировка таблицы students на время пересчета статистики",
+     "LOCK TABLE students IN SHARE MODE;"),
+    ("пересчет статистики",
+     """DELETE FROM student_stats;
+        DELETE FROM student_stats_delta;
+        INSERT INTO student_stats (course, age, students)
+        SELECT course, age, count(*) FROM students GROUP BY 1, 2;"""),
+]
+
+# Миграции схемы БД: (версия, описание, список шагов).
+# Шаг - это (описание, SQL-запрос, обязательный ли шаг).
+# Если НЕобязательный шаг не выполнился (например, нет прав на CREATE EXTENSION),
+# миграция все равно считается примененной, просто без этого шага.
+# Новые изменения схемы добавляются ТОЛЬКО в конец списка с новым номером версии.
+SCHEMA_MIGRATIONS = [
+    (1, 'таблица students', [
+        ("таблица 'students'", CREATE_STUDENTS_TABLE_QUERY, True),
+    ]),
+    (2, 'индексы для поиска по ФИО', [
+        (description, statement, False) for description, statement in SEARCH_INDEX_STATEMENTS
+    ]),
+    (3, 'индексы для сортировки списка и отчетов по курсу/возрасту', [
+        (description, statement, True) for description, statement in SORT_INDEX_STATEMENTS
+    ]),
+    (4, 'сводная статистика по курсам и возрасту (обновляется триггерами)', [
+        (description, statement, True) for description, statement in STUDENT_STATS_STATEMENTS
+    ]),
+    (5, 'журнал изменений студентов и столбец updated_at', [
+        (description, statement, True) for description, statement in STUDENT_CHANGES_STATEMENTS
+    ]),
+    (6, 'версия строки студента (оптимистичная блокировка)', [
+        (description, statement, True) for description, statement in STUDENT_VERSION_STATEMENTS
+    ]),
+    (7, 'неизвестные курс и возраст в статистике - отдельной группой, а не как 0', [
+        (description, statement, True) for description, statement in STUDENT_STATS_NULL_STATEMENTS
+    ]),
+]
+
+LATEST_SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# Номер advisory-блокировки PostgreSQL: если несколько копий программы стартуют
+# одновременно, миграции выполнит только одна из них, остальные подождут
+SCHEMA_MIGRATION_LOCK_ID = 470001
+
+
+def _apply_migration_step(cursor, description, statement, required):
+    """
+    Выполняет один шаг миграции. Необязательный шаг выполняется внутри SAVEPOINT:
+    при ошибке откатывается только он, а не вся миграция.
+    """
+    if required:
+        cursor.execute(statement)
+        return
+    cursor.execute('SAVEPOINT migration_step;')
+    try:
+        cursor.execute(statement)
+        cursor.execute('RELEASE SAVEPOINT migration_step;')
+    except Error as e:
+        cursor.execute('ROLLBACK TO SAVEPOINT migration_step;')
+        print(f"Не удалось создать {description}: {e}")
+
+
+def create_students_table():
+    """
+    Создает таблицу 'students' и приводит схему БД к последней версии.
+
+    Каждая миграция из SCHEMA_MIGRATIONS выполняется в своей транзакции
+    и записывается в таблицу schema_version, поэтому повторный запуск
+    ничего не делает (кроме одного запроса с проверкой версии).
+    Возвращает текущую версию схемы или None при ошибке.
+    """
+    global _search_features
+    with db_connection() as connection:  # Берем соединение из пула
+        if not connection: # Проверяем, удалось ли получить соединение
+            print("Не удалось подготовить таблицу 'students': нет соединения с БД.")
+            return None
+        cursor = connection.cursor()  # Создаем объект курсора
+        try:
+            # Таблица с историей примененных миграций
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+            """)
+            cursor.execute('SELECT coalesce(max(version), 0) FROM schema_version;')
+            current_version = cursor.fetchone()[0]
+            connection.commit() # Подтверждаем изменения в базе данных (сохраняем)
+
+            if current_version >= LATEST_SCHEMA_VERSION:
+                print(f"Схема БД актуальна (версия {current_version}).")
+                return current_version
+
+            for version, description, steps in SCHEMA_MIGRATIONS:
+                if version <= current_version:
+                    continue
+                # Блокировка держится до конца транзакции (до commit/rollback)
+                cursor.execute('SELECT pg_advisory_xact_lock(%s);', (SCHEMA_MIGRATION_LOCK_ID,))
+                # Пока мы ждали блокировку, эту миграцию могла применить другая копия программы
+                cursor.execute('SELECT 1 FROM schema_version WHERE version = %s;', (version,))
+                if cursor.fetchone():
+                    connection.rollback()
+                    current_version = version
+                    continue
+                for step_description, statement, required in steps:
+                    _apply_migration_step(cursor, step_description, statement, required)
+                cursor.execute(
+                    'INSERT INTO schema_version (version, description) VALUES (%s, %s);',
+                    (version, description)
+                )
+                connection.commit()
+                current_version = version
+                print(f"Применена миграция схемы БД {version}: {description}.")
+
+            print("Таблица 'students' успешно создана или уже существует.")
+            return current_version
+        
+        except Error as e:
+            print(f"Ошибка при создании таблицы 'students': {e}")
+            connection.rollback()  # Откатываем изменения, если произошла ошибка
+            return None
+        
+        finally:
+            cursor.close()  # Всегда закрываем курсор (соединение вернется в пул само)
+            _search_features = None  # После миграций набор индексов для поиска мог измениться
+                
+    
+    
+     
+
+# --- Кэш версии схемы ---
+# Чтобы не открывать соединение и не проверять схему при каждом запуске,
+# версия схемы каждой БД запоминается в файле SCHEMA_CACHE_FILE.
+# Если в файле уже последняя версия, миграции при запуске не выполняются.
+_schema_state = 'unknown'  # 'unknown' -> 'checking' -> 'ready'
+_schema_lock = threading.RLock()  # RLock: миграции сами берут соединение и снова вызывают ensure_schema()
+_schema_checker = None  # поток, который сейчас проверяет схему (threading.get_ident())
+
+
+def _schema_cache_key():
+    return f'{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+
+
+def _read_schema_cache():
+    try:
+        with open(SCHEMA_CACHE_FILE, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_schema_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(SCHEMA_CACHE_FILE) or '.', exist_ok=True)
+        with open(SCHEMA_CACHE_FILE + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(cache, file, ensure_ascii=False)
+        os.replace(SCHEMA_CACHE_FILE + '.tmp', SCHEMA_CACHE_FILE)
+    except OSError as e:
+        print(f'Не удалось сохранить версию схемы в {SCHEMA_CACHE_FILE}: {e}')
+
+
+def remember_schema_version(version):
+    """
+    Запоминает в SCHEMA_CACHE_FILE, что схема этой БД имеет версию version.
+    """
+    cache = _read_schema_cache()
+    cache[_schema_cache_key()] = version
+    _write_schema_cache(cache)
+
+
+def forget_schema_version():
+    """
+    Забывает сохраненную версию схемы: при следующем обращении к БД миграции проверятся заново
+    (например, если таблицу students удалили, пока программа не работала).
+    """
+    global _schema_state
+    with _schema_lock:  # не сбрасываю состояние посреди чужой проверки схемы
+        cache = _read_schema_cache()
+        if cache.pop(_schema_cache_key(), None) is not None:
+            _write_schema_cache(cache)
+        _schema_state = 'unknown'
+
+
+def ensure_schema(force=False):
+    """
+    Проверяет схему БД один раз за работу программы, перед первым запросом:
+    если в SCHEMA_CACHE_FILE уже записана последняя версия - ничего не делает,
+    иначе выполняет миграции (create_students_table) и запоминает версию.
+    С force=True миграции проверяются в БД в любом случае.
+    Пока один поток проверяет схему, остальные ждут на блокировке _schema_lock
+    и не берут соединения, пока миграции не закончатся (важно в режиме сервера).
+    """
+    global _schema_state, _schema_checker
+    if _schema_state == 'ready' and not force:
+        return
+    with _schema_lock:
+        if _schema_checker == threading.get_ident():
+            return  # Вызов из самих миграций: этот поток уже проверяет схему
+        if _schema_state == 'ready' and not force:
+            return  # Схему уже проверил другой поток, пока мы ждали
+        _schema_state = 'checking'
+        _schema_checker = threading.get_ident()
+        started = time.perf_counter()
+        version = None
+        try:
+            if not force and _read_schema_cache().get(_schema_cache_key()) == LATEST_SCHEMA_VERSION:
+                version = LATEST_SCHEMA_VERSION
+                startup_event('проверка схемы БД (по кэшу)', started)
+                return
+            version = create_students_table()
+            if version == LATEST_SCHEMA_VERSION:
+                remember_schema_version(version)
+            startup_event('проверка и миграции схемы БД', started)
+        finally:
+            # Если БД была недоступна, схема проверится при следующем обращении к БД
+            _schema_state = 'ready' if version is not None else 'unknown'
+            _schema_checker = None
+
+
+# --- Секционирование таблицы students (необязательно) ---
+# Для многомиллионных таблиц students можно разбить на секции по курсу
+# (PARTITION BY LIST (course)): students_course_1 ... students_course_6
+# и students_course_other (курс не указан). Тогда:
+#  - запросы с условием по курсу (список курса, групповые операции) читают одну секцию;
+#  - VACUUM и автоочистка обрабатывают каждую секцию отдельно;
+#  - выпуск целого курса в архив - это DETACH PARTITION (archive_course), без DELETE миллионов строк.
+# Остальные функции программы не меняются: они работают с students, а PostgreSQL
+# сам направляет строки в нужную секцию (и переносит студента при смене курса).
+# Триггеры статистики и журнала изменений остаются на students и срабатывают для всех секций.
+# Ограничение PostgreSQL: первичный ключ секционированной таблицы должен включать столбец
+# секционирования, поэтому у id остается обычный индекс, а уникальность id дает последовательность.
+# Нужен PostgreSQL 13 или новее (строчные BEFORE-триггеры на секционированных таблицах).
+
+# Столбцы students после всех миграций (кроме вычисляемого search_vector)
+STUDENT_TABLE_COLUMNS = 'id, last_name, first_name, patronymic, age, course, updated_at, version'
+
+# Триггеры students: после замены таблицы их нужно создать заново (функции триггеров остаются)
+STUDENT_TRIGGER_STATEMENTS = [
+    (description, statement) for description, statement in STUDENT_STATS_STATEMENTS + STUDENT_CHANGES_STATEMENTS
+    if 'CREATE TRIGGER' in statement
+]
+
+
+def students_table_is_partitioned(cursor):
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = 'students'::regclass;")
+    return cursor.fetchone()[0]
+
+
+def build_partition_statements(sequence):
+    """
+    Шаги перевода students на секции: (описание, SQL-запрос, обязательный ли шаг).
+    sequence - имя последовательности, из которой берутся ID студентов.
+    """
+    steps = [
+        ("секционированная таблица",
+         "CREATE TABLE students_partitioned (LIKE students INCLUDING DEFAULTS INCLUDING GENERATED) "
+         "PARTITION BY LIST (course);", True),
+    ]
+    for course in range(MIN_COURSE, MAX_COURSE + 1):
+        steps.append((f"секция {course}-го курса",
+                      f"CREATE TABLE students_course_{course} PARTITION OF students_partitioned "
+                      f"FOR VALUES IN ({course});", True))
+    steps += [
+        ("секция для студентов без курса",
+         "CREATE TABLE students_course_other PARTITION OF students_partitioned DEFAULT;", True),
+        ("копирование студентов",
+         f"INSERT INTO students_partitioned ({STUDENT_TABLE_COLUMNS}) SELECT {STUDENT_TABLE_COLUMNS} FROM students;",
+         True),
+        # Иначе последовательность удалится вместе со старой таблицей
+        ("отвязка последовательности ID", f"ALTER SEQUENCE {sequence} OWNED BY NONE;", True),
+        ("удаление старой таблицы", "DROP TABLE students;", True),
+        ("переименование новой таблицы", "ALTER TABLE students_partitioned RENAME TO students;", True),
+        ("привязка последовательности ID", f"ALTER SEQUENCE {sequence} OWNED BY students.id;", True),
+        ("индекс по ID", "CREATE INDEX IF NOT EXISTS students_id_idx ON students (id);", True),
+    ]
+    steps += [(description, statement, True) for description, statement in SORT_INDEX_STATEMENTS]
+    steps += [(description, statement, False) for description, statement in SEARCH_INDEX_STATEMENTS]
+    steps += [(description, statement, True) for description, statement in STUDENT_TRIGGER_STATEMENTS]
+    return steps
+
+
+def partition_students_table():
+    """
+    Переводит существующую таблицу students на секции по курсу (см. описание выше).
+    Все шаги - одна транзакция: при ошибке таблица остается прежней. На время
+    копирования таблица заблокирована, поэтому лучше делать это, когда с программой не работают.
+    Возвращает число перенесенных студентов (None, если таблица уже секционирована).
+    """
+    global _search_features
+    ensure_schema()
+    started = time.perf_counter()
+    with db_transaction() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('LOCK TABLE students IN ACCESS EXCLUSIVE MODE;')
+            if students_table_is_partitioned(cursor):
+                print('Таблица students уже разбита на секции.')
+                return None
+            cursor.execute("SELECT pg_get_serial_sequence('students', 'id');")
+            sequence = cursor.fetchone()[0]
+            for description, statement, required in build_partition_statements(sequence):
+                _apply_migration_step(cursor, description, statement, required)
+            cursor.execute('SELECT count(*) FROM students;')
+            moved = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+            _search_features = None  # Индексы для поиска созданы заново
+    print(f'Таблица students разбита на секции по курсу: перенесено {moved} студентов '
+          f'(за {time.perf_counter() - started:.2f} сек.).')
+    return moved
+
+
+def archive_course(course):
+    """
+    Переносит в архив всех студентов курса course (например, выпускников):
+    секция students_course_<курс> отсоединяется от students (DETACH PARTITION)
+    и остается отдельной таблицей students_archive_course_<курс>_<дата>,
+    а на ее место создается новая пустая секция. Строки при этом не удаляются
+    и не переписываются; статистика и журнал изменений обновляются так,
+    будто этих студентов удалили.
+    Возвращает (имя архивной таблицы, число студентов в архиве).
+    """
+    course, error = check_course(course)
+    if error:
+        raise ValueError(error)
+    partition = f'students_course_{course}'
+    archive = f"students_archive_course_{course}_{time.strftime('%Y%m%d_%H%M%S')}"
+    with db_transaction() as connection:
+        cursor = connection.cursor()
+        try:
+            # Блокирую сразу всю таблицу: DETACH все равно потребует такую блокировку
+            cursor.execute('LOCK TABLE students IN ACCESS EXCLUSIVE MODE;')
+            if not students_table_is_partitioned(cursor):
+                raise ValueError('Таблица students не разбита на секции (см. partition_students_table).')
+            # Триггеры DELETE не сработают, поэтому статистику и журнал дополняю сам
+            cursor.execute(f"""INSERT INTO student_stats_delta (course, age, students)
+                               SELECT course, age, -count(*) FROM {partition} GROUP BY 1, 2;""")
+            cursor.execute(f"INSERT INTO student_changes (operation, student_id) SELECT 'delete', id FROM {partition};")
+            archived = cursor.rowcount
+            cursor.execute(f'ALTER TABLE students DETACH PARTITION {partition};')
+            cursor.execute(f'ALTER TABLE {partition} RENAME TO {archive};')
+            cursor.execute(f'CREATE TABLE {partition} PARTITION OF students FOR VALUES IN ({course});')
+            cursor.execute('SELECT pg_notify(%s, %s);', (STUDENT_CHANGES_CHANNEL, ''))
+            announce_students_changed(cursor)
+        finally:
+            cursor.close()
+    invalidate_students()  # Из students ушел целый курс - сбрасываю весь кэш
+    print(f'Студенты {course}-го курса ({archived}) перенесены в архивную таблицу {archive}.')
+    return archive, archived
+
+
+# ==================== Определение класса Student ====================
+# Мы определяем новый КЛАСС с именем 'Student'.
+# Это как ЧЕРТЕЖ или ШАБЛОН для создания КОНКРЕТНЫХ ОБЪЕКТОВ-студентов.
+# Каждый ОБЪЕКТ-студент будет иметь характеристики (АТРИБУТЫ)
+# и сможет выполнять действия (МЕТОДЫ), определенные в этом КЛАССЕ.
+class Student:
+    """
+    Класс Student представляет собой шаблон для создания объектов студентов.
+    Каждый объект студента будет иметь АТРИБУТЫ (данные)
+    и сможет выполнять МЕТОДЫ (действия).
+    """
+    # --- __slots__ ---
+    # Обычно Python хранит атрибуты каждого объекта в отдельном словаре __dict__.
+    # __slots__ перечисляет атрибуты заранее, и они хранятся в компактных "ячейках"
+    # без словаря: объект занимает заметно меньше памяти (сколько именно - зависит
+    # от версии Python, см. measure_student_memory), что важно,
+    # когда из БД загружаются сотни тысяч студентов.
+    # Побочный эффект: новые атрибуты, не перечисленные здесь, добавить нельзя.
+    __slots__ = ('id', 'last_name', 'first_name', 'patronymic', 'age', 'course')
+
+    # --- Конструктор (метод __init__) ---
+    # Это специальный МЕТОД, называемый КОНСТРУКТОРОМ.
+    # Он автоматически вызывается КАЖДЫЙ РАЗ, когда вы создаете новый
+    # ЭКЗЕМПЛЯР (или ОБЪЕКТ) класса Student.
+    # Например, когда мы пишем `Student("Иванов", "Иван", ...)`
+    # 'self' - это ОБЯЗАТЕЛЬНЫЙ первый параметр в любом методе класса.
+    # Он является ссылкой на ТОТ КОНКРЕТНЫЙ ОБЪЕКТ, который сейчас создается
+    # или с которым мы работаем. Через 'self' мы присваиваем данные
+    # АТРИБУТАМ ЭТОГО КОНКРЕТНОГО ОБЪЕКТА.
+    # id - номер студента в БД (None, пока студент еще не сохранен).
+    def __init__(self, last_name, first_name, patronymic, age, course, id=None):
+        self.id = id                  # АТРИБУТ ID в базе данных
+        self.last_name = last_name    # АТРИБУТ фамилия
+        self.first_name = first_name  # АТРИБУТ имя
+        self.patronymic = patronymic  # АТРИБУТ отчество
+        self.age = age                # АТРИБУТ возраст
+        self.course = course          # АТРИБУТ курс
+        
+    # --- Создание студента из строки БД ---
+    # @classmethod - метод, который вызывается у самого КЛАССА: Student.from_row(row).
+    # row - кортеж из БД в порядке STUDENT_COLUMNS (id, фамилия, имя, отчество, возраст, курс).
+    # Строки (ФИО) не копируются: объект просто ссылается на те же значения, что и кортеж.
+    @classmethod
+    def from_row(cls, row):
+        student = cls.__new__(cls)  # создаю объект без вызова __init__ (так быстрее)
+        (student.id, student.last_name, student.first_name,
+         student.patronymic, student.age, student.course) = row
+        return student
+
+    # Обратное преобразование: объект -> кортеж в порядке STUDENT_COLUMNS
+    def as_row(self):
+        return (self.id, self.last_name, self.first_name, self.patronymic, self.age, self.course)
+        
+    
+    # --- Специальный метод __str__() ---
+    # Этот специальный МЕТОД определяет, как ОБЪЕКТ класса Student
+    # должен быть представлен в виде СТРОКИ, когда вы используете
+    # функцию `print()` для этого ОБЪЕКТА или преобразуете его к строке (`str()`).
+    # Это очень удобно для "человекочитаемого" вывода информации о студенте.
+    def __str__(self):
+        return (f"ФИО: {self.last_name} {self.first_name} {self.patronymic} "
+                f"| Возраст: {self.age} | Курс: {self.course}")
+        
+# ==================== Конец определения класса Student ====================
+
+
+class StudentCursorMixin:
+    """
+    Курсор psycopg2 (StudentCursor), который вместо кортежей возвращает объекты Student
+    (для запросов, выбирающих столбцы STUDENT_COLUMNS):
+
+        cursor = connection.cursor(cursor_factory=StudentCursor)
+    """
+    def fetchone(self):
+        row = super().fetchone()
+        return Student.from_row(row) if row is not None else None
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany() if size is None else super().fetchmany(size)
+        return [Student.from_row(row) for row in rows]
+
+    def fetchall(self):
+        return [Student.from_row(row) for row in super().fetchall()]
+
+    def __iter__(self):
+        for row in super().__iter__():
+            yield Student.from_row(row)
+
+
+class StudentColumns:
+    """
+    Компактное хранилище большого числа студентов "по столбцам" для отчетов и выгрузок.
+
+    Вместо списка объектов (по объекту на студента) хранятся отдельные столбцы:
+    числа (id, возраст, курс) - в массивах array, где каждое число занимает
+    несколько байт, а не целый объект Python; ФИО - в списках, причем одинаковые
+    строки (например, 100 тысяч "Иван") хранятся в памяти один раз (sys.intern).
+    Пустые возраст/курс (NULL в БД) хранятся как 0.
+    """
+    __slots__ = ('ids', 'last_names', 'first_names', 'patronymics', 'ages', 'courses')
+
+    def __init__(self):
+        self.ids = array('q')        # 8-байтовые целые
+        self.last_names = []
+        self.first_names = []
+        self.patronymics = []
+        self.ages = array('h')       # 2-байтовые целые
+        self.courses = array('b')    # 1-байтовые целые
+
+    def append_row(self, row):
+        """
+        Добавляет строку из БД (кортеж в порядке STUDENT_COLUMNS).
+        """
+        student_id, last_name, first_name, patronymic, age, course = row
+        self.ids.append(student_id)
+        self.last_names.append(sys.intern(last_name))
+        self.first_names.append(sys.intern(first_name))
+        self.patronymics.append(sys.intern(patronymic or ''))
+        self.ages.append(age or 0)
+        self.courses.append(course or 0)
+
+    def extend_rows(self, rows):
+        for row in rows:
+            self.append_row(row)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, index):
+        """
+        Возвращает студента номер index в виде кортежа (как из БД).
+        """
+        return (self.ids[index], self.last_names[index], self.first_names[index],
+                self.patronymics[index] or None, self.ages[index] or None, self.courses[index] or None)
+
+    def __getitem__(self, index):
+        return Student.from_row(self.row(index))
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self[index]
+
+
+def load_student_columns(connection, batch_size=VIEW_FETCH_SIZE):
+    """
+    Загружает всю таблицу students в StudentColumns потоком (через серверный курсор),
+    не создавая промежуточный список всех строк.
+    """
+    columns = StudentColumns()
+    columns.extend_rows(iter_students(connection, batch_size))
+    return columns
+
+
+def measure_student_memory(count=100000):
+    """
+    Сравнивает, сколько памяти занимают count студентов в разных представлениях
+    (измерение через tracemalloc). Печатает таблицу и возвращает словарь {представление: байт}.
+    """
+    import tracemalloc  # нужен только для этого измерения
+
+    class DictStudent:
+        """Студент "как раньше": обычный класс с __dict__ у каждого объекта."""
+        def __init__(self, last_name, first_name, patronymic, age, course, id=None):
+            self.id = id
+            self.last_name = last_name
+            self.first_name = first_name
+            self.patronymic = patronymic
+            self.age = age
+            self.course = course
+
+    names = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов']
+    # Строки как из БД: каждая строка таблицы - отдельные объекты str
+    rows = [(number, ''.join(names[number % 5]), ''.join('Иван'), ''.join('Петрович'), 18 + number % 40,
+             1 + number % 6) for number in range(count)]
+
+    def measure(build):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del result
+        return size
+
+    def build_columns():
+        columns = StudentColumns()
+        columns.extend_rows(rows)
+        return columns
+
+    results = {
+        'DictStudent (до)': measure(lambda: [DictStudent(*row[1:], id=row[0]) for row in rows]),
+        'Student (__slots__)': measure(lambda: [Student.from_row(row) for row in rows]),
+        'StudentColumns': measure(build_columns),
+    }
+    print(f'\nПамять на {count} студентов (без учета самих строк из БД):')
+    for title, size in results.items():
+        print(f'{title.ljust(22)}: {size / 1024 / 1024:8.2f} МБ ({size / count:6.1f} байт на студента)')
+    return results
+
+
+
+# Пункты главного меню (номер пункта = позиция в списке, последний пункт - выход)
+MENU_ITEMS = [
+    'Добавить нового студента',
+    'Посмотреть список студентов',
+    'Найти студента по фамилии',
+    'Удалить студента из списка',
+    'Редактировать студента',
+    'Импорт студентов из файла',
+    'Посмотреть список студентов постранично',
+    'Групповое удаление или изменение студентов',
+    'Экспорт студентов в файл',
+    'Статистика по курсам и возрасту',
+    'Аналитика по снимку таблицы (в памяти)',
+    'Выход из программы',
+]
+
+
+# функция вызова меню
+def display_menu():
+    '''
+        Выводит главное меню системы управления студентами на экран
+    '''
+    menu = PacedOutput(delay=0.2)
+    with menu:
+        menu.add('<><><><><> СИСТЕМА УПРАВЛЕНИЯ СПИСКОМ СТУДЕНТОВ <><><><><>')
+        menu.add('')
+        for number, title in enumerate(MENU_ITEMS, start=1):
+            menu.add(f'<< {number} >> {title}')
+    print('\n***********************************************************')
+    print() # пустая строка для отделения меню
+    
+    
+'''
+добавляю функции для обработки данных ввода ФИО
+'''
+# Допустимые диапазоны возраста и курса (в нашем ВУЗе можно обучаться с 16 до 65 лет, курсы с 1 по 6)
+MIN_AGE, MAX_AGE = 16, 65
+MIN_COURSE, MAX_COURSE = 1, 6
+
+
+# проверяет часть ФИО и возвращает текст ошибки (или None, если все в порядке)
+def check_name(name, name_type):
+    if not name:
+        return f'Ошибка: **{name_type}** не может быть пустым.'
+    
+    if not name.isalpha():
+        return f'Ошибка: **{name_type}** должен содержать только буквы.'
+    return None
+
+
+# проверяет корректность части ФИО
+def validate_name(name, name_type):
+    error = check_name(name, name_type)
+    if error:
+        print(error)
+        return False
+    return True
+
+
+# проверяет возраст: возвращает кортеж (возраст числом, None) или (None, текст ошибки)
+def check_age(age_value):
+    age_str = str(age_value).strip() if age_value is not None else ''
+    # валидация на пустой ввод
+    if not age_str:
+        return None, 'Возраст не может быть пустой строкой'
+    # валидация на число
+    if not age_str.isdigit():
+        return None, 'Возраст надо вводить числом'
+    age = int(age_str)
+    # проверка диапазона возраста
+    if not MIN_AGE <= age <= MAX_AGE:
+        return None, f'В нашем ВУЗе можно учиться с {MIN_AGE} лет до {MAX_AGE}(включительно)'
+    return age, None
+
+
+# проверяет курс: возвращает кортеж (курс числом, None) или (None, текст ошибки)
+def check_course(course_value):
+    course_str = str(course_value).strip() if course_value is not None else ''
+    if not course_str:
+        return None, 'Вы не ввели курс'
+    if not course_str.isdigit():
+        return None, 'Курс надо вводить числом'
+    course = int(course_str)
+    if not MIN_COURSE <= course <= MAX_COURSE:
+        return None, f'В нашем ВУЗе есть только курсы с {MIN_COURSE}-го по {MAX_COURSE}-ой(включительно)'
+    return course, None
+
+'''
+функция запрашивает у пользователя часть ФИО с валидацией
+'''
+def get_valid_name(name_type):
+    while True:
+        name = input(f'Введите {name_type} студента: ').title().strip()
+        if validate_name(name, name_type):
+            return name
+    
+        
+        
+        
+        
+# определение функции добавить студента  add_student()
+def add_student():
+    '''
+    Добавляем нового студента (фамилия, имя, отчество, возраст, курс)
+    
+    Аргументы:
+        students_list (list): Список, в который будет добавлен новый студент.
+    '''
+    print('\n---------- Добавляем нового студента ----------') # вывод для ясности, что сейчас мы добавляем нового студента
+    '''
+    здесь будет весь код для вызова "пункта меню << 1 >>"
+    '''
+    pause(0.5)
+    print('\n***Введите данные студента***')
+    pause(0.2)
+    print('-----------------------------')
+    last_name = get_valid_name('фамилию')
+    first_name = get_valid_name('имя')
+    patronymic = get_valid_name('отчество')
+    
+    # ввод и валидация возраста студента
+    while True:
+        student_age, error = check_age(input('Введите возраст студента: '))
+        if error:
+            print(error)
+            continue
+        break # выход из цикла валидации **возраста**
+        
+        # ввод и валидация курса студента
+    while True:
+        student_course, error = check_course(input('Введите курс студента: '))
+        if error:
+            print(error)
+            continue
+        break
+            
+    # создаю объект (экземпляр) класса Student
+    # Раньше здесь создавался словарь, а теперь вызываем конструктор __init__
+    new_student = Student(
+        last_name,
+        first_name,
+        patronymic,
+        student_age,
+        student_course
+    )
+    
+    # ----- код для сохранения в БД -----
+    try:
+        student_id = insert_student(new_student)
+        # вывод подтверждения о добавлении студента
+        print(f'\nСтудент **{new_student.last_name} {new_student.first_name} {new_student.patronymic}**  (ID: {student_id}) добавлен в список студентов.')
+    except ValueError as e:
+        print(f"Студент не добавлен: {e}")
+    except Error as e:
+        print(f"Произошла ошибка при добавлении студента в БД: {e}")
+    # ------ тут код для сохранения студента в БД заканчивается ------    
+    
+
+# Столбцы студента в том порядке, в котором их выбирают все SELECT-запросы
+STUDENT_COLUMNS = 'id, last_name, first_name, patronymic, age, course'
+
+
+def print_students_header():
+    """
+    Выводит заголовок таблицы студентов.
+    """
+    print(f"{'ID'.ljust(4)} | {'ФАМИЛИЯ'.ljust(15)} | {'ИМЯ'.ljust(15)} | {'ОТЧЕСТВО'.ljust(15)} | {'ВОЗРАСТ'.ljust(7)} | {'КУРС'.ljust(5)}")
+    print('-' * 76) # Для красивого отделения заголовков от значений
+
+
+def format_student_row(row):
+    """
+    Возвращает одну строку таблицы студентов (кортеж из БД в порядке STUDENT_COLUMNS).
+    """
+    # Распаковываю кортеж в отдельные переменные
+    # Порядок столбцов тут долджен быть строго такое же как в STUDENT_COLUMNS
+    student_id, last_name, first_name, patronymic, age, course = row
+    # Строка с данными на каждого студента(все, как в заголовке)
+    # Пишу впереди "str()", чтобы применить "ljust()"
+    return f"{str(student_id).ljust(4)} | {last_name.ljust(15)} | {first_name.ljust(15)} | {(patronymic or '').ljust(15)} | {str(age).ljust(7)} | {str(course).ljust(5)}"
+
+
+def iter_students(connection, batch_size=VIEW_FETCH_SIZE, cursor_factory=None):
+    """
+    Генератор: отдает студентов по одному, отсортированных по (фамилия, имя, id).
+
+    Использует СЕРВЕРНЫЙ (именованный) курсор: результат запроса остается
+    на сервере PostgreSQL, а мы забираем его пачками по batch_size строк
+    через fetchmany(). Так память программы не зависит от размера таблицы.
+    Серверный курсор живет внутри транзакции, поэтому после перебора
+    транзакция завершается (rollback - мы ничего не меняли).
+    С cursor_factory=StudentCursor генератор отдает объекты Student вместо кортежей.
+    """
+    # имя курсора => курсор серверный
+    cursor = connection.cursor(name='students_stream', cursor_factory=cursor_factory)
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(f"SELECT {STUDENT_COLUMNS} FROM students ORDER BY last_name, first_name, id;")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+        connection.rollback()
+
+
+def build_page_query(after=None, before=None, page_size=VIEW_PAGE_SIZE):
+    """
+    Собирает запрос одной страницы списка студентов (keyset-пагинация).
+    Возвращает (запрос, параметры, нужно ли развернуть результат).
+    """
+    if before is not None:
+        # Иду "назад": беру page_size строк перед ключом в обратном порядке и разворачиваю
+        return (f"SELECT {STUDENT_COLUMNS} FROM students "
+                "WHERE (last_name, first_name, id) < (%s, %s, %s) "
+                "ORDER BY last_name DESC, first_name DESC, id DESC LIMIT %s;",
+                (*before, page_size), True)
+    if after is not None:
+        return (f"SELECT {STUDENT_COLUMNS} FROM students "
+                "WHERE (last_name, first_name, id) > (%s, %s, %s) "
+                "ORDER BY last_name, first_name, id LIMIT %s;",
+                (*after, page_size), False)
+    return (f"SELECT {STUDENT_COLUMNS} FROM students ORDER BY last_name, first_name, id LIMIT %s;",
+            (page_size,), False)
+
+
+def fetch_students_page(connection, after=None, before=None, page_size=VIEW_PAGE_SIZE):
+    """
+    Возвращает одну страницу студентов (список кортежей) методом keyset-пагинации.
+
+    after  - ключ (фамилия, имя, id) последней строки предыдущей страницы -> следующая страница;
+    before - ключ первой строки текущей страницы -> предыдущая страница;
+    без них - первая страница.
+    В отличие от OFFSET, сервер не перебирает пропущенные строки,
+    поэтому любая страница открывается одинаково быстро.
+    """
+    query, params, reverse = build_page_query(after, before, page_size)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        return rows[::-1] if reverse else rows
+    finally:
+        cursor.close()
+        connection.rollback()  # Завершаю читающую транзакцию, чтобы не держать ее открытой
+
+
+def iter_all_students(batch_size=VIEW_FETCH_SIZE):
+    """
+    Генератор всех студентов по порядку (фамилия, имя, id) для вывода списка.
+    Обычно - через серверный курсор (iter_students) на соединении из пула,
+    в асинхронном режиме - страницами по batch_size через асинхронный сервис.
+    """
+    if _async_bridge is not None:
+        after = None
+        while True:
+            rows = _async_bridge.run(_async_bridge.service.list_students(after=after, page_size=batch_size))
+            if not rows:
+                return
+            yield from rows
+            after = page_key(rows[-1])
+    with db_connection(readonly=True) as connection:
+        if not connection:
+            raise psycopg2.OperationalError('нет соединения с базой данных')
+        yield from iter_students(connection, batch_size)
+
+
+# --- Подготовленные запросы (PREPARE / EXECUTE) ---
+# Частые запросы с постоянным текстом PostgreSQL разбирает и планирует один раз
+# на соединение (PREPARE), дальше они только выполняются (EXECUTE).
+# Какие запросы уже подготовлены, помнит само соединение (StudentConnection.prepared).
+
+# SQL-запрос для вставки студента (значения - в порядке фамилия, имя, отчество, возраст, курс)
+INSERT_STUDENT_QUERY = (
+    "INSERT INTO students (last_name, first_name, patronymic, age, course) "
+    "VALUES (%s, %s, %s, %s, %s) RETURNING id;"
+)
+
+# Имя подготовленного запроса -> его текст
+PREPARED_STATEMENTS = {
+    'student_by_id': f"SELECT {STUDENT_COLUMNS} FROM students WHERE id = %s;",
+    'student_insert': INSERT_STUDENT_QUERY,
+    'student_delete': "DELETE FROM students WHERE id = %s RETURNING id;",
+    'student_with_version': f"SELECT {STUDENT_COLUMNS}, version FROM students WHERE id = %s;",
+    'student_delete_version': "DELETE FROM students WHERE id = %s AND version = %s RETURNING id;",
+}
+
+
+def execute_prepared(cursor, name, params, query=None):
+    """
+    Выполняет запрос name из PREPARED_STATEMENTS (или переданный query) как подготовленный:
+    при первом вызове на этом соединении - PREPARE, дальше только EXECUTE.
+    Если соединение не из пула или DB_PREPARED_STATEMENTS=0 - выполняет запрос обычным образом.
+    """
+    query = query or PREPARED_STATEMENTS[name]
+    prepared = getattr(cursor.connection, 'prepared', None)
+    if not DB_PREPARED_STATEMENTS or prepared is None:
+        cursor.execute(query, params)
+        return
+    _prepared_queries.setdefault(name, query)  # для отпечатка в метриках (query_fingerprint)
+    if name not in prepared:
+        # В PREPARE параметры записываются как $1, $2, ...
+        numbered_query, _ = to_numbered_query(query, params)
+        cursor.execute(f"PREPARE {name} AS {numbered_query.rstrip(';')};")
+        prepared.add(name)
+    try:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))});", params)
+    except Error as e:
+        if e.pgcode == '26000':  # подготовленного запроса на сервере нет (например, после DISCARD ALL)
+            prepared.discard(name)  # в следующий раз подготовлю заново
+        raise
+
+
+def fetch_student_by_id(connection, student_id):
+    """
+    Возвращает строку студента с ID student_id (кортеж в порядке STUDENT_COLUMNS) или None.
+    """
+    cursor = connection.cursor()
+    try:
+        execute_prepared(cursor, 'student_by_id', (student_id,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+class StudentConflictError(ValueError):
+    """
+    Студента изменил или удалил кто-то другой после того, как мы прочитали его версию:
+    изменение не сохранено. В current - текущие данные студента, в current_version - его версия.
+    """
+    def __init__(self, student_id, expected_version, current, current_version):
+        super().__init__(f'Студента с ID {student_id} уже изменил кто-то другой '
+                         f'(ожидалась версия {expected_version}, сейчас {current_version}).')
+        self.student_id = student_id
+        self.expected_version = expected_version
+        self.current = current
+        self.current_version = current_version
+
+
+def fetch_student_with_version(connection, student_id):
+    """
+    Возвращает (строка студента, версия) или (None, None), если такого студента нет.
+    """
+    cursor = connection.cursor()
+    try:
+        execute_prepared(cursor, 'student_with_version', (student_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return (row[:-1], row[-1]) if row else (None, None)
+
+
+def get_student_with_version(student_id):
+    """
+    Студент и его версия прямо из БД (без кэша): версию потом передают
+    в update_student/delete_student_by_id (expected_version), чтобы не затереть чужие изменения.
+    """
+    student_id = int(student_id)
+    if _async_bridge is not None:
+        return _async_bridge.run(_async_bridge.service.get_student_with_version(student_id))
+    with db_transaction() as connection:
+        return fetch_student_with_version(connection, student_id)
+
+
+def check_version_conflict(student_id, expected_version, current, current_version):
+    """
+    Вызывается, когда условный UPDATE/DELETE ничего не изменил: если студент еще есть,
+    значит, его версия другая - выбрасывает StudentConflictError. Если студента нет, возвращает False.
+    """
+    if current is None:
+        return False
+    invalidate_students([student_id])  # В кэше точно старые данные
+    raise StudentConflictError(student_id, expected_version, current, current_version)
+
+
+def get_student_by_id(student_id, connection=None, fresh=False):
+    """
+    Студент по ID через кэш (None, если такого студента нет).
+    С переданным соединением "connection" или с fresh=True читает напрямую из БД, минуя кэш
+    (нужно перед изменением студента, чтобы проверять актуальные данные).
+    """
+    student_id = int(student_id)
+    if connection is not None:
+        return fetch_student_by_id(connection, student_id)
+    if _async_bridge is not None:
+        return _async_bridge.run(_async_bridge.service.get_student(student_id, fresh=fresh))
+
+    def load(readonly=True):
+        with db_transaction(readonly=readonly) as conn:
+            return fetch_student_by_id(conn, student_id)
+    if fresh:
+        row = load(readonly=False)  # перед изменением - только с основного сервера
+        student_cache.put(('id', student_id), row)  # свежие данные заодно обновляют кэш
+        return row
+    return cached_read(('id', student_id), load)
+
+
+def _validated_student_row(student):
+    """
+    Проверяет объект Student по правилам ручного ввода и возвращает кортеж
+    (фамилия, имя, отчество, возраст, курс) для INSERT. При ошибке - ValueError.
+    """
+    row, errors = validate_student_record({
+        'last_name': student.last_name,
+        'first_name': student.first_name,
+        'patronymic': student.patronymic,
+        'age': student.age,
+        'course': student.course,
+    })
+    if errors:
+        raise ValueError('; '.join(errors))
+    return row
+
+
+def build_update_query(student_id, changes, expected_version=None):
+    """
+    Динамически строит SQL-запрос UPDATE: только те поля, которые меняются.
+    Например: если изменили только имя и возраст, будет "first_name = %s, age = %s".
+    changes - уже проверенный словарь (validate_student_changes), поэтому имена
+    столбцов в нем безопасны, а значения передаются через %s.
+    Столбцы всегда идут в порядке BATCH_UPDATE_COLUMNS, поэтому разных запросов
+    бывает не больше 31 (по одному на каждый набор столбцов).
+    С expected_version студент меняется, только если у него все еще эта версия.
+    Возвращает (запрос, параметры).
+    """
+    columns = [column for column in BATCH_UPDATE_COLUMNS if column in changes]
+    set_clause = ', '.join(f'{column} = %s' for column in columns)
+    params = (*(changes[column] for column in columns), student_id)
+    if expected_version is None:
+        return f"UPDATE students SET {set_clause} WHERE id = %s RETURNING id;", params
+    return (f"UPDATE students SET {set_clause} WHERE id = %s AND version = %s RETURNING id;",
+            (*params, int(expected_version)))
+
+
+def update_statement_name(changes, versioned=False):
+    """
+    Имя подготовленного запроса UPDATE для набора столбцов changes:
+    "student_update_<номер>", где номер - битовая маска столбцов из BATCH_UPDATE_COLUMNS
+    (с проверкой версии - "student_update_<номер>_version").
+    """
+    mask = sum(1 << index for index, column in enumerate(BATCH_UPDATE_COLUMNS) if column in changes)
+    return f'student_update_{mask}_version' if versioned else f'student_update_{mask}'
+
+
+def insert_student(student, connection=None):
+    """
+    Сохраняет нового студента (объект Student) в БД и возвращает его ID
+    (он же записывается в student.id).
+    """
+    row = _validated_student_row(student)
+    if connection is None and _async_bridge is not None:
+        student.id = _async_bridge.run(_async_bridge.service.add_student(student))
+        return student.id
+    with db_transaction(connection) as conn:
+        cursor = conn.cursor()
+        try:
+            # SQL-запрос для вставки данных. Используем %s для параметров,
+            # чтобы избежать SQL-инъекций и корректно передавать данные.
+            execute_prepared(cursor, 'student_insert', row)
+            # Получаем ID только что вставленной записи
+            student.id = cursor.fetchone()[0]
+            announce_students_changed(cursor, [student.id])
+        finally:
+            cursor.close()
+    invalidate_students_after_commit(connection, [student.id])  # Сбрасываю кэш списков (и ID нового студента)
+    return student.id
+
+
+def delete_student_by_id(student_id, connection=None, expected_version=None):
+    """
+    Удаляет студента одним запросом DELETE ... RETURNING.
+    Возвращает True, если студент был удален, и False, если такого студента уже нет.
+    С expected_version удаляет, только если версия студента не изменилась,
+    иначе выбрасывает StudentConflictError.
+    """
+    if connection is None and _async_bridge is not None:
+        return _async_bridge.run(_async_bridge.service.delete_student(student_id, expected_version))
+    with db_transaction(connection) as conn:
+        cursor = conn.cursor()
+        try:
+            if expected_version is None:
+                execute_prepared(cursor, 'student_delete', (student_id,))
+            else:
+                execute_prepared(cursor, 'student_delete_version', (student_id, int(expected_version)))
+            deleted = cursor.fetchone() is not None
+            if deleted:
+                announce_students_changed(cursor, [student_id])
+            elif expected_version is not None:
+                check_version_conflict(student_id, expected_version, *fetch_student_with_version(conn, student_id))
+        finally:
+            cursor.close()
+    invalidate_students_after_commit(connection, [student_id])  # Удаленного студента больше нет и в кэше
+    return deleted
+
+
+def update_student(student_id, changes, connection=None, expected_version=None):
+    """
+    Меняет у студента поля из словаря changes ({столбец: новое значение}).
+    Значения проверяются по правилам ручного ввода (ValueError при ошибке).
+    Возвращает True, если студент найден и изменен, иначе False.
+    С expected_version (версия, прочитанная get_student_with_version) меняет студента,
+    только если его с тех пор никто не изменил, иначе выбрасывает StudentConflictError.
+    Строки при этом не блокируются, пока пользователь вводит изменения.
+    """
+    changes = validate_student_changes(changes)
+    if connection is None and _async_bridge is not None:
+        return _async_bridge.run(_async_bridge.service.edit_student(student_id, changes, expected_version))
+    update_query, params = build_update_query(student_id, changes, expected_version)
+    statement_name = update_statement_name(changes, versioned=expected_version is not None)
+    with db_transaction(connection) as conn:
+        cursor = conn.cursor()
+        try:
+            execute_prepared(cursor, statement_name, params, query=update_query)
+            updated = cursor.fetchone() is not None
+            if updated:
+                announce_students_changed(cursor, [student_id])
+            elif expected_version is not None:
+                check_version_conflict(student_id, expected_version, *fetch_student_with_version(conn, student_id))
+        finally:
+            cursor.close()
+    invalidate_students_after_commit(connection, [student_id])  # В кэше могла остаться старая версия студента
+    return updated
+
+
+def get_students_page(after=None, before=None, page_size=VIEW_PAGE_SIZE):
+    """
+    Страница списка студентов (см. fetch_students_page) через кэш.
+    """
+    if _async_bridge is not None:
+        return _async_bridge.run(_async_bridge.service.list_students(after=after, before=before, page_size=page_size))
+
+    def load():
+        with db_transaction(readonly=True) as conn:
+            return fetch_students_page(conn, after=after, before=before, page_size=page_size)
+    return cached_read(('page', after, before, page_size), load)
+
+
+def page_key(row):
+    """
+    Ключ строки для keyset-пагинации: (фамилия, имя, id).
+    """
+    return row[1], row[2], row[0]
+
+
+# определение функции постраничного просмотра студентов
+def browse_students():
+    """
+    Показывает студентов постранично (по VIEW_PAGE_SIZE строк).
+    Соединение берется из пула только на время загрузки страницы
+    (а уже просмотренные страницы берутся из кэша),
+    пока пользователь читает страницу, соединение свободно.
+    """
+    print('\n<<<<<<<<<<<<<<<< СПИСОК СТУДЕНТОВ ПОСТРАНИЧНО >>>>>>>>>>>>>>>>')
+    page = []         # строки текущей страницы
+    page_number = 0
+    direction = None  # None - первая страница, 'next' - следующая, 'prev' - предыдущая
+    while True:
+        try:
+            if direction == 'next':
+                new_page = get_students_page(after=page_key(page[-1]))
+            elif direction == 'prev':
+                new_page = get_students_page(before=page_key(page[0]))
+            else:
+                new_page = get_students_page()
+        except Error as e:
+            print(f'Произошла ошибка при получени данных: {e}')
+            return
+
+        if new_page:
+            page = new_page
+            page_number += -1 if direction == 'prev' else 1
+        elif not page:
+            print('\nСписок студентов в базе данных пуст.')
+            return
+        else:
+            # Дальше (или раньше) страниц нет - остаюсь на текущей
+            print('\nБольше страниц в эту сторону нет.')
+
+        print(f'\n--- Страница {page_number} ---')
+        print_students_header()
+        table = PacedOutput()  # страница выводится одной записью, без пауз
+        with table:
+            for row in page:
+                table.add(format_student_row(row))
+
+        command = input('\n[Enter] - следующая, "п" - предыдущая, "в" - выход: ').strip().lower()
+        if command in ('в', 'q'):
+            break
+        direction = 'prev' if command in ('п', 'p') else 'next'
+
+
+# определение функции вывода списка студентов
+def view_students(): # "students_list" пока оставляю, но потом удалю(после полного перехода в PostgreSQL)
+    """
+    Отображает список всех студентов, находящихся в системе, получая их из базы данных PostgreSQL.
+    """
+    print('\n<<<<<<<<<<<<<<<<<<<<< СПИСОК СТУДЕНТОВ >>>>>>>>>>>>>>>>>>>>>')
+    pause(0.2)
+    print()
+    
+    try:
+        # Студентов получаю ПОТОКОМ через серверный курсор (см. iter_all_students):
+        # в памяти программы одновременно лежит только одна пачка строк,
+        # а первая строка появляется на экране сразу, даже если студентов сотни тысяч.
+        students_count = 0
+        # Для плавного и красивого вывода на экран - пауза 0.2 сек. перед каждой строкой
+        # (в быстром режиме строки копятся и выводятся пачками)
+        table = PacedOutput(delay=0.2)
+        with table:
+            for row in iter_all_students():
+                if students_count == 0:
+                    # Вывожу заголовки таблицы, выравнивая их для красивого вывода
+                    print_students_header()
+                students_count += 1
+                table.add(format_student_row(row))
+
+        # Проверяю, есть ли студенты в БД
+        if students_count == 0:
+            print('\nСписок студентов в базе данных пуст.')
+
+    # Обработка ошибок, если произойдут (в том числе "нет соединения с базой данных")
+    except Error as e:
+        print(f'Произошла ошибка при получени данных: {e}')
+
+    
+    
+# ==================== Поиск студентов по ФИО ====================
+# Названия способов поиска для вывода на экран
+SEARCH_MODE_TITLES = {
+    'prefix': 'по началу фамилии',
+    'trigram': 'по части ФИО (триграммы)',
+    'fulltext': 'полнотекстовый',
+    'fuzzy': 'с опечатками (индекс в памяти)',
+}
+
+_search_features = None  # Какие индексы для поиска есть в БД (проверяется один раз)
+
+
+# Запрос: установлено ли расширение pg_trgm и есть ли столбец search_vector
+SEARCH_FEATURES_QUERY = """
+    SELECT
+        EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'),
+        EXISTS (SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'students' AND column_name = 'search_vector');
+"""
+
+
+def get_search_features(connection):
+    """
+    Проверяет (один раз за запуск), установлено ли расширение pg_trgm
+    и есть ли столбец search_vector для полнотекстового поиска.
+    """
+    global _search_features
+    if _search_features is None:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(SEARCH_FEATURES_QUERY)
+            trigram, fulltext = cursor.fetchone()
+            _search_features = {'trigram': trigram, 'fulltext': fulltext}
+        finally:
+            cursor.close()
+    return _search_features
+
+
+def choose_search_mode(term):
+    """
+    Выбирает способ поиска по введенной строке:
+      - несколько слов ("Иванов Иван") -> полнотекстовый поиск;
+      - 1-2 буквы -> поиск по началу фамилии (триграммам нужно хотя бы 3 символа);
+      - иначе -> поиск подстроки с помощью триграмм, с сортировкой по похожести.
+    """
+    if len(term.split()) > 1:
+        return 'fulltext'
+    if len(term) < TRIGRAM_MIN_LENGTH:
+        return 'prefix'
+    return 'trigram'
+
+
+def _like_escape(term):
+    """
+    Экранирует символы %, _ и \\, чтобы они искались как обычные символы в LIKE/ILIKE.
+    """
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def build_search_query(term, mode, features, limit=SEARCH_RESULTS_LIMIT):
+    """
+    Собирает SQL-запрос поиска студентов по части ФИО.
+    features - результат get_search_features() (какие индексы есть в БД).
+    Возвращает (запрос, словарь параметров, способ поиска).
+    """
+    mode = mode or choose_search_mode(term)
+    if mode == 'fulltext' and not features['fulltext']:
+        mode = 'trigram'  # нет столбца search_vector - ищем всю строку как подстроку
+
+    params = {'term': term, 'pattern': f"%{_like_escape(term)}%", 'limit': limit}
+    if mode == 'prefix':
+        params['pattern'] = f"{_like_escape(term.lower())}%"
+        query = f"""
+            SELECT {STUDENT_COLUMNS} FROM students
+            WHERE lower(last_name) LIKE %(pattern)s
+            ORDER BY last_name, first_name, id
+            LIMIT %(limit)s;
+        """
+    elif mode == 'fulltext':
+        query = f"""
+            SELECT {STUDENT_COLUMNS} FROM students
+            WHERE search_vector @@ plainto_tsquery('russian', %(term)s)
+            ORDER BY ts_rank(search_vector, plainto_tsquery('russian', %(term)s)) DESC,
+                     last_name, first_name, id
+            LIMIT %(limit)s;
+        """
+    elif features['trigram']:
+        # ILIKE использует триграммные GIN-индексы, similarity() - оценка похожести от 0 до 1
+        query = f"""
+            SELECT {STUDENT_COLUMNS} FROM students
+            WHERE last_name ILIKE %(pattern)s OR first_name ILIKE %(pattern)s OR patronymic ILIKE %(pattern)s
+            ORDER BY GREATEST(similarity(last_name, %(term)s),
+                              similarity(first_name, %(term)s),
+                              similarity(coalesce(patronymic, ''), %(term)s)) DESC,
+                     last_name, first_name, id
+            LIMIT %(limit)s;
+        """
+    else:
+        # Расширения pg_trgm нет: обычный ILIKE без индекса и без оценки похожести
+        query = f"""
+            SELECT {STUDENT_COLUMNS} FROM students
+            WHERE last_name ILIKE %(pattern)s OR first_name ILIKE %(pattern)s OR patronymic ILIKE %(pattern)s
+            ORDER BY last_name, first_name, id
+            LIMIT %(limit)s;
+        """
+    return query, params, mode
+
+
+def search_students(connection, term, mode=None, limit=SEARCH_RESULTS_LIMIT):
+    """
+    Ищет студентов по части ФИО и возвращает кортеж (список строк, способ поиска).
+    Результаты отсортированы по релевантности (похожести), не больше limit строк.
+    """
+    query, params, mode = build_search_query(term, mode, get_search_features(connection), limit)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall(), mode
+    finally:
+        cursor.close()  # Транзакцию завершает тот, кто передал соединение
+
+
+def find_students_by_name(term, mode=None, connection=None):
+    """
+    То же, что search_students(), но через кэш.
+    Если передано соединение "connection" (идет чья-то транзакция), кэш не используется,
+    чтобы транзакция видела свои же незавершенные изменения.
+    Способ 'fuzzy' ищет не в БД, а в индексе в памяти (fuzzy_find_students).
+    """
+    if mode == 'fuzzy':
+        return [row for row, distance in fuzzy_find_students(term)], mode
+    if connection is not None:
+        return search_students(connection, term, mode)
+    if _async_bridge is not None:
+        return _async_bridge.run(_async_bridge.service.find_students(term, mode))
+
+    def load():
+        with db_transaction(readonly=True) as conn:
+            return search_students(conn, term, mode)
+    return cached_read(('search', term.lower(), mode, SEARCH_RESULTS_LIMIT), load)
+
+# ==================== Конец поиска студентов ====================
+
+
+# ==================== Поиск с опечатками (индекс в памяти) ====================
+# Поиск в БД находит только точные подстроки: по "Иваноф" не найдется "Иванов".
+# Для поиска с опечатками программа держит в памяти индекс по ФИО всех студентов:
+#  - каждое различное имя (фамилия, имя или отчество) хранится один раз и получает номер;
+#  - для каждой триграммы (3 буквы подряд) - список номеров имен, где она есть
+#    (инвертированный индекс): похожие имена отбираются по числу общих триграмм;
+#  - для отобранных имен считается расстояние Левенштейна - сколько букв нужно
+#    вставить, удалить или заменить, чтобы получить введенное слово.
+# Индекс строится из таблицы при первом поиске с опечатками. Потом он обновляется
+# по изменениям: invalidate_students() отмечает измененных студентов, и перед
+# следующим поиском только они перечитываются из БД одним запросом.
+
+def levenshtein_distance(a, b, max_distance=None):
+    """
+    Расстояние Левенштейна между строками a и b.
+    Если оно больше max_distance, досчитывать не нужно: возвращается max_distance + 1.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def name_trigrams(name):
+    """
+    Триграммы слова (как в pg_trgm: с двумя пробелами в начале и одним в конце).
+    """
+    padded = f'  {name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def fuzzy_max_distance(word):
+    """
+    Сколько опечаток допускается в слове: в коротком слове одна, в длинном - SEARCH_FUZZY_MAX_DISTANCE.
+    """
+    return min(SEARCH_FUZZY_MAX_DISTANCE, 1 if len(word) <= 4 else 2)
+
+
+class FuzzyNameIndex:
+    """
+    Индекс ФИО студентов в памяти для поиска с опечатками (см. описание раздела).
+
+    Студенты хранятся по столбцам в массивах array, где номер элемента - это ID студента:
+    номера фамилии, имени и отчества (-1 - нет), возраст и курс (0 - не указан).
+    Так миллион студентов занимает в памяти около 16 МБ, а не сотни мегабайт объектов.
+
+    Из списка студентов имени (name_students) удаленный или переименованный студент
+    сразу не вычеркивается: у частой фамилии в списке десятки тысяч ID, и искать в нем
+    было бы долго. Поиск пропускает ID, у которого этого имени уже нет, а список
+    "уплотняется", когда устаревших ID в нем становится больше, чем настоящих.
+
+    Индекс меняется на месте (refresh), поэтому поиск и обновление идут под self.lock:
+    иначе в режиме --serve поиск из другого потока увидел бы наполовину очищенный индекс.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()  # RLock: fuzzy_find_students держит его и на refresh, и на search
+        # Что изменилось после построения индекса (см. invalidate)
+        self._stale_lock = threading.Lock()
+        self._stale_ids = set()
+        self._stale_all = True
+        self.clear()
+
+    def clear(self):
+        self.names = []          # номер имени -> имя, как в БД ("Иванов")
+        self.name_keys = []      # номер имени -> имя в нижнем регистре (по нему идет поиск)
+        self.name_numbers = {}   # имя -> номер
+        self.name_students = []  # номер имени -> array ID студентов с этим именем (и устаревших, см. выше)
+        self.name_sizes = array('i')  # номер имени -> сколько студентов с этим именем на самом деле
+        self.trigrams = {}       # триграмма -> array номеров имен
+        self.last_names = array('i')
+        self.first_names = array('i')
+        self.patronymics = array('i')
+        self.ages = array('h')
+        self.courses = array('b')
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    # --- Наполнение ---
+    def _name_number(self, name):
+        number = self.name_numbers.get(name)
+        if number is None:
+            number = self.name_numbers[name] = len(self.names)
+            self.names.append(name)
+            key = name.lower()
+            self.name_keys.append(key)
+            self.name_students.append(array('i'))
+            self.name_sizes.append(0)
+            for trigram in name_trigrams(key):
+                self.trigrams.setdefault(trigram, array('i')).append(number)
+        return number
+
+    def add(self, row):
+        """
+        Добавляет (или заменяет) студента - кортеж из БД в порядке STUDENT_COLUMNS.
+        """
+        student_id, last_name, first_name, patronymic, age, course = row
+        old_numbers = self._student_names(student_id)
+        if student_id >= len(self.last_names):
+            # Массивы растут с запасом, чтобы не удлинять их при каждом новом студенте
+            missing = max(student_id + 1 - len(self.last_names), len(self.last_names) // 4, 1024)
+            for column in (self.last_names, self.first_names, self.patronymics):
+                column.extend(array('i', [-1]) * missing)
+            self.ages.extend(array('h', [0]) * missing)
+            self.courses.extend(array('b', [0]) * missing)
+        numbers = [self._name_number(name) if name else -1 for name in (last_name, first_name, patronymic)]
+        self.last_names[student_id], self.first_names[student_id], self.patronymics[student_id] = numbers
+        self.ages[student_id] = age or 0
+        self.courses[student_id] = course or 0
+        new_numbers = set(numbers) - {-1}
+        for number in new_numbers - old_numbers:
+            self.name_students[number].append(student_id)
+            self.name_sizes[number] += 1
+        self._forget_names(old_numbers - new_numbers)
+        if not old_numbers:
+            self.size += 1
+
+    def remove(self, student_id):
+        """
+        Убирает студента из индекса (если он там есть).
+        """
+        old_numbers = self._student_names(student_id)
+        if not old_numbers:
+            return
+        for column in (self.last_names, self.first_names, self.patronymics):
+            column[student_id] = -1
+        self._forget_names(old_numbers)
+        self.size -= 1
+
+    def _student_names(self, student_id):
+        """
+        Номера имен студента (пустое множество, если его нет в индексе).
+        """
+        if student_id >= len(self.last_names) or self.last_names[student_id] == -1:
+            return set()
+        return {self.last_names[student_id], self.first_names[student_id], self.patronymics[student_id]} - {-1}
+
+    def _has_name(self, student_id, number):
+        return number in (self.last_names[student_id], self.first_names[student_id], self.patronymics[student_id])
+
+    def _forget_names(self, numbers):
+        """
+        Уменьшает счетчики имен, которых у студента больше нет. Его ID остается в списках
+        этих имен и отбрасывается при поиске; слишком "засоренный" список уплотняется.
+        """
+        for number in numbers:
+            self.name_sizes[number] -= 1
+            students = self.name_students[number]
+            if len(students) > 2 * self.name_sizes[number] + 16:
+                # dict.fromkeys убирает повторы: студент мог вернуть себе прежнее имя
+                self.name_students[number] = array('i', dict.fromkeys(
+                    student_id for student_id in students if self._has_name(student_id, number)))
+
+    def row(self, student_id):
+        """
+        Студент с ID student_id в виде кортежа (как из БД).
+        """
+        patronymic = self.patronymics[student_id]
+        return (student_id, self.names[self.last_names[student_id]], self.names[self.first_names[student_id]],
+                self.names[patronymic] if patronymic != -1 else None,
+                self.ages[student_id] or None, self.courses[student_id] or None)
+
+    # --- Свежесть индекса ---
+    def invalidate(self, student_ids=None):
+        """
+        Отмечает, что студенты student_ids изменились (None - неизвестно какие, построить индекс заново).
+        """
+        with self._stale_lock:
+            if student_ids is None:
+                self._stale_all = True
+            elif not self._stale_all:
+                self._stale_ids.update(int(student_id) for student_id in student_ids)
+
+    def refresh(self):
+        """
+        Приводит индекс в соответствие с таблицей: строит его заново или
+        перечитывает из БД только студентов, отмеченных в invalidate().
+        """
+        with self.lock:
+            with self._stale_lock:
+                rebuild, stale_ids = self._stale_all, self._stale_ids
+                self._stale_all, self._stale_ids = False, set()
+            try:
+                if rebuild:
+                    self.clear()
+                    for row in iter_all_students():
+                        self.add(row)
+                elif stale_ids:
+                    with db_transaction() as connection:
+                        cursor = connection.cursor()
+                        try:
+                            cursor.execute(f"SELECT {STUDENT_COLUMNS} FROM students WHERE id = ANY(%s);",
+                                           (sorted(stale_ids),))
+                            rows = cursor.fetchall()
+                        finally:
+                            cursor.close()
+                    for student_id in stale_ids:
+                        self.remove(student_id)
+                    for row in rows:
+                        self.add(row)
+            except BaseException:
+                self.invalidate(None)  # Не получилось - в следующий раз строим заново
+                raise
+
+    # --- Поиск ---
+    def similar_names(self, word, max_distance):
+        """
+        Имена, похожие на слово word: словарь {номер имени: расстояние Левенштейна}.
+        """
+        word = word.lower()
+        trigrams = name_trigrams(word)
+        counts = {}
+        for trigram in trigrams:
+            for number in self.trigrams.get(trigram, ()):
+                counts[number] = counts.get(number, 0) + 1
+        # Каждая опечатка портит не больше 3 триграмм слова: у имен, с которыми
+        # общих триграмм меньше, расстояние точно больше max_distance
+        min_common = max(1, len(trigrams) - 3 * max_distance)
+        similar = {}
+        for number, common in counts.items():
+            if common < min_common or not self.name_sizes[number]:
+                continue
+            distance = levenshtein_distance(word, self.name_keys[number], max_distance)
+            if distance <= max_distance:
+                similar[number] = distance
+        return similar
+
+    def search(self, term, limit=SEARCH_RESULTS_LIMIT, max_distance=None):
+        """
+        Ищет студентов, в ФИО которых есть каждое слово term с небольшими опечатками.
+        Возвращает список (строка студента, число опечаток) - сначала точные совпадения.
+        """
+        with self.lock:
+            return self._search(term, limit, max_distance)
+
+    def _search(self, term, limit, max_distance):
+        words = term.split()
+        if not words:
+            return []
+        matches = [self.similar_names(word, fuzzy_max_distance(word) if max_distance is None else max_distance)
+                   for word in words]
+        if not all(matches):
+            return []
+        # Перебираю студентов самого "редкого" слова, остальные слова проверяю у каждого из них
+        pivot = min(range(len(words)), key=lambda index: sum(
+            self.name_sizes[number] for number in matches[index]))
+        others = matches[:pivot] + matches[pivot + 1:]
+        last_names, first_names, patronymics = self.last_names, self.first_names, self.patronymics
+        missing = SEARCH_FUZZY_MAX_DISTANCE * len(words) + 1  # "слово не найдено"
+        found = {}
+        # Имена - по возрастанию расстояния. У студента опечаток не меньше, чем у его имени,
+        # поэтому имена с большим числом опечаток, чем у limit-го лучшего найденного
+        # студента, можно не смотреть. Имена с таким же числом смотрю: там может быть
+        # студент с теми же опечатками, но раньше по алфавиту
+        worst = missing  # опечатки limit-го лучшего студента (пока не набралось limit - "не найдено")
+        level = None
+        for number, distance in sorted(matches[pivot].items(), key=lambda item: (item[1], self.names[item[0]])):
+            if distance != level:
+                level = distance
+                if len(found) >= limit:
+                    worst = heapq.nsmallest(limit, found.values())[-1]
+            if distance > worst:
+                break
+            for student_id in self.name_students[number]:
+                if number != last_names[student_id] and number != first_names[student_id] \
+                        and number != patronymics[student_id]:
+                    continue  # устаревший ID: студента удалили или у него теперь другое имя
+                total = distance
+                for similar in others:
+                    total += min(similar.get(last_names[student_id], missing),
+                                 similar.get(first_names[student_id], missing),
+                                 similar.get(patronymics[student_id], missing))
+                    if total >= missing:
+                        break
+                else:
+                    if total < found.get(student_id, missing):
+                        found[student_id] = total
+        # Строки собираю только для limit лучших: найденных студентов может быть очень много
+        names = self.names
+        best = heapq.nsmallest(limit, found.items(), key=lambda item: (
+            item[1], names[last_names[item[0]]], names[first_names[item[0]]], item[0]))
+        return [(self.row(student_id), distance) for student_id, distance in best]
+
+
+fuzzy_name_index = FuzzyNameIndex()
+
+
+def fuzzy_find_students(term, limit=SEARCH_RESULTS_LIMIT):
+    """
+    Поиск студентов с опечатками по индексу в памяти (перед поиском индекс обновляется).
+    Возвращает список (строка студента, число опечаток).
+    """
+    # Под одной блокировкой: между обновлением и поиском индекс не перестроит другой поток
+    with fuzzy_name_index.lock:
+        fuzzy_name_index.refresh()
+        return fuzzy_name_index.search(term.strip(), limit)
+
+# ==================== Конец поиска с опечатками ====================
+
+
+# определение функции "найти студента" def find_student()
+def find_student():
+    """
+    Ищет и отображает информацию о студенте(ах) в базе данных PostgreSQL.
+    Поиск может быть выполнен по ID или по части фамилии/имени/отчества.
+    """
+    print("\n========== Поиск студента ==========")
+    pause(0.5)
+    print()
+    
+    try:
+        # Предлагаю пользователю выбрать тип поиска
+        search_type = input("Искать по ID(1) или по фамилии/имени/отчеству(2)? Введите 1 или 2: ").strip()
+        if search_type == '1':
+            # Поиск по ID
+            try:
+                search_id = int(input("Введите ID студента: "))
+            except ValueError:
+                print("Некорректный ID. Введите ID цифрами.")
+                pause(0.5)
+                return
+        elif search_type == '2':
+            # Поиск по фамили/имени/отчеству
+            search_term = input("Введите фамилию, имя или отчество (или часть) для поиска: ").strip()
+            if not search_term:
+                print("Поисковый запрос не может быть пустым.")
+                pause(0.5)
+                return
+        else:
+            print("Некорректный выбор типа поиска. Введите 1 или 2.")
+            pause(0.5)
+            return
+        
+        # Читаю через кэш: соединение из пула берется, только если результата в кэше нет
+        if search_type == '1':
+            student = get_student_by_id(search_id)
+            found_students = [student] if student else []
+        else:
+            found_students, mode = find_students_by_name(search_term)
+            print(f'Способ поиска: {SEARCH_MODE_TITLES[mode]}')
+            if not found_students and SEARCH_FUZZY_FALLBACK:
+                # Точных совпадений нет - возможно, в запросе опечатка
+                if not len(fuzzy_name_index):
+                    print('Строю индекс для поиска с опечатками (один раз за запуск)...')
+                similar = fuzzy_find_students(search_term)
+                if similar:
+                    print('Точных совпадений нет. Похожие студенты (в скобках - число опечаток):')
+                    print()
+                    with PacedOutput(delay=0.3) as table:
+                        for row, distance in similar:
+                            table.add(f'{format_student_row(row)} ({distance})\n')
+                    print('\n===========================================================')
+                    return
+    
+        if not found_students:
+            print('Студенты по вашему запросу не найдены.')
+        else:
+            print('Найденые студенты:')
+            print()
+            print(f"{'ID'.ljust(4)} | {'ФАМИЛИЯ'.ljust(15)} | {'ИМЯ'.ljust(15)} | {'ОТЧЕСТВО'.ljust(15)} | {'ВОЗРАСТ'.ljust(7)} | {'КУРС'.ljust(5)}")
+            print("-" * 80)
+            table = PacedOutput(delay=0.3)
+            with table:
+                for row in found_students:
+                    table.add(format_student_row(row) + '\n')
+            if len(found_students) >= SEARCH_RESULTS_LIMIT:
+                print(f'Показаны первые {SEARCH_RESULTS_LIMIT} результатов, уточните запрос.')
+    except Error as e:
+        print(f"\nОшибка при поиске: {e}")
+    print('\n===========================================================')
+       
+    
+# определение функции "удалить студента"  def delete_student()
+def delete_student():
+    '''
+    Удаление  всю информацию о студенте из БД
+    '''
+    print('\n-------------------- УДАЛЕНИЕ СТУДЕНТА --------------------')
+    pause(0.5)
+    print()
+    # Вывожу список всех студентов, чтобы пользователь знал ID студента для удаления
+    view_students()
+    
+    try:
+        # После показа списка студентов, запрашиваю ID студента для удаления
+        student_id = int(input('Введите ID студента для его удаления: '))
+    except ValueError:
+        print('Неверный ID: введите ID числом.')
+        pause(0.5)
+        return # Возвращаемся в главное меню
+    
+    try:
+        # Проверяю, есть ли студент с таким ID (читаю прямо из БД, а не из кэша).
+        # Запоминаю версию студента: если, пока пользователь думает, студента изменят,
+        # удаление не выполнится, и пользователь увидит новые данные
+        existing_student, version = get_student_with_version(student_id)
+        if not existing_student:
+            print(f'Студент с ID {student_id} не найден.')
+            pause(0.5)
+            return # Возвращаемся, если студент не найден
+
+        # ВАЖНО! Запрашиваю подтверждение на удаление.
+        # Пока пользователь думает, соединение с БД не занято - оно вернулось в пул.
+        confirm = input(f"Вы уверены, что хотите удалить студента: {existing_student[1]} {existing_student[2]}"
+                        f"(ID: {student_id})? (да/нет): ").lower().strip()
+
+        # Если "ДА", то удаляем студента
+        if confirm == 'да':
+            if delete_student_by_id(student_id, expected_version=version):
+                print(f"Студент с ID {student_id} успешно удален.")
+            else:
+                print(f"Студент с ID {student_id} уже удален кем-то другим.")
+        else:
+            print("Удаление отменено.")
+    except StudentConflictError as e:
+        print("Студент не удален: пока вы подтверждали удаление, его изменил кто-то другой. Сейчас:")
+        print_students_header()
+        print(format_student_row(e.current))
+        print("Если его все еще нужно удалить, повторите удаление.")
+    except Error as e:
+        print(f"Ошибка при удалении студента: {e}")
+    print('\n-----------------------------------------------------------')
+    print()
+    
+    
+# определение функции "изменить студента"  def edit_student()
+def edit_student():  # Пока оставляю "student_list", потом удалю вообще
+    """
+    Редактирует информацию о существующем студенте в базе данных PostgreSQL.
+    """
+    print('\n*************** РЕДАКТИРОВАНИЕ СТУДЕНТА ***************')
+    pause(0.5)
+    print()
+    # Показываю список студентов, чтобы пользователь видел ID студента
+    # Чтобы пользователь мог по ID выбрать студента для редактирования
+    view_students()
+    
+    try:
+        # Запрашиваю ID студента и провожу проверку правильности ввода
+        student_id = int(input('Введите "ID" студента для редактирования: '))
+    except ValueError:
+        print('Некорректный ID. Пожалуйста, введите число.')
+        pause(0.5)
+        return # Возвращаюсь в главное меню, не продолжая функцию
+    
+    try:
+        # Проверяю, есть ли студент с таким ID в БД
+        # Это ВАЖНО, чтобы не пытаться обновить несуществующую запись.
+        # Версию студента запоминаю: пока пользователь вводит изменения, строка НЕ блокируется,
+        # а при сохранении проверяется, что студента за это время никто не изменил
+        existing_student, version = get_student_with_version(student_id)
+        if not existing_student:
+            print(f"Студент с ID: {student_id} не найден.")
+            pause(0.5)
+            return
+        # Если студент найдет, запрашиваю новые поля у пользователя
+        # Обязательно удаляю пробелы в начале и конце строки
+        # Если пользователь не хочет менять поле, то он оставляет его пустым
+        print(f"\nРедактирование студента с ID {student_id}. Сейчас:")
+        print_students_header()
+        print(format_student_row(existing_student))
+        new_values = {
+            'last_name': input('Введите новую фамилию студента (оставте поле пустым, чтобы не менять): ').strip(),
+            'first_name': input('Введите новое имя студента (оставте поле пустым, чтобы не менять): ').strip(),
+            'patronymic': input('Введите новое отчество студента (оставте поле пустым, чтобы не менять): ').strip(),
+            'age': input('Введите новый возраст студента (оставте поле пустым, чтобы не менять): ').strip(),
+            'course': input('Введите новый курс студента (оставте поле пустым, чтобы не менять): ').strip(),
+        }
+
+        # Собираю только те поля, которые пользователь захотел поменять
+        # и которые прошли проверку (те же правила, что и при добавлении студента)
+        changes = {}
+        for column, value in new_values.items():
+            if not value:  # пустая строка - поле не меняем
+                continue
+            try:
+                changes.update(validate_student_changes({column: value}))
+            except ValueError as e:
+                # При неправильном вводе программа игнорирует изменение этого поля
+                print(f'{e} Поле не будет изменено.')
+
+        # если словарь пуст, значит пользователь ничего не захотел менять
+        if not changes:
+            print('Никаких изменений не введено.')
+            pause(0.5)
+            return # Возвращаюсь из функции
+
+        if update_student(student_id, changes, expected_version=version):
+            print(f"Информация о студенте с ID {student_id} успешно обновлена.")
+        else:
+            print(f"Студент с ID: {student_id} не найден (возможно, его только что удалили).")
+
+    except StudentConflictError as e:
+        # Пока пользователь вводил данные, студента изменил другой оператор:
+        # не затираю его изменения, а показываю, что было и что стало
+        print("Изменения НЕ сохранены: пока вы их вводили, студента изменил кто-то другой.")
+        print_students_header()
+        print(format_student_row(existing_student) + '   <- было')
+        print(format_student_row(e.current) + '   <- стало')
+        print("Повторите редактирование, если ваши изменения все еще нужны.")
+    except Error as e:
+        # Обработка любых других ошибок БД
+        print(f"Ошибка при обновлении данных студента: {e}")
+        
+    print("\n><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><")
+    print()
+
+
+# ==================== Групповое удаление и изменение студентов ====================
+# Столбцы, которые можно менять групповой операцией, и функции их проверки
+BATCH_UPDATE_COLUMNS = ('last_name', 'first_name', 'patronymic', 'age', 'course')
+
+
+def build_student_filter(ids=None, course=None, age_min=None, age_max=None):
+    """
+    Собирает условие WHERE для групповых операций.
+    Возвращает (текст условия, список параметров).
+    Пустое условие запрещено, чтобы случайно не удалить/изменить ВСЕХ студентов.
+    """
+    conditions = []
+    params = []
+    if ids:
+        conditions.append('id = ANY(%s)')  # список ID передается как массив PostgreSQL
+        params.append([int(student_id) for student_id in ids])
+    if course is not None:
+        conditions.append('course = %s')
+        params.append(int(course))
+    if age_min is not None:
+        conditions.append('age >= %s')
+        params.append(int(age_min))
+    if age_max is not None:
+        conditions.append('age <= %s')
+        params.append(int(age_max))
+    if not conditions:
+        raise ValueError('Не задано ни одного условия отбора студентов.')
+    return ' AND '.join(conditions), params
+
+
+def validate_student_changes(changes):
+    """
+    Проверяет новые значения полей по тем же правилам, что и ручной ввод.
+    Возвращает словарь {столбец: значение}; при ошибке выбрасывает ValueError.
+    """
+    checked = {}
+    errors = []
+    for column, value in changes.items():
+        if column not in BATCH_UPDATE_COLUMNS:
+            errors.append(f'Поле {column} нельзя изменить.')
+        elif column == 'age':
+            checked[column], error = check_age(value)
+            errors.append(error)
+        elif column == 'course':
+            checked[column], error = check_course(value)
+            errors.append(error)
+        else:
+            name_type = {'last_name': 'фамилия', 'first_name': 'имя', 'patronymic': 'отчество'}[column]
+            checked[column] = str(value or '').strip().title()
+            errors.append(check_name(checked[column], name_type))
+    errors = [error for error in errors if error]
+    if errors:
+        raise ValueError('; '.join(errors))
+    if not checked:
+        raise ValueError('Не задано ни одного изменения.')
+    return checked
+
+
+def count_students(connection=None, **criteria):
+    """
+    Считает студентов, подходящих под условие (ids, course, age_min, age_max).
+    Используется для "пробного запуска" групповых операций.
+    """
+    where, params = build_student_filter(**criteria)
+    with db_transaction(connection) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'SELECT count(*) FROM students WHERE {where};', params)
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+
+def batch_delete_students(ids=None, course=None, age_min=None, age_max=None, dry_run=False, connection=None):
+    """
+    Удаляет всех студентов, подходящих под условие, ОДНИМ запросом DELETE ... RETURNING
+    в одной транзакции (без отдельной проверки существования каждого студента).
+    Возвращает список ID удаленных студентов.
+    При dry_run=True ничего не удаляет и возвращает только количество подходящих студентов.
+    """
+    criteria = {'ids': ids, 'course': course, 'age_min': age_min, 'age_max': age_max}
+    if dry_run:
+        return count_students(connection, **criteria)
+    where, params = build_student_filter(**criteria)
+    with db_transaction(connection) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'DELETE FROM students WHERE {where} RETURNING id;', params)
+            deleted_ids = [row[0] for row in cursor.fetchall()]
+            announce_students_changed(cursor, deleted_ids)
+        finally:
+            cursor.close()
+    invalidate_students_after_commit(connection, deleted_ids)
+    return deleted_ids
+
+
+def batch_update_students(changes, ids=None, course=None, age_min=None, age_max=None, dry_run=False,
+                          connection=None):
+    """
+    Меняет поля (changes - словарь {столбец: новое значение}) у всех студентов,
+    подходящих под условие, ОДНИМ запросом UPDATE ... RETURNING в одной транзакции.
+    Например, перевод всего 2-го курса на 3-й:
+
+        batch_update_students({'course': 3}, course=2)
+
+    Возвращает список ID измененных студентов (при dry_run=True - только их количество).
+    """
+    changes = validate_student_changes(changes)
+    criteria = {'ids': ids, 'course': course, 'age_min': age_min, 'age_max': age_max}
+    if dry_run:
+        return count_students(connection, **criteria)
+    where, params = build_student_filter(**criteria)
+    # Имена столбцов берутся только из BATCH_UPDATE_COLUMNS, значения передаются через %s
+    set_clause = ', '.join(f'{column} = %s' for column in changes)
+    with db_transaction(connection) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f'UPDATE students SET {set_clause} WHERE {where} RETURNING id;',
+                list(changes.values()) + params
+            )
+            updated_ids = [row[0] for row in cursor.fetchall()]
+            announce_students_changed(cursor, updated_ids)
+        finally:
+            cursor.close()
+    invalidate_students_after_commit(connection, updated_ids)
+    return updated_ids
+
+
+def _input_student_criteria():
+    """
+    Спрашивает у пользователя условие отбора студентов для групповой операции.
+    Пустой ответ - условие не используется.
+    """
+    criteria = {}
+    ids_str = input('Список ID через запятую (Enter - не отбирать по ID): ').strip()
+    if ids_str:
+        criteria['ids'] = [int(part) for part in ids_str.replace(' ', '').split(',') if part]
+    course_str = input('Курс (Enter - любой): ').strip()
+    if course_str:
+        criteria['course'] = int(course_str)
+    age_min_str = input('Возраст ОТ (Enter - без ограничения): ').strip()
+    if age_min_str:
+        criteria['age_min'] = int(age_min_str)
+    age_max_str = input('Возраст ДО (Enter - без ограничения): ').strip()
+    if age_max_str:
+        criteria['age_max'] = int(age_max_str)
+    return criteria
+
+
+def batch_operations_menu():
+    """
+    Пункт меню: групповое удаление или изменение студентов по списку ID,
+    курсу или диапазону возраста. Сначала показывает, сколько студентов
+    будет затронуто, и просит подтверждение.
+    """
+    print('\n---------- ГРУППОВЫЕ ОПЕРАЦИИ ----------')
+    operation = input('Удалить (1) или изменить (2) группу студентов? Введите 1 или 2: ').strip()
+    if operation not in ('1', '2'):
+        print('Некорректный выбор. Введите 1 или 2.')
+        return
+    try:
+        criteria = _input_student_criteria()
+        changes = {}
+        if operation == '2':
+            print('Новые значения (оставьте поле пустым, чтобы не менять):')
+            for column, title in (('last_name', 'фамилия'), ('first_name', 'имя'), ('patronymic', 'отчество'),
+                                  ('age', 'возраст'), ('course', 'курс')):
+                value = input(f'  {title}: ').strip()
+                if value:
+                    changes[column] = value
+            changes = validate_student_changes(changes)
+
+        # Пробный запуск: только считаю, сколько студентов попадет под операцию
+        if operation == '1':
+            affected = batch_delete_students(dry_run=True, **criteria)
+        else:
+            affected = batch_update_students(changes, dry_run=True, **criteria)
+        if affected == 0:
+            print('Под условие не подходит ни один студент.')
+            return
+        action = 'удалить' if operation == '1' else 'изменить'
+        confirm = input(f'Будет затронуто студентов: {affected}. Вы уверены, что хотите их {action}? (да/нет): ')
+        if confirm.lower().strip() != 'да':
+            print('Операция отменена.')
+            return
+
+        if operation == '1':
+            changed_ids = batch_delete_students(**criteria)
+            print(f'Удалено студентов: {len(changed_ids)}.')
+        else:
+            changed_ids = batch_update_students(changes, **criteria)
+            print(f'Изменено студентов: {len(changed_ids)}.')
+    except ValueError as e:
+        print(f'Ошибка ввода: {e}')
+    except Error as e:
+        print(f'Ошибка при выполнении групповой операции: {e}')
+    print('\n----------------------------------------')
+    print()
+
+# ==================== Конец групповых операций ====================
+
+
+# ==================== Статистика по курсам и возрасту ====================
+# Все числа считаются в PostgreSQL по сводной таблице student_stats
+# (см. STUDENT_STATS_STATEMENTS), а не по всей таблице students.
+
+# Сначала дельты переносятся в сводку. DELETE ... RETURNING забирает только
+# дельты уже подтвержденных транзакций, поэтому ничего не теряется и не считается дважды.
+# Курс и возраст могут быть NULL, поэтому строка сводки ищется через IS NOT DISTINCT FROM
+# (ON CONFLICT с NULL не работает), а блокировка не дает двум переносам одновременно
+# вставить одну и ту же новую строку сводки (чтение сводки она не блокирует)
+REFRESH_STUDENT_STATS_QUERY = """
+LOCK TABLE student_stats IN SHARE ROW EXCLUSIVE MODE;
+WITH moved AS (
+    DELETE FROM student_stats_delta RETURNING course, age, students
+), sums AS (
+    SELECT course, age, sum(students) AS students FROM moved GROUP BY course, age
+), updated AS (
+    UPDATE student_stats AS stats SET students = stats.students + sums.students
+    FROM sums
+    WHERE stats.course IS NOT DISTINCT FROM sums.course AND stats.age IS NOT DISTINCT FROM sums.age
+    RETURNING stats.course, stats.age
+), inserted AS (
+    INSERT INTO student_stats (course, age, students)
+    SELECT course, age, students FROM sums
+    WHERE NOT EXISTS (SELECT 1 FROM updated
+                      WHERE updated.course IS NOT DISTINCT FROM sums.course
+                        AND updated.age IS NOT DISTINCT FROM sums.age)
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM updated) + (SELECT count(*) FROM inserted);
+"""
+
+# Студенты без возраста (age IS NULL) входят в число студентов курса,
+# но не в средний, минимальный и максимальный возраст
+STATS_BY_COURSE_QUERY = """
+SELECT course,
+       sum(students) AS students,
+       round(sum(age * students)::numeric / nullif(sum(students) FILTER (WHERE age IS NOT NULL), 0), 1) AS avg_age,
+       min(age) AS min_age,
+       max(age) AS max_age,
+       round(100.0 * sum(students) / nullif(sum(sum(students)) OVER (), 0), 1) AS percent
+FROM student_stats
+WHERE students > 0
+GROUP BY course
+ORDER BY course;
+"""
+
+STATS_BY_AGE_QUERY = """
+SELECT age,
+       sum(students) AS students,
+       sum(sum(students)) OVER (ORDER BY age) AS cumulative
+FROM student_stats
+WHERE students > 0
+GROUP BY age
+ORDER BY age;
+"""
+
+
+def refresh_student_stats(connection=None):
+    """
+    Переносит накопленные изменения из student_stats_delta в сводку student_stats.
+    """
+    with db_transaction(connection) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(REFRESH_STUDENT_STATS_QUERY)
+        finally:
+            cursor.close()
+
+
+def fetch_student_stats(connection):
+    """
+    Статистика в виде словаря:
+      total     - всего студентов;
+      by_course - по курсам: число студентов, средний/мин./макс. возраст, доля в процентах;
+      by_age    - распределение по возрасту (с накопленным итогом).
+    Не указанные курс или возраст - отдельная группа с course/age = None
+    (в распределении по возрасту она последняя).
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(REFRESH_STUDENT_STATS_QUERY)
+        cursor.execute(STATS_BY_COURSE_QUERY)
+        by_course = [
+            {'course': course, 'students': int(students), 'avg_age': float(avg_age) if avg_age is not None else None,
+             'min_age': min_age, 'max_age': max_age, 'percent': float(percent) if percent is not None else 0.0}
+            for course, students, avg_age, min_age, max_age, percent in cursor.fetchall()
+        ]
+        cursor.execute(STATS_BY_AGE_QUERY)
+        by_age = [
+            {'age': age, 'students': int(students), 'cumulative': int(cumulative)}
+            for age, students, cumulative in cursor.fetchall()
+        ]
+    finally:
+        cursor.close()
+    return {'total': sum(row['students'] for row in by_course), 'by_course': by_course, 'by_age': by_age}
+
+
+def get_student_stats():
+    """
+    Статистика по курсам и возрасту (см. fetch_student_stats) через кэш.
+    """
+    def load():
+        with db_transaction() as conn:
+            return fetch_student_stats(conn)
+    return cached_read(('stats',), load)
+
+
+def show_student_stats():
+    """
+    Пункт меню: выводит статистику по курсам и гистограмму возрастов.
+    """
+    print('\n---------- СТАТИСТИКА ПО КУРСАМ И ВОЗРАСТУ ----------')
+    try:
+        stats = get_student_stats()
+    except Error as e:
+        print(f'Ошибка при получении статистики: {e}')
+        return
+    if not stats['total']:
+        print('Студентов пока нет.')
+        return
+    print(f"Всего студентов: {stats['total']}\n")
+    with PacedOutput(0.1) as table:
+        table.add(f"{'Курс':<6}{'Студентов':>10}{'Доля, %':>9}{'Ср. возраст':>13}{'Возраст':>10}")
+        for row in stats['by_course']:
+            course = row['course'] or 'не указан'
+            ages = f"{row['min_age']}-{row['max_age']}" if row['min_age'] is not None else 'не указан'
+            average = f"{row['avg_age']:.1f}" if row['avg_age'] is not None else '-'
+            table.add(f"{course:<6}{row['students']:>10}{row['percent']:>9.1f}{average:>13}{ages:>10}")
+    print()
+    widest = max(row['students'] for row in stats['by_age'])
+    with PacedOutput(0.05) as table:
+        table.add('Возраст  Студентов')
+        for row in stats['by_age']:
+            bar = '#' * max(1, round(40 * row['students'] / widest))
+            age = row['age'] if row['age'] is not None else '?'
+            table.add(f"{age:>7}  {row['students']:>9}  {bar}")
+    print('\n-----------------------------------------------------')
+    print()
+
+# ==================== Конец статистики ====================
+
+
+# ==================== Журнал изменений студентов (CDC) ====================
+# Внешние системы синхронизируются не перечитыванием всей таблицы, а по журналу
+# student_changes (его заполняют триггеры, см. STUDENT_CHANGES_STATEMENTS).
+# Система запоминает позицию последнего прочитанного изменения и в следующий раз
+# читает только то, что изменилось после нее:
+#     changes, position = get_student_changes(after=position)
+# Позиция - строка "txid:change_id". Пустая позиция - начало журнала,
+# "now" - текущий конец журнала (начать синхронизацию без истории).
+# Изменение - словарь:
+#     {"cursor": "...", "op": "insert" | "update" | "delete" | "truncate",
+#      "student_id": 5, "changed_at": "...", "student": {...} (для delete - None)}
+# "truncate" значит, что таблицу очистили целиком и ее нужно загрузить заново.
+# Журнал хранится STUDENT_CHANGES_KEEP_DAYS дней (prune_student_changes):
+# система, которая не читала журнал дольше, должна загрузить таблицу заново.
+
+# Изменения только завершенных транзакций: txid меньше самой старой еще идущей транзакции
+STUDENT_CHANGES_QUERY = """
+    SELECT txid, change_id, operation, student_id, changed_at, data
+    FROM student_changes
+    WHERE (txid, change_id) > (%s, %s)
+      AND txid < txid_snapshot_xmin(txid_current_snapshot())
+    ORDER BY txid, change_id
+    LIMIT %s;
+"""
+
+# Текущий конец журнала: все, что раньше этой транзакции, уже завершено
+CURRENT_CHANGE_POSITION_QUERY = "SELECT txid_snapshot_xmin(txid_current_snapshot());"
+
+
+def format_change_cursor(txid, change_id):
+    return f'{txid}:{change_id}'
+
+
+def parse_change_cursor(position):
+    """
+    Позиция в журнале "txid:change_id" -> (txid, change_id). Пустая позиция - начало журнала.
+    """
+    if not position:
+        return 0, 0
+    try:
+        txid, change_id = (int(part) for part in str(position).split(':'))
+    except ValueError:
+        raise ValueError(f'Некорректная позиция в журнале изменений "{position}": ожидается "txid:change_id".')
+    return txid, change_id
+
+
+def change_to_json(row):
+    """
+    Строка журнала student_changes -> словарь для JSON.
+    """
+    txid, change_id, operation, student_id, changed_at, data = row
+    return {
+        'cursor': format_change_cursor(txid, change_id),
+        'op': operation,
+        'student_id': student_id,
+        'changed_at': changed_at.isoformat(),
+        'student': data,
+    }
+
+
+def fetch_student_changes(connection, after=None, limit=STUDENT_CHANGES_BATCH_SIZE):
+    """
+    Читает не больше limit изменений после позиции after (по порядку).
+    Возвращает (список изменений, новая позиция) - новую позицию передают в следующий вызов.
+    """
+    cursor = connection.cursor()
+    try:
+        if after == 'now':
+            cursor.execute(CURRENT_CHANGE_POSITION_QUERY)
+            after = format_change_cursor(cursor.fetchone()[0], 0)
+        txid, change_id = parse_change_cursor(after)
+        cursor.execute(STUDENT_CHANGES_QUERY, (txid, change_id, limit))
+        changes = [change_to_json(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    return changes, changes[-1]['cursor'] if changes else format_change_cursor(txid, change_id)
+
+
+def get_student_changes(after=None, limit=STUDENT_CHANGES_BATCH_SIZE):
+    """
+    То же, что fetch_student_changes(), на соединении из пула (кэш не используется).
+    """
+    with db_transaction() as connection:
+        return fetch_student_changes(connection, after, limit)
+
+
+def iter_student_changes(after=None, follow=False, batch_size=STUDENT_CHANGES_BATCH_SIZE, poll_seconds=5):
+    """
+    Генератор: отдает изменения после позиции after по порядку (читая пачками по batch_size).
+
+    Без follow заканчивается, когда новых изменений нет.
+    С follow ждет новые изменения на отдельном соединении с LISTEN: триггер журнала
+    присылает уведомление после каждой транзакции, изменившей студентов, поэтому
+    журнал перечитывается только тогда, когда в нем что-то появилось (и на всякий
+    случай раз в poll_seconds: изменение могло стать видимым позже уведомления,
+    если в это время шла другая долгая транзакция).
+    """
+    if not follow:
+        while True:
+            changes, after = get_student_changes(after, batch_size)
+            yield from changes
+            if len(changes) < batch_size:
+                return
+
+    load_db_driver()
+    ensure_schema()
+    connection = psycopg2.connect(
+        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD, port=DB_PORT
+    )
+    try:
+        connection.autocommit = True  # LISTEN работает вне транзакции, каждый запрос - своя транзакция
+        cursor = connection.cursor()
+        cursor.execute(f'LISTEN {STUDENT_CHANGES_CHANNEL};')
+        cursor.close()
+        while True:
+            changes, after = fetch_student_changes(connection, after, batch_size)
+            yield from changes
+            if len(changes) == batch_size:
+                continue  # Журнал прочитан не до конца
+            # Жду уведомление (не дольше poll_seconds); уведомления нужны только как сигнал
+            if select.select([connection], [], [], poll_seconds) != ([], [], []):
+                connection.poll()
+                connection.notifies.clear()
+    finally:
+        connection.close()
+
+
+def prune_student_changes(keep_days=STUDENT_CHANGES_KEEP_DAYS):
+    """
+    Удаляет из журнала изменения старше keep_days дней. Возвращает, сколько удалено.
+    """
+    with db_transaction() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("DELETE FROM student_changes WHERE changed_at < now() - make_interval(days => %s);",
+                           (keep_days,))
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+# ==================== Конец журнала изменений ====================
+
+
+# ==================== Снимок таблицы в памяти (NumPy) ====================
+# Для аналитики удобнее один раз загрузить таблицу в память и дальше
+# фильтровать и сортировать ее локально, без запроса к БД на каждый вопрос.
+# Столбцы хранятся в массивах NumPy, а ФИО - "словарем": каждое разное имя
+# записано один раз, а в столбце лежат только его номера (коды).
+# Тогда поиск по имени проверяет только словарь (несколько тысяч разных имен),
+# а не все строки, и результат переносится на строки одной векторной операцией.
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('Для снимка таблицы нужна библиотека numpy: pip install numpy')
+    return numpy
+
+
+class DictionaryColumn:
+    """
+    Столбец строк со словарным кодированием: values - словарь (разные строки),
+    codes - номер строки в словаре для каждой записи.
+    """
+    def __init__(self, np):
+        self.np = np
+        self.codes = np.empty(0, dtype=np.int32)
+        self._index = {}     # строка -> код
+        self._values = []    # код -> строка
+        self.values = np.array([], dtype=str)        # словарь в виде массива NumPy
+        self.lower_values = np.array([], dtype=str)  # он же в нижнем регистре - для поиска
+        self.ranks = np.empty(0, dtype=np.int32)     # место каждой строки словаря по алфавиту
+
+    def encode(self, strings):
+        """
+        Добавляет строки в конец столбца.
+        """
+        index = self._index
+        new_codes = []
+        for string in strings:
+            code = index.get(string)
+            if code is None:
+                code = index[string] = len(self._values)
+                self._values.append(string)
+            new_codes.append(code)
+        if len(self._values) != len(self.values):  # в словаре появились новые строки
+            self.values = self.np.array(self._values, dtype=str)
+            self.lower_values = self.np.char.lower(self.values)
+            self.ranks = self.np.empty(len(self._values), dtype=self.np.int32)
+            self.ranks[self.np.argsort(self.values, kind='stable')] = self.np.arange(len(self._values))
+        self.codes = self.np.concatenate([self.codes, self.np.array(new_codes, dtype=self.np.int32)])
+
+    def matches(self, term, prefix=False):
+        """
+        Булев массив по строкам: строка начинается с term (prefix=True) или содержит term.
+        Проверяется только словарь, потом результат раскладывается по кодам.
+        """
+        term = term.lower()
+        if prefix:
+            found = self.np.char.startswith(self.lower_values, term)
+        else:
+            found = self.np.char.find(self.lower_values, term) >= 0
+        return found[self.codes]
+
+    def sort_keys(self):
+        return self.ranks[self.codes]
+
+    def __getitem__(self, index):
+        return self._values[self.codes[index]]
+
+
+class StudentSnapshot:
+    """
+    Снимок таблицы students в памяти для быстрых локальных запросов:
+
+        snapshot = StudentSnapshot()
+        snapshot.refresh()                    # загрузка (а потом - догрузка новых студентов)
+        rows = snapshot.query(course=2, age_min=18, name='ива', order='name', limit=20)
+
+    Числовые столбцы (id, возраст, курс) - массивы NumPy, ФИО - DictionaryColumn.
+    Возраст и курс в таблице могут быть NULL: для них есть булевы массивы has_ages
+    и has_courses, и такие студенты, как и в SQL, не подходят ни под одно условие по этому столбцу.
+    refresh() догружает только студентов с ID больше уже загруженных
+    (high_water_mark). Изменения и удаления уже загруженных студентов так
+    не видны - для них есть reload() (полная перезагрузка).
+    Сортировка по ФИО - по кодам символов, поэтому порядок может немного
+    отличаться от порядка в PostgreSQL (где он зависит от правил сортировки БД).
+    """
+    def __init__(self):
+        np = self.np = _import_numpy()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.ages = np.empty(0, dtype=np.int16)
+        self.courses = np.empty(0, dtype=np.int8)
+        self.has_ages = np.empty(0, dtype=bool)     # False - возраст не указан (NULL)
+        self.has_courses = np.empty(0, dtype=bool)  # False - курс не указан (NULL)
+        self.last_names = DictionaryColumn(np)
+        self.first_names = DictionaryColumn(np)
+        self.patronymics = DictionaryColumn(np)
+        self.high_water_mark = 0  # наибольший загруженный ID
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def refresh(self, connection=None, batch_size=VIEW_FETCH_SIZE):
+        """
+        Догружает студентов с ID больше high_water_mark. Возвращает число новых строк.
+        """
+        with db_transaction(connection, readonly=True) as conn:
+            cursor = conn.cursor(name='students_snapshot')  # серверный курсор: строки приходят пачками
+            try:
+                cursor.execute(
+                    f"SELECT {STUDENT_COLUMNS} FROM students WHERE id > %s ORDER BY id;", (self.high_water_mark,)
+                )
+
+                def fetched_rows():
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            return
+                        yield from rows
+                added = self.extend(fetched_rows())
+            finally:
+                cursor.close()
+        self.loaded_at = time.time()
+        return added
+
+    def extend(self, rows):
+        """
+        Добавляет в конец снимка строки (кортежи в порядке STUDENT_COLUMNS, по возрастанию ID).
+        Возвращает число добавленных строк.
+        """
+        np = self.np
+        ids, last_names, first_names, patronymics, ages, courses = [], [], [], [], [], []
+        for student_id, last_name, first_name, patronymic, age, course in rows:
+            ids.append(student_id)
+            last_names.append(last_name)
+            first_names.append(first_name)
+            patronymics.append(patronymic or '')
+            ages.append(age)
+            courses.append(course)
+        if ids:
+            has_ages = np.array([age is not None for age in ages], dtype=bool)
+            has_courses = np.array([course is not None for course in courses], dtype=bool)
+            self.ids = np.concatenate([self.ids, np.array(ids, dtype=np.int64)])
+            # Вместо NULL в массив пишется 0, но условия и сортировка смотрят на has_ages/has_courses
+            self.ages = np.concatenate([self.ages, np.array([age or 0 for age in ages], dtype=np.int16)])
+            self.courses = np.concatenate([self.courses, np.array([course or 0 for course in courses],
+                                                                  dtype=np.int8)])
+            self.has_ages = np.concatenate([self.has_ages, has_ages])
+            self.has_courses = np.concatenate([self.has_courses, has_courses])
+            self.last_names.encode(last_names)
+            self.first_names.encode(first_names)
+            self.patronymics.encode(patronymics)
+            self.high_water_mark = ids[-1]
+        return len(ids)
+
+    def reload(self, connection=None):
+        """
+        Полностью перезагружает снимок (чтобы увидеть измененных и удаленных студентов).
+        """
+        self.__init__()
+        return self.refresh(connection)
+
+    def mask(self, ids=None, course=None, age_min=None, age_max=None, name=None, prefix=False):
+        """
+        Булев массив "строка подходит под условие". Условия те же, что у групповых
+        операций (build_student_filter), плюс name - часть фамилии, имени или отчества
+        (prefix=True - только начало).
+        """
+        np = self.np
+        selected = np.ones(len(self.ids), dtype=bool)
+        if ids:
+            selected &= np.isin(self.ids, np.asarray(list(ids), dtype=np.int64))
+        # Как в SQL: сравнение с NULL не выполняется, поэтому строки без возраста
+        # (курса) отбрасываются любым условием по возрасту (курсу)
+        if course is not None:
+            selected &= self.has_courses & (self.courses == course)
+        if age_min is not None:
+            selected &= self.has_ages & (self.ages >= age_min)
+        if age_max is not None:
+            selected &= self.has_ages & (self.ages <= age_max)
+        if name:
+            selected &= (self.last_names.matches(name, prefix)
+                         | self.first_names.matches(name, prefix)
+                         | self.patronymics.matches(name, prefix))
+        return selected
+
+    def query(self, order='name', limit=None, descending=False, **criteria):
+        """
+        Строки (кортежи в порядке STUDENT_COLUMNS), подходящие под условие criteria (см. mask),
+        отсортированные по order: 'name' (фамилия, имя, id), 'age', 'course' или 'id'.
+        """
+        np = self.np
+        positions = np.flatnonzero(self.mask(**criteria))
+        if order == 'name':
+            # np.lexsort сортирует по последнему ключу, при равенстве - по предыдущему
+            keys = (self.ids[positions], self.first_names.sort_keys()[positions],
+                    self.last_names.sort_keys()[positions])
+        elif order in ('age', 'course'):
+            # NULL - в конце, как в PostgreSQL при ORDER BY ... ASC
+            keys = (self.ids[positions], getattr(self, order + 's')[positions],
+                    ~getattr(self, 'has_' + order + 's')[positions])
+        elif order == 'id':
+            keys = (self.ids[positions],)
+        else:
+            raise ValueError(f'Неизвестный порядок сортировки: {order}')
+        positions = positions[np.lexsort(keys)]
+        if descending:
+            positions = positions[::-1]
+        if limit is not None:
+            positions = positions[:limit]
+        return [self.row(position) for position in positions]
+
+    def count(self, **criteria):
+        return int(self.mask(**criteria).sum())
+
+    def row(self, position):
+        return (int(self.ids[position]), self.last_names[position], self.first_names[position],
+                self.patronymics[position] or None,
+                int(self.ages[position]) if self.has_ages[position] else None,
+                int(self.courses[position]) if self.has_courses[position] else None)
+
+    def memory_bytes(self):
+        """
+        Сколько байт занимают массивы снимка (без словарей имен).
+        """
+        return (self.ids.nbytes + self.ages.nbytes + self.courses.nbytes + self.has_ages.nbytes
+                + self.has_courses.nbytes + self.last_names.codes.nbytes
+                + self.first_names.codes.nbytes + self.patronymics.codes.nbytes)
+
+
+_student_snapshot = None
+
+
+def snapshot_menu():
+    """
+    Пункт меню: запросы к снимку таблицы в памяти (загружается при первом вызове).
+    """
+    global _student_snapshot
+    print('\n---------- АНАЛИТИКА ПО СНИМКУ ТАБЛИЦЫ ----------')
+    try:
+        if _student_snapshot is None:
+            _student_snapshot = StudentSnapshot()
+        started = time.perf_counter()
+        action = input('Обновить снимок: 1 - догрузить новых студентов, 2 - загрузить заново, '
+                       'Enter - не обновлять: ').strip()
+        if action == '2' or len(_student_snapshot) == 0:
+            added = _student_snapshot.reload()
+        elif action == '1':
+            added = _student_snapshot.refresh()
+        else:
+            added = None
+        if added is not None:
+            print(f'Загружено студентов: {added} (в снимке: {len(_student_snapshot)}, '
+                  f'{_student_snapshot.memory_bytes() / 1024 / 1024:.1f} МБ, '
+                  f'за {time.perf_counter() - started:.2f} сек.)')
+
+        criteria = _input_student_criteria()
+        name = input('Часть фамилии, имени или отчества (Enter - любые): ').strip()
+        if name:
+            criteria['name'] = name
+        order = {'1': 'name', '2': 'age', '3': 'course', '4': 'id'}.get(
+            input('Сортировка: 1 - по ФИО, 2 - по возрасту, 3 - по курсу, 4 - по ID [1]: ').strip() or '1')
+        if order is None:
+            print('Некорректный выбор сортировки.')
+            return
+
+        started = time.perf_counter()
+        total = _student_snapshot.count(**criteria)
+        rows = _student_snapshot.query(order=order, limit=VIEW_PAGE_SIZE, **criteria)
+        elapsed = time.perf_counter() - started
+        print(f'\nНайдено студентов: {total} (за {elapsed * 1000:.1f} мс). Первые {len(rows)}:')
+        if rows:
+            with PacedOutput(0.05) as table:
+                print_students_header()
+                for row in rows:
+                    table.add(format_student_row(row))
+    except ValueError as e:
+        print(f'Ошибка ввода: {e}')
+    except RuntimeError as e:
+        print(e)
+    except Error as e:
+        print(f'Ошибка при загрузке снимка: {e}')
+    print('\n-------------------------------------------------')
+    print()
+
+# ==================== Конец снимка таблицы ====================
+
+
+# ==================== Асинхронный слой доступа к данным ====================
+# Асинхронный драйвер PostgreSQL asyncpg нужен только для этого режима,
+# поэтому импортируется при первом использовании.
+_NAMED_QUERY_PARAM = re.compile(r'%\((\w+)\)s')
+
+
+def _import_asyncpg():
+    try:
+        import asyncpg
+    except ImportError:
+        raise RuntimeError('Для асинхронного режима нужна библиотека asyncpg: pip install asyncpg')
+    return asyncpg
+
+
+def to_numbered_query(query, params=()):
+    """
+    Переводит запрос в стиле psycopg2 (%s или %(имя)s) в стиль самого PostgreSQL ($1, $2, ...),
+    который нужен asyncpg и PREPARE. Так асинхронный слой и подготовленные запросы
+    используют те же самые SQL-запросы, что и обычный.
+    Возвращает (запрос, список параметров).
+    """
+    if isinstance(params, dict):
+        names = []
+
+        def replace_named(match):
+            name = match.group(1)
+            if name not in names:
+                names.append(name)
+            return f'${names.index(name) + 1}'
+        return _NAMED_QUERY_PARAM.sub(replace_named, query), [params[name] for name in names]
+    numbers = iter(range(1, len(params) + 1))
+    return re.sub(r'%s', lambda match: f'${next(numbers)}', query), list(params)
+
+
+class AsyncStudentService:
+    """
+    Асинхронный доступ к студентам (корутины поверх asyncpg со своим пулом соединений).
+    Позволяет одному процессу обслуживать много клиентов одновременно:
+
+        service = AsyncStudentService()
+        await service.start()
+        student, (found, mode) = await asyncio.gather(
+            service.get_student(1), service.find_students('Иван'))
+        await service.close()
+
+    Проверка данных та же, что и в обычном режиме (check_name, check_age, check_course),
+    кэш студентов (student_cache) общий с обычным режимом.
+    """
+    def __init__(self, min_size=DB_POOL_MIN, max_size=DB_POOL_MAX):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        self.search_features = None
+
+    async def start(self):
+        asyncpg = _import_asyncpg()
+        self.pool = await asyncpg.create_pool(
+            host=DB_HOST,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            port=int(DB_PORT) if DB_PORT else None,
+            min_size=self.min_size,
+            max_size=self.max_size,
+        )
+        return self
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def _fetch(self, query, params=()):
+        """
+        Выполняет запрос и возвращает строки в виде кортежей (как psycopg2).
+        """
+        query, args = to_numbered_query(query, params)
+        async with self.pool.acquire() as connection:
+            return [tuple(record) for record in await connection.fetch(query, *args)]
+
+    async def _write(self, query, params, student_ids=None):
+        """
+        Выполняет изменяющий запрос ... RETURNING id в транзакции,
+        рассылает уведомление для кэша и сбрасывает кэш. Возвращает список ID.
+        """
+        query, args = to_numbered_query(query, params)
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                changed_ids = [record[0] for record in await connection.fetch(query, *args)]
+                if changed_ids and STUDENT_CACHE_NOTIFY:
+                    await connection.execute('SELECT pg_notify($1, $2);', STUDENT_CACHE_CHANNEL,
+                                             cache_notification_payload(changed_ids))
+        invalidate_students(changed_ids or student_ids or [])
+        return changed_ids
+
+    async def _cached(self, key, load):
+        value = student_cache.get(key)
+        if value is _MISSING:
+            value = await load()
+            student_cache.put(key, value)
+        return value
+
+    async def get_student(self, student_id, fresh=False):
+        """
+        Студент по ID (кортеж в порядке STUDENT_COLUMNS) или None.
+        """
+        student_id = int(student_id)
+
+        async def load():
+            rows = await self._fetch(f"SELECT {STUDENT_COLUMNS} FROM students WHERE id = %s;", (student_id,))
+            return rows[0] if rows else None
+        if fresh:
+            row = await load()
+            student_cache.put(('id', student_id), row)
+            return row
+        return await self._cached(('id', student_id), load)
+
+    async def list_students(self, after=None, before=None, page_size=VIEW_PAGE_SIZE):
+        """
+        Страница списка студентов (keyset-пагинация, как fetch_students_page).
+        """
+        query, params, reverse = build_page_query(after, before, page_size)
+        rows = await self._fetch(query, params)
+        return rows[::-1] if reverse else rows
+
+    async def find_students(self, term, mode=None):
+        """
+        Поиск по части ФИО, возвращает (список строк, способ поиска).
+        """
+        if self.search_features is None:
+            rows = await self._fetch(SEARCH_FEATURES_QUERY)
+            self.search_features = {'trigram': rows[0][0], 'fulltext': rows[0][1]}
+
+        async def load():
+            query, params, used_mode = build_search_query(term, mode, self.search_features)
+            return await self._fetch(query, params), used_mode
+        return await self._cached(('search', term.lower(), mode, SEARCH_RESULTS_LIMIT), load)
+
+    async def add_student(self, student):
+        """
+        Добавляет студента (объект Student), возвращает его ID.
+        """
+        row = _validated_student_row(student)
+        changed_ids = await self._write(INSERT_STUDENT_QUERY, row)
+        student.id = changed_ids[0]
+        return student.id
+
+    async def get_student_with_version(self, student_id):
+        """
+        (строка студента, версия) или (None, None) - прямо из БД, как get_student_with_version().
+        """
+        rows = await self._fetch(PREPARED_STATEMENTS['student_with_version'], (student_id,))
+        return (rows[0][:-1], rows[0][-1]) if rows else (None, None)
+
+    async def delete_student(self, student_id, expected_version=None):
+        """
+        Удаляет студента, возвращает True, если он был удален.
+        С expected_version - только если версия не изменилась (иначе StudentConflictError).
+        """
+        if expected_version is None:
+            return bool(await self._write(PREPARED_STATEMENTS['student_delete'], (student_id,), [student_id]))
+        if await self._write(PREPARED_STATEMENTS['student_delete_version'], (student_id, int(expected_version)),
+                             [student_id]):
+            return True
+        return check_version_conflict(student_id, expected_version, *await self.get_student_with_version(student_id))
+
+    async def edit_student(self, student_id, changes, expected_version=None):
+        """
+        Меняет поля студента (словарь {столбец: значение}), возвращает True, если студент найден.
+        С expected_version - только если версия не изменилась (иначе StudentConflictError).
+        """
+        query, params = build_update_query(student_id, validate_student_changes(changes), expected_version)
+        if await self._write(query, params, [student_id]):
+            return True
+        if expected_version is None:
+            return False
+        return check_version_conflict(student_id, expected_version, *await self.get_student_with_version(student_id))
+
+
+class AsyncBridge:
+    """
+    Мост между обычным (синхронным) кодом меню и асинхронным сервисом:
+    цикл событий asyncio крутится в отдельном фоновом потоке,
+    а run() отправляет в него корутину и ждет результат.
+    Ошибки asyncpg превращаются в psycopg2.Error, чтобы меню обрабатывало их как обычно.
+    """
+    def __init__(self, service):
+        import asyncio
+        self.service = service
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='student-async-loop', daemon=True)
+        self.thread.start()
+        self.run(service.start())
+
+    def run(self, coroutine):
+        import asyncio
+        asyncpg = _import_asyncpg()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result()
+        except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError) as e:
+            raise Error(str(e)) from e
+
+    def close(self):
+        try:
+            self.run(self.service.close())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+
+
+_async_bridge = None  # Если задан, операции меню выполняются через асинхронный сервис
+
+
+def use_async_backend():
+    """
+    Переключает меню на асинхронный слой доступа к данным
+    (добавление, список, поиск, удаление и редактирование студентов).
+    Массовый импорт и групповые операции по-прежнему используют пул psycopg2.
+    """
+    global _async_bridge
+    if _async_bridge is None:
+        ensure_schema()  # Миграции выполняются через обычный пул psycopg2
+        _async_bridge = AsyncBridge(AsyncStudentService())
+        atexit.register(stop_async_backend)
+        print('Включен асинхронный режим работы с БД (asyncpg).')
+    return _async_bridge
+
+
+def stop_async_backend():
+    """
+    Закрывает пул asyncpg и останавливает фоновый цикл событий.
+    """
+    global _async_bridge
+    if _async_bridge is not None:
+        bridge, _async_bridge = _async_bridge, None
+        bridge.close()
+
+# ==================== Конец асинхронного слоя ====================
+
+
+# ==================== Массовый импорт студентов из файла ====================
+# Поля в файле могут называться как в "students.json" (по-русски)
+# или как столбцы таблицы students (по-английски)
+IMPORT_FIELD_NAMES = {
+    'фамилия': 'last_name',
+    'имя': 'first_name',
+    'отчество': 'patronymic',
+    'возраст': 'age',
+    'курс': 'course',
+    'last_name': 'last_name',
+    'first_name': 'first_name',
+    'patronymic': 'patronymic',
+    'age': 'age',
+    'course': 'course',
+}
+
+# Пробелы и запятые между элементами JSON-массива
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
+# Символы, по которым ищется конец элемента массива: кавычки, "\", скобки и запятая
+_JSON_STRUCTURE = re.compile(r'[\\"\[\]{},]')
+# Элемент массива длиннее этого (в символах) считается ошибкой файла: иначе при
+# незакрытой скобке или кавычке в буфер пришлось бы дочитать весь остаток файла
+JSON_MAX_RECORD_CHARS = 1024 * 1024
+
+
+def _json_element_end(buffer, position):
+    """
+    Ищет конец элемента JSON-массива, который начинается в buffer[position]:
+    запятую или "]" вне строк и вложенных скобок (или лишнюю "}").
+    Возвращает позицию найденного символа или -1, если конец элемента еще не прочитан.
+    """
+    depth = 0
+    in_string = False
+    while True:
+        match = _JSON_STRUCTURE.search(buffer, position)
+        if match is None:
+            return -1
+        char = match.group()
+        position = match.end()
+        if in_string:
+            if char == '\\':
+                position += 1  # пропускаю экранированный символ, например \"
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '[{':
+            depth += 1
+        elif char in ']}':
+            if depth == 0:
+                return match.start()
+            depth -= 1
+        elif char == ',' and depth == 0:
+            return match.start()
+
+
+def _iter_json_array(file, chunk_size=64 * 1024):
+    """
+    Потоково читает JSON-массив объектов "[{...}, {...}]" кусками по chunk_size символов.
+    Весь файл в память не загружается: в буфере лежит только недочитанная часть.
+    Испорченный элемент массива отдается как json.JSONDecodeError (как строка JSONL
+    в iter_student_records), и чтение продолжается со следующего элемента.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('JSON-файл должен содержать массив студентов: [ {...}, {...} ]')
+    position = 1  # пропускаю "["
+    end_of_file = False
+    while True:
+        position = _JSON_SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return  # массив закончился
+        try:
+            item, position_after = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            end = _json_element_end(buffer, position)
+            if end >= 0:
+                # Элемент испорчен: отдаю ошибку (позиции в ней - от начала элемента)
+                # и перехожу к следующему элементу
+                yield json.JSONDecodeError(e.msg, buffer[position:end], e.pos - position)
+                position = end if buffer[end] in ',]' else end + 1
+                continue
+            if end_of_file:
+                raise ValueError('JSON-массив не закончен: файл обрезан?') from None
+        else:
+            # Число на границе куска могло прочитаться не полностью ("12" из "123")
+            if position_after < len(buffer) or end_of_file:
+                yield item
+                position = position_after
+                continue
+        # Элемент обрезан на границе куска - дочитываю следующий кусок
+        if len(buffer) - position > JSON_MAX_RECORD_CHARS:
+            raise ValueError(f'Элемент JSON-массива длиннее {JSON_MAX_RECORD_CHARS} символов: файл поврежден?')
+        chunk = file.read(chunk_size)
+        end_of_file = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+# Расширение файла -> формат импорта
+IMPORT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'json'}
+
+
+def import_file_format(path):
+    """
+    Формат файла для импорта по расширению: 'csv', 'jsonl' или 'json'.
+    Для других расширений выбрасывает ValueError.
+    """
+    file_format = IMPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format is None:
+        raise ValueError(f'Неизвестный формат файла {path}: поддерживаются {", ".join(IMPORT_FORMATS)}')
+    return file_format
+
+
+def iter_student_records(path):
+    """
+    Генератор: по одной отдает записи из файла в виде (номер строки/записи, словарь).
+    Формат определяется по расширению: .csv, .jsonl/.ndjson (JSON Lines) или .json (массив).
+    """
+    file_format = import_file_format(path)
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        if file_format == 'csv':
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+        elif file_format == 'jsonl':
+            for line_number, line in enumerate(file, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_number, e  # ошибку разбора строки отдаю как отказ, а не падаю
+        else:
+            for record_number, record in enumerate(_iter_json_array(file), start=1):
+                yield record_number, record
+
+
+def validate_student_record(record):
+    """
+    Проверяет одну запись из файла по тем же правилам, что и ручной ввод
+    (check_name, check_age, check_course).
+    Возвращает (кортеж значений для таблицы, None) или (None, список ошибок).
+    """
+    if not isinstance(record, dict):
+        return None, [f'Запись должна быть объектом с полями студента, а не {type(record).__name__}']
+
+    # Переименовываю ключи в названия столбцов таблицы
+    fields = {}
+    for key, value in record.items():
+        column = IMPORT_FIELD_NAMES.get(str(key).strip().lower())
+        if column:
+            fields[column] = value
+
+    errors = []
+    names = []
+    for column, name_type in (('last_name', 'фамилия'), ('first_name', 'имя'), ('patronymic', 'отчество')):
+        # Привожу имя к виду "Иванов", как при ручном вводе в get_valid_name()
+        name = str(fields.get(column) or '').strip().title()
+        error = check_name(name, name_type)
+        if error:
+            errors.append(error)
+        names.append(name)
+
+    age, error = check_age(fields.get('age'))
+    if error:
+        errors.append(error)
+    course, error = check_course(fields.get('course'))
+    if error:
+        errors.append(error)
+
+    if errors:
+        return None, errors
+    return (names[0], names[1], names[2], age, course), None
+
+
+def _copy_students_batch(cursor, rows):
+    """
+    Загружает пачку проверенных строк в таблицу students одной командой COPY FROM STDIN.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        'COPY students (last_name, first_name, patronymic, age, course) FROM STDIN WITH (FORMAT csv);',
+        buffer
+    )
+
+
+def import_students(path, batch_size=IMPORT_BATCH_SIZE, rejects_path=None, show_rejects=20):
+    """
+    Массовый импорт студентов из файла (JSON-массив, JSON Lines или CSV).
+
+    Файл читается потоково, каждая запись проверяется, правильные записи
+    загружаются пачками по batch_size через COPY. Весь импорт - одна транзакция:
+    если случится ошибка БД, не загрузится ничего.
+    Отклоненные записи печатаются (первые show_rejects штук) и, если указан
+    rejects_path, записываются туда в формате JSON Lines.
+    Возвращает словарь со статистикой: прочитано, загружено, отклонено.
+    """
+    summary = {'read': 0, 'imported': 0, 'rejected': 0}
+    try:
+        import_file_format(path)
+    except ValueError as e:
+        print(f'Ошибка: {e}')
+        return summary
+    rejects_file = open(rejects_path, 'w', encoding='utf-8') if rejects_path else None
+
+    def reject(number, record, errors):
+        summary['rejected'] += 1
+        if summary['rejected'] <= show_rejects:
+            print(f"Запись {number} отклонена: {'; '.join(errors)}")
+        if rejects_file:
+            rejects_file.write(json.dumps(
+                {'номер': number, 'ошибки': errors, 'запись': record if isinstance(record, dict) else None},
+                ensure_ascii=False
+            ) + '\n')
+
+    started = time.perf_counter()
+    try:
+        with db_connection() as connection:
+            if not connection:
+                print('Не удалось импортировать студентов: нет соединения с БД.')
+                return summary
+            cursor = connection.cursor()
+            try:
+                batch = []
+                for number, record in iter_student_records(path):
+                    summary['read'] += 1
+                    if isinstance(record, Exception):
+                        reject(number, None, [f'Некорректный JSON: {record}'])
+                        continue
+                    row, errors = validate_student_record(record)
+                    if errors:
+                        reject(number, record, errors)
+                        continue
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        _copy_students_batch(cursor, batch)
+                        summary['imported'] += len(batch)
+                        batch = []
+                if batch:
+                    _copy_students_batch(cursor, batch)
+                    summary['imported'] += len(batch)
+                announce_students_changed(cursor)
+                connection.commit()  # Все пачки сохраняются одним подтверждением
+                invalidate_students()  # Добавилось много студентов - сбрасываю весь кэш
+            except (Error, OSError, ValueError) as e:
+                connection.rollback()
+                print(f'Ошибка при импорте студентов: {e}')
+                summary['imported'] = 0
+            finally:
+                cursor.close()
+    finally:
+        if rejects_file:
+            rejects_file.close()
+
+    elapsed = time.perf_counter() - started
+    if summary['rejected'] > show_rejects:
+        print(f"... и еще {summary['rejected'] - show_rejects} отклоненных записей.")
+    print(f"Прочитано записей: {summary['read']}, загружено: {summary['imported']}, "
+          f"отклонено: {summary['rejected']} (за {elapsed:.2f} сек.)")
+    return summary
+
+
+# --- Параллельный импорт ---
+# Для больших файлов один процесс не успевает и разбирать записи, и грузить их в БД.
+# Поэтому работа делится на три части:
+#   1) чтение файла - в главном процессе: файл только режется на куски из целых записей
+#      (строк CSV/JSONL или элементов JSON-массива), сами записи здесь не разбираются;
+#   2) разбор (json.loads, csv) и проверка записей - в пуле процессов (workers штук), каждый на своем ядре;
+#   3) загрузка через COPY - в writers потоках, у каждого свое соединение с БД.
+# Между частями - ограниченные очереди (backpressure): если БД не успевает,
+# чтение файла приостанавливается, и память не растет.
+
+# Регулярное выражение для строки JSON (с экранированными символами внутри)
+_JSON_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_JSON_CHARS_PER_RECORD = 128  # примерный размер одного студента в JSON-файле (для размера куска)
+
+
+def _json_text_is_complete(text):
+    """
+    True, если в тексте закрыты все строки и скобки, то есть он состоит из целых элементов массива.
+    """
+    if '\\' in text:
+        rest = _JSON_STRING.sub('', text)  # строки вырезаются целиком: кавычки и скобки в них не считаются
+    else:
+        parts = text.split('"')  # без "\" в тексте каждая вторая часть - содержимое строки (так быстрее)
+        if len(parts) % 2 == 0:
+            return False  # нечетное число кавычек: текст обрывается внутри строки
+        rest = ''.join(parts[::2])
+    return '"' not in rest and rest.count('{') == rest.count('}') and rest.count('[') == rest.count(']')
+
+
+def _iter_json_array_chunks(file, chunk_chars):
+    """
+    Режет JSON-массив на куски текста примерно по chunk_chars символов из целых элементов
+    (без "[" и "]"), не разбирая сами элементы. Кусок заканчивается на "}" или "]"
+    перед запятой, после которой в массиве идет следующий элемент.
+    """
+    buffer = file.read(chunk_chars).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('JSON-файл должен содержать массив студентов: [ {...}, {...} ]')
+    buffer = buffer[1:]
+    end_of_file = False
+    while True:
+        if not end_of_file and len(buffer) < chunk_chars:
+            chunk = file.read(chunk_chars)
+            end_of_file = not chunk
+            buffer += chunk
+            continue
+        if end_of_file:
+            text = buffer.rstrip()
+            if not text.endswith(']'):
+                raise ValueError('JSON-массив не закончен: файл обрезан?')
+            if text[:-1].strip():
+                yield text[:-1]
+            return
+        # Ищу с конца буфера закрывающую скобку, после которой стоит запятая и которая
+        # закрывает целый элемент (а не стоит внутри строки или вложенного объекта)
+        cut = len(buffer)
+        for _ in range(16):
+            cut = max(buffer.rfind('}', 0, cut), buffer.rfind(']', 0, cut))
+            if cut < 0:
+                break
+            comma = _JSON_SEPARATORS.match(buffer, cut + 1).end()
+            if ',' in buffer[cut + 1:comma] and comma < len(buffer) and _json_text_is_complete(buffer[:cut + 1]):
+                yield buffer[:cut + 1]
+                buffer = buffer[comma:]
+                break
+        else:
+            cut = -1
+        if cut < 0:
+            # Целого элемента в буфере не нашлось - дочитываю еще кусок
+            if len(buffer) > chunk_chars + JSON_MAX_RECORD_CHARS:
+                raise ValueError('Не удалось разделить JSON-массив на записи: файл поврежден?')
+            chunk = file.read(chunk_chars)
+            end_of_file = not chunk
+            buffer += chunk
+
+
+def _iter_line_chunks(file, chunk_size, csv_quotes=False):
+    """
+    Режет файл на куски текста по chunk_size строк.
+    С csv_quotes=True кусок не обрывается внутри поля CSV в кавычках, которое
+    занимает несколько строк: строки дочитываются, пока кавычек не станет четное число.
+    """
+    while True:
+        text = ''.join(itertools.islice(file, chunk_size))
+        if not text:
+            return
+        if csv_quotes:
+            quotes = text.count('"')
+            while quotes % 2:
+                line = next(file, '')
+                if not line:
+                    break
+                text += line
+                quotes += line.count('"')
+        yield text
+
+
+def _iter_import_chunks(path, file_format, chunk_size):
+    """
+    Генератор кусков файла для процессов-обработчиков:
+    (номер куска, формат, заголовок CSV, номер записи перед куском, текст).
+    "Номер записи перед куском" - сколько строк файла пропущено перед первым куском
+    (заголовок CSV), для остальных кусков - 0: номера записей досчитывает главный процесс.
+    """
+    # CSV читается с newline='' (так требует модуль csv), JSONL - с переводом концов строк в "\n"
+    with open(path, encoding='utf-8-sig', newline='' if file_format == 'csv' else None) as file:
+        header = None
+        skipped = 0
+        if file_format == 'csv':
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                return  # пустой файл
+            skipped = reader.line_num
+            chunks = _iter_line_chunks(file, chunk_size, csv_quotes=True)
+        elif file_format == 'jsonl':
+            chunks = _iter_line_chunks(file, chunk_size)
+        else:
+            chunks = _iter_json_array_chunks(file, chunk_size * _JSON_CHARS_PER_RECORD)
+        for chunk_number, text in enumerate(chunks):
+            yield chunk_number, file_format, header, skipped, text
+            skipped = 0
+
+
+def _parse_import_chunk(chunk):
+    """
+    Выполняется в процессе-обработчике: разбирает кусок файла и проверяет его записи.
+    Возвращает (номер куска, правильные строки, отклоненные записи, сколько строк или
+    элементов файла занял кусок, PID процесса, время разбора и проверки).
+    Номера отклоненных записей считаются от начала куска.
+    """
+    started = time.perf_counter()
+    chunk_number, file_format, header, skipped, text = chunk
+    rows = []
+    rejects = []
+
+    def check(number, record):
+        if isinstance(record, Exception):
+            rejects.append((number, None, [f'Некорректный JSON: {record}']))
+            return
+        row, errors = validate_student_record(record)
+        if errors:
+            rejects.append((number, record, errors))
+        else:
+            rows.append(row)
+
+    if file_format == 'csv':
+        reader = csv.DictReader(io.StringIO(text, newline=''), fieldnames=header)
+        for record in reader:
+            check(skipped + reader.line_num, record)
+        consumed = skipped + reader.line_num
+    elif file_format == 'jsonl':
+        lines = text.split('\n')
+        if text.endswith('\n'):
+            lines.pop()  # после последнего "\n" строки нет
+        for line_number, line in enumerate(lines, start=1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = e
+                check(line_number, record)
+        consumed = len(lines)
+    else:
+        text = '[' + text + ']'
+        try:
+            records = json.loads(text)  # обычно кусок разбирается целиком одним вызовом
+        except json.JSONDecodeError:
+            records = list(_iter_json_array(io.StringIO(text)))  # есть испорченный элемент: отказ по нему
+        for number, record in enumerate(records, start=1):
+            check(number, record)
+        consumed = len(records)
+    return chunk_number, rows, rejects, consumed, os.getpid(), time.perf_counter() - started
+
+
+def _copy_writer(connection, batches, failed, stats):
+    """
+    Поток-загрузчик: берет пачки строк из очереди и загружает их через COPY
+    в своей транзакции. None в очереди - сигнал "пачек больше не будет".
+    """
+    cursor = connection.cursor()
+    try:
+        while True:
+            rows = batches.get()
+            if rows is None:
+                return
+            if failed.is_set():
+                continue  # Другой загрузчик упал: дочитываю очередь, но не гружу
+            started = time.perf_counter()
+            try:
+                _copy_students_batch(cursor, rows)
+            except Error as e:
+                stats['error'] = e
+                failed.set()
+                continue
+            stats['rows'] += len(rows)
+            stats['seconds'] += time.perf_counter() - started
+    finally:
+        cursor.close()
+
+
+def _two_phase_commit_available(connection, writers):
+    """
+    Можно ли подтвердить транзакции загрузчиков вместе (PREPARE TRANSACTION):
+    для этого на сервере max_prepared_transactions должно быть не меньше числа загрузчиков.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SHOW max_prepared_transactions;')
+        return int(cursor.fetchone()[0]) >= writers
+    finally:
+        cursor.close()
+        connection.rollback()
+
+
+def _commit_import_writers(connections, two_phase, gid):
+    """
+    Подтверждает транзакции загрузчиков. Возвращает номера загрузчиков (с 1), чьи строки сохранены.
+
+    С two_phase=True сначала все транзакции подготавливаются (PREPARE TRANSACTION): если
+    хоть одна не подготовилась, откатываются все. После этого подтверждение уже не зависит
+    от данных; если оно все же не прошло (например, оборвалось соединение), транзакция
+    остается подготовленной на сервере, и печатается команда, которой ее подтвердить.
+    Без two_phase транзакции подтверждаются по очереди, и при ошибке загрузчики,
+    подтвержденные раньше, остаются сохраненными (об этом печатается сообщение).
+    """
+    committed = []
+    if two_phase:
+        try:
+            for connection in connections:
+                connection.tpc_prepare()
+        except Error as e:
+            for connection in connections:
+                try:
+                    connection.tpc_rollback()
+                except Error:
+                    pass  # соединение оборвалось - сервер откатит транзакцию сам
+            print(f'Ошибка при импорте студентов: {e}')
+            return committed
+        for number, connection in enumerate(connections, 1):
+            try:
+                connection.tpc_commit()
+                committed.append(number)
+            except Error as e:
+                print(f'Загрузчик {number}: транзакция подготовлена, но не подтверждена ({e}). '
+                      f"Подтвердите ее вручную: COMMIT PREPARED '{gid}-{number}';")
+                connection.close()  # подготовленная транзакция на сервере при этом сохраняется
+        return committed
+
+    for number, connection in enumerate(connections, 1):
+        try:
+            connection.commit()
+            committed.append(number)
+        except Error as e:
+            print(f'Ошибка при импорте студентов: {e}')
+            for other in connections[number - 1:]:
+                try:
+                    other.rollback()
+                except Error:
+                    pass  # соединение оборвалось - сервер откатит транзакцию сам
+            if committed:
+                print(f"Внимание: загрузчики {', '.join(map(str, committed))} уже подтвердили свои строки, "
+                      f"они остались в таблице; остальные откатились.")
+            break
+    return committed
+
+
+def parallel_import_students(path, workers=IMPORT_WORKERS, writers=IMPORT_WRITERS, chunk_size=IMPORT_BATCH_SIZE,
+                             rejects_path=None, show_rejects=20):
+    """
+    Параллельный массовый импорт студентов из файла (те же форматы, что и у import_students).
+
+    Отклоненные записи печатаются по порядку номеров, как при обычном импорте.
+    Каждый загрузчик пишет в своей транзакции. Если сервер разрешает двухфазное
+    подтверждение (max_prepared_transactions не меньше числа загрузчиков), импорт
+    атомарен: транзакции сначала подготавливаются все, и только потом подтверждаются.
+    Иначе они подтверждаются по очереди, и если подтверждение одного загрузчика
+    не прошло, строки загрузчиков до него остаются в таблице (см. _commit_import_writers).
+    В конце печатается производительность (строк в секунду) каждого процесса и загрузчика.
+    Возвращает словарь со статистикой: прочитано, загружено, отклонено и
+    номера загрузчиков, чьи строки сохранены ('committed_writers').
+    """
+    import multiprocessing
+    summary = {'read': 0, 'imported': 0, 'rejected': 0, 'committed_writers': []}
+    try:
+        file_format = import_file_format(path)
+    except ValueError as e:
+        print(f'Ошибка: {e}')
+        return summary
+    validator_stats = {}  # PID процесса -> {'rows': ..., 'seconds': ...}
+    writer_stats = [{'rows': 0, 'seconds': 0.0, 'error': None} for _ in range(writers)]
+    # Процессы запускаются через spawn и ДО соединений с БД и потоков-загрузчиков:
+    # fork скопировал бы в процесс открытые соединения и потоки с занятыми блокировками
+    process_pool = multiprocessing.get_context('spawn').Pool(workers)
+    rejects_file = open(rejects_path, 'w', encoding='utf-8') if rejects_path else None
+    connections = []
+    two_phase = False
+    finished = False  # транзакции загрузчиков уже подтверждены или откачены
+    started = time.perf_counter()
+    try:
+        for _ in range(writers):
+            connection = get_db_connection()
+            if not connection:
+                print('Не удалось импортировать студентов: нет соединения с БД.')
+                return summary
+            connections.append(connection)
+        two_phase = _two_phase_commit_available(connections[0], writers)
+        gid = f'students-import-{os.getpid()}-{time.time_ns()}'
+        if two_phase:
+            for number, connection in enumerate(connections, 1):
+                connection.tpc_begin(f'{gid}-{number}')
+
+        batches = queue.Queue(maxsize=writers * 2)
+        failed = threading.Event()
+        threads = [
+            threading.Thread(target=_copy_writer, args=(connection, batches, failed, stats), daemon=True)
+            for connection, stats in zip(connections, writer_stats)
+        ]
+        for thread in threads:
+            thread.start()
+
+        numbered = 0  # сколько строк (элементов) файла уже пронумеровано
+
+        def handle_result(result):
+            nonlocal numbered
+            chunk_number, rows, rejects, consumed, pid, seconds = result
+            stats = validator_stats.setdefault(pid, {'rows': 0, 'seconds': 0.0})
+            stats['rows'] += len(rows) + len(rejects)
+            stats['seconds'] += seconds
+            summary['read'] += len(rows) + len(rejects)
+            for number, record, errors in rejects:
+                number += numbered
+                summary['rejected'] += 1
+                if summary['rejected'] <= show_rejects:
+                    print(f"Запись {number} отклонена: {'; '.join(errors)}")
+                if rejects_file:
+                    rejects_file.write(json.dumps({'номер': number, 'ошибки': errors, 'запись': record},
+                                                  ensure_ascii=False) + '\n')
+            numbered += consumed
+            if rows:
+                batches.put(rows)  # Ждет, если загрузчики не успевают
+
+        try:
+            # Результаты обрабатываются строго по порядку кусков, а в работе одновременно
+            # не больше workers * 2 кусков - поэтому файл не читается в память целиком
+            pending = deque()
+            for chunk in _iter_import_chunks(path, file_format, chunk_size):
+                pending.append(process_pool.apply_async(_parse_import_chunk, (chunk,)))
+                if len(pending) >= workers * 2:
+                    handle_result(pending.popleft().get())
+                if failed.is_set():
+                    break
+            while pending:
+                handle_result(pending.popleft().get())
+        except (OSError, ValueError) as e:
+            print(f'Ошибка при чтении файла: {e}')
+            failed.set()
+        finally:
+            for _ in threads:
+                batches.put(None)
+            for thread in threads:
+                thread.join()
+
+        errors = [stats['error'] for stats in writer_stats if stats['error']]
+        if failed.is_set():
+            print(f"Ошибка при импорте студентов: {errors[0] if errors else 'импорт прерван'}")
+        else:
+            committed = _commit_import_writers(connections, two_phase, gid)
+            finished = True
+            summary['committed_writers'] = committed
+            summary['imported'] = sum(writer_stats[number - 1]['rows'] for number in committed)
+            if 1 in committed:
+                # Уведомление NOTIFY нельзя отправить из подготовленной транзакции - отправляю после
+                cursor = connections[0].cursor()
+                announce_students_changed(cursor)
+                cursor.close()
+                connections[0].commit()
+        invalidate_students()  # Добавилось много студентов - сбрасываю весь кэш
+    finally:
+        process_pool.terminate()
+        process_pool.join()
+        for connection in connections if not finished else ():
+            try:
+                # Транзакцию загрузчика (в том числе двухфазную) откатываю явно:
+                # обычный rollback() пула для нее не работает
+                connection.tpc_rollback() if two_phase else connection.rollback()
+            except Error:
+                pass  # соединение оборвалось - сервер откатит транзакцию сам
+        for connection in connections:
+            release_db_connection(connection)
+        if rejects_file:
+            rejects_file.close()
+
+    elapsed = time.perf_counter() - started
+    if summary['rejected'] > show_rejects:
+        print(f"... и еще {summary['rejected'] - show_rejects} отклоненных записей.")
+    print(f"Прочитано записей: {summary['read']}, загружено: {summary['imported']}, "
+          f"отклонено: {summary['rejected']} (за {elapsed:.2f} сек., "
+          f"{summary['imported'] / elapsed if elapsed else 0:.0f} строк/сек.)")
+    for pid, stats in sorted(validator_stats.items()):
+        print(f"  разбор и проверка, процесс {pid}: {stats['rows']} записей, "
+              f"{stats['rows'] / stats['seconds'] if stats['seconds'] else 0:.0f} записей/сек.")
+    for number, stats in enumerate(writer_stats, 1):
+        print(f"  загрузчик {number}: {stats['rows']} строк, "
+              f"{stats['rows'] / stats['seconds'] if stats['seconds'] else 0:.0f} строк/сек.")
+    return summary
+
+
+def import_students_menu():
+    """
+    Пункт меню: спрашивает путь к файлу и запускает массовый импорт.
+    """
+    print('\n---------- ИМПОРТ СТУДЕНТОВ ИЗ ФАЙЛА ----------')
+    path = input('Введите путь к файлу (.json, .jsonl, .csv) [students.json]: ').strip() or 'students.json'
+    if not os.path.isfile(path):
+        print(f'Файл {path} не найден.')
+        return
+    rejects_path = input('Куда сохранить отклоненные записи (оставьте пустым, чтобы не сохранять): ').strip()
+    workers = input(f'Сколько процессов использовать для проверки записей (1 - без параллельности) '
+                    f'[{IMPORT_WORKERS}]: ').strip()
+    if workers and not workers.isdigit():
+        print('Ошибка: число процессов должно быть числом.')
+        return
+    workers = int(workers) if workers else IMPORT_WORKERS
+    if workers > 1:
+        parallel_import_students(path, workers=workers, rejects_path=rejects_path or None)
+    else:
+        import_students(path, rejects_path=rejects_path or None)
+    print('\n-----------------------------------------------')
+    print()
+
+# ==================== Конец массового импорта ====================
+
+
+# ==================== Экспорт студентов в файл ====================
+# Таблица выгружается пачками по диапазонам ID (по возрастанию ID), поэтому
+# память не зависит от размера таблицы, а прерванный экспорт можно продолжить:
+# после каждой пачки в файл "<имя файла>.progress" записывается последний выгруженный ID.
+# Форматы:
+#   .csv            - COPY ... TO STDOUT прямо в файл (заголовки по-русски, как в students.json)
+#   .jsonl, .ndjson - JSON Lines с теми же ключами, что в students.json (файл можно импортировать обратно)
+#   .parquet        - колоночный сжатый формат (нужна библиотека pyarrow)
+
+# Ключи экспорта: столбец таблицы -> поле в файле (как в students.json, плюс id)
+EXPORT_FIELD_NAMES = [
+    ('id', 'id'),
+    ('last_name', 'фамилия'),
+    ('first_name', 'имя'),
+    ('patronymic', 'отчество'),
+    ('age', 'возраст'),
+    ('course', 'курс'),
+]
+
+EXPORT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('Для экспорта в Parquet нужна библиотека pyarrow: pip install pyarrow')
+    return pyarrow
+
+
+def _next_export_boundary(cursor, after_id, id_to, batch_size):
+    """
+    Граница следующей пачки (не больше batch_size студентов с ID > after_id):
+    (ID последнего студента пачки, сколько в ней студентов) или (None, 0), если студентов больше нет.
+    Читается только индекс первичного ключа.
+    """
+    cursor.execute(
+        "SELECT max(id), count(*) FROM "
+        "(SELECT id FROM students WHERE id > %s AND id <= %s ORDER BY id LIMIT %s) AS batch;",
+        (after_id, id_to, batch_size)
+    )
+    return cursor.fetchone()
+
+
+def _read_export_progress(progress_path):
+    try:
+        with open(progress_path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_export_progress(progress_path, progress):
+    # Сначала пишу во временный файл, потом переименовываю: так файл прогресса
+    # не окажется недописанным, если программу прервут посередине
+    with open(progress_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(progress, file, ensure_ascii=False)
+    os.replace(progress_path + '.tmp', progress_path)
+
+
+class _CsvExportWriter:
+    def __init__(self, path, append):
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+        self.header = not append
+
+    def write_batch(self, cursor, after_id, last_id):
+        header = 'true' if self.header else 'false'
+        columns = ', '.join(f'{column} AS "{name}"' for column, name in EXPORT_FIELD_NAMES)
+        select = cursor.mogrify(
+            f"SELECT {columns} FROM students WHERE id > %s AND id <= %s ORDER BY id", (after_id, last_id)
+        ).decode('utf-8')
+        cursor.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER {header})", self.file)
+        self.header = False
+
+    def position(self):
+        self.file.flush()
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class _JsonLinesExportWriter:
+    def __init__(self, path, append):
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write_batch(self, cursor, after_id, last_id):
+        cursor.execute(
+            f"SELECT {STUDENT_COLUMNS} FROM students WHERE id > %s AND id <= %s ORDER BY id;", (after_id, last_id)
+        )
+        names = [name for column, name in EXPORT_FIELD_NAMES]
+        self.file.writelines(
+            json.dumps(dict(zip(names, row)), ensure_ascii=False) + '\n' for row in cursor
+        )
+
+    def position(self):
+        self.file.flush()
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetExportWriter:
+    """
+    Каждая пачка - отдельная группа строк (row group) Parquet-файла.
+    ФИО хранятся словарем (одинаковые имена записываются один раз), файл сжимается zstd.
+    Дописывать Parquet-файл нельзя, поэтому продолжение экспорта
+    пишется в соседний файл "<имя>.from_<ID>.parquet".
+    """
+    def __init__(self, path, append, after_id):
+        self.pa = _import_pyarrow()
+        if append:
+            stem, extension = os.path.splitext(path)
+            path = f'{stem}.from_{after_id + 1}{extension}'
+        self.path = path
+        self.schema = self.pa.schema([
+            ('id', self.pa.int64()),
+            ('фамилия', self.pa.string()),
+            ('имя', self.pa.string()),
+            ('отчество', self.pa.string()),
+            ('возраст', self.pa.int16()),
+            ('курс', self.pa.int8()),
+        ])
+        self.writer = self.pa.parquet.ParquetWriter(path, self.schema, compression='zstd', use_dictionary=True)
+        self.rows = 0
+
+    def write_batch(self, cursor, after_id, last_id):
+        cursor.execute(
+            f"SELECT {STUDENT_COLUMNS} FROM students WHERE id > %s AND id <= %s ORDER BY id;", (after_id, last_id)
+        )
+        columns = list(zip(*cursor.fetchall()))  # строки пачки -> столбцы
+        if columns:
+            self.writer.write_table(self.pa.Table.from_arrays(
+                [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+                schema=self.schema
+            ))
+            self.rows += len(columns[0])
+
+    def position(self):
+        return self.rows
+
+    def close(self):
+        self.writer.close()
+
+
+def export_students(path, id_from=None, id_to=None, resume=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Выгружает студентов с ID от id_from до id_to (включительно) в файл path.
+    Формат выбирается по расширению файла (см. EXPORT_FORMATS).
+
+    С resume=True продолжает прерванный экспорт с места, записанного в "<path>.progress"
+    (недописанный хвост CSV/JSONL-файла при этом отрезается).
+    Все пачки читаются в одной транзакции REPEATABLE READ, то есть из одного
+    "снимка" таблицы, даже если студентов в это время меняют.
+    Возвращает словарь со статистикой: сколько выгружено и последний ID.
+    """
+    export_format = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if export_format is None:
+        raise ValueError(f'Неизвестный формат файла {path}: поддерживаются {", ".join(EXPORT_FORMATS)}')
+
+    progress_path = path + '.progress'
+    progress = _read_export_progress(progress_path) if resume else None
+    if progress:
+        id_from, id_to = progress['last_id'] + 1, progress['id_to']
+        if export_format != 'parquet':
+            with open(path, 'r+b') as file:
+                file.truncate(progress['position'])  # отрезаю пачку, которая не успела записаться целиком
+        print(f"Продолжаю экспорт в {path} со студента с ID {id_from} "
+              f"(уже выгружено {progress['exported']}).")
+    else:
+        progress = {'exported': 0}
+    after_id = (id_from if id_from is not None else 1) - 1
+    id_to = id_to if id_to is not None else 2 ** 63 - 1
+    summary = {'exported': 0, 'last_id': None}
+
+    started = time.perf_counter()
+    with db_transaction(readonly=True) as connection:  # экспорт только читает - можно с реплики
+        cursor = connection.cursor()
+        if export_format == 'csv':
+            writer = _CsvExportWriter(path, append=bool(progress.get('last_id')))
+        elif export_format == 'jsonl':
+            writer = _JsonLinesExportWriter(path, append=bool(progress.get('last_id')))
+        else:
+            writer = _ParquetExportWriter(path, append=bool(progress.get('last_id')), after_id=after_id)
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+            while True:
+                last_id, exported = _next_export_boundary(cursor, after_id, id_to, batch_size)
+                if last_id is None:
+                    break
+                writer.write_batch(cursor, after_id, last_id)
+                summary['exported'] += exported
+                summary['last_id'] = after_id = last_id
+                progress.update(last_id=last_id, id_to=id_to, position=writer.position(),
+                                exported=progress['exported'] + exported)
+                _write_export_progress(progress_path, progress)
+        finally:
+            writer.close()
+            cursor.close()
+
+    if os.path.exists(progress_path):
+        os.remove(progress_path)  # Экспорт закончен, продолжать нечего
+    elapsed = time.perf_counter() - started
+    print(f"Выгружено студентов: {summary['exported']} в {path} (за {elapsed:.2f} сек.)")
+    return summary
+
+
+def export_students_menu():
+    """
+    Пункт меню: спрашивает файл и диапазон ID и запускает экспорт.
+    """
+    print('\n---------- ЭКСПОРТ СТУДЕНТОВ В ФАЙЛ ----------')
+    path = input('Введите путь к файлу (.csv, .jsonl, .parquet) [students_export.csv]: ').strip() \
+        or 'students_export.csv'
+    resume = False
+    if os.path.exists(path + '.progress'):
+        resume = input('Найден незаконченный экспорт в этот файл. Продолжить его? (да/нет): ').strip().lower() == 'да'
+    id_from = id_to = None
+    if not resume:
+        id_range = input('Диапазон ID через дефис, например 1-50000 (оставьте пустым для всех): ').strip()
+        if id_range:
+            try:
+                id_from, id_to = (int(part) for part in id_range.split('-', 1))
+            except ValueError:
+                print('Ошибка: диапазон должен быть в виде "начало-конец", например 1-50000.')
+                return
+    try:
+        export_students(path, id_from=id_from, id_to=id_to, resume=resume)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f'Не удалось выгрузить студентов: {e}')
+    except Error as e:
+        print(f'Ошибка БД при экспорте (его можно продолжить, выбрав тот же файл): {e}')
+    print('\n-----------------------------------------------')
+    print()
+
+# ==================== Конец экспорта ====================
+
+
+# ==================== HTTP/JSON API (режим сервера) ====================
+# Вместо меню с input() программа может работать как HTTP-сервер (флаг --serve):
+#   GET    /students                     - весь список потоком (chunked), по порядку ФИО
+#   GET    /students?page_size=20&after=ID - одна страница списка (after - ID последнего студента прошлой страницы)
+#   GET    /students/search?q=Иван&mode=  - поиск по части ФИО
+#   GET    /students/ID                  - один студент
+#   POST   /students                     - добавить студента (JSON с полями, как при импорте)
+#   PATCH  /students/ID                  - изменить поля студента
+#   DELETE /students/ID                  - удалить студента
+# PATCH и DELETE с заголовком "If-Match: ВЕРСИЯ" выполняются, только если версия студента
+# не изменилась, иначе ответ 409 с текущими данными студента и его версией.
+# Версию возвращают PATCH (поле version и заголовок ETag), ответ 409 и журнал изменений.
+#   GET    /stats                        - статистика по курсам и возрасту
+#   GET    /changes?after=ПОЗИЦИЯ&limit=  - журнал изменений после позиции (для синхронизации)
+#   GET    /metrics                      - метрики запросов, пула и кэша (формат Prometheus)
+# Каждый запрос обрабатывается в своем потоке, соединения берутся из общего пула.
+
+def student_to_json(row):
+    """
+    Строка студента (кортеж в порядке STUDENT_COLUMNS) -> словарь для JSON.
+    """
+    return {
+        'id': row[0],
+        'last_name': row[1],
+        'first_name': row[2],
+        'patronymic': row[3],
+        'age': row[4],
+        'course': row[5],
+    }
+
+
+def _json_bytes(data):
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class StudentAPIHandlerMixin:
+    """
+    Обработчик HTTP-запросов к студентам (методы для BaseHTTPRequestHandler, см. api_handler_class).
+    HTTP/1.1: соединение с клиентом не закрывается после ответа (keep-alive),
+    поэтому у каждого ответа есть Content-Length или Transfer-Encoding: chunked.
+    В каждом ответе есть заголовки Server-Timing и X-Response-Time
+    со временем обработки запроса в миллисекундах.
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StudentAPI/1.0'
+
+    # --- Разбор запроса ---
+    def _route(self):
+        from urllib.parse import urlparse, parse_qs
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return parts, query
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            raise ValueError('Пустое тело запроса, ожидается JSON-объект.')
+        try:
+            data = json.loads(self.rfile.read(length).decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f'Некорректный JSON: {e}')
+        if not isinstance(data, dict):
+            raise ValueError('Ожидается JSON-объект с полями студента.')
+        return data
+
+    def _query_int(self, query, name, default, maximum):
+        """
+        Целый параметр запроса от 1 до maximum (ValueError, то есть ответ 400, если он другой).
+        """
+        value = query.get(name)
+        if value is None:
+            return default
+        if not value.isdigit() or not 1 <= int(value) <= maximum:
+            raise ValueError(f'Параметр {name} должен быть целым числом от 1 до {maximum}, а не "{value}".')
+        return int(value)
+
+    # --- Ответы ---
+    def _elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def _expected_version(self):
+        """
+        Версия студента из заголовка If-Match (None, если заголовка нет).
+        """
+        value = (self.headers.get('If-Match') or '').strip().strip('"')
+        if not value:
+            return None
+        if not value.isdigit():
+            raise ValueError(f'В заголовке If-Match должна быть версия студента (число), а не "{value}".')
+        return int(value)
+
+    def _send_headers(self, status, headers):
+        """
+        Начало любого ответа: статус, заголовки headers и время обработки запроса
+        (Server-Timing и X-Response-Time).
+        """
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        elapsed = self._elapsed_ms()
+        self.send_header('Server-Timing', f'app;dur={elapsed:.1f}')
+        self.send_header('X-Response-Time', f'{elapsed:.1f}ms')
+        self.end_headers()
+
+    def _send_json(self, status, data=None, headers=None):
+        body = b'' if data is None else _json_bytes(data)
+        headers = dict(headers or {})
+        if data is not None:
+            headers['Content-Type'] = 'application/json; charset=utf-8'
+        headers['Content-Length'] = str(len(body))
+        self._send_headers(status, headers)
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_error_json(self, status, message):
+        self._send_json(status, {'error': message})
+
+    def _send_metrics(self):
+        body = render_prometheus_metrics().encode('utf-8')
+        self._send_headers(200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+                                 'Content-Length': str(len(body))})
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        if data:
+            self.wfile.write(f'{len(data):X}\r\n'.encode('ascii') + data + b'\r\n')
+
+    def _stream_students(self, rows):
+        """
+        Отдает список студентов JSON-массивом по частям (Transfer-Encoding: chunked),
+        не собирая весь ответ в памяти. В заголовках - время до начала ответа,
+        а время обработки всего запроса приходит в конце, в трейлере Server-Timing.
+        """
+        rows = iter(rows)
+        first = next(rows, None)  # Ошибка подключения к БД всплывет здесь, до отправки заголовков
+        self._send_headers(200, {'Content-Type': 'application/json; charset=utf-8',
+                                 'Transfer-Encoding': 'chunked', 'Trailer': 'Server-Timing'})
         try:
-            # Создаю объект курсора, который позволит выполнять SQL-запросы
-            cursor = connection.cursor()
-            
-            # SQL-запрос для выбора всех студентов.
-            # Я явно указываю порядок столбцов: сначала id, затем last_name (фамилия), 
-            # потом first_name (имя), patronymic (отчество) и так далее.
-            # ORDER BY last_name, first_name - это сортировка: сначала по фамилии, потом по имени.
-            select_query = """
-            SELECT id, last_name, first_name, patronymic, age, course FROM students ORDER BY last_name, first_name;
-            """
-            
-            # Выполняю SQL-запрос
-            cursor.execute(select_query)
-            
-            # Получаю все строки результата запроса
-            # Каждая строка будет кортежем (tuple)
-            students_from_db = cursor.fetchall()
-            
-            # Проверяю, есть ли студенты в БД
-            if not students_from_db:
-                print('\nСписок студентов в базе данных пуст.')
-                
+            chunk = [b'[']
+            count = 0
+            if first is not None:
+                chunk.append(_json_bytes(student_to_json(first)))
+                count = 1
+            for row in rows:
+                chunk.append(b',' + _json_bytes(student_to_json(row)))
+                count += 1
+                if count % API_STREAM_CHUNK_ROWS == 0:
+                    self._write_chunk(b''.join(chunk))
+                    chunk = []
+            chunk.append(b']')
+            self._write_chunk(b''.join(chunk))
+        except Error as e:
+            # Заголовки уже отправлены: обрываю ответ без последнего чанка,
+            # чтобы клиент понял, что список неполный
+            self.log_error('Ошибка БД во время потоковой выдачи: %s', e)
+            self.close_connection = True
+            return
+        self.wfile.write(f'0\r\nServer-Timing: app;dur={self._elapsed_ms():.1f}\r\n\r\n'.encode('ascii'))
+
+    # --- Обработка методов ---
+    def _handle(self, method):
+        self.started = time.perf_counter()
+        try:
+            parts, query = self._route()
+            if parts == ['metrics'] and method == 'GET':
+                return self._send_metrics()
+            if parts == ['stats'] and method == 'GET':
+                return self._send_json(200, get_student_stats())
+            if parts == ['changes'] and method == 'GET':
+                return self._list_changes(query)
+            if not parts or parts[0] != 'students' or len(parts) > 2:
+                return self._send_error_json(404, 'Нет такого адреса.')
+            if len(parts) == 1:
+                if method == 'GET':
+                    return self._list_students(query)
+                if method == 'POST':
+                    return self._create_student()
+            elif parts[1] == 'search':
+                if method == 'GET':
+                    return self._search_students(query)
             else:
-                # Вывожу заголовки таблицы, выравнивая их для красивого вывода
-                print(f"{'ID'.ljust(4)} | {'ФАМИЛИЯ'.ljust(15)} | {'ИМЯ'.ljust(15)} | {'ОТЧЕСТВО'.ljust(15)} | {'ВОЗРАСТ'.ljust(7)} | {'КУРС'.ljust(5)}")
-                print('-' * 76) # Для красивого отделения заголовков от значений
-                
-                # Прохожу по каждой строке кортежа, полученого из БД
-                for row in students_from_db:
-                    # Распаковываю кортеж в отдельные переменные
-                    # Порядок столбцов тут долджен быть строго такое же как в "select_query"
-                    student_id, last_name, first_name, patronymic, age, course = row
-                    
-                    time.sleep(0.2) # Для плавного и красивого вывода не экран
-                    # Вывожу строку с данными на каждого студента(все, как в заголовке)
-                    # Пишу впереди "str()", чтобы применить "ljust()"
-                    print(f"{str(student_id).ljust(4)} | {last_name.ljust(15)} | {first_name.ljust(15)} | {patronymic.ljust(15)} | {str(age).ljust(7)} | {str(course).ljust(5)}")
-    
-        # Обработка ошибок, если произойдут
+                if not parts[1].isdigit():
+                    raise ValueError(f'ID студента должен быть числом, а не "{parts[1]}".')
+                student_id = int(parts[1])
+                if method == 'GET':
+                    return self._get_student(student_id)
+                if method == 'PATCH':
+                    return self._update_student(student_id)
+                if method == 'DELETE':
+                    return self._delete_student(student_id)
+            return self._send_error_json(405, f'Метод {method} здесь не поддерживается.')
+        except StudentConflictError as e:
+            return self._send_json(409, {'error': str(e), 'student': student_to_json(e.current),
+                                         'version': e.current_version})
+        except ValueError as e:
+            return self._send_error_json(400, str(e))
         except Error as e:
-            print(f'Произошла ошибка при получени данных: {e}')
-        
-        # Блок "finally" исполнится в любом случае, даже если будет ошибка при получении данных
-        # Это очень важный блок для управления ресурсами
-        finally:
-            if cursor:
-                cursor.close()  # Закрываю курсор
-            if connection:
-                connection.close()  # Закрываю соединение с БД
-                print('\nСоединение с БД закрыто.')
-            
-    else: # Если get_db_connection() вернул None (т.е. соединение не было установлено)
-        print("Не удалось отобразить студентов: нет соединения с базой данных.")
+            return self._send_error_json(503, f'Ошибка базы данных: {e}')
 
-print('\n>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>')
-print()
-    
-    
-# определение функции "найти студента" def find_student()
-def find_student():
+    def _list_students(self, query):
+        if 'page_size' not in query and 'after' not in query:
+            return self._stream_students(iter_all_students())
+        page_size = self._query_int(query, 'page_size', VIEW_PAGE_SIZE, API_MAX_PAGE_SIZE)
+        after = None
+        if query.get('after'):
+            if not query['after'].isdigit():
+                raise ValueError(f"Параметр after должен быть ID студента (числом), а не \"{query['after']}\".")
+            last = get_student_by_id(query['after'])
+            if last is None:
+                return self._send_error_json(404, f"Студент с ID {query['after']} не найден.")
+            after = page_key(last)
+        rows = get_students_page(after=after, page_size=page_size)
+        next_after = rows[-1][0] if len(rows) == page_size else None
+        return self._send_json(200, {'students': [student_to_json(row) for row in rows], 'next_after': next_after})
+
+    def _search_students(self, query):
+        term = query.get('q', '').strip()
+        if not term:
+            raise ValueError('Не задан текст для поиска (параметр q).')
+        mode = query.get('mode') or None
+        if mode is not None and mode not in SEARCH_MODE_TITLES:
+            raise ValueError(f'Неизвестный способ поиска "{mode}": возможны {", ".join(SEARCH_MODE_TITLES)}.')
+        rows, mode = find_students_by_name(term, mode=mode)
+        return self._send_json(200, {'mode': mode, 'students': [student_to_json(row) for row in rows]})
+
+    def _list_changes(self, query):
+        limit = self._query_int(query, 'limit', min(STUDENT_CHANGES_BATCH_SIZE, API_MAX_PAGE_SIZE), API_MAX_PAGE_SIZE)
+        changes, next_after = get_student_changes(after=query.get('after') or None, limit=limit)
+        return self._send_json(200, {'changes': changes, 'next_after': next_after})
+
+    def _get_student(self, student_id):
+        row = get_student_by_id(student_id)
+        if row is None:
+            return self._send_error_json(404, f'Студент с ID {student_id} не найден.')
+        return self._send_json(200, student_to_json(row))
+
+    def _create_student(self):
+        row, errors = validate_student_record(self._read_json())
+        if errors:
+            raise ValueError('; '.join(errors))
+        student = Student(*row)
+        insert_student(student)
+        return self._send_json(201, student_to_json((student.id, *row)))
+
+    def _update_student(self, student_id):
+        changes = {}
+        for key, value in self._read_json().items():
+            column = IMPORT_FIELD_NAMES.get(str(key).strip().lower())
+            if column is None:
+                raise ValueError(f'Неизвестное поле {key}.')
+            changes[column] = value
+        if not update_student(student_id, changes, expected_version=self._expected_version()):
+            return self._send_error_json(404, f'Студент с ID {student_id} не найден.')
+        row, version = get_student_with_version(student_id)
+        return self._send_json(200, {**student_to_json(row), 'version': version}, headers={'ETag': f'"{version}"'})
+
+    def _delete_student(self, student_id):
+        if not delete_student_by_id(student_id, expected_version=self._expected_version()):
+            return self._send_error_json(404, f'Студент с ID {student_id} не найден.')
+        return self._send_json(204)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+_api_handler_class = None
+
+
+def api_handler_class():
     """
-    Ищет и отображает информацию о студенте(ах) в базе данных PostgreSQL.
-    Поиск может быть выполнен по ID или по части фамилии/имени/отчества.
+    Класс обработчика запросов для http.server. Библиотека http.server нужна только
+    в режиме сервера, поэтому импортируется и класс создается при первом вызове.
     """
-    print("\n========== Поиск студента ==========")
-    time.sleep(0.5)
-    print()
-    
-    connection = None # Инициализация переменных для соединения и курсора
-    cursor = None
-    
+    global _api_handler_class
+    if _api_handler_class is None:
+        from http.server import BaseHTTPRequestHandler
+
+        class StudentAPIHandler(StudentAPIHandlerMixin, BaseHTTPRequestHandler):
+            pass
+        _api_handler_class = StudentAPIHandler
+    return _api_handler_class
+
+
+def run_api_server(host=API_HOST, port=API_PORT):
+    """
+    Запускает HTTP-сервер (каждый запрос - в отдельном потоке) и обслуживает запросы до Ctrl+C.
+    """
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer((host, port), api_handler_class())
+    server.daemon_threads = True
+    print(f'HTTP API студентов запущен: http://{host}:{port}/students (Ctrl+C - остановить)')
     try:
-        # Предлагаю пользователю выбрать тип поиска
-        search_type = input("Искать по ID(1) или по фамилии/имени/отчеству(2)? Введите 1 или 2: ").strip()
-        if search_type == '1':
-            # Поиск по ID
-            try:
-                search_id = int(input("Введите ID студента: "))
-                query = "SELECT id, last_name, first_name, patronymic, age, course FROM students WHERE id = %s;"
-                params = (search_id,)
-            except ValueError:
-                print("Некорректный ID. Введите ID цифрами.")
-                time.sleep(0.5)
-                return
-        elif search_type == '2':
-            # Поиск по фамили/имени/отчеству
-            search_term = input("Введите фамилию, имя или отчество (или часть) для поиска: ").strip()
-            if not search_term:
-                print("Поисковый запрос не может быть пустым.")
-                time.sleep(0.5)
-                return
-            # Используем оператор ILIKE для регистронезависимого поиска по шаблону
-            # %s% означает "содержит эту подстроку"
-            query = """
-            SELECT id, last_name, first_name, patronymic, age, course FROM students 
-            WHERE last_name ILIKE %s OR first_name ILIKE %s OR patronymic ILIKE %s
-            ORDER BY last_name, first_name;
-            """
-            # Добавляем % к поисковому запросу для использования ILIKE
-            params = (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%") 
-        else:
-            print("Некорректный выбор типа поиска. Введите 1 или 2.")
-            time.sleep(0.5)
-            return
-        
-        # Получаю соединение с БД
-        connection = get_db_connection()
-        if connection:
-            cursor = connection.cursor()
-            
-            cursor.execute(query, params) # Выполняет запрос с параметрами
-            found_students = cursor.fetchall() # Получаем все найденые строки
-            
-            if not found_students:
-                print('Студенты по вашему запросу не найдены.')
-            else:
-                print('Найденые студенты:')
-                print()
-                print(f"{'ID'.ljust(4)} | {'ФАМИЛИЯ'.ljust(15)} | {'ИМЯ'.ljust(15)} | {'ОТЧЕСТВО'.ljust(15)} | {'ВОЗРАСТ'.ljust(7)} | {'КУРС'.ljust(5)}")
-                print("-" * 80)
-                for row in found_students:
-                    student_id, last_name, first_name, patronymic, age, course = row
-                    time.sleep(0.3)
-                    print(
-                        f"{str(student_id).ljust(4)} | {last_name.ljust(15)} | {first_name.ljust(15)} | {patronymic.ljust(15)} | {str(age).ljust(7)} | {str(course).ljust(5)}"
-                    )
-                    print()
-        else:
-            print('Не удалось произвести поиск. Нет соединения с БД.')
-    except Error as e:
-        print(f"\nОшибка при поиске: {e}")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('\nСервер остановлен.')
     finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-            print('Соединение с БД закрытою.')
-    print('\n===========================================================')
-       
-    
-# определение функции "удалить студента"  def delete_student()
-def delete_student():
-    '''
-    Удаление  всю информацию о студенте из БД
-    '''
-    print('\n-------------------- УДАЛЕНИЕ СТУДЕНТА --------------------')
-    time.sleep(0.5)
-    print()
-    # Вывожу список всех студентов, чтобы пользователь знал ID студента для удаления
-    view_students()
-    
-    # Переменная для соединения и курсора
-    connection = None
-    cursor = None
-    
+        server.server_close()
+
+# ==================== Конец HTTP/JSON API ====================
+
+
+# ==================== Командная строка без меню (для скриптов) ====================
+# Основные действия доступны и без input(), подкомандами:
+#   python student_management_functions.py add Иванов Иван Иванович 20 2
+#   python student_management_functions.py get 12
+#   python student_management_functions.py list --course 2 --limit 100
+#   python student_management_functions.py find Иван
+#   python student_management_functions.py delete 5 6 7
+#   python student_management_functions.py edit 5 --age 21 --course 3
+#   python student_management_functions.py import students.csv --workers 4
+#   python student_management_functions.py export students.jsonl --id-from 1000
+#   python student_management_functions.py batch ops.txt   ("-" или без файла - читать из stdin)
+#   python student_management_functions.py changes --after 1234:56 [--follow]
+#   python student_management_functions.py partition          (разбить students на секции по курсу)
+#   python student_management_functions.py archive-course 6   (выпускников - в архивную таблицу)
+# Результат печатается в stdout в формате JSON Lines (один JSON-объект на строку),
+# а сообщения для человека (статистика импорта, ошибки) - в stderr.
+# Код выхода: 0 - все успешно, 1 - была ошибка.
+#
+# Сценарий (batch) - по одной операции на строку, так же, как в подкомандах:
+#   add Петров Петр Петрович 19 1
+#   edit 12 --course 3
+#   edit 15 --age 20 --version 4   (только если версия студента все еще 4, см. get)
+#   delete 40 41
+# или JSON-объектом с полем "op" и полями студента, как при импорте:
+#   {"op": "add", "фамилия": "Петров", "имя": "Петр", "отчество": "Петрович", "возраст": 19, "курс": 1}
+#   {"op": "edit", "id": 12, "course": 3}
+# Пустые строки и строки, начинающиеся с #, пропускаются.
+# Весь сценарий выполняется на ОДНОМ соединении в ОДНОЙ транзакции и подтверждается
+# одним commit в конце. При первой ошибке откатывается весь сценарий; с --keep-going
+# ошибочная операция откатывается отдельно (SAVEPOINT), а остальные сохраняются.
+
+# Подкоманды, которые можно писать в сценарии batch
+SCRIPT_COMMANDS = ('add', 'get', 'list', 'find', 'delete', 'edit')
+
+
+class _ScriptArgumentParser(argparse.ArgumentParser):
+    """
+    Разбор строки сценария: вместо выхода из программы выбрасывает ValueError,
+    чтобы ошибка в одной строке обрабатывалась как ошибка операции.
+    """
+    def error(self, message):
+        raise ValueError(message)
+
+    def exit(self, status=0, message=None):
+        raise ValueError((message or 'недопустимая команда').strip())
+
+
+def add_student_subcommands(subparsers):
+    """
+    Добавляет подкоманды add/get/list/find/delete/edit (общие для командной строки и сценария).
+    """
+    add = subparsers.add_parser('add', help='добавить студента')
+    add.add_argument('last_name', metavar='ФАМИЛИЯ')
+    add.add_argument('first_name', metavar='ИМЯ')
+    add.add_argument('patronymic', metavar='ОТЧЕСТВО')
+    add.add_argument('age', metavar='ВОЗРАСТ')
+    add.add_argument('course', metavar='КУРС')
+
+    get = subparsers.add_parser('get', help='показать студента по ID')
+    get.add_argument('id', type=int, metavar='ID')
+
+    listing = subparsers.add_parser('list', help='список студентов по порядку ФИО')
+    listing.add_argument('--course', type=int, help='только этот курс')
+    listing.add_argument('--age-min', type=int, help='возраст от')
+    listing.add_argument('--age-max', type=int, help='возраст до')
+    listing.add_argument('--limit', type=int, help='не больше стольких студентов')
+
+    find = subparsers.add_parser('find', help='найти студентов по части ФИО')
+    find.add_argument('term', metavar='ТЕКСТ')
+    find.add_argument('--mode', choices=sorted(SEARCH_MODE_TITLES), help='способ поиска (по умолчанию - автоматически)')
+
+    delete = subparsers.add_parser('delete', help='удалить студентов по ID')
+    delete.add_argument('ids', type=int, nargs='+', metavar='ID')
+    delete.add_argument('--version', type=int, dest='expected_version', metavar='ВЕРСИЯ',
+                        help='удалить, только если у студента все еще эта версия (один ID)')
+
+    edit = subparsers.add_parser('edit', help='изменить поля студента')
+    edit.add_argument('id', type=int, metavar='ID')
+    edit.add_argument('--version', type=int, dest='expected_version', metavar='ВЕРСИЯ',
+                      help='изменить, только если у студента все еще эта версия')
+    edit.add_argument('--last-name', dest='last_name', metavar='ФАМИЛИЯ')
+    edit.add_argument('--first-name', dest='first_name', metavar='ИМЯ')
+    edit.add_argument('--patronymic', metavar='ОТЧЕСТВО')
+    edit.add_argument('--age', metavar='ВОЗРАСТ')
+    edit.add_argument('--course', metavar='КУРС')
+
+
+_script_parser = None
+
+
+def script_parser():
+    """
+    Парсер строк сценария (создается при первом вызове).
+    """
+    global _script_parser
+    if _script_parser is None:
+        _script_parser = _ScriptArgumentParser(prog='batch', add_help=False)
+        add_student_subcommands(_script_parser.add_subparsers(dest='command', required=True))
+    return _script_parser
+
+
+def parse_script_line(line):
+    """
+    Одна строка сценария -> argparse.Namespace, как у подкоманды.
+    Строка в виде JSON-объекта переводится в те же поля (ключи - как при импорте).
+    Ошибка в строке - ValueError.
+    """
+    import shlex
+    if not line.startswith('{'):
+        return script_parser().parse_args(shlex.split(line))
     try:
-        # После показа списка студентов, запрашиваю ID студента для удаления
-        student_id = int(input('Введите ID студента для его удаления: '))
-    except ValueError:
-        print('Неверный ID: введите ID числом.')
-        time.sleep(0.5)
-        return # Возвращаемся в главное меню
-    
-    connection = get_db_connection()
-    
-    if connection:
+        data = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f'Некорректный JSON: {e}')
+    if not isinstance(data, dict):
+        raise ValueError('Ожидается JSON-объект с полем "op".')
+    op = str(data.pop('op', '')).strip().lower()
+    if op not in SCRIPT_COMMANDS:
+        raise ValueError(f'Неизвестная операция "{op}": допустимы {", ".join(SCRIPT_COMMANDS)}.')
+    args = argparse.Namespace(command=op)
+    if op == 'add':
+        args.record = data  # проверяется так же, как запись при импорте
+    elif op == 'get':
+        args.id = data.get('id')
+    elif op == 'list':
+        for name in ('course', 'age_min', 'age_max', 'limit'):
+            setattr(args, name, data.get(name))
+    elif op == 'find':
+        args.term, args.mode = str(data.get('term') or data.get('q') or ''), data.get('mode')
+    elif op == 'delete':
+        ids = data.get('ids', data.get('id'))
+        args.ids = ids if isinstance(ids, list) else [ids]
+        args.expected_version = data.get('version')
+    else:
+        args.id = data.pop('id', None)
+        args.expected_version = data.pop('version', None)
+        args.changes = {}
+        for key, value in data.items():
+            column = IMPORT_FIELD_NAMES.get(str(key).strip().lower())
+            if column is None:
+                raise ValueError(f'Неизвестное поле {key}.')
+            args.changes[column] = value
+    return args
+
+
+def _student_id(value):
+    """
+    ID студента из аргумента сценария (ValueError, если это не целое число).
+    """
+    if isinstance(value, bool) or not str(value).strip().lstrip('-').isdigit():
+        raise ValueError(f'ID студента должен быть числом, а не "{value}".')
+    return int(value)
+
+
+def iter_students_in_transaction(connection, course=None, age_min=None, age_max=None, limit=None):
+    """
+    Как iter_students(), но с условием отбора и БЕЗ завершения транзакции в конце:
+    используется внутри сценария, где транзакцию подтверждает run_student_operations().
+    """
+    if course is None and age_min is None and age_max is None:
+        where, params = 'TRUE', []
+    else:
+        where, params = build_student_filter(course=course, age_min=age_min, age_max=age_max)
+    query = f"SELECT {STUDENT_COLUMNS} FROM students WHERE {where} ORDER BY last_name, first_name, id"
+    if limit is not None:
+        query += ' LIMIT %s'
+        params.append(int(limit))
+    cursor = connection.cursor(name='students_script_list')
+    cursor.itersize = VIEW_FETCH_SIZE
+    try:
+        cursor.execute(query + ';', params)
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+def run_student_operation(connection, args):
+    """
+    Выполняет одну операцию сценария (args - результат parse_script_line или подкоманды)
+    в транзакции соединения connection. Возвращает словарь с результатом для JSON.
+    Ошибка в данных - ValueError, ошибка БД - Error.
+    """
+    op = args.command
+    if op == 'add':
+        record = getattr(args, 'record', None)
+        if record is None:
+            record = {column: getattr(args, column) for column in ('last_name', 'first_name', 'patronymic', 'age', 'course')}
+        row, errors = validate_student_record(record)
+        if errors:
+            raise ValueError('; '.join(errors))
+        student = Student(*row)
+        insert_student(student, connection=connection)
+        return {'student': student_to_json((student.id, *row))}
+
+    if op == 'get':
+        student_id = _student_id(args.id)
+        row, version = fetch_student_with_version(connection, student_id)
+        if row is None:
+            raise ValueError(f'Студент с ID {student_id} не найден.')
+        return {'student': student_to_json(row), 'version': version}
+
+    if op == 'list':
+        rows = iter_students_in_transaction(connection, course=args.course, age_min=args.age_min,
+                                            age_max=args.age_max, limit=args.limit)
+        return {'students': [student_to_json(row) for row in rows]}
+
+    if op == 'find':
+        term = args.term.strip()
+        if not term:
+            raise ValueError('Поисковый запрос не может быть пустым.')
+        if args.mode is not None and args.mode not in SEARCH_MODE_TITLES:
+            raise ValueError(f'Неизвестный способ поиска "{args.mode}".')
+        rows, mode = find_students_by_name(term, mode=args.mode, connection=connection)
+        return {'mode': mode, 'students': [student_to_json(row) for row in rows]}
+
+    if op == 'delete':
+        expected_version = getattr(args, 'expected_version', None)
+        if expected_version is not None and len(args.ids) != 1:
+            raise ValueError('Версию можно указать, только если удаляется один студент.')
+        deleted, not_found = [], []
+        for student_id in (_student_id(value) for value in args.ids):
+            removed = delete_student_by_id(student_id, connection=connection, expected_version=expected_version)
+            (deleted if removed else not_found).append(student_id)
+        return {'deleted': deleted, 'not_found': not_found}
+
+    # edit
+    student_id = _student_id(args.id)
+    changes = getattr(args, 'changes', None)
+    if changes is None:
+        changes = {column: getattr(args, column) for column in BATCH_UPDATE_COLUMNS
+                   if getattr(args, column, None) is not None}
+    if not update_student(student_id, changes, connection=connection,
+                          expected_version=getattr(args, 'expected_version', None)):
+        raise ValueError(f'Студент с ID {student_id} не найден.')
+    row, version = fetch_student_with_version(connection, student_id)
+    return {'student': student_to_json(row), 'version': version}
+
+
+def iter_script_operations(file):
+    """
+    Генератор: читает сценарий из файла и отдает (номер строки, операция или ValueError).
+    """
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
         try:
-            # если соединение удачное, то создаю курсор для SQL
+            yield number, parse_script_line(line)
+        except ValueError as e:
+            yield number, e
+
+
+def _print_json_line(data, output):
+    output.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+
+def run_student_operations(operations, output, keep_going=False, dry_run=False):
+    """
+    Выполняет операции (пары "номер строки, операция") на одном соединении в одной транзакции.
+    Результат каждой операции печатается в output строкой JSON:
+        {"line": 3, "op": "add", "ok": true, "student": {...}}
+        {"line": 4, "op": "edit", "ok": false, "error": "..."}
+    В конце - итоговая строка {"summary": {...}}.
+    Без keep_going первая ошибка откатывает всю транзакцию, с keep_going - только
+    свою операцию (каждая операция выполняется внутри SAVEPOINT).
+    С dry_run транзакция в конце откатывается (проверка сценария без изменений).
+    Возвращает True, если все операции выполнены и транзакция подтверждена (или dry_run).
+    """
+    summary = {'operations': 0, 'ok': 0, 'failed': 0, 'committed': False}
+    started = time.perf_counter()
+    try:
+        with db_transaction() as connection:
             cursor = connection.cursor()
-            # Проверяю, есть ли студент с таким  ID
-            check_query = "SELECT id, last_name, first_name FROM students WHERE id = %s;"
-            cursor.execute(check_query, (student_id,))
-            existing_student = cursor.fetchone() # Возвращает (id, фамилию, имя) или None, если нет такого student_id
-        
-            if not existing_student:
-                print(f'Студент с ID {student_id} не найден.')
-                time.sleep(0.5)
-                return # Возвращаемся, если студент не найден
-        
-            # ВАЖНО! Запрашиваю подтверждение на удаление.
-            confirm = input(f"Вы уверены, что хотите удалить студента: {existing_student[1]} {existing_student[2]}"
-                            f"(ID: {student_id})? (да/нет): ").lower().strip()
-        
-            # Если "ДА", то удаляем студента
-            if confirm == 'да':
-                # Выполняю SQL-запрос DELETE
-                delete_quere = "DELETE FROM students WHERE id = %s;"
-                cursor.execute(delete_quere, (student_id,))
-                connection.commit()  # Подтверждаю изменение
-                print(f"Студент с ID {student_id} успешно удален.")
+            try:
+                for number, args in operations:
+                    summary['operations'] += 1
+                    result = {'line': number} if number is not None else {}
+                    try:
+                        if isinstance(args, Exception):
+                            raise args
+                        result['op'] = args.command
+                        if keep_going:
+                            cursor.execute('SAVEPOINT script_operation;')
+                        payload = run_student_operation(connection, args)
+                        result['ok'] = True
+                        result.update(payload)
+                        if keep_going:
+                            cursor.execute('RELEASE SAVEPOINT script_operation;')
+                        summary['ok'] += 1
+                    except (ValueError, Error) as e:
+                        if keep_going and 'op' in result and not isinstance(args, Exception):
+                            cursor.execute('ROLLBACK TO SAVEPOINT script_operation;')
+                        summary['failed'] += 1
+                        result.update(ok=False, error=str(e).strip())
+                        if isinstance(e, StudentConflictError):
+                            result['conflict'] = {'student': student_to_json(e.current), 'version': e.current_version}
+                        _print_json_line(result, output)
+                        if not keep_going:
+                            raise
+                        continue
+                    _print_json_line(result, output)
+            finally:
+                cursor.close()
+            if dry_run:
+                connection.rollback()
             else:
-                print("Удаление отменено.")
-            
-        except Error as e:
-            print(f"Ошибка при удалении студента: {e}")
-            connection.rollback() # Отактывает изменения назад в случае ошибки
-        finally:
-            if cursor:
-                cursor.close() # Закрываю курсор
-            if connection:
-                connection.close()
-                print("Соединение с БД закрыто.")
-    else:
-        print("Не удалось удалить студента: нет соединения с БД.")
-    print('\n-----------------------------------------------------------')
-    print()
-    
-    
-# определение функции "изменить студента"  def edit_student()
-def edit_student():  # Пока оставляю "student_list", потом удалю вообще
+                summary['committed'] = True  # commit выполнит db_transaction при выходе из блока
+    except (ValueError, Error) as e:
+        if summary['committed'] or summary['failed'] == 0:
+            # Ошибка при подтверждении или при получении соединения
+            print(f'Ошибка при выполнении сценария: {e}', file=sys.stderr)
+            summary['failed'] += 1
+        summary['committed'] = False
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    _print_json_line({'summary': summary}, output)
+    return summary['failed'] == 0
+
+
+def run_cli_command(args):
     """
-    Редактирует информацию о существующем студенте в базе данных PostgreSQL.
+    Выполняет подкоманду командной строки (args.command). Возвращает код выхода программы.
     """
-    print('\n*************** РЕДАКТИРОВАНИЕ СТУДЕНТА ***************')
-    time.sleep(0.5)
-    print()
-    # Показываю список студентов, чтобы пользователь видел ID студента
-    # Чтобы пользователь мог по ID выбрать студента для редактирования
-    view_students()
-    
-    # Переменные для соединения и курсора, инициализирую их как  None
-    # Это хорошая практика, чтобы убедиться, что они всегда будут определенны,
-    # даже если что-то пойдет не так до их создания
-    connection = None
-    cursor = None
-    
-    try:
-        # Запрашиваю ID студента и провожу проверку правильности ввода
-        student_id = int(input('Введите "ID" студента для редактирования: '))
-    except ValueError:
-        print('Некорректный ID. Пожалуйста, введите число.')
-        time.sleep(0.5)
-        return # Возвращаюсь в главное меню, не продолжая функцию
-    
-    # Пытаюсь установить соединение с БД
-    connection = get_db_connection()
-    if connection:  # Проверяю, удалось ли соединение
-        try:
-            cursor = connection.cursor()  # Создаю курсов для выполнения SQL-запросов
-            # Проверяю, есть ли студент с таким ID в БД
-            # Это ВАЖНО, чтобы не пытаться обновить несуществующую запись
-            check_query = "SELECT id FROM students WHERE id = %s;"
-            cursor.execute(check_query, (student_id,)) # Выполняю запрос, %s будет заменен на student_id
-            existing_student = cursor.fetchone() # Возвращает одну строку или None, если ничего не найдено
-            
-            # Проверяю, есть ли студент с таким ID
-            if not existing_student:
-                print(f"Студент с ID: {student_id} не найден.")
-                time.sleep(0.5)
-                return
-            # Если студент найдет, запрашиваю новые поля у пользователя
-            # Обязательно удаляю пробелы в начале и конце строки
-            # Если пользователь не хочет менять поле, то он оставляет его пустым
-            print(f"\nРедактирование студента с ID {student_id}.")
-            new_last_name = input('Введите новую фамилию студента (оставте поле пустым, чтобы не менять): ').strip()
-            new_first_name = input('Введите новое имя студента (оставте поле пустым, чтобы не менять): ').strip()
-            new_patronymic = input('Введите новое отчество студента (оставте поле пустым, чтобы не менять): ').strip()
-            
-            new_age_str = input('Введите новый возраст студента (оставте поле пустым, чтобы не менять): ').strip()
-            new_course_str = input('Введите новый курс студента (оставте поле пустым, чтобы не менять): ').strip()
-            
-            # Динамически строю SQL-запрос UPDATE
-            # В запрос буду добавлять только те поля, которые хочу поменять
-            update_parts = []  # Список для частей SQL-запроса (например: "last_name = %s")
-            update_values = []  # Список для частей значений, которые будут вставлены вместо "%s"
-            
-            if new_last_name:  # Если пользователь ввел новую фамилию (строка не пустая)
-                update_parts.append('last_name = %s')  # Добавляю часть запроса
-                update_values.append(new_last_name)  # Добавляю значение
-                
-            if new_first_name: # Как для фамилии
-                update_parts.append('first_name = %s')
-                update_values.append(new_first_name) 
-                
-            if new_patronymic: # Как для фамилии
-                update_parts.append('patronymic = %s')
-                update_values.append(new_patronymic)
-                
-            if new_age_str:
-                # Проверка, что пользователь ввел возраст цифрами
-                try:
-                    new_age = int(new_age_str) # Как для фамилии
-                    update_parts.append('age = %s')
-                    update_values.append(new_age)
-                except ValueError:
-                    # При неправильном вводе программа игнорирует изменение возраста
-                    print('Некоректный формат ввода. Возраст не будет изменен.')
-                    
-            if new_course_str:
-                # Проверка, что пользователь ввел курс цифрами
-                try:
-                    new_course = int(new_course_str)
-                    update_parts.append('course = %s')
-                    update_values.append(new_course)
-                except ValueError:
-                    # При неправильном вводе программа игнорирует изменение курса
-                    print('Некорректный формат ввода. Курс студента не будет изменен.')
-                    
-            # если список пуст, значит пользователь ничего не захотел менять
-            if not update_parts:
-                print('Никаких изменений не введено.')
-                time.sleep(0.5)
-                return # Возвращаюсь из функции
-            
-            # Собираю финальный SQL-запрос UPDATE
-            # ', '.join(update_parts) объединяет все части из списка update_parts через запятую.
-            # Например: если изменили только имя и возраст, будет "first_name = %s", "age = %s"
-            update_query = f"UPDATE students SET {', '.join(update_parts)} WHERE id = %s;"
-            
-            # Добавляю ID студента в конец списка значений,
-            # Потому что он используется в значении WHERE
-            update_values.append(student_id)
-            
-            # Выполняю SQL-запрос на обновление
-            # update_values должен быть кортежем, поэтому преобразую в кортеж
-            cursor.execute(update_query, tuple(update_values))
-            
-            # Подтверждаю изменения в БД
-            # commit() окончательно сохраняет изменения
-            connection.commit()
-            print(f"Информация о студенте с ID {student_id} успешно обновлена.")
-            
-        except Error as e:
-            # Обработка любых других ошибок БД
-            print(f"Ошибка при обновлении данных студента: {e}")
-            # Все изменения откатываются, это гарантирует, что БД останется в согласованном состоянии
-            connection.rollback()
-            
+    import contextlib
+    output = sys.stdout
+    # Сообщения функций (print) идут в stderr, в stdout остаются только строки JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if args.command == 'batch':
+                if args.script in (None, '-'):
+                    return 0 if run_student_operations(iter_script_operations(sys.stdin), output,
+                                                       args.keep_going, args.dry_run) else 1
+                with open(args.script, encoding='utf-8') as file:
+                    return 0 if run_student_operations(iter_script_operations(file), output,
+                                                       args.keep_going, args.dry_run) else 1
+
+            if args.command == 'import':
+                if args.workers > 1:
+                    summary = parallel_import_students(args.file, workers=args.workers, rejects_path=args.rejects)
+                else:
+                    summary = import_students(args.file, rejects_path=args.rejects)
+                _print_json_line(summary, output)
+                return 0 if summary['imported'] or not summary['read'] else 1
+
+            if args.command == 'export':
+                summary = export_students(args.file, id_from=args.id_from, id_to=args.id_to, resume=args.resume)
+                _print_json_line(summary, output)
+                return 0
+
+            if args.command == 'changes':
+                if args.prune:
+                    print(f'Удалено старых записей журнала: {prune_student_changes(args.keep_days)}')
+                if args.follow:
+                    # Ждать новые изменения до Ctrl+C, печатая каждое сразу
+                    try:
+                        for change in iter_student_changes(args.after, follow=True, batch_size=args.limit):
+                            _print_json_line(change, output)
+                            output.flush()
+                    except KeyboardInterrupt:
+                        pass
+                    return 0
+                after = args.after
+                while True:
+                    changes, after = get_student_changes(after, args.limit)
+                    for change in changes:
+                        _print_json_line(change, output)
+                    if len(changes) < args.limit:
+                        break
+                _print_json_line({'next_after': after}, output)  # с этой позиции читать в следующий раз
+                return 0
+
+            if args.command == 'partition':
+                _print_json_line({'op': 'partition', 'ok': True, 'moved': partition_students_table()}, output)
+                return 0
+
+            if args.command == 'archive-course':
+                archive, archived = archive_course(args.course)
+                _print_json_line({'op': 'archive-course', 'ok': True, 'archive': archive, 'archived': archived}, output)
+                return 0
+
+            if args.command == 'list':
+                # Весь список - потоком, по строке JSON на студента, без сбора в памяти
+                with db_transaction() as connection:
+                    for row in iter_students_in_transaction(connection, course=args.course, age_min=args.age_min,
+                                                            age_max=args.age_max, limit=args.limit):
+                        _print_json_line(student_to_json(row), output)
+                return 0
+
+            # Одиночная операция - это сценарий из одной строки (без итоговой строки)
+            with db_transaction() as connection:
+                result = run_student_operation(connection, args)
+            _print_json_line({'op': args.command, 'ok': True, **result}, output)
+            return 0
+        except (ValueError, OSError, Error) as e:
+            result = {'op': args.command, 'ok': False, 'error': str(e).strip()}
+            if isinstance(e, StudentConflictError):
+                result['conflict'] = {'student': student_to_json(e.current), 'version': e.current_version}
+            _print_json_line(result, output)
+            return 1
         finally:
-            # Это обязательный шаг, независимо от успеха программы или ошибки
-            # Этот шаг важен для эффективного использования БД
-            if cursor:
-                cursor.close()
-            
-            if connection:
-                connection.close()
-                print('Соединение с БД закрыто.')
-    
-    # Если get_db_connection() вернул None (соединение с БД не установлено)
-    else:
-        print("Не удалось отредактировать студента: нет соединения с БД.")
-        
-    print("\n><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><")
-    print()
+            output.flush()
+
+# ==================== Конец командной строки без меню ====================
+
 
    
 # определение главной функции main()
@@ -660,21 +6167,27 @@ def main():
         
         # Ниже будет весь код, который был в твоем главном цикле while True
         # (запрос ввода, валидация, if/elif для выбора пунктов)
-        menu_choice_str = input('Выберите пункт меню: 1 - 6:>> ')
+        menu_choice_str = input(f'Выберите пункт меню: 1 - {len(MENU_ITEMS)}:>> ')
         try:
             menu_choice = int(menu_choice_str)
         except ValueError:
             print('Ошибка: Введите числовое значение для выбора пункта меню.')
-            time.sleep(0.5)
+            pause(0.5)
             continue
-        if not 1 <= menu_choice <= 6:
+        if not 1 <= menu_choice <= len(MENU_ITEMS):
             print(f'Меню с номером << {menu_choice} >> нет в списке.')
             continue
         
-        # -------------------- выбор меню << 6 >> --------------------
-        if menu_choice == 6:
+        # -------------------- выбор меню "Выход" (последний пункт) --------------------
+        if menu_choice == len(MENU_ITEMS):
             print('Вы вышли из программы.')
             print('До свидания!')
+            if DB_POOL_REPORT:
+                print_pool_stats() # статистика пула, чтобы подобрать DB_POOL_MIN/DB_POOL_MAX
+            if STUDENT_CACHE_REPORT:
+                print_cache_stats()
+            if DB_METRICS_REPORT:
+                print_query_stats()
             break # выход из пронраммы
         
         # -------------------- выбор меню << 1 >> --------------------
@@ -697,11 +6210,115 @@ def main():
         elif menu_choice == 5:
             print('Вы выбрали пункт меню << 5 >>: "Редактировать студента"')
             edit_student()
+        
+        elif menu_choice == 6:
+            print('Вы выбрали пункт меню << 6 >>: "Импорт студентов из файла"')
+            import_students_menu()
+        
+        elif menu_choice == 7:
+            print('Вы выбрали пункт меню << 7 >>: "Посмотреть список студентов постранично"')
+            browse_students()
+        
+        elif menu_choice == 8:
+            print('Вы выбрали пункт меню << 8 >>: "Групповое удаление или изменение студентов"')
+            batch_operations_menu()
+        
+        elif menu_choice == 9:
+            print('Вы выбрали пункт меню << 9 >>: "Экспорт студентов в файл"')
+            export_students_menu()
+        
+        elif menu_choice == 10:
+            print('Вы выбрали пункт меню << 10 >>: "Статистика по курсам и возрасту"')
+            show_student_stats()
+        
+        elif menu_choice == 11:
+            print('Вы выбрали пункт меню << 11 >>: "Аналитика по снимку таблицы (в памяти)"')
+            snapshot_menu()
             
             
+def parse_args(argv=None):
+    '''
+    Разбирает аргументы командной строки.
+    '''
+    parser = argparse.ArgumentParser(description='Система управления списком студентов')
+    parser.add_argument('--fast', action='store_true',
+                        help='быстрый режим: без пауз при выводе, таблицы выводятся пачками '
+                             '(то же, что STUDENTS_FAST_MODE=1)')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        default=os.getenv('STUDENT_BACKEND', '') == 'async',
+                        help='работать с БД через асинхронный слой asyncpg '
+                             '(то же, что STUDENT_BACKEND=async)')
+    parser.add_argument('--migrate', action='store_true',
+                        help='проверить схему БД и выполнить миграции сразу, не доверяя сохраненной версии')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='напечатать время этапов запуска (то же, что STUDENTS_STARTUP_REPORT=1)')
+    parser.add_argument('--serve', action='store_true',
+                        help='запустить HTTP/JSON API вместо меню')
+    parser.add_argument('--host', default=API_HOST, help=f'адрес HTTP-сервера (по умолчанию {API_HOST})')
+    parser.add_argument('--port', type=int, default=API_PORT, help=f'порт HTTP-сервера (по умолчанию {API_PORT})')
+
+    # Подкоманды для работы без меню (см. раздел "Командная строка без меню")
+    subparsers = parser.add_subparsers(dest='command', metavar='КОМАНДА',
+                                       help='выполнить действие без меню и выйти (вывод - JSON Lines)')
+    add_student_subcommands(subparsers)
+    import_command = subparsers.add_parser('import', help='импорт студентов из файла (.json, .jsonl, .csv)')
+    import_command.add_argument('file', metavar='ФАЙЛ')
+    import_command.add_argument('--workers', type=int, default=1,
+                                help='сколько процессов проверяют записи (1 - без параллельности)')
+    import_command.add_argument('--rejects', metavar='ФАЙЛ', help='куда записать отклоненные записи')
+    export_command = subparsers.add_parser('export', help='экспорт студентов в файл (.csv, .jsonl, .parquet)')
+    export_command.add_argument('file', metavar='ФАЙЛ')
+    export_command.add_argument('--id-from', type=int, help='с какого ID выгружать')
+    export_command.add_argument('--id-to', type=int, help='по какой ID выгружать')
+    export_command.add_argument('--resume', action='store_true', help='продолжить прерванную выгрузку')
+    changes_command = subparsers.add_parser('changes', help='журнал изменений студентов после позиции')
+    changes_command.add_argument('--after', metavar='ПОЗИЦИЯ',
+                                 help='позиция "txid:change_id" из прошлого запуска ("now" - с текущего момента)')
+    changes_command.add_argument('--limit', type=int, default=STUDENT_CHANGES_BATCH_SIZE,
+                                 help='сколько изменений читать за раз')
+    changes_command.add_argument('--follow', action='store_true', help='ждать новые изменения (LISTEN/NOTIFY)')
+    changes_command.add_argument('--prune', action='store_true',
+                                 help='сначала удалить записи журнала старше --keep-days дней')
+    changes_command.add_argument('--keep-days', type=int, default=STUDENT_CHANGES_KEEP_DAYS,
+                                 help=f'сколько дней хранить журнал (по умолчанию {STUDENT_CHANGES_KEEP_DAYS})')
+    subparsers.add_parser('partition', help='разбить таблицу students на секции по курсу (один раз)')
+    archive_command = subparsers.add_parser('archive-course',
+                                            help='перенести всех студентов курса в архивную таблицу (нужны секции)')
+    archive_command.add_argument('course', metavar='КУРС')
+    batch_command = subparsers.add_parser('batch', help='выполнить сценарий операций одной транзакцией')
+    batch_command.add_argument('script', nargs='?', metavar='ФАЙЛ', help='файл сценария ("-" или без файла - stdin)')
+    batch_command.add_argument('--keep-going', action='store_true',
+                               help='не останавливаться на ошибке: откатить только ошибочную операцию')
+    batch_command.add_argument('--dry-run', action='store_true', help='выполнить сценарий и откатить все изменения')
+    return parser.parse_args(argv)
+
+
+startup_event('импорт модуля', _MODULE_STARTED)
+
+
 if __name__ == '__main__':
     # Этот блок кода будет выполнен только тогда, когда файл запущен напрямую (не импортирован как модуль)
-    create_students_table()
-    main()
+    args = parse_args()
+    STARTUP_REPORT = STARTUP_REPORT or args.startup_report
+    if args.fast:
+        set_fast_mode(True)
+    # Схема БД проверяется не здесь, а перед первым запросом к БД (ensure_schema),
+    # и обычно без обращения к БД - по сохраненной версии
+    if args.migrate:
+        ensure_schema(force=True)
+    start_cache_listener()
+    if args.use_async:
+        try:
+            use_async_backend()
+        except (RuntimeError, Error) as e:
+            print(f'Асинхронный режим недоступен ({e}), работаю в обычном режиме.')
+    if STARTUP_REPORT:
+        print_startup_report()
+    if args.command:
+        sys.exit(run_cli_command(args))
+    elif args.serve:
+        run_api_server(args.host, args.port)
+    else:
+        main()
     
     
\ No newline at end of file
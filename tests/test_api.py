@@ -0,0 +1,180 @@
+"""
+Тесты HTTP/JSON API: настоящий HTTP-сервер на свободном порту, а функции
+доступа к БД подменены (mock), поэтому PostgreSQL не нужен.
+Проверяются коды ответов, тела ответов и заголовки со временем обработки.
+"""
+import http.client
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+import student_management_functions as smf
+
+
+IVANOV = (1, 'Иванов', 'Иван', 'Иванович', 20, 1)
+PETROV = (2, 'Петров', 'Петр', None, 21, 2)
+
+
+class StudentAPITest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), smf.api_handler_class())
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def patch(self, name, **kwargs):
+        patcher = mock.patch.object(smf, name, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Выполняет запрос. Возвращает (код ответа, заголовки, JSON тела или None).
+        """
+        connection = http.client.HTTPConnection(*self.server.server_address, timeout=10)
+        self.addCleanup(connection.close)
+        data = None if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode('utf-8'))
+        connection.request(method, path, body=data, headers=headers or {})
+        response = connection.getresponse()
+        raw = response.read()
+        self.assertIn('Server-Timing', response.headers)  # время обработки - в каждом ответе
+        self.assertTrue(response.headers['X-Response-Time'].endswith('ms'))
+        content_type = response.headers.get('Content-Type', '')
+        return response.status, response.headers, json.loads(raw) if raw and 'json' in content_type else raw
+
+    # --- Поиск ---
+    def test_search_unknown_mode(self):
+        find = self.patch('find_students_by_name')
+        status, headers, data = self.request('GET', '/students/search?q=%D0%98%D0%B2&mode=foo')
+        self.assertEqual(status, 400)
+        self.assertIn('foo', data['error'])
+        find.assert_not_called()
+
+    def test_search(self):
+        find = self.patch('find_students_by_name', return_value=([IVANOV], 'prefix'))
+        status, headers, data = self.request('GET', '/students/search?q=%D0%98%D0%B2&mode=prefix')
+        self.assertEqual(status, 200)
+        self.assertEqual(data, {'mode': 'prefix', 'students': [smf.student_to_json(IVANOV)]})
+        find.assert_called_once_with('Ив', mode='prefix')
+        self.assertEqual(self.request('GET', '/students/search?q=+')[0], 400)
+
+    # --- Список ---
+    def test_page_parameters(self):
+        page = self.patch('get_students_page', return_value=[IVANOV, PETROV])
+        for query in ('page_size=0', 'page_size=abc', f'page_size={smf.API_MAX_PAGE_SIZE + 1}',
+                      'page_size=-5', 'after=abc', 'after=-1'):
+            with self.subTest(query=query):
+                self.assertEqual(self.request('GET', f'/students?{query}')[0], 400)
+        page.assert_not_called()
+
+    def test_page(self):
+        self.patch('get_students_page', return_value=[IVANOV, PETROV])
+        status, headers, data = self.request('GET', '/students?page_size=2')
+        self.assertEqual(status, 200)
+        self.assertEqual(data['students'], [smf.student_to_json(IVANOV), smf.student_to_json(PETROV)])
+        self.assertEqual(data['next_after'], 2)  # страница полная - может быть следующая
+        status, headers, data = self.request('GET', '/students?page_size=3')
+        self.assertIsNone(data['next_after'])
+
+    def test_page_after_missing_student(self):
+        self.patch('get_student_by_id', return_value=None)
+        self.assertEqual(self.request('GET', '/students?after=99')[0], 404)
+
+    def test_page_after(self):
+        self.patch('get_student_by_id', return_value=IVANOV)
+        page = self.patch('get_students_page', return_value=[PETROV])
+        self.assertEqual(self.request('GET', '/students?after=1&page_size=5')[0], 200)
+        page.assert_called_once_with(after=smf.page_key(IVANOV), page_size=5)
+
+    def test_stream(self):
+        rows = [(number, 'Иванов', 'Иван', None, 20, 1) for number in range(1, smf.API_STREAM_CHUNK_ROWS * 2 + 3)]
+        self.patch('iter_all_students', return_value=iter(rows))
+        status, headers, data = self.request('GET', '/students')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Transfer-Encoding'], 'chunked')
+        self.assertEqual(data, [smf.student_to_json(row) for row in rows])
+
+    def test_empty_stream(self):
+        self.patch('iter_all_students', return_value=iter([]))
+        self.assertEqual(self.request('GET', '/students')[2], [])
+
+    # --- Один студент ---
+    def test_get_student(self):
+        self.patch('get_student_by_id', side_effect=lambda student_id: IVANOV if student_id == 1 else None)
+        self.assertEqual(self.request('GET', '/students/1')[2], smf.student_to_json(IVANOV))
+        self.assertEqual(self.request('GET', '/students/2')[0], 404)
+        self.assertEqual(self.request('GET', '/students/abc')[0], 400)
+
+    def test_create_student(self):
+        def insert(student, connection=None):
+            student.id = 7
+            return 7
+        self.patch('insert_student', side_effect=insert)
+        record = {'фамилия': 'Иванов', 'имя': 'Иван', 'отчество': 'Иванович', 'возраст': 20, 'курс': 1}
+        status, headers, data = self.request('POST', '/students', record)
+        self.assertEqual(status, 201)
+        self.assertEqual(data, smf.student_to_json((7, *IVANOV[1:])))
+        self.assertEqual(self.request('POST', '/students', {**record, 'возраст': 5})[0], 400)
+        self.assertEqual(self.request('POST', '/students', b'{oops')[0], 400)
+        self.assertEqual(self.request('POST', '/students', [record])[0], 400)
+
+    def test_update_student(self):
+        update = self.patch('update_student', return_value=True)
+        self.patch('get_student_with_version', return_value=(IVANOV, 4))
+        status, headers, data = self.request('PATCH', '/students/1', {'возраст': 20}, {'If-Match': '"3"'})
+        self.assertEqual(status, 200)
+        self.assertEqual(data['version'], 4)
+        self.assertEqual(headers['ETag'], '"4"')
+        update.assert_called_once_with(1, {'age': 20}, expected_version=3)
+        self.assertEqual(self.request('PATCH', '/students/1', {'возраст': 20}, {'If-Match': 'abc'})[0], 400)
+        self.assertEqual(self.request('PATCH', '/students/1', {'email': 'x'})[0], 400)
+
+    def test_update_conflict(self):
+        self.patch('update_student', side_effect=smf.StudentConflictError(1, 3, IVANOV, 5))
+        status, headers, data = self.request('PATCH', '/students/1', {'возраст': 20}, {'If-Match': '3'})
+        self.assertEqual(status, 409)
+        self.assertEqual((data['student'], data['version']), (smf.student_to_json(IVANOV), 5))
+
+    def test_delete_student(self):
+        self.patch('delete_student_by_id', side_effect=lambda student_id, expected_version=None: student_id == 1)
+        self.assertEqual(self.request('DELETE', '/students/1')[0], 204)
+        self.assertEqual(self.request('DELETE', '/students/2')[0], 404)
+
+    # --- Прочее ---
+    def test_unknown_address_and_method(self):
+        self.assertEqual(self.request('GET', '/teachers')[0], 404)
+        self.assertEqual(self.request('GET', '/students/1/2/3')[0], 404)
+        self.assertEqual(self.request('POST', '/students/1', {})[0], 405)
+        self.assertEqual(self.request('DELETE', '/students')[0], 405)
+
+    def test_database_error(self):
+        self.patch('get_student_by_id', side_effect=smf.Error('нет соединения'))
+        status, headers, data = self.request('GET', '/students/1')
+        self.assertEqual(status, 503)
+        self.assertIn('нет соединения', data['error'])
+
+    def test_metrics_and_stats(self):
+        status, headers, body = self.request('GET', '/metrics')
+        self.assertEqual(status, 200)
+        self.assertIn(b'student_db_connect_seconds', body)
+        self.patch('get_student_stats', return_value={'total': 0})
+        self.assertEqual(self.request('GET', '/stats')[2], {'total': 0})
+
+    def test_changes_limit(self):
+        changes = self.patch('get_student_changes', return_value=([], '10:5'))
+        self.assertEqual(self.request('GET', '/changes?limit=0')[0], 400)
+        status, headers, data = self.request('GET', '/changes?after=10:4&limit=5')
+        self.assertEqual((status, data), (200, {'changes': [], 'next_after': '10:5'}))
+        changes.assert_called_once_with(after='10:4', limit=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
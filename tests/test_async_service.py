@@ -0,0 +1,194 @@
+"""
+Тесты асинхронного слоя: перевод запросов в стиль $1, $2 (to_numbered_query)
+и AsyncStudentService поверх пула в стиле asyncpg, который выполняет запросы
+в SQLite (в нем параметры ?1, ?2 - те же номера, что $1, $2 у PostgreSQL).
+"""
+import asyncio
+import re
+import sqlite3
+import types
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+class ToNumberedQueryTest(unittest.TestCase):
+    def test_positional(self):
+        self.assertEqual(smf.to_numbered_query('SELECT %s, %s;', (1, 'a')), ('SELECT $1, $2;', [1, 'a']))
+        self.assertEqual(smf.to_numbered_query('SELECT 1;'), ('SELECT 1;', []))
+
+    def test_named(self):
+        # Повторное имя - тот же номер, параметр передается один раз
+        query, args = smf.to_numbered_query('WHERE a = %(term)s OR b = %(pattern)s OR c = %(term)s LIMIT %(limit)s;',
+                                            {'limit': 5, 'pattern': '%x%', 'term': 'x', 'unused': 1})
+        self.assertEqual(query, 'WHERE a = $1 OR b = $2 OR c = $1 LIMIT $3;')
+        self.assertEqual(args, ['x', '%x%', 5])
+
+    def test_real_queries(self):
+        for name, query in smf.PREPARED_STATEMENTS.items():
+            with self.subTest(name=name):
+                numbered, args = smf.to_numbered_query(query, tuple(range(query.count('%s'))))
+                self.assertNotIn('%s', numbered)
+                self.assertEqual(len(args), len(set(re.findall(r'\$\d+', numbered))))
+        query, params, mode = smf.build_search_query('ванов', None, {'trigram': True, 'fulltext': True})
+        numbered, args = smf.to_numbered_query(query, params)
+        self.assertNotIn('%(', numbered)
+        self.assertEqual(len(args), len(set(re.findall(r'\$\d+', numbered))))
+
+
+class SQLiteAsyncConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetch(self, query, *args):
+        self.pool.queries.append(query)
+        await asyncio.sleep(0)  # отдаю управление другим корутинам, как настоящий драйвер
+        query = re.sub(r'\$(\d+)', r'?\1', query)
+        return self.pool.database.execute(query, args).fetchall()
+
+    async def execute(self, query, *args):
+        await self.fetch(query, *args)
+
+    def transaction(self):
+        pool = self.pool
+
+        class Transaction:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, exc_type, exc_value, traceback):
+                pool.database.commit() if exc_type is None else pool.database.rollback()
+                return False
+        return Transaction()
+
+
+class SQLiteAsyncPool:
+    """
+    Пул в стиле asyncpg (acquire, fetch, transaction) поверх одной БД SQLite.
+    """
+    def __init__(self):
+        self.database = sqlite3.connect(':memory:')
+        self.database.execute('CREATE TABLE students (id INTEGER PRIMARY KEY, last_name TEXT, first_name TEXT, '
+                              'patronymic TEXT, age INTEGER, course INTEGER, version INTEGER DEFAULT 1);')
+        self.queries = []
+        self.closed = False
+
+    def acquire(self):
+        connection = SQLiteAsyncConnection(self)
+
+        class Acquire:
+            async def __aenter__(self):
+                return connection
+
+            async def __aexit__(self, exc_type, exc_value, traceback):
+                return False
+        return Acquire()
+
+    async def close(self):
+        self.closed = True
+        self.database.close()
+
+
+class AsyncStudentServiceTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(smf, 'student_cache', smf.StudentCache(max_size=100, ttl=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = smf.AsyncStudentService()
+        self.service.pool = self.pool = SQLiteAsyncPool()
+        self.addCleanup(self.pool.database.close)
+
+    def wait(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def add(self, last_name, first_name, patronymic='Петрович', age=20, course=1):
+        return self.wait(self.service.add_student(smf.Student(last_name, first_name, patronymic, age, course)))
+
+    def test_add_and_get(self):
+        student_id = self.add('Иванов', 'Иван', 'Иванович')
+        self.assertEqual(self.wait(self.service.get_student(student_id)),
+                         (student_id, 'Иванов', 'Иван', 'Иванович', 20, 1))
+        self.assertIsNone(self.wait(self.service.get_student(999)))
+        with self.assertRaises(ValueError):
+            self.add('Иванов', 'Иван', age=5)  # проверка та же, что при ручном вводе
+
+    def test_concurrent_reads(self):
+        ids = [self.add('Иванов', name) for name in ('Анна', 'Иван', 'Олег')]
+
+        async def read_all():
+            return await asyncio.gather(*(self.service.get_student(student_id) for student_id in ids * 3))
+        rows = self.wait(read_all())
+        self.assertEqual([row[0] for row in rows], ids * 3)
+
+    def test_cache_and_invalidation(self):
+        student_id = self.add('Иванов', 'Иван')
+        self.wait(self.service.get_student(student_id))
+        reads = len(self.pool.queries)
+        self.wait(self.service.get_student(student_id))
+        self.assertEqual(len(self.pool.queries), reads)  # из кэша
+        self.assertTrue(self.wait(self.service.edit_student(student_id, {'age': 21})))
+        self.assertEqual(self.wait(self.service.get_student(student_id))[4], 21)  # кэш сброшен после изменения
+
+    def test_list_pages(self):
+        for name in ('Анна', 'Борис', 'Вера', 'Глеб', 'Дарья'):
+            self.add('Иванов', name)
+        first = self.wait(self.service.list_students(page_size=2))
+        second = self.wait(self.service.list_students(after=smf.page_key(first[-1]), page_size=2))
+        self.assertEqual([row[2] for row in first + second], ['Анна', 'Борис', 'Вера', 'Глеб'])
+        self.assertEqual(self.wait(self.service.list_students(before=smf.page_key(second[0]), page_size=2)), first)
+
+    def test_versions(self):
+        student_id = self.add('Иванов', 'Иван')
+        self.assertEqual(self.wait(self.service.get_student_with_version(student_id))[1], 1)
+        with self.assertRaises(smf.StudentConflictError) as conflict:
+            self.wait(self.service.edit_student(student_id, {'age': 22}, expected_version=5))
+        self.assertEqual(conflict.exception.current_version, 1)
+        self.assertTrue(self.wait(self.service.delete_student(student_id, expected_version=1)))
+        self.assertFalse(self.wait(self.service.delete_student(student_id, expected_version=1)))
+        self.assertFalse(self.wait(self.service.edit_student(student_id, {'age': 22})))
+
+    def test_search_features_are_checked_once(self):
+        calls = []
+
+        async def fetch(query, params=()):
+            calls.append(query)
+            return [(False, False)] if query == smf.SEARCH_FEATURES_QUERY else []
+        self.service._fetch = fetch
+        self.assertEqual(self.wait(self.service.find_students('ванов')), ([], 'trigram'))
+        self.assertEqual(self.wait(self.service.find_students('Иванов Иван')), ([], 'trigram'))
+        self.assertEqual(calls.count(smf.SEARCH_FEATURES_QUERY), 1)
+
+
+class AsyncBridgeTest(unittest.TestCase):
+    def test_errors_become_database_errors(self):
+        class PostgresError(Exception):
+            pass
+        asyncpg = types.SimpleNamespace(PostgresError=PostgresError, InterfaceError=PostgresError)
+
+        class Service:
+            async def start(self):
+                return self
+
+            async def close(self):
+                pass
+
+        async def failing():
+            raise PostgresError('нет соединения')
+
+        async def answer():
+            return 42
+
+        with mock.patch.object(smf, '_import_asyncpg', return_value=asyncpg):
+            bridge = smf.AsyncBridge(Service())
+            try:
+                self.assertEqual(bridge.run(answer()), 42)
+                with self.assertRaises(smf.Error):
+                    bridge.run(failing())
+            finally:
+                bridge.close()
+        self.assertFalse(bridge.thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
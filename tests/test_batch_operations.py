@@ -0,0 +1,100 @@
+"""
+Тесты групповых операций без БД: условие отбора студентов и сброс кэша
+после изменений в чужой транзакции (параметр connection=).
+"""
+import unittest
+
+import student_management_functions as smf
+
+
+class FakeConnection:
+    """
+    Вместо соединения psycopg2: только commit и rollback.
+    """
+    def __init__(self):
+        self.commits = self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class StudentConnection(smf.StudentConnectionMixin, FakeConnection):
+    pass
+
+
+class BuildStudentFilterTest(unittest.TestCase):
+    def test_all_conditions(self):
+        where, params = smf.build_student_filter(ids=['3', 5], course='2', age_min=18, age_max='25')
+        self.assertEqual(where, 'id = ANY(%s) AND course = %s AND age >= %s AND age <= %s')
+        self.assertEqual(params, [[3, 5], 2, 18, 25])
+
+    def test_zero_is_a_condition(self):
+        self.assertEqual(smf.build_student_filter(age_min=0), ('age >= %s', [0]))
+
+    def test_empty_condition_is_forbidden(self):
+        # Иначе групповая операция задела бы всех студентов
+        for criteria in ({}, {'ids': []}, {'ids': None, 'course': None}):
+            with self.subTest(criteria=criteria):
+                with self.assertRaises(ValueError):
+                    smf.build_student_filter(**criteria)
+
+    def test_bad_values(self):
+        with self.assertRaises(ValueError):
+            smf.build_student_filter(ids=['1; DROP TABLE students'])
+        with self.assertRaises(ValueError):
+            smf.build_student_filter(course='второй')
+
+
+class InvalidateAfterCommitTest(unittest.TestCase):
+    def setUp(self):
+        smf.student_cache.invalidate(None)
+        self.addCleanup(smf.student_cache.invalidate, None)
+        for student_id in (1, 2, 3):
+            smf.student_cache.put(('id', student_id), (student_id, 'Иванов', 'Иван', None, 20, 1))
+        smf.student_cache.put(('page', None, None, 20), [])
+
+    def cached(self, key):
+        return smf.student_cache.get(key) is not smf._MISSING
+
+    def test_without_connection_invalidates_at_once(self):
+        smf.invalidate_students_after_commit(None, [1])
+        self.assertFalse(self.cached(('id', 1)))
+        self.assertTrue(self.cached(('id', 2)))
+
+    def test_waits_for_commit(self):
+        connection = StudentConnection()
+        smf.invalidate_students_after_commit(connection, [1])
+        smf.invalidate_students_after_commit(connection, [2])
+        # До commit другие потоки еще видят в БД старые данные - кэш не трогаю
+        self.assertTrue(self.cached(('id', 1)))
+        self.assertTrue(self.cached(('page', None, None, 20)))
+        connection.commit()
+        self.assertEqual(connection.commits, 1)
+        self.assertFalse(self.cached(('id', 1)))
+        self.assertFalse(self.cached(('id', 2)))
+        self.assertTrue(self.cached(('id', 3)))
+        self.assertFalse(self.cached(('page', None, None, 20)))
+        self.assertEqual(connection.changed_students, [])
+
+    def test_rollback_keeps_cache(self):
+        connection = StudentConnection()
+        smf.invalidate_students_after_commit(connection, [1])
+        connection.rollback()
+        connection.commit()  # следующая транзакция ничего не меняла
+        self.assertTrue(self.cached(('id', 1)))
+        self.assertTrue(self.cached(('page', None, None, 20)))
+
+    def test_unknown_students(self):
+        connection = StudentConnection()
+        smf.invalidate_students_after_commit(connection, [1])
+        smf.invalidate_students_after_commit(connection, None)
+        connection.commit()
+        for student_id in (1, 2, 3):
+            self.assertFalse(self.cached(('id', student_id)))
+
+
+if __name__ == '__main__':
+    unittest.main()
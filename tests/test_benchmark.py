@@ -0,0 +1,110 @@
+"""
+Тесты вспомогательных функций замеров (benchmark_students.py) без БД:
+синтетические студенты, перцентили, итоги и сравнение с прошлым прогоном.
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import benchmark_students as bench
+import student_management_functions as smf
+
+
+class RandomStudentTest(unittest.TestCase):
+    def test_rows_pass_validation(self):
+        # Синтетические студенты проходят ту же проверку, что ручной ввод и импорт
+        rng = random.Random(1)
+        for _ in range(2000):
+            row = bench.random_student_row(rng)
+            record = dict(zip(('last_name', 'first_name', 'patronymic', 'age', 'course'), row))
+            self.assertEqual(smf.validate_student_record(record), (row, None))
+
+    def test_same_seed_same_rows(self):
+        first = [bench.random_student_row(random.Random(42)) for _ in range(3)]
+        self.assertEqual(first, [bench.random_student_row(random.Random(42)) for _ in range(3)])
+
+
+class SummaryTest(unittest.TestCase):
+    def test_percentile(self):
+        values = [float(number) for number in range(1, 101)]
+        self.assertEqual(bench.percentile(values, 0.5), 51.0)
+        self.assertEqual(bench.percentile(values, 0.99), 99.0)
+        self.assertEqual(bench.percentile(values, 1.0), 100.0)
+        self.assertEqual(bench.percentile([], 0.5), 0.0)
+
+    def test_summarize(self):
+        summary = bench.summarize([0.003, 0.001, 0.002], 0.5)
+        self.assertEqual(summary['ops'], 3)
+        self.assertAlmostEqual(summary['p50_ms'], 2.0)
+        self.assertAlmostEqual(summary['max_ms'], 3.0)
+        self.assertAlmostEqual(summary['mean_ms'], 2.0)
+        self.assertAlmostEqual(summary['ops_per_sec'], 6.0)
+        self.assertNotIn('rows', summary)
+        self.assertAlmostEqual(bench.summarize([2.0], 2.0, rows=1000)['rows_per_sec'], 500.0)
+        self.assertEqual(bench.summarize([], 0)['ops_per_sec'], 0.0)
+
+    def test_measure(self):
+        calls = []
+        latencies, total = bench.measure(calls.append, [1, 2, 3])
+        self.assertEqual(calls, [1, 2, 3])
+        self.assertEqual(len(latencies), 3)
+        self.assertGreaterEqual(total, sum(latencies))
+
+
+class CompareResultsTest(unittest.TestCase):
+    def test_slower_operations_are_marked(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as file:
+            json.dump({'results': {'10000': {'insert': {'p50_ms': 1.0}, 'update': {'p50_ms': 0.0}}}}, file)
+        self.addCleanup(os.remove, file.name)
+        results = {'10000': {'insert': {'p50_ms': 1.5}, 'update': {'p50_ms': 1.0}, 'delete': {'p50_ms': 1.0}},
+                   '100000': {'insert': {'p50_ms': 1.0}}}
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            bench.compare_results(file.name, results)
+        lines = [line for line in output.getvalue().splitlines() if line.startswith('  ')]
+        self.assertEqual(len(lines), 1)  # без прошлого результата (или с нулевым) сравнивать не с чем
+        self.assertIn('insert', lines[0])
+        self.assertIn('x1.50', lines[0])
+        self.assertIn('медленнее', lines[0])
+
+
+class BenchSizeTest(unittest.TestCase):
+    def run_bench(self, table_before, first_seeded_id):
+        """
+        bench_size с подмененными функциями БД. Возвращает ID, которые читались по одному.
+        """
+        info = iter([table_before, (table_before[0] + 50, table_before[1] + 50)])
+        read_ids = []
+        with mock.patch.object(bench, 'table_info', lambda: next(info)), \
+                mock.patch.object(bench, 'seed_students'), \
+                mock.patch.object(bench.sm, 'insert_student', side_effect=range(10 ** 6, 10 ** 7)), \
+                mock.patch.object(bench.sm, 'get_student_by_id',
+                                  side_effect=lambda student_id, fresh: read_ids.append(student_id)), \
+                mock.patch.object(bench.sm, 'find_students_by_name'), \
+                mock.patch.object(bench.sm, 'update_student'), \
+                mock.patch.object(bench.sm, 'delete_student_by_id'), \
+                mock.patch.object(bench.sm, 'iter_all_students', return_value=iter([()] * 7)), \
+                contextlib.redirect_stdout(io.StringIO()):
+            results = bench.bench_size(100, 20, random.Random(3), first_seeded_id)
+        self.assertEqual(set(results), {'insert', 'get_by_id', 'search_substring', 'update', 'delete',
+                                        'full_listing'})
+        self.assertEqual(results['full_listing']['rows'], 7)
+        return read_ids
+
+    def test_reads_seeded_students(self):
+        read_ids = self.run_bench((50, 500), first_seeded_id=501)  # добавлено 50 студентов: ID 501-550
+        self.assertTrue(all(501 <= student_id <= 550 for student_id in read_ids))
+
+    def test_table_already_large_enough(self):
+        # Добавлять никого не пришлось: ID берутся из всей таблицы, а не из пустого диапазона
+        read_ids = self.run_bench((1000, 1200), first_seeded_id=1201)
+        self.assertEqual(len(read_ids), 20)
+        self.assertTrue(all(1 <= student_id <= 1200 for student_id in read_ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Тесты кэша студентов (StudentCache): LRU-вытеснение, время жизни записей,
+сброс после изменений и уведомления для других копий программы.
+"""
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+IVANOV = (1, 'Иванов', 'Иван', 'Иванович', 20, 1)
+
+
+class Clock:
+    """
+    Подменяет time.monotonic: время идет только по команде.
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StudentCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(smf.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = smf.StudentCache(max_size=3, ttl=10)
+
+    def test_get_and_put(self):
+        self.assertIs(self.cache.get(('id', 1)), smf._MISSING)
+        self.cache.put(('id', 1), IVANOV)
+        self.cache.put(('id', 2), None)  # "студента нет" - тоже ответ, и он кэшируется
+        self.assertEqual(self.cache.get(('id', 1)), IVANOV)
+        self.assertIsNone(self.cache.get(('id', 2)))
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (2, 1, 2))
+
+    def test_ttl(self):
+        self.cache.put(('id', 1), IVANOV)
+        self.clock.now += 10
+        self.assertEqual(self.cache.get(('id', 1)), IVANOV)
+        self.clock.now += 0.001
+        self.assertIs(self.cache.get(('id', 1)), smf._MISSING)
+        self.assertEqual(self.cache.get_stats()['expirations'], 1)
+        self.assertEqual(self.cache.get_stats()['size'], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        for student_id in (1, 2, 3):
+            self.cache.put(('id', student_id), IVANOV)
+        self.cache.get(('id', 1))  # 1 теперь "свежее" 2
+        self.cache.put(('id', 4), IVANOV)
+        self.assertIs(self.cache.get(('id', 2)), smf._MISSING)
+        for student_id in (1, 3, 4):
+            self.assertIsNot(self.cache.get(('id', student_id)), smf._MISSING)
+        self.assertEqual(self.cache.get_stats()['evictions'], 1)
+
+    def test_lists_are_evicted_first(self):
+        self.cache.put(('page', None, None, 20), [IVANOV])
+        self.cache.put(('id', 1), IVANOV)
+        self.cache.put(('id', 2), IVANOV)
+        self.cache.put(('id', 3), IVANOV)
+        self.assertIs(self.cache.get(('page', None, None, 20)), smf._MISSING)
+        self.assertEqual(self.cache.get(('id', 1)), IVANOV)
+
+    def test_invalidate_students(self):
+        self.cache.put(('id', 1), IVANOV)
+        self.cache.put(('id', 2), IVANOV)
+        self.cache.put(('search', 'иван', None, 100), [IVANOV])
+        self.cache.invalidate(['1'])
+        self.assertIs(self.cache.get(('id', 1)), smf._MISSING)
+        self.assertEqual(self.cache.get(('id', 2)), IVANOV)
+        # В какие списки попадал студент, не известно - сбрасываются все
+        self.assertIs(self.cache.get(('search', 'иван', None, 100)), smf._MISSING)
+        self.cache.invalidate(None)
+        self.assertEqual(self.cache.get_stats()['size'], 0)
+
+    def test_disabled(self):
+        cache = smf.StudentCache(max_size=0, ttl=10)
+        cache.put(('id', 1), IVANOV)
+        self.assertIs(cache.get(('id', 1)), smf._MISSING)
+
+
+class CachedReadTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(smf, 'student_cache', smf.StudentCache(max_size=10, ttl=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_load_once(self):
+        load = mock.Mock(return_value=IVANOV)
+        self.assertEqual(smf.cached_read(('id', 1), load), IVANOV)
+        self.assertEqual(smf.cached_read(('id', 1), load), IVANOV)
+        load.assert_called_once_with()
+
+    def test_get_student_by_id(self):
+        with mock.patch.object(smf, 'db_transaction') as transaction, \
+                mock.patch.object(smf, 'fetch_student_by_id', return_value=IVANOV) as fetch:
+            self.assertEqual(smf.get_student_by_id('1'), IVANOV)
+            self.assertEqual(smf.get_student_by_id(1), IVANOV)
+            self.assertEqual(fetch.call_count, 1)
+            # fresh=True (перед изменением) - всегда из БД, с основного сервера
+            smf.get_student_by_id(1, fresh=True)
+            self.assertEqual(fetch.call_count, 2)
+            transaction.assert_called_with(readonly=False)
+            # Соединение вызывающего - только из БД, кэш не трогается
+            connection = object()
+            smf.get_student_by_id(1, connection=connection)
+            fetch.assert_called_with(connection, 1)
+        self.assertEqual(smf.student_cache.get_stats()['hits'], 1)
+
+
+class CacheNotificationTest(unittest.TestCase):
+    def test_payload(self):
+        self.assertEqual(smf.cache_notification_payload([1, 2, 3]), '1,2,3')
+        self.assertEqual(smf.cache_notification_payload(None), '*')
+        self.assertEqual(smf.cache_notification_payload(range(1, 5000)), '*')  # не влезает в NOTIFY
+
+    def test_handle_notification(self):
+        with mock.patch.object(smf, 'invalidate_students') as invalidate:
+            smf._handle_cache_notification(smf.cache_notification_payload([1, 22]))
+            self.assertEqual(list(invalidate.call_args[0][0]), [1, 22])
+            for payload in ('*', ''):
+                smf._handle_cache_notification(payload)
+                invalidate.assert_called_with(None)
+
+    def test_announce_only_when_enabled(self):
+        cursor = mock.Mock()
+        with mock.patch.object(smf, 'STUDENT_CACHE_NOTIFY', False):
+            smf.announce_students_changed(cursor, [1])
+        cursor.execute.assert_not_called()
+        with mock.patch.object(smf, 'STUDENT_CACHE_NOTIFY', True):
+            smf.announce_students_changed(cursor, [1])
+        cursor.execute.assert_called_once_with('SELECT pg_notify(%s, %s);', (smf.STUDENT_CACHE_CHANNEL, '1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Тесты журнала изменений (CDC): позиция "txid:change_id" и чтение журнала пачками.
+Запрос журнала выполняет SQLite; txid_snapshot_xmin(txid_current_snapshot()) -
+самая старая еще идущая транзакция - задается в тесте.
+"""
+import contextlib
+import json
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+import sqlite3
+
+import student_management_functions as smf
+
+
+SNAPSHOT_XMIN = 'txid_snapshot_xmin(txid_current_snapshot())'
+
+
+class ChangesCursor:
+    def __init__(self, journal):
+        self.journal = journal
+        self.rows = []
+
+    def execute(self, query, params=()):
+        query = query.replace(SNAPSHOT_XMIN, str(self.journal.xmin)).replace('%s', '?')
+        self.rows = self.journal.database.execute(query, params).fetchall()
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        # Как psycopg2: время - datetime, JSONB - словарь
+        return [(txid, change_id, operation, student_id, datetime.fromisoformat(changed_at),
+                 json.loads(data) if data is not None else None)
+                for txid, change_id, operation, student_id, changed_at, data in self.rows]
+
+    def close(self):
+        pass
+
+
+class Journal:
+    """
+    Журнал student_changes в SQLite и "идущие" транзакции.
+    """
+    def __init__(self):
+        self.database = sqlite3.connect(':memory:')
+        self.database.execute('CREATE TABLE student_changes (change_id INTEGER PRIMARY KEY, txid INTEGER, '
+                              'operation TEXT, student_id INTEGER, changed_at TEXT, data TEXT);')
+        self.running = set()
+        self.next_txid = 100
+
+    @property
+    def xmin(self):
+        return min(self.running) if self.running else self.next_txid
+
+    def begin(self):
+        txid = self.next_txid
+        self.next_txid += 1
+        self.running.add(txid)
+        return txid
+
+    def write(self, txid, operation, student_id, age=20):
+        data = None if operation == 'delete' else json.dumps({'id': student_id, 'age': age})
+        self.database.execute('INSERT INTO student_changes (txid, operation, student_id, changed_at, data) '
+                              'VALUES (?, ?, ?, ?, ?);',
+                              (txid, operation, student_id, datetime.now(timezone.utc).isoformat(), data))
+
+    def commit(self, txid):
+        self.running.discard(txid)
+
+    def cursor(self):
+        return ChangesCursor(self)
+
+
+class ChangeCursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(smf.parse_change_cursor(smf.format_change_cursor(123, 45)), (123, 45))
+        self.assertEqual(smf.parse_change_cursor(None), (0, 0))
+        self.assertEqual(smf.parse_change_cursor(''), (0, 0))
+
+    def test_bad_position(self):
+        for position in ('abc', '1', '1:2:3', '1:x', 'now:1'):
+            with self.subTest(position=position), self.assertRaises(ValueError):
+                smf.parse_change_cursor(position)
+
+
+class FetchChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.journal = Journal()
+        self.addCleanup(self.journal.database.close)
+
+    def read_all(self, after, limit=2):
+        changes = []
+        while True:
+            batch, after = smf.fetch_student_changes(self.journal, after, limit)
+            changes.extend(batch)
+            if len(batch) < limit:
+                return changes, after
+
+    def test_change_json(self):
+        txid = self.journal.begin()
+        self.journal.write(txid, 'insert', 1)
+        self.journal.write(txid, 'delete', 1)
+        self.journal.commit(txid)
+        changes, after = self.read_all(None)
+        self.assertEqual([(change['op'], change['student_id'], change['student']) for change in changes],
+                         [('insert', 1, {'id': 1, 'age': 20}), ('delete', 1, None)])
+        self.assertEqual(after, changes[-1]['cursor'])
+        datetime.fromisoformat(changes[0]['changed_at'])
+        # Новых изменений нет - позиция не меняется
+        self.assertEqual(smf.fetch_student_changes(self.journal, after), ([], after))
+
+    def test_late_commit_is_not_skipped(self):
+        # Транзакция 100 началась раньше 101, но подтверждена позже: ее изменения
+        # нельзя пропустить, хотя номера change_id у них больше
+        slow, fast = self.journal.begin(), self.journal.begin()
+        self.journal.write(fast, 'insert', 1)
+        self.journal.commit(fast)
+        self.journal.write(slow, 'insert', 2)
+        changes, after = self.read_all(None)
+        self.assertEqual(changes, [])  # пока идет транзакция 100, и 101 не видна
+        self.journal.commit(slow)
+        changes, after = self.read_all(after)
+        self.assertEqual([change['student_id'] for change in changes], [2, 1])
+        self.assertEqual(after, changes[-1]['cursor'])
+
+    def test_batches_cover_journal(self):
+        expected = []
+        for number in range(7):
+            txid = self.journal.begin()
+            for student_id in range(number % 3 + 1):
+                self.journal.write(txid, 'update', student_id, age=number)
+                expected.append((txid, student_id))
+            self.journal.commit(txid)
+        for limit in (1, 2, 5, 100):
+            with self.subTest(limit=limit):
+                changes, after = self.read_all(None, limit)
+                self.assertEqual([(int(change['cursor'].split(':')[0]), change['student_id']) for change in changes],
+                                 expected)
+
+    def test_now_skips_history(self):
+        txid = self.journal.begin()
+        self.journal.write(txid, 'insert', 1)
+        self.journal.commit(txid)
+        changes, after = smf.fetch_student_changes(self.journal, 'now')
+        self.assertEqual(changes, [])
+        self.assertEqual(after, f'{self.journal.xmin}:0')
+        txid = self.journal.begin()
+        self.journal.write(txid, 'insert', 2)
+        self.journal.commit(txid)
+        self.assertEqual([change['student_id'] for change in self.read_all(after)[0]], [2])
+
+    def test_iter_changes(self):
+        for student_id in range(5):
+            txid = self.journal.begin()
+            self.journal.write(txid, 'insert', student_id)
+            self.journal.commit(txid)
+
+        @contextlib.contextmanager
+        def transaction(connection=None, readonly=False):
+            yield self.journal
+
+        with mock.patch.object(smf, 'db_transaction', transaction):
+            changes = list(smf.iter_student_changes(batch_size=2))
+        self.assertEqual([change['student_id'] for change in changes], list(range(5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+"""
+Тесты командной строки без меню: разбор подкоманд и строк сценария,
+выполнение сценария одной транзакцией (SAVEPOINT, --keep-going, --dry-run)
+и JSON-вывод подкоманд. Операции с БД подменены.
+"""
+import contextlib
+import io
+import json
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+IVANOV = (1, 'Иванов', 'Иван', 'Иванович', 20, 1)
+
+
+class ParseArgsTest(unittest.TestCase):
+    def test_subcommands(self):
+        args = smf.parse_args(['add', 'Иванов', 'Иван', 'Иванович', '20', '1'])
+        self.assertEqual((args.command, args.last_name, args.age), ('add', 'Иванов', '20'))
+        args = smf.parse_args(['delete', '3', '4'])
+        self.assertEqual((args.ids, args.expected_version), ([3, 4], None))
+        args = smf.parse_args(['edit', '3', '--age', '21', '--version', '2'])
+        self.assertEqual((args.id, args.age, args.course, args.expected_version), (3, '21', None, 2))
+        args = smf.parse_args(['export', 'students.csv', '--id-from', '10', '--resume'])
+        self.assertEqual((args.file, args.id_from, args.id_to, args.resume), ('students.csv', 10, None, True))
+        args = smf.parse_args(['--fast', 'batch', '--keep-going'])
+        self.assertEqual((args.fast, args.command, args.script, args.keep_going), (True, 'batch', None, True))
+        self.assertIsNone(smf.parse_args([]).command)
+
+    def test_find_mode_choices(self):
+        self.assertEqual(smf.parse_args(['find', 'Иван', '--mode', 'fuzzy']).mode, 'fuzzy')
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            smf.parse_args(['find', 'Иван', '--mode', 'foo'])
+
+
+class ParseScriptLineTest(unittest.TestCase):
+    def test_shell_form(self):
+        args = smf.parse_script_line('add "Иванов" Иван Иванович 20 1')
+        self.assertEqual((args.command, args.last_name, args.course), ('add', 'Иванов', '1'))
+        self.assertEqual(smf.parse_script_line('delete 5 6').ids, [5, 6])
+
+    def test_json_form(self):
+        args = smf.parse_script_line('{"op": "add", "фамилия": "Иванов", "имя": "Иван"}')
+        self.assertEqual(args.record, {'фамилия': 'Иванов', 'имя': 'Иван'})
+        args = smf.parse_script_line('{"op": "EDIT", "id": 5, "version": 2, "Возраст": 21}')
+        self.assertEqual((args.command, args.id, args.expected_version, args.changes), ('edit', 5, 2, {'age': 21}))
+        self.assertEqual(smf.parse_script_line('{"op": "delete", "id": 7}').ids, [7])
+        self.assertEqual(smf.parse_script_line('{"op": "find", "q": "Иван"}').term, 'Иван')
+
+    def test_errors_do_not_exit(self):
+        # Ошибка в строке сценария - ValueError, а не выход из программы
+        for line in ('drop table', 'get abc', 'add Иванов', '{"op": "drop"}', '{oops', '[1, 2]',
+                     '{"op": "edit", "id": 1, "email": "x"}'):
+            with self.subTest(line=line), contextlib.redirect_stderr(io.StringIO()):
+                with self.assertRaises(ValueError):
+                    smf.parse_script_line(line)
+
+    def test_script_lines(self):
+        script = io.StringIO('# сценарий\n\nget 1\n  drop  \n{"op": "list"}\n')
+        operations = list(smf.iter_script_operations(script))
+        self.assertEqual([number for number, args in operations], [3, 4, 5])
+        self.assertEqual(operations[0][1].command, 'get')
+        self.assertIsInstance(operations[1][1], ValueError)
+
+    def test_student_id(self):
+        self.assertEqual(smf._student_id(' 12 '), 12)
+        for value in ('abc', '1.5', True, None, ''):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                smf._student_id(value)
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, statement, params=None):
+        self.log.append(statement)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+    def rollback(self):
+        self.log.append('ROLLBACK')
+
+
+class ScriptTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = FakeConnection()
+
+        @contextlib.contextmanager
+        def transaction(connection=None, readonly=False):
+            try:
+                yield self.connection
+                self.connection.commit()
+            except BaseException:
+                self.connection.rollback()
+                raise
+
+        patcher = mock.patch.object(smf, 'db_transaction', transaction)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_script(self, text, **options):
+        def operation(connection, args):
+            if args.command == 'get' and args.id == 99:
+                raise ValueError('Студент с ID 99 не найден.')
+            if args.command == 'edit':
+                raise smf.StudentConflictError(args.id, args.expected_version, IVANOV, 5)
+            return {'student': smf.student_to_json(IVANOV)}
+
+        output = io.StringIO()
+        with mock.patch.object(smf, 'run_student_operation', side_effect=operation):
+            ok = smf.run_student_operations(smf.iter_script_operations(io.StringIO(text)), output, **options)
+        return ok, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_all_ok(self):
+        ok, lines = self.run_script('get 1\nget 2\n')
+        self.assertTrue(ok)
+        self.assertEqual([(line['line'], line['op'], line['ok']) for line in lines[:2]], [(1, 'get', True), (2, 'get', True)])
+        self.assertEqual(lines[-1]['summary']['operations'], 2)
+        self.assertTrue(lines[-1]['summary']['committed'])
+        self.assertEqual(self.connection.log, ['COMMIT'])
+
+    def test_first_error_rolls_back_everything(self):
+        ok, lines = self.run_script('get 1\nget 99\nget 2\n')
+        self.assertFalse(ok)
+        self.assertEqual(lines[1], {'line': 2, 'op': 'get', 'ok': False, 'error': 'Студент с ID 99 не найден.'})
+        self.assertEqual(len(lines), 3)  # третья операция не выполнялась
+        self.assertEqual(lines[-1]['summary']['failed'], 1)
+        self.assertFalse(lines[-1]['summary']['committed'])
+        self.assertEqual(self.connection.log, ['ROLLBACK'])
+
+    def test_keep_going(self):
+        ok, lines = self.run_script('get 1\nget 99\nbad line\nedit 1 --version 3 --age 21\nget 2\n', keep_going=True)
+        self.assertFalse(ok)
+        self.assertEqual([line.get('ok') for line in lines[:-1]], [True, False, False, False, True])
+        self.assertEqual(lines[3]['conflict'], {'student': smf.student_to_json(IVANOV), 'version': 5})
+        self.assertEqual(lines[-1]['summary']['failed'], 3)
+        self.assertTrue(lines[-1]['summary']['committed'])
+        # Ошибочные операции откатываются до своей точки сохранения, остальное подтверждается
+        self.assertEqual(self.connection.log, [
+            'SAVEPOINT script_operation;', 'RELEASE SAVEPOINT script_operation;',
+            'SAVEPOINT script_operation;', 'ROLLBACK TO SAVEPOINT script_operation;',
+            'SAVEPOINT script_operation;', 'ROLLBACK TO SAVEPOINT script_operation;',
+            'SAVEPOINT script_operation;', 'RELEASE SAVEPOINT script_operation;',
+            'COMMIT',
+        ])
+
+    def test_dry_run(self):
+        ok, lines = self.run_script('get 1\n', dry_run=True)
+        self.assertTrue(ok)
+        self.assertFalse(lines[-1]['summary']['committed'])
+        self.assertEqual(self.connection.log[0], 'ROLLBACK')
+
+
+class RunStudentOperationTest(unittest.TestCase):
+    def test_add_validates_like_import(self):
+        with mock.patch.object(smf, 'insert_student') as insert:
+            with self.assertRaises(ValueError):
+                smf.run_student_operation('соединение', smf.parse_script_line('add Иванов Иван Иванович 5 1'))
+            insert.assert_not_called()
+
+            def set_id(student, connection):
+                student.id = 7
+            insert.side_effect = set_id
+            result = smf.run_student_operation('соединение', smf.parse_script_line('add иванов иван иванович 20 1'))
+        self.assertEqual(result, {'student': smf.student_to_json((7, 'Иванов', 'Иван', 'Иванович', 20, 1))})
+        self.assertEqual(insert.call_args.kwargs, {'connection': 'соединение'})
+
+    def test_delete(self):
+        with mock.patch.object(smf, 'delete_student_by_id', side_effect=lambda student_id, **kwargs: student_id == 1):
+            result = smf.run_student_operation(None, smf.parse_script_line('delete 1 2'))
+            self.assertEqual(result, {'deleted': [1], 'not_found': [2]})
+            with self.assertRaises(ValueError):
+                smf.run_student_operation(None, smf.parse_script_line('delete 1 2 --version 3'))
+
+    def test_get_missing(self):
+        with mock.patch.object(smf, 'fetch_student_with_version', return_value=(None, None)):
+            with self.assertRaises(ValueError):
+                smf.run_student_operation(None, smf.parse_script_line('get 5'))
+
+
+class RunCliCommandTest(unittest.TestCase):
+    def test_output_is_json_only(self):
+        @contextlib.contextmanager
+        def transaction(connection=None, readonly=False):
+            print('сообщение функции')  # должно уйти в stderr, а не в JSON
+            yield None
+
+        with mock.patch.object(smf, 'db_transaction', transaction), \
+                mock.patch.object(smf, 'run_student_operation', return_value={'student': smf.student_to_json(IVANOV)}), \
+                contextlib.redirect_stdout(io.StringIO()) as output, \
+                contextlib.redirect_stderr(io.StringIO()) as errors:
+            code = smf.run_cli_command(smf.parse_args(['get', '1']))
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output.getvalue()), {'op': 'get', 'ok': True, 'student': smf.student_to_json(IVANOV)})
+        self.assertIn('сообщение функции', errors.getvalue())
+
+    def test_error_exit_code(self):
+        with mock.patch.object(smf, 'db_transaction', side_effect=smf.Error('нет соединения')), \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            code = smf.run_cli_command(smf.parse_args(['get', '1']))
+        self.assertEqual(code, 1)
+        self.assertEqual(json.loads(output.getvalue()), {'op': 'get', 'ok': False, 'error': 'нет соединения'})
+
+
+if __name__ == '__main__':
+    unittest.main()
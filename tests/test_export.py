@@ -0,0 +1,172 @@
+"""
+Тесты экспорта студентов в файл и продолжения прерванного экспорта:
+запросы экспорта выполняет SQLite, COPY ... TO STDOUT для CSV изображает курсор-подделка.
+Прерванный и продолженный экспорт должен дать тот же файл, что и экспорт без перерыва.
+"""
+import contextlib
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+ROWS = [(student_id, 'Иванов' if student_id % 3 else 'Петров', 'Иван', None if student_id % 4 == 0 else 'Ильич',
+         17 + student_id % 10, 1 + student_id % 6)
+        for student_id in list(range(1, 40)) + [55, 56, 90]]
+
+BOUNDARY_QUERY = 'SELECT max(id), count(*)'
+
+
+class ExportCursor:
+    """
+    Курсор в стиле psycopg2 поверх SQLite. fail_after - после скольких
+    запросов границы пачки "оборвать соединение" (None - не обрывать).
+    """
+    def __init__(self, database, fail_after=None):
+        self.database = database
+        self.fail_after = fail_after
+        self.rows = []
+
+    def execute(self, query, params=()):
+        if query.startswith('SET TRANSACTION'):
+            return
+        if query.startswith(BOUNDARY_QUERY):
+            if self.fail_after == 0:
+                raise smf.Error('соединение с сервером потеряно')
+            if self.fail_after is not None:
+                self.fail_after -= 1
+        self.rows = self.database.execute(query.replace('%s', '?'), params).fetchall()
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def mogrify(self, query, params):
+        return (query % tuple(int(param) for param in params)).encode('utf-8')
+
+    def copy_expert(self, statement, file):
+        match = re.fullmatch(r'COPY \((.*)\) TO STDOUT WITH \(FORMAT csv, HEADER (true|false)\)', statement)
+        cursor = self.database.execute(match.group(1))
+        writer = csv.writer(file, lineterminator='\n')
+        if match.group(2) == 'true':
+            writer.writerow([column[0] for column in cursor.description])
+        writer.writerows(cursor)
+
+    def close(self):
+        pass
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.database = sqlite3.connect(':memory:')
+        self.addCleanup(self.database.close)
+        self.database.execute('CREATE TABLE students (id INTEGER PRIMARY KEY, last_name TEXT, first_name TEXT, '
+                              'patronymic TEXT, age INTEGER, course INTEGER);')
+        self.database.executemany('INSERT INTO students VALUES (?, ?, ?, ?, ?, ?);', ROWS)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def export(self, name, fail_after=None, **kwargs):
+        """
+        Экспорт в файл name. Возвращает итог export_students или None, если экспорт "оборвался".
+        """
+        cursor = ExportCursor(self.database, fail_after)
+
+        @contextlib.contextmanager
+        def transaction(readonly=False):
+            yield mock.Mock(cursor=lambda: cursor)
+
+        with mock.patch.object(smf, 'db_transaction', transaction), \
+                contextlib.redirect_stdout(io.StringIO()):
+            try:
+                return smf.export_students(os.path.join(self.directory, name), batch_size=7, **kwargs)
+            except smf.Error:
+                return None
+
+    def read(self, name):
+        with open(os.path.join(self.directory, name), encoding='utf-8') as file:
+            return file.read()
+
+    def progress(self, name):
+        return smf._read_export_progress(os.path.join(self.directory, name + '.progress'))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            smf.export_students(os.path.join(self.directory, 'students.xlsx'))
+
+    def test_jsonl(self):
+        summary = self.export('students.jsonl')
+        self.assertEqual(summary, {'exported': len(ROWS), 'last_id': 90})
+        records = [json.loads(line) for line in self.read('students.jsonl').splitlines()]
+        self.assertEqual([tuple(record.values()) for record in records], ROWS)
+        self.assertEqual(list(records[0]), [name for column, name in smf.EXPORT_FIELD_NAMES])
+        self.assertIsNone(self.progress('students.jsonl'))  # экспорт закончен - файла прогресса нет
+
+    def test_id_range(self):
+        summary = self.export('students.jsonl', id_from=10, id_to=55)
+        self.assertEqual(summary, {'exported': 31, 'last_id': 55})
+        ids = [json.loads(line)['id'] for line in self.read('students.jsonl').splitlines()]
+        self.assertEqual(ids, [row[0] for row in ROWS if 10 <= row[0] <= 55])
+
+    def test_resume(self):
+        for name in ('students.csv', 'students.jsonl'):
+            with self.subTest(name=name):
+                self.export('full_' + name)
+                self.assertIsNone(self.export(name, fail_after=3))  # обрыв после трех пачек
+                progress = self.progress(name)
+                self.assertEqual((progress['last_id'], progress['exported']), (21, 21))
+                self.assertEqual(progress['position'], os.path.getsize(os.path.join(self.directory, name)))
+                # Недописанный хвост: пачка, которая не успела записаться целиком
+                with open(os.path.join(self.directory, name), 'a', encoding='utf-8') as file:
+                    file.write('22,Иванов,Ив')
+                summary = self.export(name, resume=True)
+                self.assertEqual(summary, {'exported': len(ROWS) - 21, 'last_id': 90})
+                self.assertEqual(self.read(name), self.read('full_' + name))
+                self.assertIsNone(self.progress(name))
+
+    def test_resume_without_progress(self):
+        # Продолжать нечего - обычный экспорт с начала
+        self.assertEqual(self.export('students.csv', resume=True)['exported'], len(ROWS))
+        self.assertEqual(self.read('students.csv').splitlines()[0], ','.join(
+            name for column, name in smf.EXPORT_FIELD_NAMES))
+
+    def test_progress_file_is_replaced_whole(self):
+        path = os.path.join(self.directory, 'students.csv.progress')
+        smf._write_export_progress(path, {'last_id': 5})
+        smf._write_export_progress(path, {'last_id': 12})
+        self.assertEqual(smf._read_export_progress(path), {'last_id': 12})
+        self.assertFalse(os.path.exists(path + '.tmp'))
+
+    @unittest.skipIf(pyarrow is None, 'нужна библиотека pyarrow')
+    def test_parquet_resume(self):
+        self.assertIsNone(self.export('students.parquet', fail_after=2))
+        self.assertEqual(self.progress('students.parquet')['position'], 14)  # в Parquet позиция - число строк
+        self.export('students.parquet', resume=True)
+        # Дописывать Parquet-файл нельзя: продолжение - в соседнем файле, начиная со следующего ID
+        first = pyarrow.parquet.read_table(os.path.join(self.directory, 'students.parquet'))
+        rest = pyarrow.parquet.read_table(os.path.join(self.directory, 'students.from_15.parquet'))
+        self.assertEqual(first.num_rows, 14)
+        rows = [tuple(record.values()) for table in (first, rest) for record in table.to_pylist()]
+        self.assertEqual(rows, ROWS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+"""
+Тесты поиска с опечатками: расстояние Левенштейна и индекс FuzzyNameIndex в памяти
+(индекс наполняется здесь же через add/remove, без БД).
+"""
+import random
+import threading
+import time
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+def make_index(rows):
+    index = smf.FuzzyNameIndex()
+    for row in rows:
+        index.add(row)
+    return index
+
+
+def brute_force_search(students, term):
+    """
+    Тот же поиск перебором всех студентов: {ID: число опечаток}.
+    """
+    found = {}
+    for student_id, row in students.items():
+        total = 0
+        for word in term.split():
+            distances = [smf.levenshtein_distance(word.lower(), name.lower()) for name in row[1:4] if name]
+            distance = min(distances)
+            if distance > smf.fuzzy_max_distance(word):
+                break
+            total += distance
+        else:
+            found[student_id] = total
+    return found
+
+
+class LevenshteinDistanceTest(unittest.TestCase):
+    def test_distance(self):
+        for a, b, distance in (('', '', 0), ('иванов', 'иванов', 0), ('иванов', 'ивонов', 1),
+                               ('иванов', 'иванв', 1), ('иванов', 'иваноов', 1), ('иванов', 'виванов', 1),
+                               ('kitten', 'sitting', 3), ('', 'abc', 3)):
+            with self.subTest(a=a, b=b):
+                self.assertEqual(smf.levenshtein_distance(a, b), distance)
+                self.assertEqual(smf.levenshtein_distance(b, a), distance)
+
+    def test_max_distance_stops_early(self):
+        self.assertEqual(smf.levenshtein_distance('kitten', 'sitting', 1), 2)
+        self.assertEqual(smf.levenshtein_distance('a', 'abcdef', 2), 3)
+        self.assertEqual(smf.levenshtein_distance('иванов', 'ивонов', 1), 1)
+
+    def test_fuzzy_max_distance(self):
+        self.assertEqual(smf.fuzzy_max_distance('Иван'), 1)
+        self.assertEqual(smf.fuzzy_max_distance('Иванов'), min(2, smf.SEARCH_FUZZY_MAX_DISTANCE))
+
+
+class FuzzyNameIndexTest(unittest.TestCase):
+    ROWS = [
+        (1, 'Иванов', 'Иван', 'Иванович', 20, 1),
+        (2, 'Ивонов', 'Петр', 'Петрович', 21, 2),
+        (3, 'Иваненко', 'Анна', None, None, None),
+        (4, 'Петров', 'Иван', 'Ильич', 19, 3),
+        (5, 'Абрамов', 'Иван', 'Иванович', 22, 4),
+        (10, 'Смирнов', 'Ольга', 'Петровна', 18, 1),
+    ]
+
+    def test_row_round_trip(self):
+        index = make_index(self.ROWS)
+        self.assertEqual(len(index), len(self.ROWS))
+        for row in self.ROWS:
+            self.assertEqual(index.row(row[0]), row)
+
+    def test_exact_matches_first(self):
+        index = make_index(self.ROWS)
+        results = index.search('Иванов')
+        # Ивонов - одна опечатка, Иванович и Иван - по две (одинаково - по алфавиту фамилий)
+        self.assertEqual([(row[0], distance) for row, distance in results], [(1, 0), (2, 1), (5, 2), (4, 2)])
+        self.assertEqual(results[0][0], self.ROWS[0])
+
+    def test_ties_sorted_by_name(self):
+        # Одинаковое число опечаток - по фамилии, затем по имени
+        index = make_index(self.ROWS)
+        results = index.search('Иван')
+        self.assertEqual([(row[0], distance) for row, distance in results], [(5, 0), (1, 0), (4, 0)])
+
+    def test_every_word_must_match(self):
+        index = make_index(self.ROWS)
+        self.assertEqual([row[0] for row, distance in index.search('ивнов петрович')], [2])
+        self.assertEqual([(row[0], distance) for row, distance in index.search('иван ивонович')], [(5, 1), (1, 1)])
+        self.assertEqual(index.search('Иванов Ольга'), [])
+        self.assertEqual(index.search('   '), [])
+
+    def test_limit_and_max_distance(self):
+        index = make_index(self.ROWS)
+        self.assertEqual([row[0] for row, distance in index.search('Иванов', max_distance=0)], [1])
+        # С limit - первые limit студентов из полного списка, в том же порядке
+        for term in ('Иван', 'Иванов', 'иван ивонович'):
+            results = index.search(term, limit=10 ** 6)
+            for limit in range(1, len(results) + 1):
+                with self.subTest(term=term, limit=limit):
+                    self.assertEqual(index.search(term, limit=limit), results[:limit])
+
+    def test_remove_and_rename(self):
+        index = make_index(self.ROWS)
+        index.remove(1)
+        index.remove(1)  # повторное удаление ничего не ломает
+        index.remove(999)
+        self.assertEqual(len(index), len(self.ROWS) - 1)
+        self.assertEqual([row[0] for row, distance in index.search('Иванов')], [2, 5, 4])
+        # Студент сменил фамилию, а потом вернул прежнюю
+        index.add((2, 'Сидоров', 'Петр', 'Петрович', 21, 2))
+        self.assertEqual(index.search('Ивонов'), [])
+        self.assertEqual([row[0] for row, distance in index.search('Сидоров')], [2])
+        index.add((2, 'Ивонов', 'Петр', 'Петрович', 21, 2))
+        self.assertEqual([(row[0], distance) for row, distance in index.search('Ивонов')], [(2, 0)])
+        self.assertEqual(len(index), len(self.ROWS) - 1)
+
+    def test_random_changes_match_brute_force(self):
+        rng = random.Random(2024)
+        last_names = ['Иванов', 'Ивонов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов']
+        first_names = ['Петр', 'Иван', 'Анна', 'Ольга']
+        patronymics = ['Ильич', 'Петрович', 'Иванович', None]
+        terms = ['Иванов', 'Ивонов Анна', 'Петр', 'Кузнецов Ольга Петрович', 'смирнв ильич']
+        index = smf.FuzzyNameIndex()
+        students = {}
+        for step in range(5000):
+            student_id = rng.randint(1, 300)
+            if rng.random() < 0.3:
+                index.remove(student_id)
+                students.pop(student_id, None)
+            else:
+                row = (student_id, rng.choice(last_names), rng.choice(first_names), rng.choice(patronymics),
+                       rng.randint(17, 30), rng.randint(1, 6))
+                index.add(row)
+                students[student_id] = row
+            if step % 499 == 0:
+                for term in terms:
+                    with self.subTest(step=step, term=term):
+                        results = index.search(term, limit=10 ** 6)
+                        self.assertEqual({row[0]: distance for row, distance in results},
+                                         brute_force_search(students, term))
+                        self.assertEqual([distance for row, distance in results],
+                                         sorted(distance for row, distance in results))
+                        for row, distance in results:
+                            self.assertEqual(row, students[row[0]])
+                        self.assertEqual(index.search(term, limit=5), results[:5])
+        self.assertEqual(len(index), len(students))
+        # Устаревшие ID не копятся: список имени уплотняется
+        for number, student_ids in enumerate(index.name_students):
+            live = sum(1 for student_id in students if index._has_name(student_id, number))
+            self.assertEqual(index.name_sizes[number], live)
+            self.assertLessEqual(len(student_ids), 2 * live + 17)
+
+
+class FuzzySearchThreadsTest(unittest.TestCase):
+    def test_search_while_index_is_rebuilt(self):
+        # Как в режиме --serve: несколько потоков ищут, и один из них в это время строит индекс заново
+        rows = [(student_id, 'Иванов' if student_id % 2 else 'Петров', 'Иван', 'Ильич', 20, 1)
+                for student_id in range(1, 2001)]
+
+        def slow_rows(batch_size=None):
+            for row in rows:
+                if row[0] % 200 == 0:
+                    time.sleep(0.001)  # пока строится индекс, другие потоки успевают искать
+                yield row
+
+        index = smf.FuzzyNameIndex()
+        stop = threading.Event()
+        errors = []
+        counts = set()
+
+        def searcher():
+            try:
+                while not stop.is_set():
+                    counts.add(len(smf.fuzzy_find_students('Иванов', limit=10 ** 6)))
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+        with mock.patch.object(smf, 'iter_all_students', slow_rows), \
+                mock.patch.object(smf, 'fuzzy_name_index', index):
+            threads = [threading.Thread(target=searcher) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for _ in range(20):
+                index.invalidate(None)  # следующий поиск построит индекс заново
+                time.sleep(0.005)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        # "Иванов" - 1000 студентов точно и 1000 "Петровых" с двумя опечатками: всегда все 2000
+        self.assertEqual(counts, {2000})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Тесты импорта студентов из файла: потоковое чтение JSON-массива и проверка записей.
+Запускаются без PostgreSQL: python -m pytest (или python -m unittest).
+"""
+import io
+import json
+import unittest
+
+import student_management_functions as smf
+
+
+class CountingReader(io.StringIO):
+    """
+    StringIO, который запоминает, сколько символов из него прочитали.
+    """
+    def __init__(self, text):
+        super().__init__(text)
+        self.chars_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.chars_read += len(chunk)
+        return chunk
+
+
+def read_json_array(text, chunk_size=64 * 1024):
+    return list(smf._iter_json_array(io.StringIO(text), chunk_size))
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    RECORDS = [
+        {'фамилия': 'Иванов', 'имя': 'Иван', 'отчество': 'Иванович', 'возраст': 20, 'курс': 2},
+        {'last_name': 'Петров', 'first_name': 'Петр', 'age': 123456, 'course': None},
+        {'note': 'скобки ] } { [ и запятые, в строке', 'quote': 'он сказал "привет"\\'},
+        {'nested': {'list': [1, [2, 3], {'a': []}]}, 'number': -1.5e3},
+        [],
+        7,
+    ]
+
+    def test_reads_whole_array(self):
+        text = json.dumps(self.RECORDS, ensure_ascii=False, indent=2)
+        self.assertEqual(read_json_array(text), self.RECORDS)
+
+    def test_chunk_boundaries(self):
+        # Граница куска попадает на каждую позицию: внутрь строк, чисел и экранирования
+        text = json.dumps(self.RECORDS, ensure_ascii=False)
+        for chunk_size in (1, 2, 3, 5, 7, 16, 100):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(read_json_array(text, chunk_size), self.RECORDS)
+
+    def test_number_on_chunk_boundary(self):
+        # "12" из "123" не должно считаться целым элементом
+        for chunk_size in range(1, 8):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(read_json_array('[123, 45678]', chunk_size), [123, 45678])
+
+    def test_empty_array(self):
+        self.assertEqual(read_json_array('  [ ]  '), [])
+        self.assertEqual(read_json_array('[]', 1), [])
+
+    def test_malformed_element_is_yielded_as_error(self):
+        text = '[{"a": 1}, {"a": 2,, "b": 3}, {"c": [1, "]"]}, {"a": 4}]'
+        for chunk_size in (1, 4, 64 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                items = read_json_array(text, chunk_size)
+                self.assertEqual(len(items), 4)
+                self.assertEqual(items[0], {'a': 1})
+                self.assertIsInstance(items[1], json.JSONDecodeError)
+                self.assertEqual(items[1].doc, '{"a": 2,, "b": 3}')
+                self.assertEqual(items[2], {'c': [1, ']']})
+                self.assertEqual(items[3], {'a': 4})
+
+    def test_malformed_element_does_not_read_to_end(self):
+        # После испорченного элемента чтение продолжается кусками, а не до конца файла
+        good = ', '.join(json.dumps({'id': number}) for number in range(10000))
+        reader = CountingReader('[{"id": oops}, ' + good + ']')
+        items = smf._iter_json_array(reader, 1024)
+        self.assertIsInstance(next(items), json.JSONDecodeError)
+        self.assertEqual(next(items), {'id': 0})
+        self.assertLess(reader.chars_read, 4 * 1024)
+        self.assertEqual(sum(1 for _ in items), 9999)
+
+    def test_truncated_array(self):
+        with self.assertRaises(ValueError):
+            read_json_array('[{"a": 1}, {"a": 2')
+        with self.assertRaises(ValueError):
+            read_json_array('[{"a": 1}, ', 2)
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            read_json_array('{"a": 1}')
+
+    def test_too_long_element(self):
+        # Незакрытая строка не должна дочитываться в буфер бесконечно
+        text = '[{"a": "' + 'x' * (smf.JSON_MAX_RECORD_CHARS + 10)
+        with self.assertRaises(ValueError):
+            read_json_array(text, 64 * 1024)
+
+
+class ValidateStudentRecordTest(unittest.TestCase):
+    def test_russian_field_names(self):
+        record = {'Фамилия': ' иванов ', 'Имя': 'иван', 'Отчество': 'ИВАНОВИЧ', 'Возраст': '20', 'Курс': 3}
+        self.assertEqual(smf.validate_student_record(record), (('Иванов', 'Иван', 'Иванович', 20, 3), None))
+
+    def test_english_field_names_and_unknown_fields(self):
+        record = {'last_name': 'Petrov', 'first_name': 'Petr', 'patronymic': 'Petrovich',
+                  'age': 16, 'course': '6', 'email': 'petrov@example.com'}
+        self.assertEqual(smf.validate_student_record(record), (('Petrov', 'Petr', 'Petrovich', 16, 6), None))
+
+    def test_all_errors_are_reported(self):
+        record = {'фамилия': 'Иванов1', 'имя': '', 'возраст': 15, 'курс': 'первый'}
+        row, errors = smf.validate_student_record(record)
+        self.assertIsNone(row)
+        # фамилия, имя, отчество (нет поля), возраст, курс
+        self.assertEqual(len(errors), 5)
+
+    def test_age_and_course_limits(self):
+        base = {'фамилия': 'Иванов', 'имя': 'Иван', 'отчество': 'Иванович'}
+        for age, course, valid in ((smf.MIN_AGE, smf.MIN_COURSE, True), (smf.MAX_AGE, smf.MAX_COURSE, True),
+                                   (smf.MIN_AGE - 1, 1, False), (smf.MAX_AGE + 1, 1, False),
+                                   (20, smf.MIN_COURSE - 1, False), (20, smf.MAX_COURSE + 1, False),
+                                   (-20, 1, False), (None, 1, False)):
+            with self.subTest(age=age, course=course):
+                row, errors = smf.validate_student_record({**base, 'возраст': age, 'курс': course})
+                self.assertEqual(row is not None, valid)
+                self.assertEqual(errors is None, valid)
+
+    def test_not_an_object(self):
+        for record in (['Иванов', 'Иван'], 'Иванов', None, json.JSONDecodeError('ошибка', '{', 0)):
+            with self.subTest(record=record):
+                row, errors = smf.validate_student_record(record)
+                self.assertIsNone(row)
+                self.assertEqual(len(errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Тесты замеров запросов: отпечатки запросов, гистограммы, курсор с замерами
+(TimingCursorMixin поверх курсора-подделки) и вывод метрик в формате Prometheus.
+"""
+import os
+import re
+import tempfile
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+class QueryFingerprintTest(unittest.TestCase):
+    def setUp(self):
+        smf.query_fingerprint.cache_clear()
+        self.addCleanup(smf.query_fingerprint.cache_clear)
+
+    def test_values_are_hidden(self):
+        fingerprint = smf.query_fingerprint("SELECT id FROM students WHERE id = %s;")
+        for query in ("SELECT id FROM students WHERE id = 42;", "SELECT id\n  FROM students   WHERE id = %(id)s;"):
+            with self.subTest(query=query):
+                self.assertEqual(smf.query_fingerprint(query), fingerprint)
+        self.assertEqual(smf.query_fingerprint("SELECT 1 FROM students WHERE last_name = 'О''Брайен';"),
+                         'SELECT ? FROM students WHERE last_name = ?;')
+
+    def test_names_with_digits_are_kept(self):
+        self.assertEqual(smf.query_fingerprint('EXECUTE student_update_12 (%s);'), 'EXECUTE student_update_12 (?);')
+
+    def test_prepared_query(self):
+        # "EXECUTE имя (...)" получает отпечаток SQL подготовленного запроса
+        with mock.patch.dict(smf._prepared_queries, {'student_by_id': smf.PREPARED_STATEMENTS['student_by_id']}):
+            self.assertEqual(smf.query_fingerprint('EXECUTE student_by_id (%s);'),
+                             smf.query_fingerprint(smf.PREPARED_STATEMENTS['student_by_id']))
+
+    def test_length_is_limited(self):
+        self.assertEqual(len(smf.query_fingerprint('SELECT ' + ', '.join(['last_name'] * 100) + ';')), 200)
+
+
+class HistogramTest(unittest.TestCase):
+    def test_buckets(self):
+        histogram = smf.Histogram()
+        for value in (0.0005, 0.001, 0.003, 0.2, 100.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.sum, 100.2045)
+        self.assertEqual(histogram.buckets[0], 2)  # границы корзин включительно
+        self.assertEqual(histogram.buckets[smf.METRICS_BUCKETS.index(0.25)], 1)
+        self.assertEqual(sum(histogram.buckets), 4)  # 100 секунд - только в "+Inf"
+
+
+class FakeCursor:
+    def __init__(self, rows=(), fail=False):
+        self.rows = list(rows)
+        self.fail = fail
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, query, vars=None):
+        if self.fail:
+            raise smf.Error('ошибка синтаксиса')
+        if (query.decode('utf-8') if isinstance(query, bytes) else query).startswith('SELECT'):
+            self.description = [('id',)]
+        else:
+            self.rowcount = 3
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def __iter__(self):
+        rows, self.rows = self.rows, []
+        return iter(rows)
+
+
+class TimingCursor(smf.TimingCursorMixin, FakeCursor):
+    pass
+
+
+class TimingCursorTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = smf.QueryMetrics()
+        for patcher in (mock.patch.object(smf, 'query_metrics', self.metrics),
+                        mock.patch.object(smf, 'DB_METRICS', True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def histogram(self, query, phase):
+        return self.metrics.queries[(smf.query_fingerprint(query), phase)]
+
+    def test_select(self):
+        query = 'SELECT id FROM students WHERE course = %s;'
+        cursor = TimingCursor(rows=[(1,), (2,), (3,)])
+        cursor.execute(query, (1,))
+        self.assertEqual(cursor.fetchone(), (1,))
+        self.assertEqual(cursor.fetchall(), [(2,), (3,)])
+        self.assertEqual(self.histogram(query, 'execute').count, 1)
+        self.assertEqual(self.histogram(query, 'fetch').count, 2)
+        self.assertEqual(self.metrics.rows[smf.query_fingerprint(query)], 3)  # строки считаются при чтении
+
+    def test_iteration(self):
+        query = 'SELECT id FROM students;'
+        cursor = TimingCursor(rows=[(1,), (2,)])
+        cursor.execute(query)
+        self.assertEqual(list(cursor), [(1,), (2,)])
+        self.assertEqual(self.histogram(query, 'fetch').count, 1)
+        self.assertEqual(self.metrics.rows[smf.query_fingerprint(query)], 2)
+
+    def test_changed_rows(self):
+        query = 'DELETE FROM students WHERE course = %s;'
+        TimingCursor().execute(query, (6,))
+        self.assertEqual(self.metrics.rows[smf.query_fingerprint(query)], 3)
+
+    def test_errors(self):
+        query = 'SELEC id FROM students;'
+        with self.assertRaises(smf.Error):
+            TimingCursor(fail=True).execute(query)
+        self.assertEqual(self.metrics.errors, {smf.query_fingerprint(query): 1})
+        self.assertEqual(self.metrics.queries, {})
+
+    def test_bytes_query(self):
+        TimingCursor().execute(b'SELECT id FROM students WHERE id = 7;')
+        self.assertIn(('SELECT id FROM students WHERE id = ?;', 'execute'), self.metrics.queries)
+
+    def test_slow_query_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log = os.path.join(directory, 'slow.log')
+            with mock.patch.object(smf, 'DB_SLOW_QUERY_MS', 0.0), mock.patch.object(smf, 'DB_SLOW_QUERY_LOG', log):
+                TimingCursor().execute('UPDATE students SET age = 20 WHERE id = 1;')
+            with open(log, encoding='utf-8') as file:
+                self.assertIn('UPDATE students SET age = ? WHERE id = ?;', file.read())
+        self.assertEqual(self.metrics.slow_queries, 1)
+
+    def test_disabled(self):
+        with mock.patch.object(smf, 'DB_METRICS', False):
+            cursor = TimingCursor(rows=[(1,)])
+            cursor.execute('SELECT id FROM students;')
+            cursor.fetchall()
+        self.assertEqual(self.metrics.queries, {})
+
+    def test_slowest(self):
+        self.metrics.observe_query('A', 'execute', 0.5, 0)
+        self.metrics.observe_query('B', 'execute', 0.1, 0)
+        self.metrics.observe_query('B', 'execute', 0.7, 0)
+        self.assertEqual([item[0] for item in self.metrics.slowest(2)], ['B', 'A'])
+        self.assertEqual(self.metrics.slowest(1)[0][2], 2)
+
+
+class PrometheusTest(unittest.TestCase):
+    def test_render(self):
+        metrics = smf.QueryMetrics()
+        metrics.observe_connect(0.02)
+        metrics.observe_query('SELECT "x" FROM students WHERE id = ?;', 'execute', 0.003, 0)
+        metrics.observe_query('SELECT "x" FROM students WHERE id = ?;', 'execute', 3.0, 0)
+        metrics.observe_error('SELEC ?;')
+        with mock.patch.object(smf, 'query_metrics', metrics):
+            text = smf.render_prometheus_metrics()
+        self.assertTrue(text.endswith('\n'))
+        self.assertIn('student_db_connect_seconds_count 1', text)
+        self.assertIn('student_db_query_errors_total{query="SELEC ?;"} 1', text)
+        labels = 'query="SELECT \\"x\\" FROM students WHERE id = ?;",phase="execute"'
+        buckets = re.findall(r'student_db_query_seconds_bucket\{' + re.escape(labels) + r',le="([^"]+)"\} (\d+)', text)
+        counts = [int(count) for bound, count in buckets]
+        # Корзины накопительные, последняя ("+Inf") - все наблюдения
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(buckets[-1], ('+Inf', '2'))
+        self.assertEqual(counts[smf.METRICS_BUCKETS.index(0.005)], 1)
+        self.assertIn(f'student_db_query_seconds_count{{{labels}}} 2', text)
+        # Строки без значения (# HELP/# TYPE) и строки "имя значение"
+        for line in text.splitlines():
+            with self.subTest(line=line):
+                self.assertTrue(line.startswith('# ') or re.fullmatch(r'\w+(\{.*\})? -?[\d.e+-]+', line))
+
+    def test_metrics_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'students.prom')
+            smf.write_metrics_file(path)
+            with open(path, encoding='utf-8') as file:
+                self.assertIn('student_db_slow_queries_total', file.read())
+            self.assertEqual(os.listdir(directory), ['students.prom'])
+
+
+if __name__ == '__main__':
+    unittest.main()
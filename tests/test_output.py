@@ -0,0 +1,77 @@
+"""
+Тесты вывода на экран: паузы учебного режима и быстрый режим (--fast),
+в котором строки таблиц копятся и выводятся пачками, без time.sleep.
+"""
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+class OutputModeTest(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(smf.set_fast_mode, smf.FAST_MODE)
+        self.sleep = mock.patch.object(smf.time, 'sleep').start()
+        self.addCleanup(mock.patch.stopall)
+        self.output = io.StringIO()
+        self.write = mock.patch.object(self.output, 'write', wraps=self.output.write).start()
+        redirect = contextlib.redirect_stdout(self.output)
+        redirect.__enter__()
+        self.addCleanup(redirect.__exit__, None, None, None)
+
+    def test_slow_mode_pauses(self):
+        smf.set_fast_mode(False)
+        smf.pause(0.5)
+        with smf.PacedOutput(delay=0.2) as table:
+            table.add('первая')
+            table.add('вторая')
+        self.assertEqual(self.sleep.call_args_list, [mock.call(0.5), mock.call(0.2), mock.call(0.2)])
+        self.assertEqual(self.output.getvalue(), 'первая\nвторая\n')
+
+    def test_fast_mode_does_not_sleep(self):
+        smf.set_fast_mode(True)
+        smf.pause(0.5)
+        with smf.PacedOutput(delay=0.2) as table:
+            table.add('первая')
+            table.add('вторая')
+            self.assertEqual(self.output.getvalue(), '')  # до выхода из "with" строки копятся
+        self.sleep.assert_not_called()
+        self.assertEqual(self.output.getvalue(), 'первая\nвторая\n')
+        self.assertEqual(self.write.call_count, 1)  # одной записью
+
+    def test_fast_mode_flushes_in_batches(self):
+        smf.set_fast_mode(True)
+        lines = [f'строка {number}' for number in range(25)]
+        with mock.patch.object(smf, 'OUTPUT_FLUSH_LINES', 10):
+            with smf.PacedOutput(delay=0.2) as table:
+                for line in lines:
+                    table.add(line)
+        self.assertEqual(self.output.getvalue(), ''.join(line + '\n' for line in lines))
+        self.assertEqual(self.write.call_count, 3)  # 10 + 10 + 5 строк
+
+    def test_view_students_fast(self):
+        smf.set_fast_mode(True)
+        rows = [(number, 'Иванов', 'Иван', None, 20, 1) for number in range(1, 51)]
+        with mock.patch.object(smf, 'iter_all_students', return_value=iter(rows)):
+            smf.view_students()
+        self.sleep.assert_not_called()
+        text = self.output.getvalue()
+        for row in rows:
+            self.assertIn(smf.format_student_row(row), text)
+
+    def test_menu_fast(self):
+        smf.set_fast_mode(True)
+        smf.display_menu()
+        self.sleep.assert_not_called()
+        for title in smf.MENU_ITEMS:
+            self.assertIn(title, self.output.getvalue())
+
+    def test_fast_flag(self):
+        self.assertTrue(smf.parse_args(['--fast']).fast)
+        self.assertFalse(smf.parse_args([]).fast)
+
+
+if __name__ == '__main__':
+    unittest.main()
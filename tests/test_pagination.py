@@ -0,0 +1,139 @@
+"""
+Тесты постраничного просмотра (keyset-пагинация) и потокового чтения списка:
+запросы build_page_query выполняет SQLite (в нем тоже есть сравнение строк
+вида (a, b, c) > (x, y, z)), поэтому PostgreSQL не нужен.
+"""
+import random
+import sqlite3
+import unittest
+
+import student_management_functions as smf
+
+
+class SQLiteCursor:
+    """
+    Курсор в стиле psycopg2 поверх SQLite: параметры %s, fetchmany, itersize.
+    """
+    def __init__(self, connection, name=None):
+        self.cursor = connection.cursor()
+        self.name = name
+        self.itersize = None
+        self.closed = False
+        self.fetch_sizes = []
+
+    def execute(self, query, params=()):
+        self.cursor.execute(query.replace('%s', '?'), params)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        return self.cursor.fetchmany(size)
+
+    def close(self):
+        self.closed = True
+
+
+class SQLiteConnection:
+    def __init__(self, rows):
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('CREATE TABLE students (id INTEGER, last_name TEXT, first_name TEXT, '
+                                'patronymic TEXT, age INTEGER, course INTEGER);')
+        self.connection.executemany('INSERT INTO students VALUES (?, ?, ?, ?, ?, ?);', rows)
+        self.cursors = []
+        self.rollbacks = 0
+
+    def cursor(self, name=None, cursor_factory=None):
+        cursor = SQLiteCursor(self.connection, name)
+        self.cursors.append(cursor)
+        return cursor
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.connection.close()
+
+
+def make_rows(count, seed=7):
+    # Много одинаковых фамилий и имен: порядок внутри них задает id
+    rng = random.Random(seed)
+    return [(student_id, rng.choice(['Иванов', 'Петров', 'Абрамов']), rng.choice(['Иван', 'Анна']),
+             None, rng.randint(17, 30), rng.randint(1, 6))
+            for student_id in rng.sample(range(1, count * 3), count)]
+
+
+class PageQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = make_rows(47)
+        self.expected = sorted(self.rows, key=smf.page_key)
+        self.connection = SQLiteConnection(self.rows)
+        self.addCleanup(self.connection.close)
+
+    def test_page_key(self):
+        self.assertEqual(smf.page_key((5, 'Иванов', 'Иван', None, 20, 1)), ('Иванов', 'Иван', 5))
+
+    def test_first_page(self):
+        page = smf.fetch_students_page(self.connection, page_size=10)
+        self.assertEqual(page, self.expected[:10])
+
+    def test_forward_then_back(self):
+        for page_size in (1, 5, 10, 47, 100):
+            with self.subTest(page_size=page_size):
+                pages = [smf.fetch_students_page(self.connection, page_size=page_size)]
+                while True:
+                    page = smf.fetch_students_page(self.connection, after=smf.page_key(pages[-1][-1]),
+                                                   page_size=page_size)
+                    if not page:
+                        break
+                    pages.append(page)
+                # Страницы вперед - весь список по порядку, без пропусков и повторов
+                self.assertEqual([row for page in pages for row in page], self.expected)
+                # Назад от каждой страницы - ровно предыдущая страница, в прямом порядке
+                for previous, page in zip(pages, pages[1:]):
+                    self.assertEqual(smf.fetch_students_page(self.connection, before=smf.page_key(page[0]),
+                                                             page_size=page_size), previous)
+                self.assertEqual(smf.fetch_students_page(self.connection, before=smf.page_key(pages[0][0]),
+                                                         page_size=page_size), [])
+
+    def test_key_of_deleted_student(self):
+        # Студента с последней строки страницы удалили: следующая страница все равно открывается
+        key = smf.page_key(self.expected[9])
+        self.connection.connection.execute('DELETE FROM students WHERE id = ?;', (key[2],))
+        self.assertEqual(smf.fetch_students_page(self.connection, after=key, page_size=5), self.expected[10:15])
+
+    def test_read_transaction_is_closed(self):
+        smf.fetch_students_page(self.connection, page_size=5)
+        self.assertTrue(self.connection.cursors[-1].closed)
+        self.assertEqual(self.connection.rollbacks, 1)
+
+
+class IterStudentsTest(unittest.TestCase):
+    def test_stream_in_batches(self):
+        rows = make_rows(25)
+        connection = SQLiteConnection(rows)
+        self.addCleanup(connection.close)
+        stream = smf.iter_students(connection, batch_size=10)
+        self.assertEqual(next(stream), min(rows, key=smf.page_key))
+        cursor = connection.cursors[0]
+        self.assertIsNotNone(cursor.name)  # имя курсора => курсор серверный
+        self.assertEqual(cursor.itersize, 10)
+        self.assertEqual([next(stream)[0] for _ in range(9)], [row[0] for row in sorted(rows, key=smf.page_key)[1:10]])
+        self.assertEqual(cursor.fetch_sizes, [10])  # пока строк первой пачки хватает, новые не запрашиваются
+        self.assertEqual(len(list(stream)), 15)
+        self.assertTrue(cursor.closed)
+        self.assertEqual(connection.rollbacks, 1)
+
+    def test_stream_stopped_early(self):
+        connection = SQLiteConnection(make_rows(25))
+        self.addCleanup(connection.close)
+        stream = smf.iter_students(connection, batch_size=10)
+        next(stream)
+        stream.close()  # перебор прервали - курсор и транзакция все равно закрываются
+        self.assertTrue(connection.cursors[0].closed)
+        self.assertEqual(connection.rollbacks, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Тесты параллельного импорта без PostgreSQL и без процессов: куски файла разбираются
+здесь же по очереди, и результат сравнивается с обычным (последовательным) чтением файла.
+"""
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import student_management_functions as smf
+
+
+def make_records(count):
+    """
+    Записи студентов: среди них есть неправильные (возраст, пустое имя, не объект).
+    """
+    records = []
+    for number in range(count):
+        if number % 7 == 3:
+            records.append({'фамилия': f'Иванов{number}', 'имя': 'Иван', 'отчество': 'Иванович',
+                            'возраст': 20, 'курс': 1})
+        elif number % 11 == 5:
+            records.append({'фамилия': 'Петров', 'имя': '', 'отчество': 'Петрович', 'возраст': 99, 'курс': 2})
+        else:
+            records.append({'фамилия': 'Сидоров', 'имя': 'Сидор', 'отчество': 'Сидорович',
+                            'возраст': 16 + number % 40, 'курс': 1 + number % 6})
+    return records
+
+
+def serial_result(path):
+    """
+    Как import_students: (правильные строки, номера отклоненных записей).
+    """
+    rows, rejected = [], []
+    for number, record in smf.iter_student_records(path):
+        row, errors = (None, ['ошибка JSON']) if isinstance(record, Exception) else smf.validate_student_record(record)
+        if errors:
+            rejected.append(number)
+        else:
+            rows.append(row)
+    return rows, rejected
+
+
+def parallel_result(path, chunk_size):
+    """
+    Как parallel_import_students: куски по порядку, номера записей досчитываются здесь.
+    """
+    rows, rejected = [], []
+    numbered = 0
+    for chunk in smf._iter_import_chunks(path, smf.import_file_format(path), chunk_size):
+        chunk_number, chunk_rows, rejects, consumed, pid, seconds = smf._parse_import_chunk(chunk)
+        rows += chunk_rows
+        rejected += [number + numbered for number, record, errors in rejects]
+        numbered += consumed
+    return rows, rejected
+
+
+class ParallelImportChunksTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.records = make_records(200)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write(text)
+        return path
+
+    def check_same_as_serial(self, path):
+        expected = serial_result(path)
+        self.assertTrue(expected[0] and expected[1])  # в файле есть и правильные, и отклоненные записи
+        for chunk_size in (1, 3, 10, 64, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(parallel_result(path, chunk_size), expected)
+
+    def test_json_array(self):
+        items = [json.dumps(record, ensure_ascii=False) for record in self.records]
+        items[10] = '{"фамилия": "Испорченный",, "курс": 1}'
+        items[11] = '["не", "объект", {"вложенный": "}"}]'
+        self.check_same_as_serial(self.write('students.json', '[\n' + ',\n'.join(items) + '\n]\n'))
+
+    def test_json_lines(self):
+        lines = [json.dumps(record, ensure_ascii=False) for record in self.records]
+        lines[20] = '{"фамилия": "Испорченный"'
+        lines[30] = ''  # пустые строки пропускаются, но номера строк считаются
+        self.check_same_as_serial(self.write('students.jsonl', '\n'.join(lines) + '\n'))
+
+    def test_csv_with_multiline_field(self):
+        path = os.path.join(self.directory, 'students.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(self.records[0]))
+            writer.writeheader()
+            writer.writerows(self.records[:50])
+            # Поле в кавычках на несколько строк: кусок не должен обрываться внутри него
+            writer.writerow({**self.records[50], 'фамилия': 'Много\nстрочная'})
+            writer.writerows(self.records[51:])
+        self.check_same_as_serial(path)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            smf.import_file_format('students.xml')
+        self.assertEqual(smf.import_file_format('STUDENTS.NDJSON'), 'jsonl')
+
+
+if __name__ == '__main__':
+    unittest.main()
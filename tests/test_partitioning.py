@@ -0,0 +1,87 @@
+"""
+Тесты секционирования таблицы students: порядок шагов перевода на секции
+(SQL только строится, без БД) и проверка курса перед архивацией.
+"""
+import unittest
+
+import student_management_functions as smf
+
+
+def step_index(steps, text):
+    """
+    Номер первого шага, в SQL которого есть text.
+    """
+    return next(index for index, (description, statement, required) in enumerate(steps) if text in statement)
+
+
+class BuildPartitionStatementsTest(unittest.TestCase):
+    def setUp(self):
+        self.steps = smf.build_partition_statements('public.students_id_seq')
+
+    def test_step_format(self):
+        for description, statement, required in self.steps:
+            with self.subTest(description=description):
+                self.assertTrue(description)
+                self.assertTrue(statement.strip().endswith(';'))
+                self.assertIsInstance(required, bool)
+
+    def test_partition_per_course(self):
+        statements = [statement for description, statement, required in self.steps]
+        for course in range(smf.MIN_COURSE, smf.MAX_COURSE + 1):
+            with self.subTest(course=course):
+                self.assertIn(f'CREATE TABLE students_course_{course} PARTITION OF students_partitioned '
+                              f'FOR VALUES IN ({course});', statements)
+        # Студенты без курса (NULL) попадают в секцию по умолчанию
+        self.assertIn('CREATE TABLE students_course_other PARTITION OF students_partitioned DEFAULT;', statements)
+
+    def test_order_of_table_swap(self):
+        steps = self.steps
+        create = step_index(steps, 'CREATE TABLE students_partitioned')
+        last_partition = step_index(steps, 'students_course_other')
+        copy = step_index(steps, 'INSERT INTO students_partitioned')
+        release = step_index(steps, 'OWNED BY NONE')
+        drop = step_index(steps, 'DROP TABLE students;')
+        rename = step_index(steps, 'RENAME TO students;')
+        attach = step_index(steps, 'OWNED BY students.id')
+        self.assertLess(create, last_partition)
+        self.assertLess(last_partition, copy)  # строки копируются, когда все секции уже есть
+        self.assertLess(copy, release)
+        self.assertLess(release, drop)  # иначе последовательность удалилась бы вместе с таблицей
+        self.assertLess(drop, rename)
+        self.assertLess(rename, attach)
+        # Индексы и триггеры создаются уже на новой таблице students
+        for description, statement, required in steps[rename + 1:]:
+            self.assertNotIn('students_partitioned', statement)
+        self.assertTrue(all(index > rename for index, step in enumerate(steps) if 'CREATE TRIGGER' in step[1]))
+
+    def test_sequence_name(self):
+        statements = [statement for description, statement, required in self.steps]
+        self.assertIn('ALTER SEQUENCE public.students_id_seq OWNED BY NONE;', statements)
+        self.assertIn('ALTER SEQUENCE public.students_id_seq OWNED BY students.id;', statements)
+
+    def test_all_columns_copied(self):
+        copy = self.steps[step_index(self.steps, 'INSERT INTO students_partitioned')][1]
+        self.assertEqual(copy.count(smf.STUDENT_TABLE_COLUMNS), 2)
+        for column in ('id', 'updated_at', 'version'):
+            self.assertIn(column, smf.STUDENT_TABLE_COLUMNS.split(', '))
+
+    def test_required_steps(self):
+        # Без индексов для поиска (например, нет pg_trgm) таблицу все равно можно перевести,
+        # а все остальные шаги обязательные
+        optional = {statement for description, statement, required in self.steps if not required}
+        self.assertEqual(optional, {statement for description, statement in smf.SEARCH_INDEX_STATEMENTS})
+        for description, statement in smf.STUDENT_TRIGGER_STATEMENTS + smf.SORT_INDEX_STATEMENTS:
+            self.assertIn((description, statement, True), self.steps)
+
+
+class ArchiveCourseTest(unittest.TestCase):
+    def test_invalid_course(self):
+        # Курс проверяется до обращения к БД: имя секции собирается из него
+        for course in (smf.MIN_COURSE - 1, smf.MAX_COURSE + 1, '1; DROP TABLE students', '', None):
+            with self.subTest(course=course):
+                with self.assertRaises(ValueError):
+                    smf.archive_course(course)
+
+
+if __name__ == '__main__':
+    unittest.main()
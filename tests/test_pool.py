@@ -0,0 +1,119 @@
+"""
+Тесты счетчиков пула соединений (StudentConnectionPoolMixin) без БД: вместо
+ThreadedConnectionPool - маленький пул с теми же правилами, что у psycopg2
+(свободными остаются не больше minconn соединений, остальные закрываются).
+"""
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool:
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self.minconn, self.maxconn = minconn, maxconn
+        self.free = []
+        for _ in range(minconn):
+            self.free.append(self._connect())
+
+    def _connect(self, key=None):
+        return FakeConnection()
+
+    def getconn(self, key=None):
+        return self.free.pop() if self.free else self._connect()
+
+    def putconn(self, conn, key=None, close=False):
+        if len(self.free) < self.minconn and not close and not conn.closed:
+            self.free.append(conn)
+        else:
+            conn.close()
+
+    def closeall(self):
+        for conn in self.free:
+            conn.close()
+        self.free = []
+
+
+class CountingPool(smf.StudentConnectionPoolMixin, FakePool):
+    pass
+
+
+class PoolCountsTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = CountingPool(2, 5)
+
+    def assertCounts(self, used, idle):
+        self.assertEqual(self.pool.used_connections, used)
+        self.assertEqual(self.pool.idle_connections(), idle)
+        # Счетчики совпадают с тем, что на самом деле лежит в пуле
+        self.assertEqual(self.pool.idle_connections(), len(self.pool.free))
+
+    def test_counts(self):
+        self.assertCounts(used=0, idle=2)
+        connections = [self.pool.getconn() for _ in range(4)]
+        self.assertCounts(used=4, idle=0)
+        for connection in connections[:3]:
+            self.pool.putconn(connection)
+        self.assertCounts(used=1, idle=2)  # третье вернувшееся соединение закрыто - minconn уже свободны
+        self.assertEqual(self.pool.open_connections, 3)
+
+    def test_dead_connection_is_not_idle(self):
+        connection = self.pool.getconn()
+        connection.close()
+        self.pool.putconn(connection)
+        self.assertCounts(used=0, idle=1)
+        self.pool.putconn(self.pool.getconn(), close=True)
+        self.assertCounts(used=0, idle=0)
+
+    def test_closeall(self):
+        self.pool.getconn()
+        self.pool.closeall()
+        self.assertCounts(used=0, idle=0)
+        self.assertEqual(self.pool.open_connections, 0)
+
+    def test_replica_pool_counts(self):
+        # У пулов реплик открытые соединения считает on_connect, а свободные и выданные - сам пул
+        connects = []
+
+        class ReplicaPool(CountingPool):
+            on_connect = staticmethod(connects.append)
+
+        pool = ReplicaPool(0, 3)
+        pool.putconn(pool.getconn())
+        self.assertEqual(len(connects), 1)
+        self.assertEqual((pool.used_connections, pool.idle_connections()), (0, 0))
+
+    def test_pool_stats(self):
+        connection = self.pool.getconn()
+        with mock.patch.object(smf, 'connection_pool', self.pool):
+            stats = smf.get_pool_stats()
+        self.assertEqual(stats['idle'], 1)
+        self.pool.putconn(connection)
+
+
+class GetConnectionPoolTest(unittest.TestCase):
+    def test_creation_prints_nothing(self):
+        # Сообщение о создании пула портило бы вывод --serve и JSON: о нем сообщает только --startup-report
+        with mock.patch.object(smf, 'connection_pool', None), \
+                mock.patch.object(smf, 'load_db_driver'), \
+                mock.patch.object(smf, 'StudentConnectionPool', CountingPool), \
+                mock.patch.object(smf.atexit, 'register'), \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            pool = smf.get_connection_pool()
+            self.assertIsInstance(pool, CountingPool)
+            self.assertIs(smf.get_connection_pool(), pool)
+        self.assertEqual(output.getvalue(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Тесты подготовленных запросов (PREPARE / EXECUTE): когда запрос готовится,
+какие имена получают запросы UPDATE и что происходит, если сервер "забыл" запрос.
+"""
+import itertools
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+class FakeConnection:
+    def __init__(self, prepared=True):
+        if prepared:
+            self.prepared = set()
+
+
+class FakeCursor:
+    def __init__(self, connection, error=None):
+        self.connection = connection
+        self.error = error
+        self.log = []
+
+    def execute(self, query, params=None):
+        self.log.append((query, params))
+        if self.error is not None and query.startswith('EXECUTE'):
+            raise self.error
+
+
+class ServerError(smf.Error):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+class ExecutePreparedTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(smf, 'DB_PREPARED_STATEMENTS', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_prepare_once_per_connection(self):
+        connection = FakeConnection()
+        first, second = FakeCursor(connection), FakeCursor(connection)
+        smf.execute_prepared(first, 'student_delete_version', (5, 2))
+        smf.execute_prepared(second, 'student_delete_version', (6, 3))
+        self.assertEqual(first.log, [
+            ('PREPARE student_delete_version AS DELETE FROM students WHERE id = $1 AND version = $2 RETURNING id;',
+             None),
+            ('EXECUTE student_delete_version (%s, %s);', (5, 2)),
+        ])
+        self.assertEqual(second.log, [('EXECUTE student_delete_version (%s, %s);', (6, 3))])
+        # У другого соединения (например, вместо "умершего") свой набор подготовленных запросов
+        other = FakeCursor(FakeConnection())
+        smf.execute_prepared(other, 'student_delete_version', (5, 2))
+        self.assertTrue(other.log[0][0].startswith('PREPARE'))
+
+    def test_every_fixed_query_can_be_prepared(self):
+        for name, query in smf.PREPARED_STATEMENTS.items():
+            with self.subTest(name=name):
+                cursor = FakeCursor(FakeConnection())
+                params = tuple(range(query.count('%s')))
+                smf.execute_prepared(cursor, name, params)
+                prepare, execute = cursor.log
+                self.assertNotIn('%s', prepare[0])
+                self.assertFalse(prepare[0].endswith(';;'))
+                self.assertEqual(execute, (f"EXECUTE {name} ({', '.join(['%s'] * len(params))});", params))
+
+    def test_plain_execute(self):
+        # Соединение не из пула или подготовленные запросы выключены - обычный execute
+        cursor = FakeCursor(FakeConnection(prepared=False))
+        smf.execute_prepared(cursor, 'student_by_id', (1,))
+        self.assertEqual(cursor.log, [(smf.PREPARED_STATEMENTS['student_by_id'], (1,))])
+        cursor = FakeCursor(FakeConnection())
+        with mock.patch.object(smf, 'DB_PREPARED_STATEMENTS', False):
+            smf.execute_prepared(cursor, 'student_by_id', (1,))
+        self.assertEqual(cursor.log, [(smf.PREPARED_STATEMENTS['student_by_id'], (1,))])
+        self.assertEqual(cursor.connection.prepared, set())
+
+    def test_forgotten_statement_is_prepared_again(self):
+        connection = FakeConnection()
+        smf.execute_prepared(FakeCursor(connection), 'student_by_id', (1,))
+        # После DISCARD ALL (например, в PgBouncer) сервер отвечает "prepared statement does not exist"
+        with self.assertRaises(ServerError):
+            smf.execute_prepared(FakeCursor(connection, error=ServerError('26000')), 'student_by_id', (1,))
+        self.assertNotIn('student_by_id', connection.prepared)
+        cursor = FakeCursor(connection)
+        smf.execute_prepared(cursor, 'student_by_id', (1,))
+        self.assertTrue(cursor.log[0][0].startswith('PREPARE student_by_id'))
+
+    def test_other_errors_keep_statement(self):
+        connection = FakeConnection()
+        smf.execute_prepared(FakeCursor(connection), 'student_by_id', (1,))
+        with self.assertRaises(ServerError):
+            smf.execute_prepared(FakeCursor(connection, error=ServerError('57014')), 'student_by_id', (1,))
+        self.assertIn('student_by_id', connection.prepared)
+
+
+class UpdateStatementTest(unittest.TestCase):
+    def column_sets(self):
+        columns = smf.BATCH_UPDATE_COLUMNS
+        for size in range(1, len(columns) + 1):
+            yield from itertools.combinations(columns, size)
+
+    def test_one_name_per_query(self):
+        # Одинаковые имена - только у одинаковых запросов, иначе EXECUTE выполнил бы чужой запрос
+        names = {}
+        for column_set in self.column_sets():
+            for versioned in (False, True):
+                changes = {column: 1 for column in reversed(column_set)}  # порядок ключей не важен
+                query = smf.build_update_query(7, changes, 3 if versioned else None)[0]
+                name = smf.update_statement_name(changes, versioned)
+                self.assertEqual(names.setdefault(name, query), query)
+        self.assertEqual(len(names), 2 * (2 ** len(smf.BATCH_UPDATE_COLUMNS) - 1))
+
+    def test_update_query(self):
+        query, params = smf.build_update_query(7, {'age': 20, 'first_name': 'Иван'})
+        self.assertEqual(query, 'UPDATE students SET first_name = %s, age = %s WHERE id = %s RETURNING id;')
+        self.assertEqual(params, ('Иван', 20, 7))
+        query, params = smf.build_update_query(7, {'course': 2}, expected_version='4')
+        self.assertEqual(query, 'UPDATE students SET course = %s WHERE id = %s AND version = %s RETURNING id;')
+        self.assertEqual(params, (2, 7, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+"""
+Тесты чтения с реплик без БД: вместо psycopg2 - поддельные серверы, соединения
+и пул с теми же правилами, что у ThreadedConnectionPool (свободными остаются
+не больше minconn соединений, больше maxconn - PoolError).
+"""
+import contextlib
+import io
+import itertools
+import threading
+import types
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+class FakeError(Exception):
+    pass
+
+
+class FakeOperationalError(FakeError):
+    pass
+
+
+class FakePoolError(FakeError):
+    pass
+
+
+class FakeServer:
+    def __init__(self, lag=0.0):
+        self.lag = lag
+        self.down = False
+        self.connects = 0
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.row = None
+
+    def execute(self, query, params=None):
+        if self.connection.server.down:
+            self.connection.closed = 2
+            raise FakeOperationalError('server closed the connection unexpectedly')
+        self.row = (self.connection.server.lag,) if query == smf.REPLICA_LAG_QUERY else (1,)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+SERVERS = {}
+
+
+class FakePool:
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self.minconn, self.maxconn = minconn, maxconn
+        self.server = SERVERS[kwargs['host']]
+        self.free = []
+        self.used = 0
+        self.closed = False
+        for _ in range(minconn):
+            self.free.append(self._connect())
+
+    def _connect(self, key=None):
+        if self.server.down:
+            raise FakeOperationalError('could not connect to server')
+        self.server.connects += 1
+        return FakeConnection(self.server)
+
+    def getconn(self, key=None):
+        if self.used >= self.maxconn:
+            raise FakePoolError('connection pool exhausted')
+        connection = self.free.pop() if self.free else self._connect()
+        self.used += 1
+        return connection
+
+    def putconn(self, conn, key=None, close=False):
+        self.used -= 1
+        if len(self.free) < self.minconn and not close and not conn.closed:
+            self.free.append(conn)
+        else:
+            conn.close()
+
+    def closeall(self):
+        for conn in self.free:
+            conn.close()
+        self.free = []
+        self.closed = True
+
+
+class ReplicaTestPool(smf.StudentConnectionPoolMixin, FakePool):
+    pass
+
+
+def parse_dsn(dsn):
+    if '=' not in dsn:
+        raise FakeError(f'invalid dsn: {dsn}')
+    return dict(part.split('=', 1) for part in dsn.split())
+
+
+FAKE_DRIVER = types.SimpleNamespace(extensions=types.SimpleNamespace(parse_dsn=parse_dsn),
+                                    OperationalError=FakeOperationalError, Error=FakeError)
+
+
+class ReplicaTest(unittest.TestCase):
+    DSNS = ['host=replica1 port=5432', 'host=replica2 port=5433']
+
+    def setUp(self):
+        SERVERS.clear()
+        SERVERS.update(replica1=FakeServer(), replica2=FakeServer())
+        self.output = io.StringIO()
+        self.enterContext(contextlib.redirect_stdout(self.output))
+        for name, value in (('psycopg2', FAKE_DRIVER), ('pg_pool', types.SimpleNamespace(PoolError=FakePoolError)),
+                            ('Error', FakeError), ('StudentConnectionPool', ReplicaTestPool),
+                            ('TimingCursor', None), ('DB_REPLICA_DSNS', self.DSNS), ('replica_pools', None),
+                            ('_replica_turn', itertools.count()), ('_replica_session', threading.local()),
+                            ('_last_write_at', None), ('DB_POOL_MIN', 1), ('DB_REPLICA_POOL_MAX', 3),
+                            ('DB_REPLICA_MAX_LAG', 10.0), ('DB_REPLICA_CHECK_INTERVAL', 1000.0),
+                            ('DB_READ_AFTER_WRITE', 1000.0), ('DB_POOL_HEALTH_CHECK', True)):
+            self.enterContext(mock.patch.object(smf, name, value))
+        self.enterContext(mock.patch.object(smf, 'load_db_driver'))
+        self.enterContext(mock.patch.object(smf.atexit, 'register'))
+        self.addCleanup(smf.close_replica_pools)
+
+    def read(self):
+        """
+        Одно чтение: имя реплики или None (основной сервер).
+        """
+        connection, replica = smf.get_replica_connection()
+        if connection is None:
+            return None
+        replica.putconn(connection)
+        return replica.name
+
+    def test_round_robin(self):
+        self.assertEqual([self.read() for _ in range(4)],
+                         ['replica1:5432', 'replica2:5433', 'replica1:5432', 'replica2:5433'])
+        stats = smf.get_replica_stats()
+        self.assertEqual({name: replica['reads'] for name, replica in stats.items()},
+                         {'replica1:5432': 2, 'replica2:5433': 2})
+        self.assertTrue(all(replica['healthy'] and replica['lag'] == 0.0 for replica in stats.values()))
+
+    def test_connections_are_reused(self):
+        # Соединение с репликой возвращается в пул, а не закрывается после каждого чтения
+        for _ in range(6):
+            self.read()
+        self.assertEqual((SERVERS['replica1'].connects, SERVERS['replica2'].connects), (1, 1))
+        self.assertEqual(smf.get_replica_stats()['replica1:5432']['connections_created'], 1)
+
+    def test_lagging_replica_is_skipped(self):
+        SERVERS['replica1'].lag = 30.0
+        self.assertEqual({self.read() for _ in range(4)}, {'replica2:5433'})
+        stats = smf.get_replica_stats()['replica1:5432']
+        self.assertEqual((stats['healthy'], stats['lag']), (False, 30.0))
+        # Реплика догнала основной сервер: после следующей проверки снова используется
+        SERVERS['replica1'].lag = 0.5
+        with mock.patch.object(smf, 'DB_REPLICA_CHECK_INTERVAL', 0.0):
+            self.assertEqual({self.read() for _ in range(4)}, {'replica1:5432', 'replica2:5433'})
+        self.assertIn('снова используется', self.output.getvalue())
+
+    def test_failed_replica(self):
+        SERVERS['replica1'].down = True
+        self.assertEqual({self.read() for _ in range(4)}, {'replica2:5433'})
+        # До следующей проверки к неисправной реплике не подключаюсь
+        self.assertEqual(smf.get_replica_stats()['replica1:5432']['failures'], 1)
+        self.assertEqual(self.output.getvalue().count('недоступна'), 1)
+        SERVERS['replica2'].down = True
+        self.assertEqual(self.read(), None)  # ни одна не годится - основной сервер
+
+    def test_replica_dies_between_reads(self):
+        with mock.patch.object(smf, 'DB_REPLICA_DSNS', self.DSNS[:1]):
+            self.assertEqual(self.read(), 'replica1:5432')
+            SERVERS['replica1'].down = True  # соединение в пуле "умерло"
+            self.assertEqual(self.read(), None)
+        self.assertFalse(smf.get_replica_stats()['replica1:5432']['healthy'])
+
+    def test_pool_exhausted_is_not_failure(self):
+        with mock.patch.object(smf, 'DB_REPLICA_DSNS', self.DSNS[:1]), \
+                mock.patch.object(smf, 'DB_REPLICA_POOL_MAX', 1):
+            connection, replica = smf.get_replica_connection()
+            self.assertEqual(self.read(), None)
+            replica.putconn(connection)
+            self.assertEqual(self.read(), 'replica1:5432')
+        stats = smf.get_replica_stats()['replica1:5432']
+        self.assertEqual((stats['skipped'], stats['failures'], stats['healthy']), (1, 0, True))
+
+    def test_bad_dsn_is_skipped(self):
+        with mock.patch.object(smf, 'DB_REPLICA_DSNS', ['oops', self.DSNS[1]]):
+            self.assertEqual([self.read() for _ in range(2)], ['replica2:5433', 'replica2:5433'])
+        self.assertIn('Реплика №1', self.output.getvalue())
+
+    def test_no_replicas(self):
+        with mock.patch.object(smf, 'DB_REPLICA_DSNS', []):
+            self.assertEqual(smf.get_replica_connection(), (None, None))
+        self.assertIsNone(smf.replica_pools)
+
+    def test_read_after_write(self):
+        smf.note_primary_write()
+        self.assertEqual(self.read(), None)  # свои изменения этот поток читает с основного сервера
+        reads = []
+        thread = threading.Thread(target=lambda: reads.append(self.read()))
+        thread.start()
+        thread.join()
+        self.assertEqual(reads, ['replica1:5432'])  # чужие чтения по-прежнему с реплик
+        with mock.patch.object(smf, 'DB_READ_AFTER_WRITE', 0.0):
+            self.assertEqual(self.read(), 'replica2:5433')
+
+    def test_replica_read_is_cacheable(self):
+        self.assertTrue(smf.replica_read_is_cacheable())
+        smf._replica_session.used_replica = True
+        self.assertTrue(smf.replica_read_is_cacheable())  # изменений не было
+        smf.note_primary_write()
+        self.assertFalse(smf.replica_read_is_cacheable())
+        smf._replica_session.used_replica = False
+        self.assertTrue(smf.replica_read_is_cacheable())  # прочитано с основного сервера
+        smf._replica_session.used_replica = True
+        with mock.patch.object(smf, 'DB_READ_AFTER_WRITE', 0.0):
+            self.assertTrue(smf.replica_read_is_cacheable())
+
+    def test_db_connection_readonly(self):
+        self.enterContext(mock.patch.object(smf, 'ensure_schema'))
+        with smf.db_connection(readonly=True) as connection:
+            self.assertIs(connection.server, SERVERS['replica1'])
+        self.assertTrue(smf._replica_session.used_replica)
+        replica = smf.replica_pools[0]
+        self.assertEqual(replica.pool.used_connections, 0)
+        # Реплика пропала посреди запроса: ошибка пробрасывается, реплика отмечается неисправной
+        with self.assertRaises(FakeOperationalError):
+            with smf.db_connection(readonly=True) as connection:
+                raise FakeOperationalError('terminating connection')
+        self.assertFalse(smf.replica_pools[1].healthy)
+        self.assertEqual(smf.replica_pools[1].pool.used_connections, 0)
+
+    def test_db_connection_falls_back_to_primary(self):
+        self.enterContext(mock.patch.object(smf, 'ensure_schema'))
+        primary = object()
+        self.enterContext(mock.patch.object(smf, 'get_db_connection', return_value=primary))
+        release = self.enterContext(mock.patch.object(smf, 'release_db_connection'))
+        smf.note_primary_write()
+        with smf.db_connection(readonly=True) as connection:
+            self.assertIs(connection, primary)
+        release.assert_called_once_with(primary)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Тесты миграций схемы: список SCHEMA_MIGRATIONS, необязательные шаги (SAVEPOINT)
+и индексы для сортировки списка. Что индексы подходят к запросам списка,
+проверяет планировщик SQLite (EXPLAIN QUERY PLAN).
+"""
+import contextlib
+import io
+import sqlite3
+import unittest
+
+import student_management_functions as smf
+
+
+class MigrationListTest(unittest.TestCase):
+    def test_versions_go_in_order(self):
+        versions = [version for version, description, steps in smf.SCHEMA_MIGRATIONS]
+        self.assertEqual(versions, list(range(1, len(versions) + 1)))
+        self.assertEqual(smf.LATEST_SCHEMA_VERSION, versions[-1])
+
+    def test_sort_indexes_are_required(self):
+        steps = dict((version, steps) for version, description, steps in smf.SCHEMA_MIGRATIONS)[3]
+        self.assertEqual([statement for description, statement, required in steps],
+                         [statement for description, statement in smf.SORT_INDEX_STATEMENTS])
+        self.assertTrue(all(required for description, statement, required in steps))
+
+    def test_statements_are_repeatable(self):
+        # Миграцию могут выполнить повторно (например, после сбоя до записи в schema_version)
+        for description, statement in smf.SEARCH_INDEX_STATEMENTS + smf.SORT_INDEX_STATEMENTS:
+            if statement.startswith('CREATE'):
+                with self.subTest(description=description):
+                    self.assertIn('IF NOT EXISTS', statement)
+
+
+class FakeCursor:
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.log = []
+
+    def execute(self, statement, params=None):
+        self.log.append(statement)
+        if statement in self.failing:
+            raise smf.Error('permission denied')
+
+
+class ApplyMigrationStepTest(unittest.TestCase):
+    def test_required_step(self):
+        cursor = FakeCursor()
+        smf._apply_migration_step(cursor, 'шаг', 'CREATE TABLE t ();', True)
+        self.assertEqual(cursor.log, ['CREATE TABLE t ();'])
+        with self.assertRaises(smf.Error):
+            smf._apply_migration_step(FakeCursor(failing=['CREATE TABLE t ();']), 'шаг', 'CREATE TABLE t ();', True)
+
+    def test_optional_step_in_savepoint(self):
+        cursor = FakeCursor()
+        smf._apply_migration_step(cursor, 'шаг', 'CREATE EXTENSION x;', False)
+        self.assertEqual(cursor.log, ['SAVEPOINT migration_step;', 'CREATE EXTENSION x;',
+                                      'RELEASE SAVEPOINT migration_step;'])
+
+    def test_failed_optional_step_is_rolled_back(self):
+        cursor = FakeCursor(failing=['CREATE EXTENSION x;'])
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            smf._apply_migration_step(cursor, 'расширение x', 'CREATE EXTENSION x;', False)
+        self.assertEqual(cursor.log[-1], 'ROLLBACK TO SAVEPOINT migration_step;')
+        self.assertIn('расширение x', output.getvalue())
+
+
+class SortIndexPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(':memory:')
+        self.addCleanup(self.connection.close)
+        self.connection.execute('CREATE TABLE students (id INTEGER, last_name TEXT, first_name TEXT, '
+                                'patronymic TEXT, age INTEGER, course INTEGER);')
+        for description, statement in smf.SORT_INDEX_STATEMENTS:
+            self.connection.execute(statement)
+
+    def plan(self, query, params):
+        query = query.replace('%s', '?')
+        return ' '.join(row[-1] for row in self.connection.execute(f'EXPLAIN QUERY PLAN {query}', params))
+
+    def test_page_queries_read_index_in_order(self):
+        key = ('Иванов', 'Иван', 5)
+        for criteria in ({}, {'after': key}, {'before': key}):
+            with self.subTest(**criteria):
+                query, params, reverse = smf.build_page_query(page_size=20, **criteria)
+                plan = self.plan(query, params)
+                self.assertIn('students_name_order_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)  # отдельной сортировки нет
+
+    def test_filter_uses_course_age_index(self):
+        where, params = smf.build_student_filter(course=2, age_min=18, age_max=25)
+        plan = self.plan(f'SELECT id FROM students WHERE {where};', params)
+        self.assertIn('students_course_age_idx', plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
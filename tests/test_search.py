@@ -0,0 +1,143 @@
+"""
+Тесты поиска студентов по части ФИО: выбор способа поиска и сборка SQL-запроса
+(сам запрос в PostgreSQL не выполняется; экранирование для LIKE проверяет SQLite).
+"""
+import re
+import sqlite3
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+ALL_FEATURES = {'trigram': True, 'fulltext': True}
+NO_FEATURES = {'trigram': False, 'fulltext': False}
+
+
+class ChooseSearchModeTest(unittest.TestCase):
+    def test_modes(self):
+        self.assertEqual(smf.choose_search_mode('Иванов Иван'), 'fulltext')
+        self.assertEqual(smf.choose_search_mode('Ив'), 'prefix')
+        self.assertEqual(smf.choose_search_mode('в' * smf.TRIGRAM_MIN_LENGTH), 'trigram')
+        self.assertEqual(smf.choose_search_mode('ванов'), 'trigram')
+
+
+class LikeEscapeTest(unittest.TestCase):
+    def test_special_characters_match_themselves(self):
+        connection = sqlite3.connect(':memory:')
+        self.addCleanup(connection.close)
+
+        def like(text, term):
+            pattern = f'%{smf._like_escape(term)}%'
+            return connection.execute("SELECT ? LIKE ? ESCAPE '\\';", (text, pattern)).fetchone()[0] == 1
+
+        self.assertTrue(like('50% скидка', '50%'))
+        self.assertFalse(like('50 скидка', '50%'))
+        self.assertTrue(like('a_b', 'a_b'))
+        self.assertFalse(like('axb', 'a_b'))
+        self.assertTrue(like('a\\b', 'a\\b'))
+        self.assertFalse(like('ab', 'a\\b'))
+
+
+class BuildSearchQueryTest(unittest.TestCase):
+    def assertParamsComplete(self, query, params):
+        # Все параметры %(имя)s из запроса переданы
+        self.assertLessEqual(set(re.findall(r'%\((\w+)\)s', query)), set(params))
+
+    def test_prefix(self):
+        query, params, mode = smf.build_search_query('И_', None, ALL_FEATURES, limit=7)
+        self.assertEqual(mode, 'prefix')
+        self.assertIn('lower(last_name) LIKE %(pattern)s', query)
+        self.assertEqual(params['pattern'], 'и\\_%')  # с начала фамилии, без учета регистра
+        self.assertEqual(params['limit'], 7)
+        self.assertParamsComplete(query, params)
+
+    def test_trigram(self):
+        query, params, mode = smf.build_search_query('ванов', None, ALL_FEATURES)
+        self.assertEqual(mode, 'trigram')
+        self.assertIn('ILIKE %(pattern)s', query)
+        self.assertIn('similarity(', query)
+        self.assertEqual(params['pattern'], '%ванов%')
+        self.assertEqual(params['limit'], smf.SEARCH_RESULTS_LIMIT)
+        self.assertParamsComplete(query, params)
+
+    def test_without_pg_trgm(self):
+        query, params, mode = smf.build_search_query('ванов', None, NO_FEATURES)
+        self.assertEqual(mode, 'trigram')
+        self.assertIn('ILIKE %(pattern)s', query)
+        self.assertNotIn('similarity(', query)  # функции similarity без расширения нет
+        self.assertParamsComplete(query, params)
+
+    def test_fulltext(self):
+        query, params, mode = smf.build_search_query('Иванов Иван', None, ALL_FEATURES)
+        self.assertEqual(mode, 'fulltext')
+        self.assertIn("plainto_tsquery('russian', %(term)s)", query)
+        self.assertEqual(params['term'], 'Иванов Иван')
+        self.assertParamsComplete(query, params)
+
+    def test_fulltext_without_search_vector(self):
+        # Столбца search_vector нет - вся строка ищется как подстрока
+        query, params, mode = smf.build_search_query('Иванов Иван', 'fulltext', {'trigram': True, 'fulltext': False})
+        self.assertEqual(mode, 'trigram')
+        self.assertNotIn('search_vector', query)
+        self.assertEqual(params['pattern'], '%Иванов Иван%')
+
+    def test_explicit_mode(self):
+        self.assertEqual(smf.build_search_query('Иванов', 'prefix', ALL_FEATURES)[2], 'prefix')
+
+    def test_every_query_has_limit_and_order(self):
+        for term in ('Ив', 'ванов', 'Иванов Иван'):
+            for features in (ALL_FEATURES, NO_FEATURES):
+                with self.subTest(term=term, features=features):
+                    query = smf.build_search_query(term, None, features)[0]
+                    self.assertIn('LIMIT %(limit)s', query)
+                    self.assertIn('last_name, first_name, id', query)
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, query, params=None):
+        self.log.append((query, params))
+
+    def fetchone(self):
+        return True, False
+
+    def fetchall(self):
+        return [(1, 'Иванов', 'Иван', None, 20, 1)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+
+class SearchStudentsTest(unittest.TestCase):
+    def test_features_are_checked_once(self):
+        connection = FakeConnection()
+        with mock.patch.object(smf, '_search_features', None):
+            rows, mode = smf.search_students(connection, 'Иванов Иван')
+            smf.search_students(connection, 'ванов')
+        self.assertEqual(mode, 'trigram')  # search_vector нет
+        self.assertEqual(rows, [(1, 'Иванов', 'Иван', None, 20, 1)])
+        self.assertEqual([query for query, params in connection.log].count(smf.SEARCH_FEATURES_QUERY), 1)
+        self.assertEqual(len(connection.log), 3)
+
+    def test_fuzzy_does_not_query_database(self):
+        row = (1, 'Иванов', 'Иван', None, 20, 1)
+        with mock.patch.object(smf, 'fuzzy_find_students', return_value=[(row, 1)]) as fuzzy, \
+                mock.patch.object(smf, 'search_students') as search:
+            self.assertEqual(smf.find_students_by_name('Иваноф', mode='fuzzy'), ([row], 'fuzzy'))
+        fuzzy.assert_called_once_with('Иваноф')
+        search.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
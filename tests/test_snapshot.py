@@ -0,0 +1,96 @@
+"""
+Тесты снимка таблицы в памяти (StudentSnapshot): условия отбора сравниваются
+с условием WHERE из build_student_filter, которое выполняет SQLite
+(в нем, как и в PostgreSQL, сравнение с NULL не выполняется).
+"""
+import itertools
+import json
+import sqlite3
+import unittest
+
+import student_management_functions as smf
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+ROWS = [
+    (1, 'Иванов', 'Иван', 'Иванович', 20, 1),
+    (2, 'Петров', 'Петр', None, None, 2),
+    (3, 'Сидоров', 'Сидор', 'Сидорович', 18, None),
+    (4, 'Абрамов', 'Иван', 'Ильич', None, None),
+    (5, 'Иваненко', 'Анна', 'Петровна', 25, 1),
+    (6, 'Кузнецов', 'Олег', None, 16, 6),
+]
+
+
+def sql_filter_ids(connection, **criteria):
+    """
+    ID студентов, подходящих под условие build_student_filter (выполняется в SQLite).
+    """
+    where, params = smf.build_student_filter(**criteria)
+    # В SQLite нет массивов: "id = ANY(%s)" заменяю на список из JSON
+    where = where.replace('id = ANY(%s)', 'id IN (SELECT value FROM json_each(%s))').replace('%s', '?')
+    params = [json.dumps(param) if isinstance(param, list) else param for param in params]
+    return {row[0] for row in connection.execute(f'SELECT id FROM students WHERE {where};', params)}
+
+
+@unittest.skipIf(numpy is None, 'нужна библиотека numpy')
+class StudentSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = smf.StudentSnapshot()
+        self.assertEqual(self.snapshot.extend(ROWS), len(ROWS))
+
+    def test_rows_round_trip(self):
+        self.assertEqual(len(self.snapshot), len(ROWS))
+        self.assertEqual(self.snapshot.high_water_mark, 6)
+        self.assertEqual([self.snapshot.row(position) for position in range(len(ROWS))], ROWS)
+
+    def test_mask_matches_sql_filter(self):
+        connection = sqlite3.connect(':memory:')
+        self.addCleanup(connection.close)
+        connection.execute('CREATE TABLE students (id INTEGER, last_name TEXT, first_name TEXT, '
+                           'patronymic TEXT, age INTEGER, course INTEGER);')
+        connection.executemany('INSERT INTO students VALUES (?, ?, ?, ?, ?, ?);', ROWS)
+        options = {
+            'ids': [None, [1, 2, 4], [3, 99]],
+            'course': [None, 0, 1, 2, 6],
+            'age_min': [None, 0, 18, 30],
+            'age_max': [None, 0, 20, 65],
+        }
+        for values in itertools.product(*options.values()):
+            criteria = {key: value for key, value in zip(options, values) if value is not None}
+            if not criteria:
+                continue  # build_student_filter запрещает пустое условие
+            with self.subTest(**criteria):
+                mask = self.snapshot.mask(**criteria)
+                found = {int(student_id) for student_id in self.snapshot.ids[mask]}
+                self.assertEqual(found, sql_filter_ids(connection, **criteria))
+                self.assertEqual(self.snapshot.count(**criteria), len(found))
+
+    def test_null_is_not_zero(self):
+        # Студенты без возраста не "моложе 20 лет", а без курса - не "на курсе 0"
+        self.assertEqual([row[0] for row in self.snapshot.query(order='id', age_max=20)], [1, 3, 6])
+        self.assertEqual(self.snapshot.query(course=0), [])
+        self.assertEqual([row[0] for row in self.snapshot.query(order='id', age_min=0)], [1, 3, 5, 6])
+
+    def test_order_by_age_puts_null_last(self):
+        ids = [row[0] for row in self.snapshot.query(order='age')]
+        self.assertEqual(ids, [6, 3, 1, 5, 2, 4])
+        self.assertEqual([row[0] for row in self.snapshot.query(order='course')], [1, 5, 2, 6, 3, 4])
+
+    def test_name_search(self):
+        self.assertEqual([row[0] for row in self.snapshot.query(name='иван')], [4, 5, 1])
+        self.assertEqual([row[0] for row in self.snapshot.query(name='иван', prefix=True, order='id')], [1, 4, 5])
+        self.assertEqual([row[0] for row in self.snapshot.query(name='петр', course=2)], [2])
+
+    def test_extend_appends(self):
+        self.snapshot.extend([(10, 'Яковлев', 'Яков', None, 30, 3)])
+        self.assertEqual(self.snapshot.high_water_mark, 10)
+        self.assertEqual(self.snapshot.query(age_min=30), [(10, 'Яковлев', 'Яков', None, 30, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
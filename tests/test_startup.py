@@ -0,0 +1,102 @@
+"""
+Тесты быстрого запуска: импорт модуля не загружает тяжелые библиотеки
+(драйвер БД, asyncio, numpy и т.д.), они загружаются при первом использовании.
+Проверка идет в отдельном процессе Python, чтобы на нее не влияли другие тесты.
+"""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Библиотеки, которые нужны только отдельным режимам программы
+LAZY_MODULES = ['psycopg2', 'asyncio', 'asyncpg', 'multiprocessing', 'http.server', 'numpy', 'pyarrow',
+                'concurrent.futures']
+
+# Драйвер-подделка: ровно то, что load_db_driver() берет из psycopg2
+FAKE_DRIVER = {
+    '__init__.py': 'class Error(Exception):\n    pass\n',
+    'extensions.py': 'class cursor:\n    pass\n\n\nclass connection:\n    pass\n',
+    'pool.py': 'class ThreadedConnectionPool:\n    pass\n',
+}
+
+
+def run_python(code, extra_path=None):
+    """
+    Выполняет code в новом процессе Python (из папки программы) и возвращает JSON, который он напечатал.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [extra_path, ROOT]))
+    result = subprocess.run([sys.executable, '-c', textwrap.dedent(code)], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_does_not_load_heavy_modules(self):
+        loaded = run_python(f"""
+            import json, sys
+            import student_management_functions
+            print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))
+        """)
+        self.assertEqual(loaded, [])
+
+    def test_help_does_not_need_database(self):
+        result = subprocess.run([sys.executable, 'student_management_functions.py', '--help'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('--startup-report', result.stdout)
+
+    def test_driver_is_loaded_on_demand(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, 'psycopg2'))
+            for name, text in FAKE_DRIVER.items():
+                with open(os.path.join(directory, 'psycopg2', name), 'w', encoding='utf-8') as file:
+                    file.write(text)
+            result = run_python("""
+                import json, sys
+                import student_management_functions as smf
+                before = 'psycopg2' in sys.modules
+                placeholder = smf.Error
+                driver = smf.load_db_driver()
+                print(json.dumps({
+                    'before': before,
+                    'same_driver': smf.load_db_driver() is driver,
+                    'error_replaced': smf.Error is driver.Error and placeholder is not driver.Error,
+                    'pool': [cls.__name__ for cls in smf.StudentConnectionPool.__mro__[1:3]],
+                    'cursor': issubclass(smf.StudentCursor, (smf.TimingCursorMixin, smf.StudentCursorMixin)),
+                    'stages': [name for name, own, total in smf._startup_events],
+                }))
+            """, extra_path=directory)
+        self.assertFalse(result['before'])
+        self.assertTrue(result['same_driver'])
+        self.assertTrue(result['error_replaced'])
+        self.assertEqual(result['pool'], ['StudentConnectionPoolMixin', 'ThreadedConnectionPool'])
+        self.assertTrue(result['cursor'])
+        self.assertIn('загрузка драйвера psycopg2', result['stages'])
+
+
+class StartupReportTest(unittest.TestCase):
+    def test_report(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output, \
+                mock.patch.object(smf, '_startup_reported', False):
+            smf.print_startup_report()
+        lines = output.getvalue().splitlines()
+        self.assertTrue(any(line.endswith('| импорт модуля') for line in lines))
+        self.assertTrue(lines[-1].startswith('запуск: до меню'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Тесты статистики по курсам и возрасту: запросы отчета выполняет SQLite
+над сводкой student_stats, заполненной так же, как при пересчете (миграция 7),
+и результат сравнивается с подсчетом "вручную" по списку студентов.
+"""
+import contextlib
+import io
+import random
+import re
+import sqlite3
+import unittest
+from unittest import mock
+
+import student_management_functions as smf
+
+
+def sqlite_query(query):
+    """
+    Запрос PostgreSQL -> SQLite: без приведения ::numeric, NULL при сортировке -
+    в конце (как по умолчанию в PostgreSQL).
+    """
+    query = query.replace('::numeric', ' * 1.0')
+    return re.sub(r'ORDER BY (course|age)\b', r'ORDER BY \1 NULLS LAST', query)
+
+
+class StatsCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+        self.log = []
+
+    def execute(self, query, params=None):
+        self.log.append(query)
+        if query == smf.REFRESH_STUDENT_STATS_QUERY:
+            return  # дельты в этих тестах не копятся - переносить нечего
+        self.rows = self.database.execute(sqlite_query(query)).fetchall()
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def expected_stats(students):
+    """
+    Та же статистика, посчитанная на Python по списку (возраст, курс).
+    """
+    total = len(students)
+    by_course = []
+    for course in sorted({course for age, course in students}, key=lambda course: (course is None, course)):
+        ages = [age for age, student_course in students if student_course == course]
+        known = [age for age in ages if age is not None]
+        by_course.append({
+            'course': course,
+            'students': len(ages),
+            'avg_age': round(sum(known) / len(known), 1) if known else None,
+            'min_age': min(known) if known else None,
+            'max_age': max(known) if known else None,
+            'percent': round(100.0 * len(ages) / total, 1),
+        })
+    by_age = []
+    cumulative = 0
+    for age in sorted({age for age, course in students}, key=lambda age: (age is None, age)):
+        count = sum(1 for student_age, course in students if student_age == age)
+        cumulative += count
+        by_age.append({'age': age, 'students': count, 'cumulative': cumulative})
+    return {'total': total, 'by_course': by_course, 'by_age': by_age}
+
+
+class StudentStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.database = sqlite3.connect(':memory:')
+        self.addCleanup(self.database.close)
+        self.database.execute('CREATE TABLE students (id INTEGER PRIMARY KEY, age INTEGER, course INTEGER);')
+        self.database.execute('CREATE TABLE student_stats (course INTEGER, age INTEGER, students BIGINT);')
+
+    def load(self, students):
+        self.database.executemany('INSERT INTO students (age, course) VALUES (?, ?);', students)
+        # Пересчет сводки - тот же запрос, что в миграции 7
+        recount = dict(smf.STUDENT_STATS_NULL_STATEMENTS)['пересчет статистики']
+        insert = recount[recount.index('INSERT INTO student_stats'):]
+        self.database.execute(insert)
+
+    def fetch(self):
+        connection = mock.Mock(cursor=lambda: StatsCursor(self.database))
+        return smf.fetch_student_stats(connection)
+
+    def test_matches_manual_count(self):
+        rng = random.Random(17)
+        students = [(rng.choice([None, *range(16, 30)]), rng.choice([None, 1, 2, 3, 4, 5, 6])) for _ in range(500)]
+        self.load(students)
+        stats = self.fetch()
+        expected = expected_stats(students)
+        self.assertEqual(stats['total'], expected['total'])
+        self.assertEqual(stats['by_age'], expected['by_age'])
+        for row, expected_row in zip(stats['by_course'], expected['by_course']):
+            with self.subTest(course=expected_row['course']):
+                self.assertEqual(row, expected_row)
+        self.assertEqual(len(stats['by_course']), len(expected['by_course']))
+
+    def test_unknown_age_is_not_zero(self):
+        # Студент без возраста не делает средний возраст курса меньше
+        self.load([(20, 1), (22, 1), (None, 1), (None, None)])
+        stats = self.fetch()
+        self.assertEqual(stats['by_course'][0], {'course': 1, 'students': 3, 'avg_age': 21.0, 'min_age': 20,
+                                                 'max_age': 22, 'percent': 75.0})
+        self.assertEqual(stats['by_course'][1]['course'], None)
+        self.assertIsNone(stats['by_course'][1]['avg_age'])
+        self.assertEqual(stats['by_age'][-1], {'age': None, 'students': 2, 'cumulative': 4})
+
+    def test_empty(self):
+        self.assertEqual(self.fetch(), {'total': 0, 'by_course': [], 'by_age': []})
+
+    def test_delta_is_applied_first(self):
+        cursor = StatsCursor(self.database)
+        smf.fetch_student_stats(mock.Mock(cursor=lambda: cursor))
+        self.assertEqual(cursor.log[0], smf.REFRESH_STUDENT_STATS_QUERY)
+
+    def test_show_stats(self):
+        self.load([(20, 1), (None, 2), (25, None)])
+        stats = self.fetch()
+        with mock.patch.object(smf, 'get_student_stats', return_value=stats), \
+                mock.patch.object(smf, 'FAST_MODE', True), \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            smf.show_student_stats()
+        text = output.getvalue()
+        self.assertIn('Всего студентов: 3', text)
+        self.assertIn('не указан', text)
+        self.assertIn('      ?', text)  # строка гистограммы для неизвестного возраста
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Тесты представления студента в памяти: Student с __slots__ и StudentColumns.
+"""
+import contextlib
+import io
+import unittest
+
+import student_management_functions as smf
+
+
+ROWS = [
+    (1, 'Иванов', 'Иван', 'Иванович', 20, 1),
+    (2, 'Петров', 'Петр', None, None, None),
+]
+
+
+class StudentTest(unittest.TestCase):
+    def test_row_round_trip(self):
+        for row in ROWS:
+            with self.subTest(row=row):
+                student = smf.Student.from_row(row)
+                self.assertEqual(student.as_row(), row)
+                self.assertEqual(smf.Student(*row[1:], id=row[0]).as_row(), row)
+
+    def test_from_row_does_not_copy_strings(self):
+        row = (1, ''.join(['Ива', 'нов']), 'Иван', 'Иванович', 20, 1)
+        self.assertIs(smf.Student.from_row(row).last_name, row[1])
+
+    def test_slots(self):
+        student = smf.Student.from_row(ROWS[0])
+        self.assertFalse(hasattr(student, '__dict__'))
+        with self.assertRaises(AttributeError):
+            student.email = 'ivanov@example.com'
+
+    def test_memory(self):
+        # Числа в комментарии к __slots__ не записаны: они зависят от версии Python,
+        # но __slots__ всегда должны быть экономнее __dict__, а столбцы - экономнее объектов
+        with contextlib.redirect_stdout(io.StringIO()):
+            sizes = smf.measure_student_memory(count=20000)
+        self.assertLess(sizes['Student (__slots__)'], sizes['DictStudent (до)'])
+        self.assertLess(sizes['StudentColumns'], sizes['Student (__slots__)'])
+
+
+class StudentColumnsTest(unittest.TestCase):
+    def test_rows_round_trip(self):
+        columns = smf.StudentColumns()
+        columns.extend_rows(ROWS)
+        self.assertEqual(len(columns), 2)
+        self.assertEqual([columns.row(index) for index in range(len(columns))], ROWS)
+        self.assertEqual([student.as_row() for student in columns], ROWS)
+
+    def test_names_are_stored_once(self):
+        columns = smf.StudentColumns()
+        columns.extend_rows((number, ''.join(['Ива', 'нов']), 'Иван', None, 20, 1) for number in range(3))
+        self.assertIs(columns.last_names[0], columns.last_names[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
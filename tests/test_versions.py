@@ -0,0 +1,79 @@
+"""
+Тесты изменения студентов с проверкой версии: запрос UPDATE строится без БД,
+а конфликт версий проверяется по данным, которые вернул бы SELECT.
+"""
+import unittest
+
+import student_management_functions as smf
+
+
+class BuildUpdateQueryTest(unittest.TestCase):
+    def test_only_changed_columns(self):
+        query, params = smf.build_update_query(7, {'age': 21, 'first_name': 'Иван'})
+        # Столбцы - в порядке BATCH_UPDATE_COLUMNS, а не в порядке словаря
+        self.assertEqual(query, 'UPDATE students SET first_name = %s, age = %s WHERE id = %s RETURNING id;')
+        self.assertEqual(params, ('Иван', 21, 7))
+
+    def test_with_expected_version(self):
+        query, params = smf.build_update_query(7, {'course': 3}, expected_version='5')
+        self.assertEqual(query, 'UPDATE students SET course = %s WHERE id = %s AND version = %s RETURNING id;')
+        self.assertEqual(params, (3, 7, 5))
+
+    def test_same_columns_same_query(self):
+        # Один и тот же набор столбцов - один и тот же запрос (и подготовленный запрос)
+        first = {'last_name': 'Иванов', 'course': 2}
+        second = {'course': 4, 'last_name': 'Петров'}
+        self.assertEqual(smf.build_update_query(1, first)[0], smf.build_update_query(2, second)[0])
+        self.assertEqual(smf.update_statement_name(first), smf.update_statement_name(second))
+
+    def test_statement_names(self):
+        names = set()
+        columns = smf.BATCH_UPDATE_COLUMNS
+        for mask in range(1, 2 ** len(columns)):
+            changes = {column: None for index, column in enumerate(columns) if mask & (1 << index)}
+            names.add(smf.update_statement_name(changes))
+            names.add(smf.update_statement_name(changes, versioned=True))
+        self.assertEqual(len(names), 2 * (2 ** len(columns) - 1))
+        self.assertEqual(smf.update_statement_name({'last_name': 'Иванов'}), 'student_update_1')
+        self.assertEqual(smf.update_statement_name({'course': 1}, versioned=True), 'student_update_16_version')
+
+
+class ValidateStudentChangesTest(unittest.TestCase):
+    def test_normalizes_values(self):
+        self.assertEqual(smf.validate_student_changes({'last_name': ' петров ', 'age': '30', 'course': 6}),
+                         {'last_name': 'Петров', 'age': 30, 'course': 6})
+
+    def test_rejects_bad_values(self):
+        for changes in ({'age': 15}, {'course': 'два'}, {'first_name': ''}, {'patronymic': 'Иван0вич'},
+                        {'id': 5}, {'version': 2}, {}):
+            with self.subTest(changes=changes):
+                with self.assertRaises(ValueError):
+                    smf.validate_student_changes(changes)
+
+    def test_all_errors_in_message(self):
+        with self.assertRaises(ValueError) as raised:
+            smf.validate_student_changes({'age': 'много', 'course': 0})
+        self.assertIn('Возраст', str(raised.exception))
+        self.assertIn('курс', str(raised.exception))
+
+
+class VersionConflictTest(unittest.TestCase):
+    def test_deleted_student_is_not_a_conflict(self):
+        self.assertFalse(smf.check_version_conflict(7, 3, None, None))
+
+    def test_changed_student_is_a_conflict(self):
+        current = (7, 'Иванов', 'Иван', 'Иванович', 21, 2)
+        smf.student_cache.put(('id', 7), (7, 'Иванов', 'Иван', 'Иванович', 20, 2))
+        with self.assertRaises(smf.StudentConflictError) as raised:
+            smf.check_version_conflict(7, 3, current, 4)
+        error = raised.exception
+        self.assertIsInstance(error, ValueError)  # меню ловит его вместе с ошибками ввода
+        self.assertEqual((error.student_id, error.expected_version, error.current, error.current_version),
+                         (7, 3, current, 4))
+        self.assertIn('версия 3', str(error))
+        # Старые данные студента из кэша убраны
+        self.assertIs(smf.student_cache.get(('id', 7)), smf._MISSING)
+
+
+if __name__ == '__main__':
+    unittest.main()